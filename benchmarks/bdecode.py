@@ -0,0 +1,248 @@
+"""Per-response CPU cost of bdecoding HTTP announce responses.
+
+Compares decode_value with the recursive Decoder it replaced in bdecode(), kept below as the baseline, and StreamDecoder
+fed the whole body or network-sized chunks, keeping every field or only ANNOUNCE_FIELDS. Compact peers are decoded per
+peer as before PeerList, through struct.iter_unpack, and into PeerList's strided columns. Responses are modelled on what
+trackers send: compact peers of several swarm sizes, with and without peers6 and BEP 24 external ip, non-compact peer
+dicts, and an extension-heavy dict with nested lists.
+Run with: python -m benchmarks.bdecode
+"""
+
+import struct
+from array import array
+from collections import OrderedDict
+from collections.abc import Callable
+from socket import AF_INET, inet_ntop
+from timeit import repeat
+
+from newtrackon.bdecode import (
+    ANNOUNCE_FIELDS,
+    TOK_DICT,
+    TOK_END,
+    TOK_INT,
+    TOK_LIST,
+    TOK_STR_SEP,
+    BDecodedValue,
+    PeerInfo,
+    PeerList,
+    StreamDecoder,
+    decode_value,
+    peer_stats,
+)
+
+CHUNK: int = 1460  # A TCP segment's worth of body per feed
+
+
+def bstr(value: bytes) -> bytes:
+    return str(len(value)).encode() + b":" + value
+
+
+def bint(value: int) -> bytes:
+    return b"i" + str(value).encode() + b"e"
+
+
+def bdict(*items: tuple[bytes, bytes]) -> bytes:
+    return b"d" + b"".join(bstr(key) + value for key, value in sorted(items)) + b"e"
+
+
+def compact_peers(count: int, length: int) -> bytes:
+    return b"".join(
+        (index * 2654435761 % 2**32).to_bytes(4) * (length // 4) + (6881 + index % 50).to_bytes(2) for index in range(count)
+    )
+
+
+def compact_response(peers: int, peers6: int = 0, external_ip: bool = False) -> bytes:
+    items = [
+        (b"complete", bint(peers * 3)),
+        (b"incomplete", bint(peers)),
+        (b"interval", bint(1800)),
+        (b"min interval", bint(900)),
+        (b"peers", bstr(compact_peers(peers, 4))),
+    ]
+    if peers6:
+        items.append((b"peers6", bstr(compact_peers(peers6, 16))))
+    if external_ip:
+        items.append((b"external ip", bstr(bytes([203, 0, 113, 7]))))
+    return bdict(*items)
+
+
+def dict_peers_response(peers: int) -> bytes:
+    entries = b"".join(
+        bdict(
+            (b"ip", bstr(f"10.{index // 256 % 256}.{index % 256}.1".encode())),
+            (b"peer id", bstr(bytes(20))),
+            (b"port", bint(6881)),
+        )
+        for index in range(peers)
+    )
+    return bdict((b"interval", bint(1800)), (b"peers", b"l" + entries + b"e"))
+
+
+def extension_response() -> bytes:
+    files = b"".join(
+        bdict((b"complete", bint(index)), (b"downloaded", bint(index * 7)), (b"incomplete", bint(1))) for index in range(100)
+    )
+    return bdict(
+        (b"interval", bint(1800)),
+        (b"peers", bstr(compact_peers(50, 4))),
+        (b"tracker id", bstr(b"opentracker")),
+        (b"warning message", bstr(b"Tracker under maintenance tonight")),
+        (b"files", b"l" + files + b"e"),  # Sorted ahead of interval, so it has to be read past
+        (b"x-software", bdict((b"name", bstr(b"chihaya")), (b"version", bstr(b"v3.0.0")))),
+    )
+
+
+RESPONSES: dict[str, bytes] = {
+    "failure reason": bdict((b"failure reason", bstr(b"unregistered torrent"))),
+    "0 peers": compact_response(0),
+    "50 peers": compact_response(50),
+    "200 peers + 50 peers6 + external ip": compact_response(200, 50, external_ip=True),
+    "1000 peers": compact_response(1000),
+    "50 non-compact peers": dict_peers_response(50),
+    "200 non-compact peers": dict_peers_response(200),
+    "extension fields": extension_response(),
+}
+
+
+class Decoder:
+    """The recursive decoder bdecode() used before decode_value, kept here as the baseline."""
+
+    def __init__(self, data: bytes) -> None:
+        self.index = 0
+        self.data = data
+
+    def decode(self) -> BDecodedValue:
+        # decode the bencoded data
+        c = self.peek()  # get the next character
+        if c is None:
+            raise EOFError()
+        elif c == TOK_DICT:
+            self.read(1)  # read the token
+            return self.decode_dict()
+        elif c == TOK_LIST:
+            self.read(1)  # read the token
+            return self.decode_list()
+        elif c == TOK_INT:
+            self.read(1)  # read the token
+            return self.decode_int()
+        elif c in b"0123456789":  # the number indicates start of str (tells len(str))
+            return self.decode_str()
+        elif c == TOK_END:
+            return None
+        else:
+            raise RuntimeError("Could not bdecode data, probably invalid format")
+
+    # get the next byte
+    def peek(self) -> bytes | None:
+        if self.index + 1 >= len(self.data):  # index is passed the end of the data
+            return None
+        return self.data[self.index : self.index + 1]
+
+    # read the data for the length
+    def read(self, length: int) -> bytes:
+        if self.index + length > len(self.data):
+            raise RuntimeError()
+        result = self.data[self.index : self.index + length]
+        self.index += length
+        return result
+
+    # read until the first occurence of the token
+    def read_until(self, token: bytes) -> bytes:
+        # get the index of the token starting from where last left off
+        loc = self.data.find(token, self.index)
+        if loc == -1:  # token not found
+            raise RuntimeError()
+        # token found, loc is the index of it
+        result = self.data[self.index : loc]
+        self.index = loc + 1  # move index to just past loc read up to
+        return result
+
+    # decodes bencoded data into a Python OrderedDict
+    def decode_dict(self) -> OrderedDict[bytes, BDecodedValue]:
+        result: OrderedDict[bytes, BDecodedValue] = OrderedDict()
+        while self.data[self.index : self.index + 1] != TOK_END:
+            key = self.decode()  # decode the key
+            if not isinstance(key, bytes):
+                raise TypeError("Dict key must be bytes in bencoded data")
+            item = self.decode()  # decode the item
+            result[key] = item  # add the key item pair to the dict
+        self.read(1)  # read the end token
+        return result
+
+    # decodes bencoded data into a Python list
+    def decode_list(self) -> list[BDecodedValue]:
+        result: list[BDecodedValue] = []
+        while self.data[self.index : self.index + 1] != TOK_END:
+            item = self.decode()  # decode an item
+            result.append(item)  # add to the list
+        self.read(1)  # read the end token
+        return result
+
+    # decode bencoded data into a Python int
+    def decode_int(self) -> int:
+        return int(self.read_until(TOK_END))  # read until the end token
+
+    # decode the bencoded data into a Python string
+    def decode_str(self) -> bytes:
+        length = int(self.read_until(TOK_STR_SEP))  # get the length of str
+        return self.read(length)  # read that length
+
+
+def legacy_peers_list(buf: bytes) -> list[PeerInfo]:
+    peers: list[PeerInfo] = []
+    view = memoryview(buf)
+    for offset in range(0, len(buf) - len(buf) % 6, 6):
+        peers.append(
+            {"IP": inet_ntop(AF_INET, bytes(view[offset : offset + 4])), "port": struct.unpack_from("!H", buf, offset + 4)[0]}
+        )
+    return peers
+
+
+def iter_unpack_columns(buf: bytes) -> tuple[array[int], array[int]]:
+    pairs = list(struct.iter_unpack("!IH", buf))
+    return array("I", [pair[0] for pair in pairs]), array("H", [pair[1] for pair in pairs])
+
+
+def stream_decode(data: bytes, chunk: int, fields: frozenset[bytes] | None = None) -> object:
+    decoder = StreamDecoder(fields)
+    for offset in range(0, len(data), chunk):
+        if decoder.feed(data[offset : offset + chunk]):
+            break
+    return decoder.value()
+
+
+def per_call(label: str, func: Callable[[], object], rounds: int) -> None:
+    best = min(repeat(func, number=rounds, repeat=5))
+    print(f"{label:<72} {best / rounds * 1e9:10.0f} ns")
+
+
+def main() -> None:
+    for name, data in RESPONSES.items():
+        assert decode_value(data) == Decoder(data).decode()  # StreamDecoder may stop once the peers are in
+        rounds = max(100, 1_000_000 // len(data))
+        per_call(f"{name} ({len(data)} B), recursive Decoder", lambda data=data: Decoder(data).decode(), rounds)
+        per_call(f"{name} ({len(data)} B), decode_value", lambda data=data: decode_value(data), rounds)
+        per_call(f"{name} ({len(data)} B), StreamDecoder whole body", lambda data=data: stream_decode(data, len(data)), rounds)
+        per_call(f"{name} ({len(data)} B), StreamDecoder {CHUNK} B chunks", lambda data=data: stream_decode(data, CHUNK), rounds)
+        per_call(
+            f"{name} ({len(data)} B), StreamDecoder {CHUNK} B chunks, ANNOUNCE_FIELDS",
+            lambda data=data: stream_decode(data, CHUNK, ANNOUNCE_FIELDS),
+            rounds,
+        )
+
+    for count in (50, 1000):
+        peers = compact_peers(count, 4)
+        rounds = 100_000 // count
+        per_call(f"{count} compact peers, per-peer dicts (legacy loop)", lambda peers=peers: legacy_peers_list(peers), rounds)
+        per_call(f"{count} compact peers, PeerList dicts", lambda peers=peers: list(PeerList(peers, 0, AF_INET)), rounds)
+        per_call(f"{count} compact peers, struct.iter_unpack columns", lambda peers=peers: iter_unpack_columns(peers), rounds)
+        per_call(f"{count} compact peers, PeerList.columns", lambda peers=peers: PeerList(peers, 0, AF_INET).columns(), rounds)
+        per_call(
+            f"{count} compact peers, columns + peer_stats",
+            lambda peers=peers: peer_stats(PeerList(peers, 0, AF_INET).columns()),
+            rounds,
+        )
+
+
+if __name__ == "__main__":
+    main()
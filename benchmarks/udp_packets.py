@@ -0,0 +1,84 @@
+"""Per-packet CPU cost of building and parsing BEP 15 packets, and of receiving datagrams.
+
+Compares the precompiled struct.Struct layouts used by newtrackon.scraper with the field-by-field packing they
+replaced, and recvfrom_into a reused buffer with recvfrom. Run with: python -m benchmarks.udp_packets
+"""
+
+import socket
+import struct
+from collections.abc import Callable
+from timeit import repeat
+
+from newtrackon.scraper import udp_create_announce_request, udp_parse_announce_response
+from newtrackon.udp import ANNOUNCE_RESPONSE, UDP_BUFFER_SIZE, response_transaction_id
+
+ROUNDS: int = 100_000
+DATAGRAMS: int = 32  # Sent in a burst, well below the default loopback receive buffer
+THASH: bytes = bytes(range(20))
+RESPONSE: bytes = struct.pack("!iIiii", 1, 1234, 1800, 5, 10) + bytes([1, 2, 3, 4, 0x1A, 0xE1]) * 50
+
+
+def legacy_announce_request(connection_id: int, thash: bytes) -> bytes:
+    buf = struct.pack("!q", connection_id)
+    buf += struct.pack("!i", 0x1)
+    buf += struct.pack("!I", 1234)
+    buf += struct.pack("!20s", thash)
+    buf += struct.pack("!20s", thash)
+    buf += struct.pack("!q", 0x0)
+    buf += struct.pack("!q", 0x0)
+    buf += struct.pack("!q", 0x0)
+    buf += struct.pack("!i", 0x2)
+    buf += struct.pack("!i", 0x0)
+    buf += struct.pack("!I", 5678)
+    buf += struct.pack("!i", -1)
+    buf += struct.pack("!H", 0x76FD)
+    return buf
+
+
+def legacy_announce_header(buf: bytes) -> tuple[int, int, int, int, int]:
+    action = struct.unpack_from("!i", buf)[0]
+    transaction_id = struct.unpack_from("!I", buf, 4)[0]
+    interval = struct.unpack_from("!i", buf, 8)[0]
+    leechers = struct.unpack_from("!i", buf, 12)[0]
+    seeds = struct.unpack_from("!i", buf, 16)[0]
+    return action, transaction_id, interval, leechers, seeds
+
+
+def per_call(label: str, func: Callable[[], object], rounds: int = ROUNDS) -> None:
+    best = min(repeat(func, number=rounds, repeat=5))
+    print(f"{label:<44} {best / rounds * 1e9:8.0f} ns")
+
+
+def receive_burst(sock: socket.socket, receiver: socket.socket, use_buffer: bool) -> None:
+    address = receiver.getsockname()
+    for _ in range(DATAGRAMS):
+        sock.sendto(RESPONSE, address)
+    if use_buffer:
+        buf = bytearray(UDP_BUFFER_SIZE)
+        view = memoryview(buf)
+        for _ in range(DATAGRAMS):
+            nbytes, _addr = receiver.recvfrom_into(buf)
+            response_transaction_id(view[:nbytes])
+    else:
+        for _ in range(DATAGRAMS):
+            data, _addr = receiver.recvfrom(UDP_BUFFER_SIZE)
+            response_transaction_id(data)
+
+
+def main() -> None:
+    per_call("announce request, field by field", lambda: legacy_announce_request(0x1234, THASH))
+    per_call("announce request, precompiled Struct", lambda: udp_create_announce_request(0x1234, THASH))
+    per_call("announce header, field by field", lambda: legacy_announce_header(RESPONSE))
+    per_call("announce header, precompiled Struct", lambda: ANNOUNCE_RESPONSE.unpack_from(RESPONSE))
+    per_call("announce response with 50 peers", lambda: udp_parse_announce_response(RESPONSE, 1234, socket.AF_INET), 10_000)
+
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sender, socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as receiver:
+        receiver.bind(("127.0.0.1", 0))
+        receiver.settimeout(1)  # Fail instead of hanging if the kernel drops part of a burst
+        for use_buffer, label in ((False, "recvfrom"), (True, "recvfrom_into reused buffer")):
+            best = min(repeat(lambda use_buffer=use_buffer: receive_burst(sender, receiver, use_buffer), number=200, repeat=5))
+            print(f"{'send + receive, ' + label:<44} {best / 200 / DATAGRAMS * 1e9:8.0f} ns")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,251 @@
+import asyncio
+import socket
+from collections import deque
+from collections.abc import Sequence
+from logging import getLogger
+from os import urandom
+from typing import Any, cast
+from urllib.parse import urlparse
+
+from dns.exception import DNSException
+from tornado.httpclient import AsyncHTTPClient, HTTPClientError, HTTPRequest
+from tornado.httputil import HTTPHeaders
+from tornado.netutil import Resolver
+from tornado.simple_httpclient import HTTPTimeoutError
+
+from newtrackon import dnscache
+from newtrackon.bdecode import BDecodeResponse
+from newtrackon.scraper import (
+    SCRAPING_HEADERS,
+    AnnounceReader,
+    UDPAnnounceResponse,
+    build_http_announce_url,
+    parse_bep_34_answer,
+    parse_http_announce,
+    udp_create_announce_request,
+    udp_create_binary_connection_request,
+    udp_parse_announce_response,
+    udp_parse_connection_response,
+)
+from newtrackon.sessions import WILDCARD_ADDRESSES, tls_context
+from newtrackon.udp import ResponseKey, connection_ids, response_key, response_transaction_id, retransmission_timeouts
+from newtrackon.utils import HAPPY_EYEBALLS_DELAY, ProtocolPref, interleave_families
+
+HTTP_MAX_CLIENTS: int = 10000
+
+logger = getLogger("newtrackon")
+
+
+class MultiplexedUDPProtocol(asyncio.DatagramProtocol):
+    """Unconnected datagram endpoint shared by every announce of one address family on the running loop.
+
+    Responses are handed to the request waiting on their (remote address, transaction ID).
+    """
+
+    def __init__(self) -> None:
+        self.transport: asyncio.DatagramTransport | None = None
+        self.pending: dict[ResponseKey, asyncio.Future[bytes]] = {}
+
+    def connection_made(self, transport: asyncio.BaseTransport) -> None:
+        self.transport = cast(asyncio.DatagramTransport, transport)
+
+    def datagram_received(self, data: bytes, addr: tuple[str | int, int]) -> None:
+        transaction_id = response_transaction_id(data)
+        if transaction_id is None:
+            return
+        waiter = self.pending.get(response_key((str(addr[0]), addr[1]), transaction_id))
+        if waiter is not None and not waiter.done():
+            waiter.set_result(data)
+
+    async def request(self, addr: tuple[str, int], data: bytes, transaction_id: int, timeouts: Sequence[float]) -> bytes:
+        assert self.transport is not None
+        key = response_key(addr, transaction_id)
+        waiter = asyncio.get_running_loop().create_future()
+        self.pending[key] = waiter
+        try:
+            for timeout in timeouts:
+                self.transport.sendto(data, addr)
+                try:
+                    return await asyncio.wait_for(asyncio.shield(waiter), timeout)
+                except TimeoutError:
+                    continue
+            raise TimeoutError
+        finally:
+            del self.pending[key]
+
+
+udp_endpoints: dict[tuple[asyncio.AbstractEventLoop, socket.AddressFamily], MultiplexedUDPProtocol] = {}
+
+
+async def get_udp_endpoint(family: socket.AddressFamily) -> MultiplexedUDPProtocol:
+    loop = asyncio.get_running_loop()
+    protocol = udp_endpoints.get((loop, family))
+    if protocol is None or protocol.transport is None or protocol.transport.is_closing():
+        for stale_loop, stale_family in [key for key in udp_endpoints if key[0].is_closed()]:
+            del udp_endpoints[stale_loop, stale_family]
+        _, protocol = await loop.create_datagram_endpoint(
+            MultiplexedUDPProtocol, family=family, local_addr=("::" if family == socket.AF_INET6 else "0.0.0.0", 0)
+        )
+        udp_endpoints[loop, family] = protocol
+    return protocol
+
+
+class CachedResolver(Resolver):
+    """Resolves tornado's HTTP connections through the DNS cache."""
+
+    async def resolve(self, host: str, port: int, family: socket.AddressFamily = socket.AF_UNSPEC) -> list[tuple[int, Any]]:
+        ips = await dnscache.resolve_ips_async(host, family)
+        if not ips:
+            raise socket.gaierror(socket.EAI_NONAME, f"Can't resolve {host}")
+        return [(socket.AF_INET6, (ip, port, 0, 0)) if ":" in ip else (socket.AF_INET, (ip, port)) for ip in ips]
+
+
+http_resolver: CachedResolver = CachedResolver()
+
+
+async def get_bep_34(hostname: str | None) -> tuple[bool, list[ProtocolPref] | None]:
+    """Querying for http://bittorrent.org/beps/bep_0034.html"""
+    if hostname is None:
+        return False, None
+    try:
+        return parse_bep_34_answer(await dnscache.resolve_async(hostname, "TXT"))
+    except DNSException:
+        pass
+    return False, None
+
+
+async def resolve_ips(hostname: str | None) -> set[str]:
+    return set(await dnscache.resolve_ips_async(hostname))
+
+
+async def announce_http(url: str, thash: bytes = urandom(20), family: socket.AddressFamily = socket.AF_UNSPEC) -> BDecodeResponse:
+    logger.info("%s Scraping HTTP(S)", url)
+    url = build_http_announce_url(url, thash)
+    headers = HTTPHeaders()
+    reader: AnnounceReader | None = None
+    aborted: RuntimeError | None = None
+
+    def read_header(line: str) -> None:
+        if line.startswith("HTTP/"):  # Interim 1xx responses come with headers of their own
+            headers.clear()
+        elif line.strip():
+            headers.parse_line(line)
+
+    def read_body(chunk: bytes) -> None:
+        # Chunks past the decoder's needs are dropped, raising here would get every early stop logged by tornado
+        nonlocal reader, aborted
+        if reader is None:
+            reader = AnnounceReader(headers.get("Content-Encoding", ""))
+        try:
+            reader.feed(chunk)
+        except RuntimeError as e:
+            aborted = e
+            raise
+
+    http_request = HTTPRequest(
+        url,
+        headers=SCRAPING_HEADERS,
+        connect_timeout=10,
+        request_timeout=10,
+        follow_redirects=False,
+        decompress_response=False,  # AnnounceReader decompresses, bounded
+        header_callback=read_header,
+        streaming_callback=read_body,
+        # Restricted to one IP version: IPv4 through allow_ipv6, IPv6 by binding IPv4 sockets to "::" failing
+        allow_ipv6=family != socket.AF_INET,
+        network_interface=WILDCARD_ADDRESSES.get(family),
+        ssl_options=tls_context,  # Resumes TLS sessions; tornado closes each connection after its request
+    )
+    client = AsyncHTTPClient(max_clients=HTTP_MAX_CLIENTS, resolver=http_resolver)
+    try:
+        response = await client.fetch(http_request, raise_error=False)
+    except HTTPTimeoutError:
+        raise RuntimeError("HTTP timeout")
+    except HTTPClientError, OSError:
+        if aborted is not None:  # read_body aborted the transfer
+            raise aborted
+        raise RuntimeError("HTTP connection failed")
+    return parse_http_announce(url, response.code, reader if reader is not None else AnnounceReader())
+
+
+async def announce_udp(
+    udp_url: str,
+    thash: bytes = urandom(20),
+    latency: int | None = None,
+    family: socket.AddressFamily = socket.AF_UNSPEC,
+) -> tuple[UDPAnnounceResponse, str | None]:
+    parsed_tracker = urlparse(udp_url)
+    logger.info("%s Scraping UDP", udp_url)
+    ips = await resolve_ips(parsed_tracker.hostname)
+    if family != socket.AF_UNSPEC:
+        ips = {ip for ip in ips if (":" in ip) == (family == socket.AF_INET6)}
+    if not ips or parsed_tracker.port is None:
+        raise RuntimeError("UDP error: Can't resolve IP")
+    port = parsed_tracker.port
+
+    # Raced as in utils.race, with tasks in place of threads
+    addresses = deque(interleave_families(ips))
+    running: set[asyncio.Task[tuple[UDPAnnounceResponse, str]]] = set()
+    last_error = RuntimeError("UDP connection error")
+    try:
+        while addresses or running:
+            if addresses:
+                running.add(asyncio.create_task(announce_udp_address(udp_url, addresses.popleft(), port, thash, latency)))
+            done, running = await asyncio.wait(
+                running, timeout=HAPPY_EYEBALLS_DELAY if addresses else None, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                try:
+                    return task.result()
+                except RuntimeError as err:
+                    last_error = err
+    finally:
+        for task in running:  # Losers are cancelled mid-exchange
+            task.cancel()
+    raise last_error
+
+
+async def announce_udp_address(
+    udp_url: str, ip: str, port: int, thash: bytes, latency: int | None
+) -> tuple[UDPAnnounceResponse, str]:
+    ip_family = socket.AF_INET6 if ":" in ip else socket.AF_INET
+    try:
+        endpoint = await get_udp_endpoint(ip_family)
+    except OSError:
+        raise RuntimeError("UDP connection error")
+    address = (ip, port)
+
+    last_error = RuntimeError("UDP announce failed")
+    for attempt in range(2):
+        logger.info("%s UDP attempt %d to %s", udp_url, attempt + 1, ip)
+        timeouts = retransmission_timeouts(latency)
+
+        # Get connection ID, unless one was handed out recently
+        connection_id = connection_ids.get(address)
+        reused_connection_id = connection_id is not None
+        try:
+            if connection_id is None:
+                req, transaction_id = udp_create_binary_connection_request()
+                buf = await endpoint.request(address, req, transaction_id, timeouts)
+                connection_id = udp_parse_connection_response(buf, transaction_id)
+                if connection_id is not None:
+                    connection_ids.put(address, connection_id)
+
+            # Announce
+            req, transaction_id = udp_create_announce_request(connection_id, thash)
+            buf = await endpoint.request(address, req, transaction_id, timeouts)
+
+            parsed_response, _raw_response = udp_parse_announce_response(buf, transaction_id, ip_family)
+            logger.info("%s response: %s", udp_url, parsed_response)
+            return parsed_response, ip
+        except TimeoutError:
+            last_error = RuntimeError("UDP timeout")
+            if not reused_connection_id:  # Retransmissions already waited out the whole schedule
+                break
+        except OSError as err:
+            last_error = RuntimeError(f"UDP error: {err}")
+        except RuntimeError as err:
+            last_error = err
+        connection_ids.discard(address)
+
+    raise last_error
@@ -1,10 +1,13 @@
-from collections import OrderedDict
+import sys
+from array import array
+from collections import Counter
+from collections.abc import Iterator, Sequence
 from socket import AF_INET, AF_INET6, inet_ntop
-from struct import unpack_from
-from typing import TypedDict
+from struct import Struct
+from typing import NamedTuple, TypedDict, overload
 
 # Recursive type alias for bencoded values
-BDecodedValue = OrderedDict[bytes, "BDecodedValue"] | list["BDecodedValue"] | int | bytes | None
+BDecodedValue = dict[bytes, "BDecodedValue"] | list["BDecodedValue"] | int | bytes | None
 
 
 class PeerInfo(TypedDict):
@@ -12,20 +15,210 @@ class PeerInfo(TypedDict):
     port: int
 
 
+PORT: Struct = Struct("!H")
+
+
+class PeerColumns(NamedTuple):
+    """Compact peers split into a column of packed addresses and one of ports."""
+
+    addresses: bytes  # address_length bytes per peer, in network order
+    ports: array[int]  # In host order
+    address_length: int
+
+
+class PeerStats(NamedTuple):
+    peers: int
+    prefixes: int  # Distinct /24s for IPv4, /48s for IPv6
+    ports: Counter[int]
+
+
+class PeerList(Sequence[PeerInfo]):
+    """Compact peers (BEP 23, BEP 7) left as a view into the response they came in, decoded one by one when read.
+
+    Checks only need the count; the raw data page decodes them when it's rendered. The repr is the count, so logging a
+    response doesn't decode its peers either.
+    """
+
+    def __init__(self, buf: bytes | memoryview, offset: int, ip_family: int) -> None:
+        self.ip_family = ip_family
+        self.peer_length = 6 if ip_family == AF_INET else 18
+        view = memoryview(buf)[offset:]
+        self.view = view[: len(view) - len(view) % self.peer_length]  # A truncated last peer is dropped
+
+    def __len__(self) -> int:
+        return len(self.view) // self.peer_length
+
+    @overload
+    def __getitem__(self, index: int) -> PeerInfo: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> list[PeerInfo]: ...
+
+    def __getitem__(self, index: int | slice) -> PeerInfo | list[PeerInfo]:
+        if isinstance(index, slice):
+            return [self.peer(position) for position in range(len(self))[index]]
+        return self.peer(range(len(self))[index])
+
+    def __iter__(self) -> Iterator[PeerInfo]:
+        addresses, ports, length = self.columns()
+        for position, port in enumerate(ports):
+            yield {"IP": inet_ntop(self.ip_family, addresses[position * length : (position + 1) * length]), "port": port}
+
+    def columns(self) -> PeerColumns:
+        """Every peer in a few strided copies, one per byte of a peer, without per-peer objects."""
+        count = len(self)
+        length = self.peer_length - 2
+        addresses = bytearray(count * length)
+        for byte in range(length):
+            addresses[byte::length] = self.view[byte :: self.peer_length]
+        ports = bytearray(count * 2)
+        ports[0::2] = self.view[length :: self.peer_length]
+        ports[1::2] = self.view[length + 1 :: self.peer_length]
+        port_column = array("H", ports)
+        if sys.byteorder == "little":
+            port_column.byteswap()
+        return PeerColumns(bytes(addresses), port_column, length)
+
+    def peer(self, position: int) -> PeerInfo:
+        port_offset = (position + 1) * self.peer_length - 2
+        ip = inet_ntop(self.ip_family, self.view[port_offset + 2 - self.peer_length : port_offset])
+        return {"IP": ip, "port": PORT.unpack_from(self.view, port_offset)[0]}
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, PeerList | list):
+            return list(self) == list(other)  # pyright: ignore[reportUnknownArgumentType]
+        return NotImplemented
+
+    __hash__ = None  # pyright: ignore[reportAssignmentType]
+
+    def __repr__(self) -> str:
+        return f"<{len(self)} IPv{4 if self.ip_family == AF_INET else 6} peers>"
+
+
+def peer_stats(columns: PeerColumns) -> PeerStats:
+    """Peer count, distinct network prefixes and port histogram, computed over whole columns."""
+    count = len(columns.ports)
+    # Prefixes are zero-padded to a machine word, so a set of ints stands in for a set of byte strings
+    prefix_length, width, typecode = (3, 4, "I") if columns.address_length == 4 else (6, 8, "Q")
+    prefixes = bytearray(count * width)
+    for byte in range(prefix_length):
+        prefixes[byte::width] = columns.addresses[byte :: columns.address_length]
+    return PeerStats(count, len(set(array(typecode, prefixes))), Counter(columns.ports))
+
+
 # Response type after bdecode processes and transforms the data
-BDecodeResponse = dict[str, BDecodedValue | str | list[PeerInfo]]
+BDecodeResponse = dict[str, BDecodedValue | str | PeerList]
 
 TOK_DICT: bytes = b"d"
 TOK_LIST: bytes = b"l"
 TOK_INT: bytes = b"i"
 TOK_END: bytes = b"e"
 TOK_STR_SEP: bytes = b":"
+# The same tokens as byte values, what indexing a memoryview or bytearray gives
+DICT, LIST, INT, END, STR_SEP = TOK_DICT[0], TOK_LIST[0], TOK_INT[0], TOK_END[0], TOK_STR_SEP[0]
+ZERO, NINE = b"0"[0], b"9"[0]
+MAX_LENGTH_DIGITS: int = 10  # String length prefixes above 9 GB are treated as malformed
+INVALID_FORMAT: str = "Could not bdecode data, probably invalid format"
+
+# Top-level fields an announce response needs decoded before the rest of it can be skipped
+PEERS_FIELDS: tuple[bytes, ...] = (b"peers", b"peers6")
+# Top-level fields of an announce response (BEP 3, 7, 23, 24 and the scrape counts) kept by checks, others are skipped
+ANNOUNCE_FIELDS: frozenset[bytes] = frozenset(
+    (
+        b"failure reason",
+        b"warning message",
+        b"interval",
+        b"min interval",
+        b"tracker id",
+        b"complete",
+        b"incomplete",
+        b"downloaded",
+        b"external ip",
+        *PEERS_FIELDS,
+    )
+)
+
 
+def bdecode(data: bytes | bytearray | memoryview) -> BDecodeResponse:
+    return decode_response(decode_value(data))
 
-def bdecode(data: bytes) -> BDecodeResponse:
-    bdecoded_response = Decoder(data).decode()
+
+def decode_value(data: bytes | bytearray | memoryview) -> BDecodedValue:
+    """Decode the bencoded value at the start of data, ignoring anything after it.
+
+    Walks a memoryview of data by index, with open containers on an explicit stack, so hostile nesting is bounded by
+    memory rather than the recursion limit. Dicts are plain dicts, in the order of their keys in data.
+    """
+    view = memoryview(data).cast("B")
+    end = len(view)
+    if not end:
+        raise EOFError()
+    stack: list[dict[bytes, BDecodedValue] | list[BDecodedValue]] = []
+    keys: list[bytes | None] = []  # Per open container, the dict key waiting for its value
+    pos = 0
+    value: BDecodedValue
+    while True:
+        if pos >= end:
+            raise RuntimeError("Truncated bencoded data")
+        token = view[pos]
+        if token == DICT or token == LIST:
+            if stack and keys[-1] is None and isinstance(stack[-1], dict):
+                raise TypeError("Dict key must be bytes in bencoded data")
+            stack.append({} if token == DICT else [])
+            keys.append(None)
+            pos += 1
+            continue
+        if token == END:
+            if not stack or keys[-1] is not None:
+                raise RuntimeError(INVALID_FORMAT)
+            value = stack.pop()
+            keys.pop()
+            pos += 1
+        elif token == INT:
+            stop = pos + 1
+            while stop < end and view[stop] != END:
+                stop += 1
+            if stop == end:
+                raise RuntimeError("Truncated bencoded data")
+            value = int(view[pos + 1 : stop].tobytes())
+            pos = stop + 1
+        elif ZERO <= token <= NINE:
+            sep = pos + 1
+            while sep < end and view[sep] != STR_SEP:
+                sep += 1
+                if sep - pos > MAX_LENGTH_DIGITS:
+                    raise RuntimeError(INVALID_FORMAT)
+            if sep == end:
+                raise RuntimeError("Truncated bencoded data")
+            start = sep + 1
+            stop = start + int(view[pos:sep].tobytes())
+            if stop > end:
+                raise RuntimeError("Truncated bencoded data")
+            value = view[start:stop].tobytes()
+            pos = stop
+        else:
+            raise RuntimeError(INVALID_FORMAT)
+
+        if not stack:
+            return value
+        container = stack[-1]
+        if isinstance(container, list):
+            container.append(value)
+            continue
+        key = keys[-1]
+        if key is None:
+            if not isinstance(value, bytes):
+                raise TypeError("Dict key must be bytes in bencoded data")
+            keys[-1] = value
+        else:
+            container[key] = value
+            keys[-1] = None
+
+
+def decode_response(bdecoded_response: BDecodedValue) -> BDecodeResponse:
+    """Turn a bdecoded announce response into str keys and values, with its peers lists and external ip unpacked."""
     response: BDecodeResponse = {}
-    if not isinstance(bdecoded_response, OrderedDict):
+    if not isinstance(bdecoded_response, dict):
         raise TypeError("Could not extract the bencoded dict, probably invalid format")
     for key, value in bdecoded_response.items():
         response[key.decode()] = value
@@ -33,12 +226,12 @@ def bdecode(data: bytes) -> BDecodeResponse:
     if "peers" in response:
         peers_value = response["peers"]
         if isinstance(peers_value, bytes):
-            response["peers"] = decode_binary_peers_list(peers_value, 0, AF_INET)
+            response["peers"] = PeerList(peers_value, 0, AF_INET)
 
     if "peers6" in response:
         peers6_value = response["peers6"]
         if isinstance(peers6_value, bytes):
-            response["peers6"] = decode_binary_peers_list(peers6_value, 0, AF_INET6)
+            response["peers6"] = PeerList(peers6_value, 0, AF_INET6)
 
     if "external ip" in response:
         external_ip = response["external ip"]
@@ -59,98 +252,188 @@ def bdecode(data: bytes) -> BDecodeResponse:
 
 
 def decode_binary_peers_list(buf: bytes, offset: int, ip_family: int) -> list[PeerInfo]:
-    peers: list[PeerInfo] = []
-    peer_length = 6 if ip_family == AF_INET else 18
-    binary_response = memoryview(buf)
-    while offset != len(buf):
-        if len(buf) < offset + peer_length:
-            return peers
-        ip_address = bytes(binary_response[offset : offset + peer_length - 2])
-        ip_str = inet_ntop(ip_family, ip_address)
-        offset += peer_length - 2
-        port = unpack_from("!H", buf, offset)[0]
-        offset += 2
-        peers.append({"IP": ip_str, "port": port})
-    return peers
-
-
-class Decoder:
-    def __init__(self, data: bytes) -> None:
-        self.index = 0
-        self.data = data
-
-    def decode(self) -> BDecodedValue:
-        # decode the bencoded data
-        c = self.peek()  # get the next character
-        if c is None:
-            raise EOFError()
-        elif c == TOK_DICT:
-            self.read(1)  # read the token
-            return self.decode_dict()
-        elif c == TOK_LIST:
-            self.read(1)  # read the token
-            return self.decode_list()
-        elif c == TOK_INT:
-            self.read(1)  # read the token
-            return self.decode_int()
-        elif c in b"0123456789":  # the number indicates start of str (tells len(str))
-            return self.decode_str()
-        elif c == TOK_END:
-            return None
+    return list(PeerList(buf, offset, ip_family))
+
+
+class StreamDecoder:
+    """Incremental bdecoder of an announce response, fed the body as it arrives.
+
+    Open containers are kept on an explicit stack and only the unparsed tail of the data is buffered. Decoding is done
+    once the root dict closes, or earlier once it has a failure reason, or an interval and every peers field it's going
+    to have: BEP 3 dicts have sorted keys, so a key past "peers6" means the missing ones aren't coming.
+
+    Given fields, values of other top-level keys are stepped over by their lengths and dropped as they arrive, so
+    extension dicts cost neither objects nor buffer space.
+    """
+
+    def __init__(self, fields: frozenset[bytes] | None = None) -> None:
+        self.fields = fields
+        self.skipping = False  # Whether the value of the pending root key is being skipped
+        self.skip_depth = 0  # Containers open in the skipped value
+        self.skip_length = 0  # Bytes left of a skipped string that didn't fit in the buffer
+        self.buffer = bytearray()
+        self.stack: list[dict[bytes, BDecodedValue] | list[BDecodedValue]] = []
+        self.keys: list[bytes | None] = []  # Per open container, the dict key waiting for its value
+        self.root: dict[bytes, BDecodedValue] | None = None
+        self.last_key = b""
+        self.sorted_keys = True
+        self.done = False
+
+    def feed(self, data: bytes) -> bool:
+        """Decode as much of data as possible, returning whether the rest of the body can be skipped."""
+        if self.done:
+            return True
+        buf = self.buffer
+        buf += data
+        pos = 0
+        end = len(buf)
+        while pos < end and not self.done:
+            if self.skipping:
+                skipped = self.skip(buf, pos, end)
+                if skipped == pos:  # A partial token
+                    break
+                pos = skipped
+                continue
+            token = buf[pos]
+            if token == DICT:
+                self.open({})
+                pos += 1
+            elif token == LIST:
+                self.open([])
+                pos += 1
+            elif token == END:
+                self.close()
+                pos += 1
+            elif token == INT:
+                stop = buf.find(TOK_END, pos + 1)
+                if stop == -1:
+                    break
+                self.add(int(buf[pos + 1 : stop]))
+                pos = stop + 1
+            elif ZERO <= token <= NINE:
+                sep = buf.find(TOK_STR_SEP, pos, pos + MAX_LENGTH_DIGITS + 1)
+                if sep == -1:
+                    if end - pos > MAX_LENGTH_DIGITS:
+                        raise RuntimeError(INVALID_FORMAT)
+                    break
+                start = sep + 1
+                length = int(buf[pos:sep])
+                if start + length > end:
+                    break
+                self.add(bytes(buf[start : start + length]))
+                pos = start + length
+            else:
+                raise RuntimeError(INVALID_FORMAT)
+        del buf[:pos]
+        return self.done
+
+    def skip(self, buf: bytearray, pos: int, end: int) -> int:
+        """Step over as much of a skipped value as is buffered, returning where that stopped: past the value, at a
+        partial token, or at the end of buf. A string running past buf is skipped as the rest of it arrives.
+        """
+        depth = self.skip_depth
+        if self.skip_length:
+            taken = min(self.skip_length, end - pos)
+            self.skip_length -= taken
+            pos += taken
+            if not self.skip_length and not depth:
+                self.skipped()
+            return pos
+        while pos < end:
+            token = buf[pos]
+            if token == DICT or token == LIST:
+                depth += 1
+                pos += 1
+                continue
+            if token == END:
+                if not depth:
+                    raise RuntimeError(INVALID_FORMAT)
+                depth -= 1
+                pos += 1
+            elif token == INT:
+                stop = buf.find(TOK_END, pos + 1)
+                if stop == -1:
+                    break
+                pos = stop + 1
+            elif ZERO <= token <= NINE:
+                sep = buf.find(TOK_STR_SEP, pos, pos + MAX_LENGTH_DIGITS + 1)
+                if sep == -1:
+                    if end - pos > MAX_LENGTH_DIGITS:
+                        raise RuntimeError(INVALID_FORMAT)
+                    break
+                stop = sep + 1 + int(buf[pos:sep])
+                if stop > end:
+                    self.skip_length = stop - end
+                    pos = end
+                    break
+                pos = stop
+            else:
+                raise RuntimeError(INVALID_FORMAT)
+            if not depth:
+                self.skipped()
+                break
+        self.skip_depth = depth
+        return pos
+
+    def skipped(self) -> None:
+        self.skipping = False
+        self.keys[-1] = None
+        self.check_root()
+
+    def value(self) -> dict[bytes, BDecodedValue]:
+        if not self.done or self.root is None:
+            raise RuntimeError("Truncated bencoded data")
+        return self.root
+
+    def open(self, container: dict[bytes, BDecodedValue] | list[BDecodedValue]) -> None:
+        if not self.stack:
+            if not isinstance(container, dict):
+                raise TypeError("Could not extract the bencoded dict, probably invalid format")
+            self.root = container
+        elif self.keys[-1] is None and isinstance(self.stack[-1], dict):
+            raise TypeError("Dict key must be bytes in bencoded data")
+        self.stack.append(container)
+        self.keys.append(None)
+
+    def close(self) -> None:
+        if not self.stack or self.keys[-1] is not None:
+            raise RuntimeError(INVALID_FORMAT)
+        container = self.stack.pop()
+        self.keys.pop()
+        if self.stack:
+            self.add(container)  # Added once complete, so the root never holds a partial peers list
         else:
-            raise RuntimeError("Could not bdecode data, probably invalid format")
-
-    # get the next byte
-    def peek(self) -> bytes | None:
-        if self.index + 1 >= len(self.data):  # index is passed the end of the data
-            return None
-        return self.data[self.index : self.index + 1]
-
-    # read the data for the length
-    def read(self, length: int) -> bytes:
-        if self.index + length > len(self.data):
-            raise RuntimeError()
-        result = self.data[self.index : self.index + length]
-        self.index += length
-        return result
-
-    # read until the first occurence of the token
-    def read_until(self, token: bytes) -> bytes:
-        # get the index of the token starting from where last left off
-        loc = self.data.find(token, self.index)
-        if loc == -1:  # token not found
-            raise RuntimeError()
-        # token found, loc is the index of it
-        result = self.data[self.index : loc]
-        self.index = loc + 1  # move index to just past loc read up to
-        return result
-
-    # decodes bencoded data into a Python OrderedDict
-    def decode_dict(self) -> OrderedDict[bytes, BDecodedValue]:
-        result: OrderedDict[bytes, BDecodedValue] = OrderedDict()
-        while self.data[self.index : self.index + 1] != TOK_END:
-            key = self.decode()  # decode the key
-            if not isinstance(key, bytes):
+            self.done = True
+
+    def add(self, value: BDecodedValue) -> None:
+        if not self.stack:
+            raise TypeError("Could not extract the bencoded dict, probably invalid format")
+        container = self.stack[-1]
+        if isinstance(container, list):
+            container.append(value)
+            return
+        key = self.keys[-1]
+        if key is None:
+            if not isinstance(value, bytes):
                 raise TypeError("Dict key must be bytes in bencoded data")
-            item = self.decode()  # decode the item
-            result[key] = item  # add the key item pair to the dict
-        self.read(1)  # read the end token
-        return result
-
-    # decodes bencoded data into a Python list
-    def decode_list(self) -> list[BDecodedValue]:
-        result: list[BDecodedValue] = []
-        while self.data[self.index : self.index + 1] != TOK_END:
-            item = self.decode()  # decode an item
-            result.append(item)  # add to the list
-        self.read(1)  # read the end token
-        return result
-
-    # decode bencoded data into a Python int
-    def decode_int(self) -> int:
-        return int(self.read_until(TOK_END))  # read until the end token
-
-    # decode the bencoded data into a Python string
-    def decode_str(self) -> bytes:
-        length = int(self.read_until(TOK_STR_SEP))  # get the length of str
-        return self.read(length)  # read that length
+            self.keys[-1] = value
+            if len(self.stack) == 1:
+                self.sorted_keys = self.sorted_keys and value > self.last_key
+                self.last_key = value
+                self.skipping = self.fields is not None and value not in self.fields
+                self.check_root()
+            return
+        container[key] = value
+        self.keys[-1] = None
+        if len(self.stack) == 1:
+            self.check_root()
+
+    def check_root(self) -> None:
+        root = self.root
+        assert root is not None
+        if b"failure reason" in root or (b"interval" in root and all(self.settled(field) for field in PEERS_FIELDS)):
+            self.done = True
+
+    def settled(self, field: bytes) -> bool:
+        assert self.root is not None
+        return field in self.root or (self.sorted_keys and self.last_key > field)
@@ -1,18 +1,50 @@
 import json
 import sqlite3
 from collections import deque
+from ipaddress import ip_address
 from os import path
+from threading import Lock
 from typing import Any, cast
 
-from newtrackon.tracker import Tracker
-from newtrackon.utils import TrackerEndpoint, dict_factory, format_list, remove_ipvx_only_trackers
+from newtrackon.tracker import FamilyHealth, Tracker
+from newtrackon.utils import TrackerEndpoint, dict_factory, format_list
 
 db_file = "data/trackon.db"
+row_lock: Lock = Lock()  # Checks save whole rows and the geo worker its columns, from the same Tracker objects
+
+# Per IP version health, measured by probes restricted to that version's addresses
+family_columns: dict[str, str] = {
+    f"{field}_ipv{version}": column_type
+    for version in (4, 6)
+    for field, column_type in (("status", "INTEGER"), ("latency", "INTEGER"), ("uptime", "INTEGER"), ("historic", "TEXT"))
+}
+
+# Columns added after the original schema, created on existing databases by migrate_db
+added_columns: dict[str, str] = {
+    "lease_owner": "TEXT",
+    "lease_expires": "INTEGER",
+    **family_columns,
+    "handshake": "INTEGER",
+    "located_ip": "TEXT",
+}
 
 
 def ensure_db_existence() -> None:
     if not path.exists(db_file):
         create_db()
+    else:
+        migrate_db()
+
+
+def migrate_db() -> None:
+    conn = sqlite3.connect(db_file)
+    c = conn.cursor()
+    existing_columns = {row[1] for row in c.execute("PRAGMA table_info(status)")}
+    for column, column_type in added_columns.items():
+        if column not in existing_columns:
+            c.execute(f"ALTER TABLE status ADD COLUMN `{column}` {column_type}")
+    conn.commit()
+    conn.close()
 
 
 def create_db() -> None:
@@ -36,6 +68,18 @@ def create_db() -> None:
         `last_downtime` INTEGER,
         `last_uptime`	INTEGER,
         `recent_ip`	TEXT,
+        `lease_owner`	TEXT,
+        `lease_expires`	INTEGER,
+        `status_ipv4`	INTEGER,
+        `latency_ipv4`	INTEGER,
+        `uptime_ipv4`	INTEGER,
+        `historic_ipv4`	TEXT,
+        `status_ipv6`	INTEGER,
+        `latency_ipv6`	INTEGER,
+        `uptime_ipv6`	INTEGER,
+        `historic_ipv6`	TEXT,
+        `handshake`	INTEGER,
+        `located_ip`	TEXT,
         PRIMARY KEY(`host`)
         );"""
     )
@@ -44,29 +88,52 @@ def create_db() -> None:
 
 
 def update_tracker(tracker: Tracker) -> None:
+    with row_lock:
+        conn = sqlite3.connect(db_file)
+        c = conn.cursor()
+        c.execute(
+            "UPDATE status SET url=?, ip=?, latency=?, last_checked=?, status=?, interval=?, uptime=?,"
+            " historic=?, country=?, country_code=?, network=?, located_ip=?, last_downtime=?, last_uptime=?, recent_ip=?,"
+            " handshake=?, " + ", ".join(f"{column}=?" for column in family_columns) + " WHERE host=?",
+            (
+                tracker.url,
+                json.dumps(tracker.ips),
+                tracker.latency,
+                tracker.last_checked,
+                tracker.status,
+                tracker.interval,
+                tracker.uptime,
+                json.dumps(list(tracker.historic) if tracker.historic else []),
+                json.dumps(tracker.countries),
+                json.dumps(tracker.country_codes),
+                json.dumps(tracker.networks),
+                located_value(tracker),
+                tracker.last_downtime,
+                tracker.last_uptime,
+                json.dumps(tracker.recent_ips),
+                tracker.handshake,
+                *family_values(tracker),
+                tracker.host,
+            ),
+        ).fetchone()
+        conn.commit()
+        conn.close()
+
+
+def update_geo(tracker: Tracker) -> None:
+    """Store the geolocation of tracker, the caller holding row_lock."""
     conn = sqlite3.connect(db_file)
     c = conn.cursor()
     c.execute(
-        "UPDATE status SET url=?, ip=?, latency=?, last_checked=?, status=?, interval=?, uptime=?,"
-        " historic=?, country=?, country_code=?, network=?, last_downtime=?, last_uptime=?, recent_ip=? WHERE host=?",
+        "UPDATE status SET country=?, country_code=?, network=?, located_ip=? WHERE host=?",
         (
-            tracker.url,
-            json.dumps(tracker.ips),
-            tracker.latency,
-            tracker.last_checked,
-            tracker.status,
-            tracker.interval,
-            tracker.uptime,
-            json.dumps(list(tracker.historic) if tracker.historic else []),
             json.dumps(tracker.countries),
             json.dumps(tracker.country_codes),
             json.dumps(tracker.networks),
-            tracker.last_downtime,
-            tracker.last_uptime,
-            json.dumps(tracker.recent_ips),
+            located_value(tracker),
             tracker.host,
         ),
-    ).fetchone()
+    )
     conn.commit()
     conn.close()
 
@@ -88,29 +155,101 @@ def get_all_data() -> list[Tracker]:
     c = conn.cursor()
     trackers_from_db: list[Tracker] = []
     for row in c.execute("SELECT * FROM STATUS ORDER BY uptime DESC"):
-        tracker_in_db = Tracker(
-            host=row.get("host"),
-            url=row.get("url"),
-            ips=json.loads(row.get("ip")),
-            latency=row.get("latency"),
-            last_checked=row.get("last_checked"),
-            interval=row.get("interval"),
-            status=row.get("status"),
-            uptime=row.get("uptime"),
-            countries=json.loads(row.get("country")),
-            country_codes=json.loads(row.get("country_code")),
-            historic=deque(json.loads(row.get("historic")), maxlen=1000),
-            added=row.get("added"),
-            networks=json.loads(row.get("network")),
-            last_downtime=row.get("last_downtime"),
-            last_uptime=row.get("last_uptime"),
-            recent_ips=json.loads(row.get("recent_ip") or "{}"),
-        )
-        trackers_from_db.append(tracker_in_db)
+        trackers_from_db.append(tracker_from_row(row))
     conn.close()
     return trackers_from_db
 
 
+def get_tracker(host: str) -> Tracker | None:
+    conn = sqlite3.connect(db_file)
+    conn.row_factory = cast(Any, dict_factory)
+    c = conn.cursor()
+    row = c.execute("SELECT * FROM STATUS WHERE host=?", (host,)).fetchone()
+    conn.close()
+    return tracker_from_row(row) if row else None
+
+
+def get_check_times() -> dict[str, int]:
+    conn = sqlite3.connect(db_file)
+    c = conn.cursor()
+    check_times: dict[str, int] = dict(c.execute("SELECT host, last_checked FROM status"))
+    conn.close()
+    return check_times
+
+
+def claim_trackers(hosts: list[str], owner: str, now: int, lease_duration: int) -> set[str]:
+    """Lease the given rows to owner, skipping rows under a live lease of another checker. Returns the claimed hosts."""
+    conn = sqlite3.connect(db_file)
+    c = conn.cursor()
+    claimed: set[str] = set()
+    for host in hosts:
+        c.execute(
+            "UPDATE status SET lease_owner=?, lease_expires=? WHERE host=?"
+            " AND (lease_owner IS NULL OR lease_owner=? OR lease_expires<?)",
+            (owner, now + lease_duration, host, owner, now),
+        )
+        if c.rowcount:
+            claimed.add(host)
+    conn.commit()
+    conn.close()
+    return claimed
+
+
+def release_trackers(hosts: list[str], owner: str) -> None:
+    conn = sqlite3.connect(db_file)
+    c = conn.cursor()
+    c.executemany(
+        "UPDATE status SET lease_owner=NULL, lease_expires=NULL WHERE host=? AND lease_owner=?",
+        [(host, owner) for host in hosts],
+    )
+    conn.commit()
+    conn.close()
+
+
+def tracker_from_row(row: dict[str, Any]) -> Tracker:
+    return Tracker(
+        host=row["host"],
+        url=row["url"],
+        ips=json.loads(row["ip"]),
+        latency=row["latency"],
+        last_checked=row["last_checked"],
+        interval=row["interval"],
+        status=row["status"],
+        uptime=row["uptime"],
+        countries=json.loads(row["country"]),
+        country_codes=json.loads(row["country_code"]),
+        historic=deque(json.loads(row["historic"]), maxlen=1000),
+        added=row["added"],
+        networks=json.loads(row["network"]),
+        located_ips=frozenset(json.loads(row["located_ip"])) if row.get("located_ip") is not None else None,
+        last_downtime=row["last_downtime"],
+        last_uptime=row["last_uptime"],
+        recent_ips=json.loads(row.get("recent_ip") or "{}"),
+        handshake=row["handshake"],
+        family_health={
+            version: FamilyHealth(
+                status=row[f"status_ipv{version}"],
+                latency=row[f"latency_ipv{version}"],
+                uptime=row[f"uptime_ipv{version}"],
+                historic=deque(json.loads(row.get(f"historic_ipv{version}") or "[]"), maxlen=1000),
+            )
+            for version in (4, 6)
+        },
+    )
+
+
+def located_value(tracker: Tracker) -> str | None:
+    return json.dumps(sorted(tracker.located_ips)) if tracker.located_ips is not None else None
+
+
+def family_values(tracker: Tracker) -> list[Any]:
+    values: list[Any] = []
+    for version in (4, 6):
+        health = tracker.family_health[version]
+        values += [health.status, health.latency, health.uptime, json.dumps(list(health.historic))]
+    return values
+
+
 def get_api_data(
     query: str,
     uptime: int = 0,
@@ -122,43 +261,60 @@ def get_api_data(
     c = conn.cursor()
     sql = ""
     params: tuple[int, ...] = ()
+    # Whether the tracker passes the same bar over IPv4 and IPv6 on their own, NULL if it wasn't probed per version yet
+    verified = "UPTIME_IPV{version} >= 95"
 
     if query == "/api/http":
-        sql = 'SELECT URL, IP FROM STATUS WHERE URL LIKE "http%" AND UPTIME >= 95'
+        sql = 'WHERE URL LIKE "http%" AND UPTIME >= 95'
     elif query == "/api/udp":
-        sql = 'SELECT URL, IP FROM STATUS WHERE URL LIKE "udp://%" AND UPTIME >= 95'
+        sql = 'WHERE URL LIKE "udp://%" AND UPTIME >= 95'
     elif query == "/api/live":
-        sql = "SELECT URL, IP FROM STATUS WHERE STATUS = 1"
+        sql = "WHERE STATUS = 1"
+        verified = "STATUS_IPV{version} = 1"
+    elif query == "/api/ipv4":
+        sql = "WHERE UPTIME_IPV4 >= 95"
+    elif query == "/api/ipv6":
+        sql = "WHERE UPTIME_IPV6 >= 95"
     elif query == "percentage":
-        sql = "SELECT URL, IP FROM STATUS WHERE UPTIME >= ?"
+        sql = "WHERE UPTIME >= ?"
+        verified = f"UPTIME_IPV{{version}} >= {int(uptime)}"
         params = (uptime,)
 
     if added_before is not None:
         sql += " AND ADDED <= ?"
         params += (added_before,)
 
-    sql += " ORDER BY UPTIME DESC"
+    sql = f"SELECT URL, IP, {verified.format(version=4)}, {verified.format(version=6)} FROM STATUS {sql} ORDER BY UPTIME DESC"
     c.execute(sql, params)
 
     raw_rows = c.fetchall()
     conn.close()
 
-    urls_and_ips: list[TrackerEndpoint] = [(url, json.loads(ips)) for url, ips in raw_rows]
+    urls_and_ips: list[TrackerEndpoint] = []
+    for url, ips, verified_ipv4, verified_ipv6 in raw_rows:
+        ip_list: list[str] = json.loads(ips) or []
+        if not include_ipv4_only and not reachable_over(6, verified_ipv6, ip_list):
+            continue
+        if not include_ipv6_only and not reachable_over(4, verified_ipv4, ip_list):
+            continue
+        urls_and_ips.append((url, ip_list))
 
-    if not include_ipv4_only:
-        urls_and_ips = remove_ipvx_only_trackers(urls_and_ips, version=4)
+    return format_list(urls_and_ips)
 
-    if not include_ipv6_only:
-        urls_and_ips = remove_ipvx_only_trackers(urls_and_ips, version=6)
 
-    return format_list(urls_and_ips)
+def reachable_over(version: int, verified: int | None, ips: list[str]) -> bool:
+    if verified is not None:
+        return bool(verified)
+    return any(ip_address(ip).version == version for ip in ips)  # Not probed per version yet, trust its addresses
 
 
 def insert_new_tracker(tracker: Tracker) -> None:
     conn = sqlite3.connect(db_file)
     c = conn.cursor()
     c.execute(
-        "INSERT INTO status VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)",
+        "INSERT INTO status (host, url, ip, latency, last_checked, interval, status, uptime, country, country_code,"
+        " network, located_ip, added, historic, last_downtime, last_uptime, recent_ip, handshake,"
+        f" {', '.join(family_columns)}) VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?{',?' * len(family_columns)})",
         (
             tracker.host,
             tracker.url,
@@ -171,11 +327,14 @@ def insert_new_tracker(tracker: Tracker) -> None:
             json.dumps(tracker.countries),
             json.dumps(tracker.country_codes),
             json.dumps(tracker.networks),
+            located_value(tracker),
             tracker.added,
             json.dumps(list(tracker.historic) if tracker.historic else []),
             tracker.last_downtime,
             tracker.last_uptime,
             json.dumps(tracker.recent_ips),
+            tracker.handshake,
+            *family_values(tracker),
         ),
     )
     conn.commit()
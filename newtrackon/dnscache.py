@@ -0,0 +1,257 @@
+import asyncio
+import socket
+from collections.abc import Iterable
+from ipaddress import ip_address
+from logging import getLogger
+from threading import Lock
+from time import perf_counter, time
+from typing import Any, NamedTuple, cast
+
+from dns import asyncresolver, resolver
+from dns.exception import DNSException
+from dns.message import Message
+from dns.name import Name
+from dns.rdatatype import SOA
+from dns.rdtypes.ANY import SOA as soa
+
+DNS_CACHE_SIZE: int = 16384
+MIN_TTL: int = 60  # Even zero-TTL answers are shared by the lookups of one check
+MAX_TTL: int = 86400
+NEGATIVE_TTL: int = 300  # For negative answers without an SOA to take it from (RFC 2308)
+PREFETCH_RECORDS: tuple[str, ...] = ("TXT", "AAAA", "A")  # Everything a check looks up, BEP 34 first
+PREFETCH_CONCURRENCY: int = 64
+ADDRESS_RECORDS: dict[socket.AddressFamily, tuple[str, ...]] = {
+    socket.AF_UNSPEC: ("AAAA", "A"),
+    socket.AF_INET6: ("AAAA",),
+    socket.AF_INET: ("A",),
+}
+
+logger = getLogger("newtrackon")
+
+# Resolutions are cached per (hostname, record type)
+CacheKey = tuple[str, str]
+
+
+class Resolution(NamedTuple):
+    """Records of one type for a hostname, or the error that stood in for them, valid until expires."""
+
+    records: tuple[str, ...]
+    error: DNSException | None
+    expires: float
+    latency: int  # Of the lookup, in ms
+
+
+class CacheStats(NamedTuple):
+    entries: int
+    hits: int  # Lookups answered from the cache
+    misses: int
+
+
+class DNSCache:
+    """Resolutions kept for their TTL, failed ones included, so each check resolves every record type once."""
+
+    def __init__(self, size: int = DNS_CACHE_SIZE) -> None:
+        self.size = size
+        self.lock = Lock()
+        self.entries: dict[CacheKey, Resolution] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: CacheKey, now: float | None = None) -> Resolution | None:
+        now = time() if now is None else now
+        with self.lock:
+            resolution = self.entries.get(key)
+            if resolution is not None and resolution.expires <= now:
+                del self.entries[key]
+                resolution = None
+            if resolution is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return resolution
+
+    def peek(self, key: CacheKey, now: float) -> Resolution | None:
+        """The unexpired resolution of key, without counting it as a lookup's hit or miss."""
+        with self.lock:
+            resolution = self.entries.get(key)
+            return resolution if resolution is not None and resolution.expires > now else None
+
+    def fresh(self, key: CacheKey, now: float) -> bool:
+        return self.peek(key, now) is not None
+
+    def put(self, key: CacheKey, resolution: Resolution) -> None:
+        with self.lock:
+            self.entries.pop(key, None)
+            self.entries[key] = resolution
+            if len(self.entries) > self.size:  # Oldest first
+                del self.entries[next(iter(self.entries))]
+
+    def stats(self) -> CacheStats:
+        with self.lock:
+            return CacheStats(len(self.entries), self.hits, self.misses)
+
+    def clear(self) -> None:
+        with self.lock:
+            self.entries.clear()
+            self.hits = self.misses = 0
+
+
+def cache_key(hostname: str, rdtype: str) -> CacheKey:
+    return hostname.lower().rstrip("."), rdtype
+
+
+def clamp_ttl(ttl: float) -> float:
+    return min(max(ttl, MIN_TTL), MAX_TTL)
+
+
+def negative_ttl(error: DNSException) -> float:
+    """SOA minimum of a negative answer (RFC 2308), or MIN_TTL for timeouts and server failures."""
+    kwargs = cast("dict[str, Any]", error.kwargs)  # The resolver's errors carry the responses they were raised for
+    responses: list[Message]
+    if isinstance(error, resolver.NXDOMAIN):
+        responses = list(cast("dict[Name, Message]", kwargs.get("responses", {})).values())
+    elif isinstance(error, resolver.NoAnswer):
+        responses = [kwargs["response"]] if "response" in kwargs else []
+    else:
+        return MIN_TTL
+    for response in responses:
+        for rrset in response.authority:
+            if rrset.rdtype == SOA:
+                return clamp_ttl(min(rrset.ttl, cast(soa.SOA, rrset[0]).minimum))
+    return NEGATIVE_TTL
+
+
+def answered(answer: Iterable[Any], expiration: float, started: float) -> Resolution:
+    now = time()
+    latency = int((perf_counter() - started) * 1000)
+    return Resolution(tuple(str(rdata) for rdata in answer), None, now + clamp_ttl(expiration - now), latency)
+
+
+def failed(error: DNSException, started: float) -> Resolution:
+    latency = int((perf_counter() - started) * 1000)
+    return Resolution((), error, time() + negative_ttl(error), latency)
+
+
+def store(key: CacheKey, resolution: Resolution) -> Resolution:
+    logger.info("DNS %s %s lookup took %d ms: %s", key[0], key[1], resolution.latency, resolution.error or resolution.records)
+    dns_cache.put(key, resolution)
+    return resolution
+
+
+def lookup(hostname: str, rdtype: str) -> Resolution:
+    key = cache_key(hostname, rdtype)
+    resolution = dns_cache.get(key)
+    if resolution is not None:
+        return resolution
+    started = perf_counter()
+    try:
+        answer = resolver.resolve(hostname, rdtype)
+    except DNSException as e:
+        return store(key, failed(e, started))
+    return store(key, answered(answer, answer.expiration, started))
+
+
+async def lookup_async(hostname: str, rdtype: str) -> Resolution:
+    resolution = dns_cache.get(cache_key(hostname, rdtype))
+    if resolution is not None:
+        return resolution
+    return await query_async(hostname, rdtype)
+
+
+async def query_async(hostname: str, rdtype: str) -> Resolution:
+    key = cache_key(hostname, rdtype)
+    started = perf_counter()
+    try:
+        answer = await asyncresolver.resolve(hostname, rdtype)
+    except DNSException as e:
+        return store(key, failed(e, started))
+    return store(key, answered(answer, answer.expiration, started))
+
+
+def records(resolution: Resolution) -> tuple[str, ...]:
+    if resolution.error is not None:
+        raise resolution.error.with_traceback(None)  # Raised once per hit, don't let tracebacks pile up on it
+    return resolution.records
+
+
+def resolve(hostname: str, rdtype: str) -> tuple[str, ...]:
+    """Records of rdtype for hostname, raising the DNSException of a failed lookup."""
+    return records(lookup(hostname, rdtype))
+
+
+async def resolve_async(hostname: str, rdtype: str) -> tuple[str, ...]:
+    return records(await lookup_async(hostname, rdtype))
+
+
+def address_literal(hostname: str, family: socket.AddressFamily) -> list[str] | None:
+    """hostname itself if it's an IP address of the given family, None if it's a name to resolve."""
+    try:
+        ip = ip_address(hostname.strip("[]"))
+    except ValueError:
+        return None
+    matches = family == socket.AF_UNSPEC or (ip.version == 6) == (family == socket.AF_INET6)
+    return [str(ip)] if matches else []
+
+
+def resolve_ips(hostname: str | None, family: socket.AddressFamily = socket.AF_UNSPEC) -> list[str]:
+    """IPv6 then IPv4 addresses of hostname, restricted to family if given. A failed record type adds none."""
+    if hostname is None:
+        return []
+    literal = address_literal(hostname, family)
+    if literal is not None:
+        return literal
+    return [ip for rdtype in ADDRESS_RECORDS[family] for ip in lookup(hostname, rdtype).records]
+
+
+async def resolve_ips_async(hostname: str | None, family: socket.AddressFamily = socket.AF_UNSPEC) -> list[str]:
+    if hostname is None:
+        return []
+    literal = address_literal(hostname, family)
+    if literal is not None:
+        return literal
+    resolutions = await asyncio.gather(*(lookup_async(hostname, rdtype) for rdtype in ADDRESS_RECORDS[family]))
+    return [ip for resolution in resolutions for ip in resolution.records]
+
+
+async def prefetch(hostnames: Iterable[str], until: float | None = None) -> None:
+    """Warm the cache with every record the checks of hostnames will look up, PREFETCH_CONCURRENCY queries at a time.
+
+    Records cached now but expiring before until are queried again, so they're still cached when the checks run.
+    """
+    semaphore = asyncio.Semaphore(PREFETCH_CONCURRENCY)
+
+    async def fetch(hostname: str, rdtype: str) -> None:
+        async with semaphore:
+            await query_async(hostname, rdtype)
+
+    await asyncio.gather(*(fetch(hostname, rdtype) for hostname, rdtype in stale_records(hostnames, until)))
+
+
+def stale_records(hostnames: Iterable[str], until: float | None = None) -> list[tuple[str, str]]:
+    """Hostname and record type pairs, IP literals aside, that checks look up and that aren't cached until then."""
+    until = time() if until is None else until
+    return [
+        (hostname, rdtype)
+        for hostname in dict.fromkeys(hostnames)
+        if address_literal(hostname, socket.AF_UNSPEC) is None
+        for rdtype in PREFETCH_RECORDS
+        if not dns_cache.fresh(cache_key(hostname, rdtype), until)
+    ]
+
+
+def uncached(hostnames: Iterable[str], until: float | None = None) -> set[str]:
+    """Hostnames, IP literals aside, of which some record their checks look up isn't cached until then."""
+    return {hostname for hostname, _ in stale_records(hostnames, until)}
+
+
+def nxdomain(hostname: str) -> bool:
+    """Whether the cache knows hostname doesn't exist, so checking it can only fail at name resolution."""
+    now = time()
+    for rdtype in PREFETCH_RECORDS:
+        resolution = dns_cache.peek(cache_key(hostname, rdtype), now)
+        if resolution is not None and isinstance(resolution.error, resolver.NXDOMAIN):
+            return True
+    return False
+
+
+dns_cache: DNSCache = DNSCache()
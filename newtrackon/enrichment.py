@@ -0,0 +1,41 @@
+import logging
+from queue import Empty
+from typing import NoReturn
+
+from newtrackon import db, geoip
+from newtrackon.persistence import geo_updates
+from newtrackon.tracker import Tracker
+
+logger: logging.Logger = logging.getLogger("newtrackon")
+
+
+def take_geo_updates() -> list[Tracker]:
+    """Wait for a tracker whose IPs changed, then take the others already queued, once per host."""
+    tracker = geo_updates.get()
+    pending = {tracker.host: tracker}
+    while True:
+        try:
+            tracker = geo_updates.get_nowait()
+        except Empty:
+            break
+        pending[tracker.host] = tracker
+    return list(pending.values())
+
+
+def enrich(trackers: list[Tracker]) -> None:
+    """Geolocate the IPs of trackers together, so IP-API gets them in as few batches as possible, and store them."""
+    located = geoip.locate(sorted({ip for tracker in trackers for ip in tracker.ips or []}))
+    for tracker in trackers:
+        with db.row_lock:  # A check saving the same tracker meanwhile would write back the previous geolocation
+            tracker.set_geo_data(located)
+            db.update_geo(tracker)
+    logger.info("Geolocated %d trackers, %d IPs queued at IP-API", len(trackers), geoip.ip_api_client.stats().queued)
+
+
+def geo_worker() -> NoReturn:
+    while True:
+        trackers = take_geo_updates()
+        try:
+            enrich(trackers)
+        except Exception:
+            logger.exception("Unhandled error while geolocating %d trackers", len(trackers))
@@ -0,0 +1,316 @@
+import csv
+import mmap
+import os
+import sqlite3
+from array import array
+from bisect import bisect_left, bisect_right
+from collections.abc import Collection, Iterable
+from concurrent.futures import Future
+from ipaddress import ip_address
+from itertools import islice
+from logging import getLogger
+from struct import Struct
+from threading import Lock
+from time import perf_counter, sleep, time
+from typing import Any, Literal, NamedTuple, cast
+
+import requests
+
+from newtrackon.utils import TokenBucket
+
+logger = getLogger("newtrackon")
+
+geo_db_file = "data/geoip.db"
+GEO_TTL: int = 30 * 86400  # Country and ISP of an address rarely change, refresh them monthly
+IP_API_BATCH_URL: str = "http://ip-api.com/batch?fields=status,country,countryCode,isp,query"
+IP_API_BATCH_SIZE: int = 100  # Most IPs the batch endpoint takes per request
+IP_API_BATCH_RATE: float = 14 / 60  # It allows 15 requests per minute, keep a margin
+IP_API_TIMEOUT: int = 10
+
+# Compiled range files: header, then native-endian columns of the sorted ranges and label offsets, then the labels
+RANGES_MAGIC: bytes = b"NTGEO\x00\x00\x01"
+RANGES_HEADER: Struct = Struct("=8sIIII")  # Magic, byte order mark, IPv4 ranges, IPv6 ranges, labels
+BYTE_ORDER_MARK: int = 0x01020304
+COLUMN_ALIGNMENT: int = 8
+LOW_BITS: int = (1 << 64) - 1
+LABEL_SEPARATOR: str = "\x1f"
+
+
+class GeoInfo(NamedTuple):
+    country: str
+    country_code: str
+    network: str
+
+
+class BatchStats(NamedTuple):
+    queued: int  # IPs waiting for a batch
+    batches: int
+    latency: int | None  # Of the last batch, in ms
+
+
+class GeoCache:
+    """Country, country code and ISP per IP, kept in SQLite for GEO_TTL so they survive restarts.
+
+    Checks only query the geolocation provider for addresses that are new or stale.
+    """
+
+    def __init__(self, database: str = geo_db_file, ttl: int = GEO_TTL) -> None:
+        self.database = database
+        self.ttl = ttl
+        self.lock = Lock()
+        self.conn: sqlite3.Connection | None = None
+
+    def connect(self) -> sqlite3.Connection:
+        # Opened once and shared by the checker threads, serialized by self.lock
+        if self.conn is None:
+            self.conn = sqlite3.connect(self.database, check_same_thread=False)
+            self.conn.execute(
+                """CREATE TABLE IF NOT EXISTS `geoip` (
+                `ip`	TEXT NOT NULL,
+                `country`	TEXT NOT NULL,
+                `country_code`	TEXT NOT NULL,
+                `network`	TEXT NOT NULL,
+                `fetched`	INTEGER NOT NULL,
+                PRIMARY KEY(`ip`)
+                );"""
+            )
+            self.conn.commit()
+        return self.conn
+
+    def get(self, ip: str, now: int | None = None) -> GeoInfo | None:
+        now = int(time()) if now is None else now
+        with self.lock:
+            row = (
+                self.connect()
+                .execute("SELECT country, country_code, network FROM geoip WHERE ip=? AND fetched>?", (ip, now - self.ttl))
+                .fetchone()
+            )
+        return GeoInfo(*row) if row else None
+
+    def put(self, ip: str, info: GeoInfo, now: int | None = None) -> None:
+        now = int(time()) if now is None else now
+        with self.lock:
+            conn = self.connect()
+            conn.execute("INSERT OR REPLACE INTO geoip VALUES (?,?,?,?,?)", (ip, *info, now))
+            conn.commit()
+
+    def clear(self) -> None:
+        with self.lock:
+            conn = self.connect()
+            conn.execute("DELETE FROM geoip")
+            conn.commit()
+
+
+class GeoRanges:
+    """Offline geolocation from a compiled range file, memory-mapped so loading it reads nothing up front.
+
+    Columns are sorted native integer arrays searched in place by bisect, a microsecond or two per lookup. IPv6
+    addresses are split in high and low 64 bits, ranges are found by their high half first.
+    """
+
+    def __init__(self, path: str) -> None:
+        with open(path, "rb") as f:
+            self.mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self.mmap)
+        magic, mark, ipv4_count, ipv6_count, label_count = RANGES_HEADER.unpack_from(view)
+        if magic != RANGES_MAGIC or mark != BYTE_ORDER_MARK:
+            raise ValueError(f"{path} is not a GeoIP range file compiled on this machine")
+        self.offset = RANGES_HEADER.size
+        self.ipv4_starts = self.column(view, "I", ipv4_count)
+        self.ipv4_ends = self.column(view, "I", ipv4_count)
+        self.ipv4_labels = self.column(view, "I", ipv4_count)
+        self.ipv6_starts_high = self.column(view, "Q", ipv6_count)
+        self.ipv6_starts_low = self.column(view, "Q", ipv6_count)
+        self.ipv6_ends_high = self.column(view, "Q", ipv6_count)
+        self.ipv6_ends_low = self.column(view, "Q", ipv6_count)
+        self.ipv6_labels = self.column(view, "I", ipv6_count)
+        self.label_offsets = self.column(view, "I", label_count + 1)
+        self.label_data = view[self.offset :]
+
+    def column(self, view: memoryview, typecode: Literal["I", "Q"], count: int) -> memoryview[int]:
+        size = count * array(typecode).itemsize
+        column = view[self.offset : self.offset + size].cast(typecode)
+        self.offset += padded(size)
+        return column
+
+    def get(self, ip: str) -> GeoInfo | None:
+        try:
+            address = ip_address(ip)
+        except ValueError:
+            return None
+        value = int(address)
+        if address.version == 4:
+            index = bisect_right(self.ipv4_starts, value) - 1
+            if index < 0 or value > self.ipv4_ends[index]:
+                return None
+            label = self.ipv4_labels[index]
+        else:
+            high, low = value >> 64, value & LOW_BITS
+            index = self.ipv6_index(high, low)
+            if index < 0 or (self.ipv6_ends_high[index], self.ipv6_ends_low[index]) < (high, low):
+                return None
+            label = self.ipv6_labels[index]
+        start, end = self.label_offsets[label], self.label_offsets[label + 1]
+        return GeoInfo(*bytes(self.label_data[start:end]).decode().split(LABEL_SEPARATOR))
+
+    def ipv6_index(self, high: int, low: int) -> int:
+        """Index of the last range starting at or before high:low, -1 if there's none."""
+        after = bisect_right(self.ipv6_starts_high, high)
+        same_high = bisect_left(self.ipv6_starts_high, high, 0, after)
+        # With no start sharing high's value, this is the last range starting below it
+        return bisect_right(self.ipv6_starts_low, low, same_high, after) - 1
+
+
+def padded(size: int) -> int:
+    return -(-size // COLUMN_ALIGNMENT) * COLUMN_ALIGNMENT
+
+
+def compile_ranges(csv_path: str, ranges_path: str) -> None:
+    """Compile CSV rows of first IP, last IP, country, country code and network into a range file for GeoRanges.
+
+    Ranges must not overlap; they may come in any order and mix IP versions.
+    """
+    ranges: dict[int, list[tuple[int, int, int]]] = {4: [], 6: []}
+    label_indexes: dict[str, int] = {}
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        for row in csv.reader(f):
+            if len(row) != 5 or row[0].startswith("#"):
+                continue
+            try:
+                first, last = ip_address(row[0].strip()), ip_address(row[1].strip())
+            except ValueError:
+                continue  # Header
+            info = GeoInfo(row[2].strip(), row[3].strip().lower(), row[4].strip())
+            label = label_indexes.setdefault(LABEL_SEPARATOR.join(info), len(label_indexes))
+            ranges[first.version].append((int(first), int(last), label))
+    ipv4, ipv6 = sorted(ranges[4]), sorted(ranges[6])
+
+    labels = [label.encode() for label in label_indexes]
+    label_offsets = [0]
+    for label in labels:
+        label_offsets.append(label_offsets[-1] + len(label))
+
+    columns = [
+        array("I", [start for start, _, _ in ipv4]),
+        array("I", [end for _, end, _ in ipv4]),
+        array("I", [label for _, _, label in ipv4]),
+        array("Q", [start >> 64 for start, _, _ in ipv6]),
+        array("Q", [start & LOW_BITS for start, _, _ in ipv6]),
+        array("Q", [end >> 64 for _, end, _ in ipv6]),
+        array("Q", [end & LOW_BITS for _, end, _ in ipv6]),
+        array("I", [label for _, _, label in ipv6]),
+        array("I", label_offsets),
+    ]
+    temporary_path = ranges_path + ".tmp"
+    with open(temporary_path, "wb") as f:
+        f.write(RANGES_HEADER.pack(RANGES_MAGIC, BYTE_ORDER_MARK, len(ipv4), len(ipv6), len(labels)))
+        for column in columns:
+            data = column.tobytes()
+            f.write(data.ljust(padded(len(data)), b"\x00"))
+        f.write(b"".join(labels))
+    os.replace(temporary_path, ranges_path)  # Checkers may have the previous file mapped
+
+
+class IPAPIClient:
+    """Geolocates the IPs of every concurrent check through IP-API's batch endpoint, paced by one token bucket.
+
+    IPs are queued, and whichever waiting caller gets the next token sends the oldest IP_API_BATCH_SIZE of them, other
+    callers' IPs included.
+    """
+
+    def __init__(self, url: str = IP_API_BATCH_URL, rate: float = IP_API_BATCH_RATE, batch_size: int = IP_API_BATCH_SIZE) -> None:
+        self.url = url
+        self.batch_size = batch_size
+        self.pacer = TokenBucket(rate=rate, capacity=1)
+        self.lock = Lock()
+        self.sending = Lock()  # One batch in flight at a time
+        self.queue: dict[str, Future[GeoInfo | None]] = {}
+        self.batches = 0
+        self.latency: int | None = None
+
+    def locate(self, ips: Iterable[str]) -> dict[str, GeoInfo]:
+        """Blocks until every IP went out in a batch. IPs IP-API couldn't locate, or whose batch failed, are left out."""
+        with self.lock:
+            futures = {ip: self.queue.setdefault(ip, Future()) for ip in ips}
+        while not all(future.done() for future in futures.values()):
+            with self.sending:
+                if all(future.done() for future in futures.values()):
+                    break  # Sent along with another caller's batch
+                while not self.pacer.take(time()):
+                    sleep(self.pacer.delay(time()))
+                self.send(self.next_batch())
+        return {ip: info for ip, future in futures.items() if (info := future.result()) is not None}
+
+    def next_batch(self) -> dict[str, Future[GeoInfo | None]]:
+        with self.lock:
+            batch = dict(islice(self.queue.items(), self.batch_size))
+            for ip in batch:
+                del self.queue[ip]
+        return batch
+
+    def send(self, batch: dict[str, Future[GeoInfo | None]]) -> None:
+        started = perf_counter()
+        located: dict[str, GeoInfo] = {}
+        try:
+            response = requests.post(self.url, json=list(batch), timeout=IP_API_TIMEOUT)
+            response.raise_for_status()
+            located = parse_ip_api_batch(response.json())
+        except (requests.RequestException, ValueError) as e:
+            logger.warning("IP-API batch of %d IPs failed: %s", len(batch), e)
+        with self.lock:
+            self.batches += 1
+            self.latency = int((perf_counter() - started) * 1000)
+            queued = len(self.queue)
+        for ip, future in batch.items():
+            future.set_result(located.get(ip))
+        logger.info("IP-API batch of %d IPs took %d ms, %d IPs still queued", len(batch), self.latency, queued)
+
+    def stats(self) -> BatchStats:
+        with self.lock:
+            return BatchStats(len(self.queue), self.batches, self.latency)
+
+
+def parse_ip_api_batch(entries: Any) -> dict[str, GeoInfo]:
+    located: dict[str, GeoInfo] = {}
+    for entry in cast("list[object]", entries) if isinstance(entries, list) else []:
+        if not isinstance(entry, dict):
+            continue
+        fields = cast("dict[str, object]", entry)
+        country, country_code, network, ip = (fields.get(field) for field in ("country", "countryCode", "isp", "query"))
+        if (
+            fields.get("status") == "success"
+            and isinstance(country, str)
+            and isinstance(country_code, str)
+            and isinstance(network, str)
+            and isinstance(ip, str)
+        ):
+            located[ip] = GeoInfo(country, country_code.lower(), network)
+    return located
+
+
+def locate(ips: Collection[str]) -> dict[str, GeoInfo]:
+    """Geolocation of ips, from the local range files if configured, else from the geo cache and IP-API for the rest."""
+    if local_ranges is not None:
+        return {ip: info for ip in ips if (info := local_ranges.get(ip)) is not None}
+    located = {ip: info for ip in ips if (info := geo_cache.get(ip)) is not None}
+    missing = [ip for ip in ips if ip not in located]
+    if missing:
+        fetched = ip_api_client.locate(missing)
+        for ip, info in fetched.items():
+            geo_cache.put(ip, info)  # Failures aren't cached, the next check asks again
+        located.update(fetched)
+    return located
+
+
+def open_ranges(csv_path: str) -> GeoRanges:
+    """GeoRanges of a CSV range dataset, compiled next to it on first use and whenever the CSV changes."""
+    ranges_path = csv_path + ".ranges"
+    if not os.path.exists(ranges_path) or os.path.getmtime(ranges_path) < os.path.getmtime(csv_path):
+        logger.info("Compiling GeoIP ranges of %s", csv_path)
+        compile_ranges(csv_path, ranges_path)
+    return GeoRanges(ranges_path)
+
+
+geo_cache: GeoCache = GeoCache()
+local_ranges: GeoRanges | None = None  # Replaces IP-API when set
+ip_api_client: IPAPIClient = IPAPIClient()
@@ -10,11 +10,13 @@ from newtrackon import db
 from newtrackon.persistence import (
     HistoryData,
     save_deque_to_disk,
+    schedule_changes,
     submitted_data,
     submitted_history_file,
     submitted_queue,
 )
 from newtrackon.scraper import attempt_submitted
+from newtrackon.sessions import http_burst
 from newtrackon.tracker import Tracker
 
 list_lock: Lock = Lock()
@@ -159,7 +161,8 @@ def process_new_tracker(tracker_candidate: Tracker) -> None:
     tracker_candidate.last_downtime = int(time())
     tracker_candidate.last_checked = int(time())
     try:
-        attempt_results = attempt_submitted(tracker_candidate)
+        with http_burst():  # HTTPS to HTTP fallbacks and BEP 34 preferences of one submission share connections
+            attempt_results = attempt_submitted(tracker_candidate)
         if attempt_results:
             (
                 tracker_candidate.interval,
@@ -175,10 +178,11 @@ def process_new_tracker(tracker_candidate: Tracker) -> None:
         # less than 5' and more than 3h
         log_wrong_interval_denial(reason="having an interval shorter than 5 minutes or longer than 3 hours")
         return
-    tracker_candidate.update_ipapi_data()
     tracker_candidate.is_up()
     tracker_candidate.update_uptime()
     db.insert_new_tracker(tracker_candidate)
+    tracker_candidate.publish_ip_change()
+    schedule_changes.put(tracker_candidate.host)
     logger.info("New tracker %s added to newTrackon", tracker_candidate.url)
 
 
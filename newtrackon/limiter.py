@@ -0,0 +1,79 @@
+import asyncio
+from collections import Counter
+from collections.abc import AsyncGenerator, Generator, Iterable
+from contextlib import asynccontextmanager, contextmanager
+from threading import Condition
+
+MAX_PROBES_PER_IP: int = 2
+MAX_PROBES_PER_NETWORK: int = 8
+
+
+def probe_keys(ips: Iterable[str] | None, networks: Iterable[str] | None) -> frozenset[str]:
+    keys = {"ip:" + ip for ip in ips or ()}
+    keys.update("network:" + network for network in networks or () if network)
+    return frozenset(keys)
+
+
+class ProbeLimiter:
+    """Caps in-flight probes per resolved IP and per ISP/network name.
+
+    A probe takes a slot on every key of its tracker at once, or waits until all of them are free, so trackers sharing
+    keys can't deadlock each other. Threads wait on a Condition; asyncio tasks wait on an asyncio.Condition bound to
+    the running loop.
+    """
+
+    def __init__(self, per_ip: int = MAX_PROBES_PER_IP, per_network: int = MAX_PROBES_PER_NETWORK) -> None:
+        self.per_ip = per_ip
+        self.per_network = per_network
+        self.in_flight: Counter[str] = Counter()
+        self.condition = Condition()
+        self.async_condition: asyncio.Condition | None = None
+        self.async_loop: asyncio.AbstractEventLoop | None = None
+
+    def limit(self, key: str) -> int:
+        return self.per_ip if key.startswith("ip:") else self.per_network
+
+    def available(self, keys: frozenset[str]) -> bool:
+        return all(self.in_flight[key] < self.limit(key) for key in keys)
+
+    def acquire(self, keys: frozenset[str]) -> None:
+        self.in_flight.update(keys)
+
+    def release(self, keys: frozenset[str]) -> None:
+        self.in_flight.subtract(keys)
+        for key in keys:
+            if self.in_flight[key] <= 0:
+                del self.in_flight[key]
+
+    @contextmanager
+    def hold(self, ips: Iterable[str] | None, networks: Iterable[str] | None) -> Generator[None]:
+        keys = probe_keys(ips, networks)
+        with self.condition:
+            self.condition.wait_for(lambda: self.available(keys))
+            self.acquire(keys)
+        try:
+            yield
+        finally:
+            with self.condition:
+                self.release(keys)
+                self.condition.notify_all()
+
+    @asynccontextmanager
+    async def hold_async(self, ips: Iterable[str] | None, networks: Iterable[str] | None) -> AsyncGenerator[None]:
+        keys = probe_keys(ips, networks)
+        loop = asyncio.get_running_loop()
+        if self.async_condition is None or self.async_loop is not loop:
+            self.async_condition, self.async_loop = asyncio.Condition(), loop
+        condition = self.async_condition
+        async with condition:
+            await condition.wait_for(lambda: self.available(keys))
+            self.acquire(keys)
+        try:
+            yield
+        finally:
+            async with condition:
+                self.release(keys)
+                condition.notify_all()
+
+
+probe_limiter: ProbeLimiter = ProbeLimiter()
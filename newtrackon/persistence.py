@@ -2,23 +2,32 @@ from __future__ import annotations
 
 import json
 from collections import deque
-from os import path
+from collections.abc import Callable
+from os import path, replace
 from queue import Queue
 from typing import TYPE_CHECKING, TypedDict, cast
 
 if TYPE_CHECKING:
+    from newtrackon.scraper import RawResponse
     from newtrackon.tracker import Tracker
 
 
+class SavedResponse(TypedDict):
+    response: str
+    peers: dict[str, str]  # Compact peer lists in hex, by key in the response
+
+
 class HistoryData(TypedDict):
     url: str
     time: int
     status: int
     ip: str
-    info: list[str] | str
+    info: list[str] | str | RawResponse | SavedResponse
 
 
 submitted_queue: Queue[Tracker] = Queue(maxsize=10000)
+schedule_changes: Queue[str] = Queue()  # Hosts whose row was added or changed outside the checker
+geo_updates: Queue[Tracker] = Queue()  # Trackers whose IPs changed since they were last geolocated
 raw_history_file = "data/raw_data.json"
 submitted_history_file = "data/submitted_data.json"
 
@@ -34,6 +43,8 @@ raw_data: deque[HistoryData] = deque(load_history(raw_history_file), maxlen=600)
 submitted_data: deque[HistoryData] = deque(load_history(submitted_history_file), maxlen=600)
 
 
-def save_deque_to_disk(obj: deque[HistoryData], filename: str) -> None:
-    with open(filename, "w") as history_file:
-        json.dump(list(obj), history_file)
+def save_deque_to_disk(obj: deque[HistoryData], filename: str, default: Callable[[object], object] = str) -> None:
+    # Written aside and renamed over the old file, so the server never loads a half-written one on startup
+    with open(f"{filename}.tmp", "w") as history_file:
+        json.dump(list(obj), history_file, default=default)
+    replace(f"{filename}.tmp", filename)
@@ -4,29 +4,38 @@ import socket
 import string
 import struct
 import subprocess
-from collections.abc import Sequence
+import zlib
+from collections.abc import Iterable, Sequence
 from logging import getLogger
 from os import urandom
+from threading import Event
 from time import time
 from typing import TYPE_CHECKING, NamedTuple, TypedDict
 from urllib.parse import ParseResult, urlencode, urlparse
 
 import requests
-from dns import resolver
 from dns.exception import DNSException
 from urllib3.exceptions import HTTPError
 
-from newtrackon.bdecode import BDecodeResponse, PeerInfo, bdecode, decode_binary_peers_list
-from newtrackon.persistence import HistoryData, submitted_data
-from newtrackon.utils import ProtocolPref, build_httpx_url, process_txt_prefs
+from newtrackon import dnscache
+from newtrackon.bdecode import ANNOUNCE_FIELDS, BDecodeResponse, PeerList, StreamDecoder, decode_response
+from newtrackon.persistence import HistoryData, SavedResponse, submitted_data
+from newtrackon.sessions import http_burst
+from newtrackon.udp import (
+    ANNOUNCE_REQUEST,
+    ANNOUNCE_RESPONSE,
+    CONNECT_REQUEST,
+    CONNECT_RESPONSE,
+    RESPONSE_HEADER,
+    connection_ids,
+    retransmission_timeouts,
+    udp_multiplexer,
+)
+from newtrackon.utils import ProtocolPref, build_httpx_url, interleave_families, process_txt_prefs, race
 
 if TYPE_CHECKING:
     from newtrackon.tracker import Tracker
 
-# Socket address types for getaddrinfo results
-SockAddr = tuple[str, int] | tuple[str, int, int, int] | tuple[int, bytes]
-AddrInfo = tuple[socket.AddressFamily, socket.SocketKind, int, str, SockAddr]
-
 
 class ScraperResult(NamedTuple):
     """Result from a successful tracker scrape attempt."""
@@ -52,28 +61,79 @@ my_ipv6: str | None = None
 SCRAPING_HEADERS: dict[str, str] = {
     "User-Agent": "qBittorrent/4.3.9",
     "Accept-Encoding": "gzip",
-    "Connection": "close",
 }
 MAX_RESPONSE_SIZE: int = 1024 * 1024  # 1MB
+STREAM_CHUNK_SIZE: int = 4096
+MAX_DECOMPRESSION_RATIO: int = 100  # Peer lists compress poorly, gzip bombs reach 1000:1
+DECOMPRESSION_RATIO_FLOOR: int = 16 * 1024  # Decoded bytes before the ratio is enforced, headers skew it on tiny bodies
 
 logger = getLogger("newtrackon")
 
 to_redact: list[str] = [str(HTTP_PORT), str(UDP_PORT)]
 
 
+class AnnounceReader:
+    """Decompresses and bdecodes an HTTP announce body chunk by chunk, holding a few KB of it at a time.
+
+    The decoded body is capped at MAX_RESPONSE_SIZE, and at MAX_DECOMPRESSION_RATIO times the bytes received. Malformed
+    bencoding ends the read, and is reported once the response is parsed.
+    """
+
+    def __init__(self, content_encoding: str = "") -> None:
+        compressed = content_encoding.strip().lower() in ("gzip", "x-gzip", "deflate")
+        self.decompressor = zlib.decompressobj(32 + zlib.MAX_WBITS) if compressed else None  # gzip or zlib header
+        self.decoder = StreamDecoder(ANNOUNCE_FIELDS)
+        self.received = 0
+        self.decoded = 0
+        self.error: Exception | None = None
+
+    def feed(self, chunk: bytes) -> bool:
+        """Take the next chunk of the body as received, returning whether the rest of it can be skipped."""
+        self.received += len(chunk)
+        if self.received > MAX_RESPONSE_SIZE:
+            raise RuntimeError("HTTP response size above 1 MB")
+        if self.decoder.done or self.error is not None:
+            return True
+        if self.decompressor is None:
+            return self.decode(chunk)
+        try:
+            data = self.decompressor.decompress(chunk, STREAM_CHUNK_SIZE)
+            while data:
+                if self.decode(data):
+                    return True
+                data = self.decompressor.decompress(self.decompressor.unconsumed_tail, STREAM_CHUNK_SIZE)
+        except zlib.error as e:
+            raise RuntimeError(f"Failed decompressing HTTP response: {e}")
+        return False
+
+    def decode(self, data: bytes) -> bool:
+        self.decoded += len(data)
+        if self.decoded > MAX_RESPONSE_SIZE:
+            raise RuntimeError("HTTP response size above 1 MB")
+        if self.decoded > DECOMPRESSION_RATIO_FLOOR and self.decoded > self.received * MAX_DECOMPRESSION_RATIO:
+            raise RuntimeError(f"HTTP response decompression ratio above {MAX_DECOMPRESSION_RATIO}:1")
+        try:
+            return self.decoder.feed(data)
+        except (RuntimeError, TypeError, ValueError) as e:
+            self.error = e
+            return True
+
+    def response(self) -> BDecodeResponse:
+        if self.error is not None:
+            raise self.error
+        return decode_response(self.decoder.value())
+
+
 class UDPAnnounceResponse(TypedDict):
     interval: int
     leechers: int
     seeds: int
-    peers: list[PeerInfo]
+    peers: PeerList
 
 
 def attempt_submitted(tracker: Tracker) -> ScraperResult:
     submitted_url = urlparse(tracker.url)
-    try:
-        failover_ip: str = str(socket.getaddrinfo(submitted_url.hostname, None)[0][4][0])
-    except OSError:
-        failover_ip = ""
+    failover_ip = next(iter(dnscache.resolve_ips(submitted_url.hostname)), "")
 
     valid_bep_34, bep_34_info = get_bep_34(submitted_url.hostname)
 
@@ -161,7 +221,6 @@ def attempt_https_http(failover_ip: str, url: ParseResult, log_to_submitted: boo
 
 def attempt_httpx(failover_ip: str, submitted_url: ParseResult, tls: bool = True, log_to_submitted: bool = True) -> AttemptResult:
     http_url = build_httpx_url(submitted_url, tls)
-    pp = pprint.PrettyPrinter(width=999999, compact=True)
     t1 = time()
     latency = 0
     status = 0
@@ -170,8 +229,7 @@ def attempt_httpx(failover_ip: str, submitted_url: ParseResult, tls: bool = True
     try:
         http_response = announce_http(http_url)
         latency = int((time() - t1) * 1000)
-        pretty_data = redact_origin(pp.pformat(http_response))
-        info = [pretty_data]
+        info = [pretty_response(http_response)]
         status = 1
         raw_interval = http_response.get("interval")
         if isinstance(raw_interval, int):
@@ -186,7 +244,6 @@ def attempt_httpx(failover_ip: str, submitted_url: ParseResult, tls: bool = True
 
 
 def attempt_udp(failover_ip: str, tracker_netloc: str) -> AttemptResult:
-    pp = pprint.PrettyPrinter(width=999999, compact=True)
     udp_url = "udp://" + tracker_netloc + "/announce"
     t1 = time()
     latency = 0
@@ -197,8 +254,7 @@ def attempt_udp(failover_ip: str, tracker_netloc: str) -> AttemptResult:
     try:
         parsed_response, resolved_ip = announce_udp(udp_url)
         latency = int((time() - t1) * 1000)
-        pretty_data = redact_origin(pp.pformat(parsed_response))
-        info = [pretty_data]
+        info = [pretty_response(parsed_response)]
         status = 1
         interval = parsed_response["interval"]
         if resolved_ip is not None:
@@ -219,18 +275,37 @@ def get_bep_34(hostname: str | None) -> tuple[bool, list[ProtocolPref] | None]:
     if hostname is None:
         return False, None
     try:
-        answer: resolver.Answer = resolver.resolve(hostname, "TXT")
-        for rdata in answer:
-            record_text = str(rdata).strip('"')
-            if record_text.startswith("BITTORRENT"):
-                return True, process_txt_prefs(record_text)
+        return parse_bep_34_answer(dnscache.resolve(hostname, "TXT"))
     except DNSException:
         pass
     return False, None
 
 
-def announce_http(url: str, thash: bytes = urandom(20)) -> BDecodeResponse:
+def parse_bep_34_answer(answer: Iterable[object]) -> tuple[bool, list[ProtocolPref] | None]:
+    for rdata in answer:
+        record_text = str(rdata).strip('"')
+        if record_text.startswith("BITTORRENT"):
+            return True, process_txt_prefs(record_text)
+    return False, None
+
+
+def announce_http(url: str, thash: bytes = urandom(20), family: socket.AddressFamily = socket.AF_UNSPEC) -> BDecodeResponse:
     logger.info("%s Scraping HTTP(S)", url)
+    url = build_http_announce_url(url, thash)
+    try:
+        response, reader = memory_limited_get(url, family)
+    except RuntimeError:
+        raise
+    except requests.Timeout:
+        raise RuntimeError("HTTP timeout")
+    except requests.ConnectionError:
+        raise RuntimeError("HTTP connection failed")
+    except HTTPError, requests.RequestException:
+        raise RuntimeError("Unhandled HTTP error")
+    return parse_http_announce(url, response.status_code, reader)
+
+
+def build_http_announce_url(url: str, thash: bytes) -> str:
     pid = "-qB4390-" + "".join([random.choice(string.ascii_letters + string.digits) for _ in range(12)])
 
     args_dict = {
@@ -245,26 +320,19 @@ def announce_http(url: str, thash: bytes = urandom(20)) -> BDecodeResponse:
         "ipv4": my_ipv4,
     }
     arguments = urlencode(args_dict)
-    url = url + "?" + arguments
-    try:
-        response, content = memory_limited_get(url)
-    except RuntimeError:
-        raise
-    except requests.Timeout:
-        raise RuntimeError("HTTP timeout")
-    except requests.ConnectionError:
-        raise RuntimeError("HTTP connection failed")
-    except HTTPError, requests.RequestException:
-        raise RuntimeError("Unhandled HTTP error")
-    if response.status_code != 200:
-        raise RuntimeError(f"HTTP {response.status_code} status code returned")
+    return url + "?" + arguments
+
+
+def parse_http_announce(url: str, status_code: int, reader: AnnounceReader) -> BDecodeResponse:
+    if status_code != 200:
+        raise RuntimeError(f"HTTP {status_code} status code returned")
 
-    elif not content:
+    elif not reader.decoded:
         raise RuntimeError("Got empty HTTP response")
 
     else:
         try:
-            tracker_response = bdecode(content)
+            tracker_response = reader.response()
         except (EOFError, OSError, RuntimeError, TypeError, ValueError) as e:
             raise RuntimeError(f"Failed bdecoding HTTP response: {e}")
 
@@ -276,94 +344,107 @@ def announce_http(url: str, thash: bytes = urandom(20)) -> BDecodeResponse:
     return tracker_response
 
 
-def announce_udp(udp_url: str, thash: bytes = urandom(20)) -> tuple[UDPAnnounceResponse, str | None]:
+def announce_udp(
+    udp_url: str,
+    thash: bytes = urandom(20),
+    latency: int | None = None,
+    family: socket.AddressFamily = socket.AF_UNSPEC,
+) -> tuple[UDPAnnounceResponse, str | None]:
     parsed_tracker = urlparse(udp_url)
     logger.info("%s Scraping UDP", udp_url)
-    ip: str | None = None
+    ips = dnscache.resolve_ips(parsed_tracker.hostname, family)
+    if not ips or parsed_tracker.port is None:
+        raise RuntimeError("UDP error: Can't resolve IP")
+    port = parsed_tracker.port
+    families = {ip: socket.AF_INET6 if ":" in ip else socket.AF_INET for ip in ips}
+    addresses = interleave_families(families)
+    if len(addresses) == 1:
+        return announce_udp_address(udp_url, families[addresses[0]], (addresses[0], port), thash, latency), addresses[0]
+
+    cancelled = Event()
+
+    def attempt(ip: str) -> tuple[UDPAnnounceResponse, str]:
+        return announce_udp_address(udp_url, families[ip], (ip, port), thash, latency, cancelled), ip
+
     try:
-        getaddr_responses: Sequence[AddrInfo] = socket.getaddrinfo(
-            parsed_tracker.hostname, parsed_tracker.port, 0, socket.SOCK_DGRAM
-        )
-    except OSError as err:
-        raise RuntimeError(f"UDP error: {err}")
+        return race(addresses, attempt)
+    finally:
+        cancelled.set()  # Losers stop before announcing
+
+
+def announce_udp_address(
+    udp_url: str,
+    af: socket.AddressFamily,
+    address: tuple[str, int],
+    thash: bytes,
+    latency: int | None,
+    cancelled: Event | None = None,
+) -> UDPAnnounceResponse:
+    try:
+        udp_multiplexer.socket_for(af)
+    except OSError:
+        raise RuntimeError("UDP connection error")
 
     last_error = RuntimeError("UDP announce failed")
     for attempt in range(2):
-        logger.info("%s UDP attempt %d", udp_url, attempt + 1)
-
-        sock: socket.socket | None = None
-        for res in getaddr_responses:
-            af, socktype, proto, _, sa = res
-            ip = str(sa[0])
-            try:
-                sock = socket.socket(af, socktype, proto)
-                sock.settimeout(10)
-            except OSError:
-                sock = None
-                continue
-            try:
-                sock.connect(sa)
-            except OSError:
-                sock.close()
-                sock = None
-                continue
-            break
-        if sock is None:
-            raise RuntimeError("UDP connection error")
+        logger.info("%s UDP attempt %d to %s", udp_url, attempt + 1, address[0])
+        timeouts = retransmission_timeouts(latency)
+        reused_connection_id = connection_ids.get(address) is not None
 
         try:
-            # Get connection ID
-            req, transaction_id = udp_create_binary_connection_request()
-            sock.sendall(req)
-            buf = sock.recv(2048)
-            connection_id = udp_parse_connection_response(buf, transaction_id)
+            connection_id = udp_connect(af, address, timeouts)
+            if cancelled is not None and cancelled.is_set():
+                raise RuntimeError("UDP attempt cancelled, another address answered first")
 
             # Announce
             req, transaction_id = udp_create_announce_request(connection_id, thash)
-            sock.sendall(req)
-            buf = sock.recv(2048)
-            ip_family = sock.family
-            sock.close()
+            buf = udp_multiplexer.request(af, address, req, transaction_id, timeouts)
 
-            parsed_response, _raw_response = udp_parse_announce_response(buf, transaction_id, ip_family)
+            parsed_response, _raw_response = udp_parse_announce_response(buf, transaction_id, af)
             logger.info("%s response: %s", udp_url, parsed_response)
-            return parsed_response, ip
-        except ConnectionRefusedError:
-            last_error = RuntimeError("UDP connection failed")
+            return parsed_response
         except TimeoutError:
             last_error = RuntimeError("UDP timeout")
+            if not reused_connection_id:  # Retransmissions already waited out the whole schedule
+                break
         except OSError as err:
             last_error = RuntimeError(f"UDP error: {err}")
         except RuntimeError as err:
             last_error = err
-        sock.close()
+            if cancelled is not None and cancelled.is_set():
+                break
+        connection_ids.discard(address)  # The tracker may have restarted or expired it early, connect again
 
     raise last_error
 
 
+def udp_connect(af: socket.AddressFamily, address: tuple[str, int], timeouts: Sequence[float]) -> int | None:
+    connection_id = connection_ids.get(address)
+    if connection_id is None:
+        req, transaction_id = udp_create_binary_connection_request()
+        buf = udp_multiplexer.request(af, address, req, transaction_id, timeouts)
+        connection_id = udp_parse_connection_response(buf, transaction_id)
+        if connection_id is not None:
+            connection_ids.put(address, connection_id)
+    return connection_id
+
+
 def udp_create_binary_connection_request() -> tuple[bytes, int]:
-    connection_id = 0x41727101980  # default connection id
-    action = 0x0  # action (0 = give me a new connection id)
     transaction_id = udp_get_transaction_id()
-    buf = struct.pack("!q", connection_id)  # first 8 bytes is connection id
-    buf += struct.pack("!i", action)  # next 4 bytes is action
-    buf += struct.pack("!i", transaction_id)  # next 4 bytes is transaction id
-    return buf, transaction_id
+    # Magic protocol ID, then action 0 (give me a new connection id)
+    return CONNECT_REQUEST.pack(0x41727101980, 0x0, transaction_id), transaction_id
 
 
 def udp_parse_connection_response(buf: bytes, sent_transaction_id: int) -> int | None:
     if len(buf) < 16:
         raise RuntimeError(f"Wrong response length getting connection id: {len(buf)}")
-    action = struct.unpack_from("!i", buf)[0]  # first 4 bytes is action
-
-    res_transaction_id = struct.unpack_from("!i", buf, 4)[0]  # next 4 bytes is transaction id
+    action, res_transaction_id, connection_id = CONNECT_RESPONSE.unpack_from(buf)
     if res_transaction_id != sent_transaction_id:
         raise RuntimeError(
             f"Transaction ID doesn't match in connection response. Expected {sent_transaction_id}, got {res_transaction_id}"
         )
 
     if action == 0x0:
-        connection_id = struct.unpack_from("!q", buf, 8)[0]  # unpack 8 bytes from byte 8, should be the connection_id
         return connection_id
     elif action == 0x3:
         error = struct.unpack_from("!s", buf, 8)
@@ -371,22 +452,23 @@ def udp_parse_connection_response(buf: bytes, sent_transaction_id: int) -> int |
 
 
 def udp_create_announce_request(connection_id: int | None, thash: bytes) -> tuple[bytes, int]:
-    action = 0x1  # action (1 = announce)
     transaction_id = udp_get_transaction_id()
-    buf = struct.pack("!q", connection_id)  # first 8 bytes is connection id
-    buf += struct.pack("!i", action)  # next 4 bytes is action
-    buf += struct.pack("!i", transaction_id)  # followed by 4 byte transaction id
-    buf += struct.pack("!20s", thash)  # hash
-    buf += struct.pack("!20s", thash)  # peer id, should be random
-    buf += struct.pack("!q", 0x0)  # number of bytes downloaded
-    buf += struct.pack("!q", 0x0)  # number of bytes left
-    buf += struct.pack("!q", 0x0)  # number of bytes uploaded
-    buf += struct.pack("!i", 0x2)  # event 0 denotes start of downloading
-    buf += struct.pack("!i", 0x0)  # IP address set to 0. Response received to the sender of this packet
     key = udp_get_transaction_id()  # Unique key randomized by client
-    buf += struct.pack("!i", key)
-    buf += struct.pack("!i", -1)  # Number of peers required. Set to -1 for default
-    buf += struct.pack("!H", 0x76FD)  # port on which response will be sent
+    buf = ANNOUNCE_REQUEST.pack(
+        connection_id,
+        0x1,  # action (1 = announce)
+        transaction_id,
+        thash,  # hash
+        thash,  # peer id, should be random
+        0x0,  # number of bytes downloaded
+        0x0,  # number of bytes left
+        0x0,  # number of bytes uploaded
+        0x2,  # event 2 denotes start of downloading
+        0x0,  # IP address set to 0. Response received to the sender of this packet
+        key,
+        -1,  # Number of peers required. Set to -1 for default
+        0x76FD,  # port on which response will be sent
+    )
     return buf, transaction_id
 
 
@@ -395,21 +477,14 @@ def udp_parse_announce_response(
 ) -> tuple[UDPAnnounceResponse, str]:
     if len(buf) < 20:
         raise RuntimeError(f"Wrong response length while announcing: {len(buf)}")
-    action = struct.unpack_from("!i", buf)[0]  # first 4 bytes is action
-    res_transaction_id = struct.unpack_from("!i", buf, 4)[0]  # next 4 bytes is transaction id
+    action, res_transaction_id = RESPONSE_HEADER.unpack_from(buf)
     if res_transaction_id != sent_transaction_id:
         raise RuntimeError(
             f"Transaction ID doesnt match in announce response! Expected {sent_transaction_id}, got {res_transaction_id}"
         )
     if action == 0x1:
-        offset = 8  # next 4 bytes after action is transaction_id, so data doesnt start till byte 8
-        interval = struct.unpack_from("!i", buf, offset)[0]
-        offset += 4
-        leechers = struct.unpack_from("!i", buf, offset)[0]
-        offset += 4
-        seeds = struct.unpack_from("!i", buf, offset)[0]
-        offset += 4
-        peers = decode_binary_peers_list(buf, offset, ip_family)
+        _, _, interval, leechers, seeds = ANNOUNCE_RESPONSE.unpack_from(buf)
+        peers = PeerList(buf, ANNOUNCE_RESPONSE.size, ip_family)
         ret: UDPAnnounceResponse = {"interval": interval, "leechers": leechers, "seeds": seeds, "peers": peers}
         return ret, buf.hex()
     # an error occured, try and extract the error string
@@ -418,20 +493,101 @@ def udp_parse_announce_response(
 
 
 def udp_get_transaction_id() -> int:
-    return int(random.randrange(0, 255))
+    # Full 32 bits, so concurrent requests multiplexed on one socket don't collide
+    return random.getrandbits(32)
 
 
 def get_server_ip(ip_version: str) -> str:
     return subprocess.check_output(["curl", "-s", "-" + ip_version, "https://icanhazip.com/"]).decode("utf-8").strip()
 
 
-def memory_limited_get(url: str) -> tuple[requests.Response, bytes]:
-    response = requests.get(url, headers=SCRAPING_HEADERS, timeout=10, stream=True, allow_redirects=False)
-    content = None
-    content = response.raw.read(MAX_RESPONSE_SIZE + 1, decode_content=True)
-    if len(content) > MAX_RESPONSE_SIZE:
-        raise RuntimeError("HTTP response size above 1 MB")
-    return response, content
+def memory_limited_get(url: str, family: socket.AddressFamily = socket.AF_UNSPEC) -> tuple[requests.Response, AnnounceReader]:
+    with http_burst() as burst:  # The running check's burst, or one of its own for a lone request
+        response = burst.get(url, family, headers=SCRAPING_HEADERS, timeout=10, allow_redirects=False)
+        return response, read_limited(response)
+
+
+def read_limited(response: requests.Response) -> AnnounceReader:
+    reader = AnnounceReader(response.headers.get("Content-Encoding", ""))
+    try:
+        if response.status_code == 200:
+            for chunk in response.raw.stream(STREAM_CHUNK_SIZE, decode_content=False):
+                if reader.feed(chunk):
+                    break
+    finally:
+        response.close()  # A body cut short drops its connection, a fully read one is already back in the pool
+    return reader
+
+
+def pretty_response(response: BDecodeResponse | UDPAnnounceResponse) -> str:
+    """The response as shown on the raw data pages, peers decoded and our own address redacted."""
+    decoded = {key: list(value) if isinstance(value, PeerList) else value for key, value in response.items()}
+    return redact_origin(pprint.pformat(decoded, width=999999, compact=True))
+
+
+class PeersMark:
+    """Stands in for a peer list in the saved form of a response, until the list is decoded into its place."""
+
+    def __init__(self, key: str) -> None:
+        self.key = key
+
+    def __repr__(self) -> str:
+        return f"<{self.key}>"
+
+
+class RawResponse:
+    """A checked announce response for raw_data, pretty-printed once rendered rather than at check time.
+
+    It's saved with its peer lists in hex, so once loaded back from disk it still decodes them only when rendered.
+    """
+
+    def __init__(self, response: BDecodeResponse | UDPAnnounceResponse, compact: SavedResponse | None = None) -> None:
+        self.response = response
+        self.pretty: str | None = None
+        self.compact: SavedResponse | None = compact
+
+    @classmethod
+    def restored(cls, saved: SavedResponse) -> RawResponse:
+        peer_lists: BDecodeResponse = {
+            key: PeerList(bytes.fromhex(peers), 0, socket.AF_INET6 if key == "peers6" else socket.AF_INET)
+            for key, peers in saved["peers"].items()
+        }
+        return cls(peer_lists, saved)
+
+    def peer_lists(self) -> dict[str, PeerList]:
+        return {key: value for key, value in self.response.items() if isinstance(value, PeerList)}
+
+    def __str__(self) -> str:
+        if self.pretty is None:
+            pretty = self.saved()["response"]
+            for key, peers in self.peer_lists().items():
+                decoded = redact_origin(pprint.pformat(list(peers), width=999999, compact=True))
+                pretty = pretty.replace(repr(PeersMark(key)), decoded)
+            self.pretty = pretty
+        return self.pretty
+
+    def saved(self) -> SavedResponse:
+        """The response as written to the raw history file: formatted with its peer lists marked, and these in hex."""
+        if self.compact is None:
+            marked = {key: PeersMark(key) if isinstance(value, PeerList) else value for key, value in self.response.items()}
+            self.compact = {
+                "response": redact_origin(pprint.pformat(marked, width=999999, compact=True)),
+                "peers": {key: peers.view.hex() for key, peers in self.peer_lists().items()},
+            }
+        return self.compact
+
+
+def saved_info(value: object) -> SavedResponse | str:
+    """JSON fallback for saving raw_data, so that saving never decodes a RawResponse's peers."""
+    return value.saved() if isinstance(value, RawResponse) else str(value)
+
+
+def restore_raw_history(history: Iterable[HistoryData]) -> None:
+    """Turn the responses loaded from the raw history file back into RawResponses."""
+    for entry in history:
+        info = entry["info"]
+        if not isinstance(info, RawResponse | str | list):
+            entry["info"] = RawResponse.restored(info)
 
 
 def redact_origin(response: str) -> str:
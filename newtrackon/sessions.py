@@ -0,0 +1,250 @@
+import socket
+import ssl
+from collections.abc import Generator
+from contextlib import contextmanager
+from threading import Lock, local
+from time import perf_counter, time
+from typing import Any, NamedTuple, cast
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import ConnectTimeoutError, NameResolutionError, NewConnectionError
+from urllib3.util import connection
+
+from newtrackon import dnscache
+from newtrackon.utils import interleave_families, race
+
+TLS_SESSION_CACHE_SIZE: int = 4096
+WILDCARD_ADDRESSES: dict[socket.AddressFamily, str] = {socket.AF_INET: "0.0.0.0", socket.AF_INET6: "::"}
+SOURCE_FAMILIES: dict[str, socket.AddressFamily] = {address: family for family, address in WILDCARD_ADDRESSES.items()}
+
+# TLS sessions are resumed per (server name, port)
+SessionKey = tuple[str, int]
+
+
+class ConnectionSetup(NamedTuple):
+    """TCP connect and TLS handshake time, in ms, of the connection that carried a request."""
+
+    handshake: int
+    reused: bool
+
+
+class TLSSessionCache:
+    """Latest resumable TLS session per server, so reconnecting skips the full handshake until the session expires."""
+
+    def __init__(self, size: int = TLS_SESSION_CACHE_SIZE) -> None:
+        self.size = size
+        self.lock = Lock()
+        self.entries: dict[SessionKey, ssl.SSLSession] = {}
+
+    def get(self, key: SessionKey) -> ssl.SSLSession | None:
+        with self.lock:
+            session = self.entries.get(key)
+            if session is not None and session.time + session.timeout <= time():
+                del self.entries[key]
+                return None
+            return session
+
+    def put(self, key: SessionKey, session: ssl.SSLSession) -> None:
+        with self.lock:
+            self.entries.pop(key, None)
+            self.entries[key] = session
+            if len(self.entries) > self.size:  # Oldest first
+                del self.entries[next(iter(self.entries))]
+
+
+class ResumableSSLSocket(ssl.SSLSocket):
+    session_key: SessionKey | None = None
+
+    def close(self) -> None:
+        # TLS 1.3 tickets arrive after the handshake, so sessions are only saved once the exchange is over
+        context = self.context
+        if self.session_key is not None and isinstance(context, ResumingSSLContext):
+            session = self.session
+            if session is not None and session.has_ticket:
+                context.sessions.put(self.session_key, session)
+        super().close()
+
+
+class ResumingSSLContext(ssl.SSLContext):
+    """Client context offering each server the last TLS session it issued to us."""
+
+    sslsocket_class = ResumableSSLSocket
+    sessions: TLSSessionCache
+
+    def wrap_socket(
+        self,
+        sock: socket.socket,
+        server_side: bool = False,
+        do_handshake_on_connect: bool = True,
+        suppress_ragged_eofs: bool = True,
+        server_hostname: str | bytes | None = None,
+        session: ssl.SSLSession | None = None,
+    ) -> ssl.SSLSocket:
+        key: SessionKey | None = None
+        if isinstance(server_hostname, str) and not server_side:
+            try:
+                key = (server_hostname, sock.getpeername()[1])
+            except OSError:
+                pass
+            if key is not None and session is None:
+                session = self.sessions.get(key)
+        ssl_sock = super().wrap_socket(
+            sock,
+            server_side=server_side,
+            do_handshake_on_connect=do_handshake_on_connect,
+            suppress_ragged_eofs=suppress_ragged_eofs,
+            server_hostname=server_hostname,
+            session=session,
+        )
+        if isinstance(ssl_sock, ResumableSSLSocket):
+            ssl_sock.session_key = key
+        return ssl_sock
+
+
+def create_tls_context() -> ResumingSSLContext:
+    context = ResumingSSLContext(ssl.PROTOCOL_TLS_CLIENT)
+    context.sessions = TLSSessionCache()
+    context.load_default_certs()
+    return context
+
+
+class TimedHTTPConnection(HTTPConnection):
+    """Connection remembering how long it took to set up, and when it was ready.
+
+    Addresses come from the DNS cache, limited to the version of the source address, and are raced as in happy eyeballs.
+    """
+
+    handshake: float = 0.0
+    connected_at: float = 0.0
+
+    def _new_conn(self) -> socket.socket:
+        host = self._dns_host
+        family = SOURCE_FAMILIES.get(self.source_address[0], socket.AF_UNSPEC) if self.source_address else socket.AF_UNSPEC
+        ips = interleave_families(dnscache.resolve_ips(host, family))
+        if not ips:
+            raise NameResolutionError(host, self, socket.gaierror(socket.EAI_NONAME, f"Can't resolve {host}"))
+        if len(ips) == 1:
+            self._dns_host = ips[0]
+            try:
+                return super()._new_conn()
+            finally:
+                self._dns_host = host  # TLS verifies the name, not the address
+
+        def attempt(ip: str) -> socket.socket:
+            return connection.create_connection(
+                (ip, self.port), self.timeout, source_address=self.source_address, socket_options=self.socket_options
+            )
+
+        try:
+            return race(ips, attempt, on_loser=socket.socket.close)
+        except TimeoutError:
+            raise ConnectTimeoutError(self, f"Connection to {host} timed out. (connect timeout={self.timeout})")
+        except OSError as err:
+            raise NewConnectionError(self, f"Failed to establish a new connection: {err}")
+
+    def connect(self) -> None:
+        t1 = perf_counter()
+        super().connect()
+        self.connected_at = perf_counter()
+        self.handshake = self.connected_at - t1
+
+
+class TimedHTTPSConnection(TimedHTTPConnection, HTTPSConnection):
+    pass
+
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = cast(Any, TimedHTTPConnection)  # urllib3's own connections don't satisfy its connection protocols
+
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = cast(Any, TimedHTTPSConnection)
+
+
+class SessionAdapter(HTTPAdapter):
+    """Keep-alive pools of timed connections, TLS through tls_context, and restricted to one IP version if given one.
+
+    Sockets of the other version fail to bind the wildcard source address of the requested one.
+    """
+
+    def __init__(self, family: socket.AddressFamily = socket.AF_UNSPEC) -> None:
+        self.source_address = (WILDCARD_ADDRESSES[family], 0) if family in WILDCARD_ADDRESSES else None
+        super().__init__()
+
+    def init_poolmanager(self, *args: Any, **kwargs: Any) -> None:
+        if self.source_address is not None:
+            kwargs["source_address"] = self.source_address
+        kwargs["ssl_context"] = tls_context
+        super().init_poolmanager(*args, **kwargs)
+        pool_classes = {"http": TimedHTTPConnectionPool, "https": TimedHTTPSConnectionPool}
+        self.poolmanager.pool_classes_by_scheme = cast(Any, pool_classes)  # Typed after urllib3's own two classes
+
+
+class HTTPBurst:
+    """Sessions shared by the HTTP requests of one check or submission, closed together once it's over.
+
+    BEP 34 re-probes, HTTPS to HTTP fallbacks and announces to the same host reuse open connections; idle ones don't
+    outlive the burst. TLS sessions outlive it in tls_context.
+    """
+
+    def __init__(self) -> None:
+        self.lock = Lock()
+        self.sessions: dict[socket.AddressFamily, requests.Session] = {}
+        self.setups: dict[socket.AddressFamily, ConnectionSetup] = {}
+
+    def session(self, family: socket.AddressFamily) -> requests.Session:
+        with self.lock:
+            session = self.sessions.get(family)
+            if session is None:
+                session = requests.Session()
+                adapter = SessionAdapter(family)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                self.sessions[family] = session
+            return session
+
+    def get(self, url: str, family: socket.AddressFamily, **kwargs: Any) -> requests.Response:
+        """Streamed GET of url through the session of family, noting the setup of the connection that carried it."""
+        started = perf_counter()
+        response = self.session(family).get(url, stream=True, **kwargs)  # The connection is released once read
+        connection = getattr(response.raw, "connection", None)
+        if isinstance(connection, TimedHTTPConnection):
+            self.setups[family] = ConnectionSetup(int(connection.handshake * 1000), connection.connected_at < started)
+        return response
+
+    def close(self) -> None:
+        with self.lock:
+            for session in self.sessions.values():
+                session.close()
+            self.sessions.clear()
+
+
+bursts = local()
+
+
+def current_burst() -> HTTPBurst | None:
+    return getattr(bursts, "current", None)
+
+
+@contextmanager
+def http_burst(burst: HTTPBurst | None = None) -> Generator[HTTPBurst]:
+    """Run this thread's HTTP requests in a burst: the given one, the one already running, or a new one."""
+    outer = current_burst()
+    if burst is None and outer is not None:
+        yield outer
+        return
+    owned = burst is None
+    burst = burst if burst is not None else HTTPBurst()
+    bursts.current = burst
+    try:
+        yield burst
+    finally:
+        bursts.current = outer
+        if owned:
+            burst.close()
+
+
+tls_context: ResumingSSLContext = create_tls_context()
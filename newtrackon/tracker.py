@@ -1,19 +1,72 @@
-import pprint
+import asyncio
 import re
 import socket
 from collections import deque
+from collections.abc import Mapping
 from ipaddress import IPv4Address, IPv6Address, ip_address
 from logging import getLogger
-from time import sleep, time
-from urllib import parse, request
+from threading import Thread
+from time import time
+from typing import NamedTuple
+from urllib import parse
 
-from newtrackon import persistence, scraper
+from newtrackon import aioscraper, dnscache, geoip, persistence, scraper
+from newtrackon.bdecode import BDecodeResponse
+from newtrackon.limiter import probe_limiter
 from newtrackon.persistence import HistoryData
+from newtrackon.scraper import UDPAnnounceResponse
+from newtrackon.sessions import current_burst, http_burst
+from newtrackon.utils import ProtocolPref
 
 logger = getLogger("newtrackon")
 
 max_downtime: int = 47304000  # 1.5 years
+BACKOFF_AFTER: int = 86400  # Down trackers are checked less often after a day of downtime
+MAX_BACKOFF_INTERVAL: int = 86400  # But still at least once a day
 IP_HISTORY_WINDOW: int = 48 * 3600  # 48 hours in seconds
+IP_VERSION_FAMILIES: dict[int, socket.AddressFamily] = {6: socket.AF_INET6, 4: socket.AF_INET}
+
+
+class FamilyProbe(NamedTuple):
+    """Outcome of an announce restricted to the addresses of one IP version."""
+
+    response: BDecodeResponse | UDPAnnounceResponse | None
+    error: RuntimeError | None
+    latency: int
+    handshake: int | None = None  # TCP and TLS setup of the HTTP connection, in ms
+
+
+class FamilyHealth:
+    """Reachability of a tracker over one IP version. Everything is None while the tracker has no address of it."""
+
+    status: int | None
+    latency: int | None
+    uptime: float | None
+    historic: deque[int]
+
+    def __init__(
+        self,
+        status: int | None = None,
+        latency: int | None = None,
+        uptime: float | None = None,
+        historic: deque[int] | None = None,
+    ) -> None:
+        self.status = status
+        self.latency = latency
+        self.uptime = uptime
+        self.historic = historic if historic is not None else deque(maxlen=1000)
+
+    def record(self, up: bool, latency: int | None, weight: int = 1) -> None:
+        self.status = int(up)
+        if up:
+            self.latency = latency
+        self.historic.extend([self.status] * (1 if up else weight))
+        self.uptime = sum(self.historic) / len(self.historic) * 100
+
+    def reset(self) -> None:
+        """Forget the version's record, so it doesn't vouch for the tracker over a version it lost."""
+        self.status, self.latency, self.uptime = None, None, None
+        self.historic.clear()
 
 
 class Tracker:
@@ -21,18 +74,22 @@ class Tracker:
     host: str
     ips: list[str] | None
     latency: int | None
+    handshake: int | None
     last_checked: int
+    previous_check: int  # When the check before the current one ran, 0 if there was none
     interval: int
     status: int
     uptime: float
     countries: list[str] | None
     country_codes: list[str] | None
     networks: list[str] | None
+    located_ips: frozenset[str] | None  # The IPs countries and networks are of, None if unknown
     historic: deque[int]
     recent_ips: dict[str, int]
     added: int
     last_downtime: int
     last_uptime: int
+    family_health: dict[int, FamilyHealth]
     to_be_deleted: bool
     status_epoch: int | None
     status_readable: str | None
@@ -55,23 +112,30 @@ class Tracker:
         last_downtime: int,
         last_uptime: int,
         recent_ips: dict[str, int] | None = None,
+        family_health: dict[int, FamilyHealth] | None = None,
+        handshake: int | None = None,
+        located_ips: frozenset[str] | None = None,
     ) -> None:
         self.url = url
         self.host = host
         self.ips = ips
         self.latency = latency
         self.last_checked = last_checked
+        self.previous_check = 0
         self.interval = interval
         self.status = status
         self.uptime = uptime
         self.countries = countries
         self.country_codes = country_codes
         self.networks = networks
+        self.located_ips = located_ips
         self.historic = historic
         self.recent_ips = recent_ips if recent_ips is not None else {}
         self.added = added
         self.last_downtime = last_downtime
         self.last_uptime = last_uptime
+        self.family_health = family_health if family_health is not None else {4: FamilyHealth(), 6: FamilyHealth()}
+        self.handshake = handshake
         self.to_be_deleted = False
         self.status_epoch = None
         self.status_readable = None
@@ -110,61 +174,174 @@ class Tracker:
         return tracker
 
     def update_status(self) -> None:
-        try:
-            now = int(time())
-            if self.last_uptime < (now - max_downtime):
-                self.to_be_deleted = True
-                raise RuntimeError("Tracker unresponsive for too long, removed")
+        with http_burst():  # BEP 34 re-probes and the announces of this check share connections
+            try:
+                self.check_max_downtime()
+                self.update_scheme_from_bep_34()
+                self.update_ips()
+                self.refresh_recent_ips()
+            except RuntimeError as reason:
+                self.clear_tracker(reason=str(reason))
+                return
+
+            self.publish_ip_change()
+            self.mark_checked()
+            with probe_limiter.hold(self.ips, self.networks):
+                t1 = time()
+                self.record_probes(self.probe_families(), t1)
+        self.finish_check()
 
-            self.update_scheme_from_bep_34()
-            self.update_ips()
+    async def update_status_async(self) -> None:
+        """Same check as update_status, probing through the asyncio engine."""
+        try:
+            self.check_max_downtime()
+            valid_bep_34, bep_34_info = await aioscraper.get_bep_34(self.host)
+            if valid_bep_34:  # Rare, and may need a blocking HTTP(S) probe
+                await asyncio.to_thread(self.apply_bep_34, valid_bep_34, bep_34_info)
+            self.set_ips(await aioscraper.resolve_ips(self.host))
             self.refresh_recent_ips()
         except RuntimeError as reason:
             self.clear_tracker(reason=str(reason))
             return
 
-        self.update_ipapi_data()
-        self.last_checked = int(time())
-        pp = pprint.PrettyPrinter(width=999999, compact=True)
+        self.publish_ip_change()
+        self.mark_checked()
+        async with probe_limiter.hold_async(self.ips, self.networks):
+            t1 = time()
+            self.record_probes(await self.probe_families_async(), t1)
+        self.finish_check()
+
+    def record_unresolvable(self) -> None:
+        """Same outcome as update_status for a hostname known not to exist, without spending a probe on it."""
+        try:
+            self.check_max_downtime()
+            self.set_ips(set())
+        except RuntimeError as reason:
+            self.clear_tracker(reason=str(reason))
+
+    def ip_versions(self) -> list[int]:
+        versions = [version for version in IP_VERSION_FAMILIES if any((":" in ip) == (version == 6) for ip in self.ips or [])]
+        return versions or [0]  # 0: addresses unknown, probe without restricting the family
+
+    def announce(self, version: int) -> FamilyProbe:
+        family = IP_VERSION_FAMILIES.get(version, socket.AF_UNSPEC)
+        t1 = time()
+        setup = None
+        try:
+            if parse.urlparse(self.url).scheme == "udp":
+                response, _ = scraper.announce_udp(self.url, latency=self.latency, family=family)
+            else:
+                with http_burst() as burst:
+                    burst.setups.pop(family, None)
+                    response = scraper.announce_http(self.url, family=family)
+                    setup = burst.setups.get(family)
+        except RuntimeError as e:
+            return FamilyProbe(None, e, int((time() - t1) * 1000))
+        latency = int((time() - t1) * 1000)
+        if setup is None:
+            return FamilyProbe(response, None, latency)
+        if setup.reused:  # Counted as if the connection had been opened for this announce, like every other one
+            latency += setup.handshake
+        return FamilyProbe(response, None, latency, setup.handshake)
+
+    async def announce_async(self, version: int) -> FamilyProbe:
+        family = IP_VERSION_FAMILIES.get(version, socket.AF_UNSPEC)
         t1 = time()
         try:
             if parse.urlparse(self.url).scheme == "udp":
-                response, _ = scraper.announce_udp(self.url)
+                response, _ = await aioscraper.announce_udp(self.url, latency=self.latency, family=family)
             else:
-                response = scraper.announce_http(self.url)
-
-            interval = response.get("interval")
-            if isinstance(interval, int):
-                self.interval = interval
-            pretty_data = scraper.redact_origin(pp.pformat(response))
-            debug: HistoryData = {
-                "url": self.url,
-                "ip": next(iter(self.ips)) if self.ips else "",
-                "time": int(t1),
-                "info": pretty_data,
-                "status": 1,
-            }
-            persistence.raw_data.appendleft(debug)
-            self.latency = int((time() - t1) * 1000)
-            self.is_up()
-            logger.info("%s status is UP", self.url)
+                response = await aioscraper.announce_http(self.url, family=family)
         except RuntimeError as e:
-            logger.info("%s status is DOWN. Cause: %s", self.url, e)
-            debug_down: HistoryData = {
-                "url": self.url,
-                "ip": next(iter(self.ips)) if self.ips else "",
-                "time": int(t1),
-                "info": str(e),
-                "status": 0,
-            }
-            persistence.raw_data.appendleft(debug_down)
-            self.is_down()
+            return FamilyProbe(None, e, int((time() - t1) * 1000))
+        return FamilyProbe(response, None, int((time() - t1) * 1000))
+
+    def probe_families(self) -> dict[int, FamilyProbe]:
+        """Announce over IPv6 and IPv4 at the same time, each restricted to the addresses of its version."""
+        versions = self.ip_versions()
+        probes: dict[int, FamilyProbe] = {}
+
+        burst = current_burst()
+
+        def probe(version: int) -> None:
+            with http_burst(burst):
+                probes[version] = self.announce(version)
+
+        others = [Thread(target=probe, args=(version,), daemon=True) for version in versions[1:]]
+        for thread in others:
+            thread.start()
+        probe(versions[0])
+        for thread in others:
+            thread.join()
+        return probes
+
+    async def probe_families_async(self) -> dict[int, FamilyProbe]:
+        versions = self.ip_versions()
+        return dict(zip(versions, await asyncio.gather(*(self.announce_async(version) for version in versions))))
+
+    def record_probes(self, probes: dict[int, FamilyProbe], t1: float) -> None:
+        weight = self.down_weight()
+        for version, health in self.family_health.items():
+            if version in probes:
+                probe = probes[version]
+                health.record(probe.response is not None, probe.latency, weight)
+            elif 0 not in probes:
+                health.reset()  # No address of this version anymore
+        answered = [probe for probe in probes.values() if probe.response is not None]
+        if answered:
+            fastest = min(answered, key=lambda probe: probe.latency)
+            assert fastest.response is not None
+            self.record_announce(fastest.response, t1)
+            self.latency = fastest.latency
+            self.handshake = fastest.handshake
+        else:
+            error = next(probe.error for probe in probes.values() if probe.error is not None)
+            self.record_failure(error, t1)
+
+    def check_max_downtime(self) -> None:
+        now = int(time())
+        if self.last_uptime < (now - max_downtime):
+            self.to_be_deleted = True
+            raise RuntimeError("Tracker unresponsive for too long, removed")
+
+    def record_announce(self, response: BDecodeResponse | UDPAnnounceResponse, t1: float) -> None:
+        interval = response.get("interval")
+        if isinstance(interval, int):
+            self.interval = interval
+        debug: HistoryData = {
+            "url": self.url,
+            "ip": next(iter(self.ips)) if self.ips else "",
+            "time": int(t1),
+            "info": scraper.RawResponse(response),
+            "status": 1,
+        }
+        persistence.raw_data.appendleft(debug)
+        self.latency = int((time() - t1) * 1000)
+        self.is_up()
+        logger.info("%s status is UP", self.url)
+
+    def record_failure(self, e: RuntimeError, t1: float) -> None:
+        logger.info("%s status is DOWN. Cause: %s", self.url, e)
+        debug_down: HistoryData = {
+            "url": self.url,
+            "ip": next(iter(self.ips)) if self.ips else "",
+            "time": int(t1),
+            "info": str(e),
+            "status": 0,
+        }
+        persistence.raw_data.appendleft(debug_down)
+        self.is_down()
+
+    def finish_check(self) -> None:
         if self.uptime == 0:
             self.interval = 10800
         self.update_uptime()
 
     def update_scheme_from_bep_34(self) -> None:
         valid_bep_34, bep_34_info = scraper.get_bep_34(self.host)
+        self.apply_bep_34(valid_bep_34, bep_34_info)
+
+    def apply_bep_34(self, valid_bep_34: bool, bep_34_info: list[ProtocolPref] | None) -> None:
         if not valid_bep_34:  # No valid BEP34, attempting existing URL
             return
         if not bep_34_info:
@@ -207,8 +384,13 @@ class Tracker:
 
     def clear_tracker(self, reason: str) -> None:
         self.countries, self.networks, self.country_codes = None, None, None
-        self.latency = None
-        self.last_checked = int(time())
+        self.located_ips = None  # Geolocated again once it resolves, even to the same IPs
+        self.latency, self.handshake = None, None
+        self.mark_checked()
+        weight = self.down_weight()
+        for health in self.family_health.values():
+            if health.status is not None:  # Unreachable over every version it was reachable on
+                health.record(False, None, weight)
         self.is_down()
         self.update_uptime()
         if self.uptime == 0:
@@ -244,13 +426,10 @@ class Tracker:
         self.uptime = (uptime / len(self.historic)) * 100
 
     def update_ips(self) -> None:
+        self.set_ips(set(dnscache.resolve_ips(self.host)))
+
+    def set_ips(self, temp_ips: set[str]) -> None:
         self.ips = []
-        temp_ips: set[str] = set()
-        try:
-            for res in socket.getaddrinfo(self.host, None):
-                temp_ips.add(str(res[4][0]))
-        except OSError:
-            pass
         if temp_ips:  # Order IPs per protocol, IPv6 first
             parsed_ips: list[IPv4Address | IPv6Address] = []
             for ip in temp_ips:
@@ -278,15 +457,21 @@ class Tracker:
                 self.recent_ips[ip] = now
         self.recent_ips = {ip: ts for ip, ts in self.recent_ips.items() if now - ts <= IP_HISTORY_WINDOW}
 
-    def update_ipapi_data(self) -> None:
+    def set_geo_data(self, located: Mapping[str, geoip.GeoInfo]) -> None:
         self.countries, self.networks, self.country_codes = [], [], []
-        if self.ips:
-            for ip in self.ips:
-                ip_data = self.ip_api(ip).splitlines()
-                if len(ip_data) == 3:
-                    self.countries.append(ip_data[0])
-                    self.country_codes.append(ip_data[1].lower())
-                    self.networks.append(ip_data[2])
+        for ip in self.ips or []:
+            info = located.get(ip)
+            if info is None:
+                continue
+            self.countries.append(info.country)
+            self.country_codes.append(info.country_code)
+            self.networks.append(info.network)
+        self.located_ips = frozenset(ip for ip in self.ips or [] if ip in located)  # Missing ones are published again
+
+    def publish_ip_change(self) -> None:
+        """Queue the tracker for the geo worker if its IPs changed since they were last geolocated."""
+        if self.ips and frozenset(self.ips) != self.located_ips:
+            persistence.geo_updates.put(self)
 
     def is_up(self) -> None:
         self.status = 1
@@ -294,16 +479,26 @@ class Tracker:
         self.historic.append(self.status)
 
     def is_down(self) -> None:
+        weight = self.down_weight()
         self.status = 0
         self.last_downtime = int(time())
-        self.historic.append(self.status)
+        self.historic.extend([self.status] * weight)
 
-    @staticmethod
-    def ip_api(ip: str) -> str:
-        try:
-            response = request.urlopen("http://ip-api.com/line/" + ip + "?fields=country,countryCode,isp")
-            tracker_info = response.read().decode("utf-8")
-            sleep(1.35)  # Respect the queries per minute limit of IP-API
-        except OSError:
-            tracker_info = "Error"
-        return tracker_info
+    def mark_checked(self) -> None:
+        self.previous_check, self.last_checked = self.last_checked, int(time())
+
+    def down_weight(self) -> int:
+        # A backed off check covers several intervals, weight the sample by the time since the previous check so
+        # uptime stays time-based. Capped at a day's worth, as a tracker is checked at least that often.
+        if not self.previous_check or self.interval <= 0:
+            return 1
+        covered = round((self.last_checked - self.previous_check) / self.interval)
+        return max(1, min(covered, MAX_BACKOFF_INTERVAL // self.interval))
+
+    def check_interval(self) -> int:
+        """Seconds between checks: the tracker's interval, doubled for every doubling of its downtime past a day."""
+        if self.status == 1 or self.interval <= 0:
+            return self.interval
+        down_for = self.last_checked - (self.last_uptime or self.added)
+        doublings = (down_for // BACKOFF_AFTER).bit_length() if down_for > 0 else 0
+        return min(self.interval << doublings, max(MAX_BACKOFF_INTERVAL, self.interval))
@@ -1,17 +1,256 @@
+import asyncio
+import heapq
 import logging
+import os
+import socket
+import zlib
+from concurrent.futures import Future, ThreadPoolExecutor
+from queue import Empty
 from time import sleep, time
-from typing import NoReturn
+from typing import NamedTuple, NoReturn
 
-from newtrackon import db
+from newtrackon import db, dnscache
 from newtrackon.persistence import (
     raw_data,
     raw_history_file,
     save_deque_to_disk,
+    schedule_changes,
 )
+from newtrackon.scraper import saved_info
 from newtrackon.tracker import Tracker
+from newtrackon.utils import TokenBucket
 
 logger: logging.Logger = logging.getLogger("newtrackon")
 
+check_workers: int = 16
+save_raw_history: bool = True  # Off in --checker-only processes, the raw history file is the main instance's
+SCHEDULE_JITTER: float = 0.1  # Due times are spread over +-5% of each tracker's interval
+PROBE_RATE_HEADROOM: float = 1.5  # Probes may run 50% faster than the steady-state rate to work off a backlog
+LEASE_DURATION: int = 600  # Rows leased by a checker that died are picked up by the others after this long
+SYNC_INTERVAL: int = 60  # How often the table is re-read to see checks and submissions made by other processes
+# Hostnames of trackers due this soon are resolved ahead of their checks, which run before even a MIN_TTL record expires
+PREFETCH_WINDOW: int = dnscache.MIN_TTL // 2
+CHECK_DONE: str = ""  # Put on schedule_changes as each probe finishes, so the checker wakes up to refill its workers
+worker_id: str = f"{socket.gethostname()}:{os.getpid()}"
+
+
+class SweepStats(NamedTuple):
+    """Checks completed over a span of time."""
+
+    checked: int
+    elapsed: float
+
+    @property
+    def rate(self) -> float:
+        return self.checked / self.elapsed if self.elapsed > 0 else float(self.checked)
+
+
+class ThroughputLog:
+    """Checks completed since the last report, logged as checks/s once every SYNC_INTERVAL seconds."""
+
+    def __init__(self, now: float) -> None:
+        self.since = now
+        self.checked = 0
+
+    def add(self, checked: int, now: float) -> None:
+        self.checked += checked
+        if now - self.since >= SYNC_INTERVAL:
+            window = SweepStats(self.checked, now - self.since)
+            logger.info("Checked %d trackers in %.1f s (%.2f checks/s)", window.checked, window.elapsed, window.rate)
+            logger.info("DNS cache holds %d resolutions, %d lookups hit and %d missed", *dnscache.dns_cache.stats())
+            self.since, self.checked = now, 0
+
+
+def schedule_jitter(host: str, interval: int) -> int:
+    """Deterministic per-host offset, so trackers sharing an interval don't come due together."""
+    phase = zlib.crc32(host.encode()) / 0xFFFFFFFF
+    return int((phase - 0.5) * interval * SCHEDULE_JITTER)
+
+
+class CheckScheduler:
+    """Trackers in a min-heap keyed by their next due time, last_checked + check interval plus a per-host jitter.
+
+    The table is read once; afterwards only hosts announced through persistence.schedule_changes are re-read.
+    Heap entries are never removed in place: an entry whose due time no longer matches self.due is stale and skipped.
+    Due trackers are released through a token bucket refilled at the steady-state check rate, so a backlog after a
+    restart or an outage is spread over time instead of being probed in one burst. They're released as workers free
+    up, one check at a time, so a slow probe holds only its own worker.
+
+    Several checker processes can share one database: a due tracker is only probed after its row is leased to this
+    worker_id, and the table is re-synced every SYNC_INTERVAL seconds to follow rows checked by the other processes.
+    """
+
+    def __init__(self, trackers: list[Tracker]) -> None:
+        self.trackers: dict[str, Tracker] = {}
+        self.due: dict[str, int] = {}
+        self.heap: list[tuple[int, str]] = []
+        self.pacer = TokenBucket(rate=0, capacity=check_workers)
+        self.synced_at = time()
+        for tracker in trackers:
+            self.schedule(tracker)
+        self.update_probe_rate()
+
+    @classmethod
+    def from_db(cls) -> CheckScheduler:
+        return cls(db.get_all_data())
+
+    @staticmethod
+    def due_time(tracker: Tracker) -> int:
+        interval = tracker.check_interval()
+        return tracker.last_checked + interval + schedule_jitter(tracker.host, interval)
+
+    def schedule(self, tracker: Tracker, now: int | None = None) -> None:
+        interval = tracker.check_interval()
+        due = self.due_time(tracker)
+        if now is not None and due <= now:  # Check didn't complete, retry on the next interval instead of spinning
+            due = now + interval
+        self.trackers[tracker.host] = tracker
+        self.due[tracker.host] = due
+        heapq.heappush(self.heap, (due, tracker.host))
+
+    def remove(self, host: str) -> None:
+        self.trackers.pop(host, None)
+        self.due.pop(host, None)
+
+    def reload(self, host: str, now: int | None = None) -> None:
+        tracker = db.get_tracker(host)
+        if tracker is None:
+            self.remove(host)
+        else:
+            self.schedule(tracker, now)
+
+    def checking(self, host: str) -> bool:
+        """Whether host was popped for a check that hasn't been rescheduled yet, so its row is about to be rewritten."""
+        return host in self.trackers and host not in self.due
+
+    def claim(self, trackers: list[Tracker], now: int) -> list[Tracker]:
+        """Lease the rows of due trackers to this worker and return the ones still due once re-read from the table."""
+        if not trackers:
+            return []
+        claimed_hosts = db.claim_trackers([tracker.host for tracker in trackers], worker_id, now, LEASE_DURATION)
+        claimed: list[Tracker] = []
+        checked_elsewhere: list[str] = []
+        for tracker in trackers:
+            if tracker.host not in claimed_hosts:  # Another checker holds it, look again after an interval
+                self.reload(tracker.host, now)
+                continue
+            fresh = db.get_tracker(tracker.host)
+            if fresh is None:
+                self.remove(tracker.host)
+            elif self.due_time(fresh) > now:
+                self.schedule(fresh)
+            else:
+                claimed.append(fresh)
+                continue
+            checked_elsewhere.append(tracker.host)
+        if checked_elsewhere:
+            db.release_trackers(checked_elsewhere, worker_id)
+        return claimed
+
+    @staticmethod
+    def release(trackers: list[Tracker]) -> None:
+        db.release_trackers([tracker.host for tracker in trackers], worker_id)
+
+    def sync(self) -> None:
+        """Follow rows added, removed or checked by other processes since the last sync."""
+        check_times = db.get_check_times()
+        for host in self.trackers.keys() - check_times.keys():
+            if not self.checking(host):
+                self.remove(host)
+        for host, last_checked in check_times.items():
+            tracker = self.trackers.get(host)
+            if tracker is None or (tracker.last_checked != last_checked and not self.checking(host)):
+                self.reload(host)
+        self.synced_at = time()
+        self.update_probe_rate()
+
+    def update_probe_rate(self) -> None:
+        intervals = [tracker.check_interval() for tracker in self.trackers.values()]
+        steady_rate = sum(1 / interval for interval in intervals if interval > 0)
+        self.pacer.rate = steady_rate * PROBE_RATE_HEADROOM
+
+    def next_due(self) -> int | None:
+        while self.heap:
+            due, host = self.heap[0]
+            if self.due.get(host) == due:
+                return due
+            heapq.heappop(self.heap)
+        return None
+
+    def upcoming(self, now: int, window: int = PREFETCH_WINDOW) -> list[Tracker]:
+        """Trackers due within window seconds, earliest first, as many as the pacer can release in that time.
+
+        The heap is walked from its root in due order, so a large backlog of overdue trackers costs no more than that.
+        """
+        horizon = now + window
+        limit = int(self.pacer.capacity + self.pacer.rate * window)
+        upcoming: list[Tracker] = []
+        frontier = [(self.heap[0], 0)] if self.heap else []
+        while frontier and len(upcoming) < limit:
+            (due, host), index = heapq.heappop(frontier)
+            if due > horizon:
+                break
+            if self.due.get(host) == due:
+                upcoming.append(self.trackers[host])
+            for child in (2 * index + 1, 2 * index + 2):
+                if child < len(self.heap):
+                    heapq.heappush(frontier, (self.heap[child], child))
+        return upcoming
+
+    def pop_due(self, now: int, limit: int | None = None) -> list[Tracker]:
+        trackers_due: list[Tracker] = []
+        while (
+            (limit is None or len(trackers_due) < limit)
+            and (due := self.next_due()) is not None
+            and due <= now
+            and self.pacer.take(now)
+        ):
+            _, host = heapq.heappop(self.heap)
+            del self.due[host]
+            trackers_due.append(self.trackers[host])
+        return trackers_due
+
+    def reschedule(self, trackers: list[Tracker]) -> None:
+        now = int(time())
+        for tracker in trackers:
+            if tracker.to_be_deleted:
+                self.remove(tracker.host)
+            else:
+                self.schedule(tracker, now)
+        self.update_probe_rate()
+
+    def time_until_next_check(self) -> float | None:
+        next_due = self.next_due()
+        if next_due is None:
+            return None
+        now = time()
+        return max(next_due - now, self.pacer.delay(now), 0)
+
+    def time_until_sync(self) -> float:
+        return max(self.synced_at + SYNC_INTERVAL - time(), 0)
+
+    def wait(self, idle: bool = True) -> None:
+        """Block until the next tracker may be checked, waking up early to pick up changed rows and finished checks.
+
+        While no worker is idle, only a finished check, a changed row or the next sync wakes it up.
+        """
+        until_check = self.time_until_next_check() if idle else None
+        until_sync = self.time_until_sync()
+        hosts: list[str] = []
+        try:
+            hosts.append(schedule_changes.get(timeout=until_sync if until_check is None else min(until_check, until_sync)))
+            while True:
+                hosts.append(schedule_changes.get_nowait())
+        except Empty:
+            pass
+        for host in hosts:
+            if host != CHECK_DONE and not self.checking(host):
+                self.reload(host)
+        if self.time_until_sync() == 0:  # Checked often, since a steady stream of finished checks never times out
+            self.sync()
+        elif hosts:
+            self.update_probe_rate()
+
 
 def build_ip_indexes(trackers: list[Tracker]) -> tuple[list[str], dict[str, set[str]]]:
     all_ips_of_all_trackers: list[str] = []
@@ -28,25 +267,116 @@ def build_ip_indexes(trackers: list[Tracker]) -> tuple[list[str], dict[str, set[
 
 
 def update_outdated_trackers() -> NoReturn:
+    scheduler = CheckScheduler.from_db()
+    throughput = ThroughputLog(time())
+    in_flight: dict[Future[None], Tracker] = {}
+    with ThreadPoolExecutor(max_workers=check_workers, thread_name_prefix="checker") as executor:
+        while True:
+            # Probes run in the pool, but results are persisted from this thread only, one tracker at a time
+            finished: list[Tracker] = []
+            checked: list[Tracker] = []
+            for future in [future for future in in_flight if future.done()]:
+                tracker = in_flight.pop(future)
+                finished.append(tracker)
+                if (error := future.exception()) is not None:
+                    logger.error("Unhandled error while checking tracker %s", tracker.url, exc_info=error)
+                else:
+                    checked.append(tracker)
+            finish_checks(scheduler, finished, checked)
+            throughput.add(len(checked), time())
+            now = int(time())
+            prefetch_dns(scheduler.upcoming(now), now + PREFETCH_WINDOW)
+            for tracker in claim_due(scheduler, now, check_workers - len(in_flight)):
+                logger.info("Updating %s", tracker.url)
+                future = executor.submit(tracker.update_status)
+                future.add_done_callback(wake_scheduler)
+                in_flight[future] = tracker
+            scheduler.wait(idle=len(in_flight) < check_workers)
+
+
+def run_async_checker() -> None:
+    asyncio.run(update_outdated_trackers_async())
+
+
+async def update_outdated_trackers_async() -> NoReturn:
+    scheduler = CheckScheduler.from_db()
+    throughput = ThroughputLog(time())
+    in_flight: dict[asyncio.Task[None], Tracker] = {}
     while True:
+        finished: list[Tracker] = []
+        checked: list[Tracker] = []
+        for task in [task for task in in_flight if task.done()]:
+            tracker = in_flight.pop(task)
+            finished.append(tracker)
+            if (error := task.exception()) is not None:
+                logger.error("Unhandled error while checking tracker %s", tracker.url, exc_info=error)
+            else:
+                checked.append(tracker)
+        # Table reads and writes go to threads, so sqlite and raw data writes don't stall the timers of probes in flight
+        await asyncio.to_thread(finish_checks, scheduler, finished, checked)
+        throughput.add(len(checked), time())
         now = int(time())
-        trackers_all = db.get_all_data()
-        trackers_outdated: list[Tracker] = []
-        for tracker in trackers_all:
-            if (now - tracker.last_checked) > tracker.interval:
-                trackers_outdated.append(tracker)
-        for tracker in trackers_outdated:
+        await dnscache.prefetch((tracker.host for tracker in scheduler.upcoming(now)), now + PREFETCH_WINDOW)
+        for tracker in await asyncio.to_thread(claim_due, scheduler, now, check_workers - len(in_flight)):
             logger.info("Updating %s", tracker.url)
-            tracker.update_status()
+            task = asyncio.create_task(tracker.update_status_async())
+            task.add_done_callback(wake_scheduler)
+            in_flight[task] = tracker
+        await asyncio.to_thread(scheduler.wait, len(in_flight) < check_workers)
 
-            if tracker.to_be_deleted:
-                logger.info("Removing %s", tracker.url)
-                db.delete_tracker(tracker)
-                trackers_all.remove(tracker)
-            else:
-                db.update_tracker(tracker)
-            save_deque_to_disk(raw_data, raw_history_file)
-        sleep(5)
+
+def wake_scheduler(_: object) -> None:
+    schedule_changes.put(CHECK_DONE)
+
+
+def claim_due(scheduler: CheckScheduler, now: int, limit: int) -> list[Tracker]:
+    """Lease up to limit due trackers and return the ones to probe; those whose hostname doesn't exist are done here."""
+    claimed = scheduler.claim(scheduler.pop_due(now, limit), now)
+    resolvable = skip_unresolvable(claimed)
+    if len(resolvable) < len(claimed):
+        skipped = [tracker for tracker in claimed if tracker not in resolvable]
+        finish_checks(scheduler, skipped, [])
+    return resolvable
+
+
+def finish_checks(scheduler: CheckScheduler, finished: list[Tracker], checked: list[Tracker]) -> None:
+    """Save the checked trackers, then release the leases of all finished ones and schedule their next checks."""
+    if not finished:
+        return
+    for tracker in checked:
+        save_tracker(tracker)
+    scheduler.release(finished)
+    scheduler.reschedule(finished)
+
+
+def prefetch_dns(trackers: list[Tracker], until: float) -> None:
+    """Resolve the hostnames of upcoming checks concurrently, so DNS is answered from the cache once they run."""
+    hostnames = dnscache.uncached((tracker.host for tracker in trackers), until)
+    if hostnames:
+        asyncio.run(dnscache.prefetch(hostnames, until))
+
+
+def skip_unresolvable(trackers: list[Tracker]) -> list[Tracker]:
+    """Record the failure of trackers whose hostname is NXDOMAIN without a worker slot, and return the others."""
+    resolvable: list[Tracker] = []
+    for tracker in trackers:
+        if dnscache.nxdomain(tracker.host):
+            logger.info("Skipping %s, hostname doesn't exist", tracker.url)
+            tracker.record_unresolvable()
+            save_tracker(tracker)
+        else:
+            resolvable.append(tracker)
+    return resolvable
+
+
+def save_tracker(tracker: Tracker) -> None:
+    if tracker.to_be_deleted:
+        logger.info("Removing %s", tracker.url)
+        db.delete_tracker(tracker)
+    else:
+        db.update_tracker(tracker)
+    if save_raw_history:
+        save_deque_to_disk(raw_data, raw_history_file, default=saved_info)
 
 
 def warn_of_duplicate_ips(all_ips: list[str]) -> None:
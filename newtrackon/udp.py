@@ -0,0 +1,166 @@
+import socket
+import struct
+from collections.abc import Sequence
+from concurrent.futures import Future
+from logging import getLogger
+from threading import Lock, Thread
+from time import time
+
+UDP_BUFFER_SIZE: int = 2048
+CONNECTION_ID_LIFETIME: int = 60  # BEP 15: clients may use a connection ID for one minute, trackers accept it for two
+UDP_TRANSMISSIONS: int = 3  # Sends of each request, the first one and two retransmissions
+UDP_DEFAULT_TIMEOUT: float = 2  # First wait for trackers without a measured latency
+UDP_MIN_TIMEOUT: float = 0.5
+UDP_MAX_TIMEOUT: float = 4  # Cap on the first wait, however slow the tracker was last time
+UDP_LATENCY_FACTOR: float = 2  # Latency spans the connect and announce round trips, so this waits ~4 round trips
+
+# BEP 15 packet layouts, compiled once instead of parsing a format string per field
+CONNECT_REQUEST: struct.Struct = struct.Struct("!qiI")  # protocol ID, action, transaction ID
+# connection ID, action, transaction ID, info hash, peer ID, downloaded, left, uploaded, event, IP, key, num_want, port
+ANNOUNCE_REQUEST: struct.Struct = struct.Struct("!qiI20s20sqqqiiIiH")
+RESPONSE_HEADER: struct.Struct = struct.Struct("!iI")  # action, transaction ID
+CONNECT_RESPONSE: struct.Struct = struct.Struct("!iIq")  # action, transaction ID, connection ID
+ANNOUNCE_RESPONSE: struct.Struct = struct.Struct("!iIiii")  # action, transaction ID, interval, leechers, seeders, then peers
+
+# Responses are routed by remote IP, remote port and BEP 15 transaction ID
+ResponseKey = tuple[str, int, int]
+
+logger = getLogger("newtrackon")
+
+
+def retransmission_timeouts(latency: int | None) -> list[float]:
+    """BEP 15's 15 * 2^n retransmission schedule, scaled down to start from the tracker's last latency in ms."""
+    if latency is None:
+        base = UDP_DEFAULT_TIMEOUT
+    else:
+        base = min(max(latency / 1000 * UDP_LATENCY_FACTOR, UDP_MIN_TIMEOUT), UDP_MAX_TIMEOUT)
+    return [base * 2**n for n in range(UDP_TRANSMISSIONS)]
+
+
+def response_key(addr: tuple[str, int] | tuple[str, int, int, int], transaction_id: int) -> ResponseKey:
+    return str(addr[0]), int(addr[1]), transaction_id
+
+
+def response_transaction_id(data: bytes | bytearray | memoryview) -> int | None:
+    if len(data) < RESPONSE_HEADER.size:
+        return None
+    return RESPONSE_HEADER.unpack_from(data)[1]
+
+
+class UDPMultiplexer:
+    """One unconnected UDP socket per address family, shared by every concurrent announce.
+
+    A receiver thread per socket hands each datagram to the request waiting on its (remote address, transaction ID),
+    so thousands of announces can be in flight over two file descriptors. Datagrams nobody waits for are dropped.
+    """
+
+    def __init__(self) -> None:
+        self.lock = Lock()
+        self.sockets: dict[socket.AddressFamily, socket.socket] = {}
+        self.pending: dict[ResponseKey, Future[bytes]] = {}
+
+    def socket_for(self, family: socket.AddressFamily) -> socket.socket:
+        with self.lock:
+            sock = self.sockets.get(family)
+            if sock is None:
+                sock = socket.socket(family, socket.SOCK_DGRAM)
+                try:
+                    sock.bind(("::" if family == socket.AF_INET6 else "0.0.0.0", 0))
+                except OSError:
+                    sock.close()
+                    raise
+                self.sockets[family] = sock
+                Thread(target=self.receive, args=(sock,), name=f"udp-{family.name}", daemon=True).start()
+            return sock
+
+    def receive(self, sock: socket.socket) -> None:
+        # Datagrams land in one preallocated buffer, only the ones a request waits for are copied out of it
+        buf = bytearray(UDP_BUFFER_SIZE)
+        view = memoryview(buf)
+        while True:
+            try:
+                nbytes, addr = sock.recvfrom_into(buf)
+            except OSError:
+                if sock.fileno() == -1:  # Closed
+                    return
+                continue  # ICMP errors of past sends surface here, they can't be tied to a request
+            transaction_id = response_transaction_id(view[:nbytes])
+            if transaction_id is None:
+                continue
+            with self.lock:
+                future = self.pending.get(response_key(addr, transaction_id))
+            if future is not None and not future.done():
+                future.set_result(bytes(view[:nbytes]))
+
+    def request(
+        self,
+        family: socket.AddressFamily,
+        addr: tuple[str, int] | tuple[str, int, int, int],
+        data: bytes,
+        transaction_id: int,
+        timeouts: Sequence[float],
+    ) -> bytes:
+        """Send data and wait for its response, retransmitting it after each of the timeouts in turn."""
+        sock = self.socket_for(family)
+        key = response_key(addr, transaction_id)
+        future: Future[bytes] = Future()
+        with self.lock:
+            self.pending[key] = future
+        try:
+            for timeout in timeouts:
+                sock.sendto(data, addr)
+                try:
+                    return future.result(timeout)
+                except TimeoutError:
+                    continue
+            raise TimeoutError
+        finally:
+            with self.lock:
+                del self.pending[key]
+
+    def close(self) -> None:
+        with self.lock:
+            for sock in self.sockets.values():
+                try:
+                    sock.shutdown(socket.SHUT_RDWR)  # Wakes up the receiver thread
+                except OSError:
+                    pass
+                sock.close()
+            self.sockets.clear()
+
+
+class ConnectionIDCache:
+    """BEP 15 connection IDs per tracker (IP, port), so retries and re-probes within their lifetime skip the connect."""
+
+    def __init__(self, lifetime: int = CONNECTION_ID_LIFETIME) -> None:
+        self.lifetime = lifetime
+        self.lock = Lock()
+        self.entries: dict[tuple[str, int], tuple[int, float]] = {}
+
+    def get(self, addr: tuple[str, int], now: float | None = None) -> int | None:
+        now = time() if now is None else now
+        with self.lock:
+            entry = self.entries.get(addr)
+            if entry is None:
+                return None
+            connection_id, expires = entry
+            if expires <= now:
+                del self.entries[addr]
+                return None
+            return connection_id
+
+    def put(self, addr: tuple[str, int], connection_id: int, now: float | None = None) -> None:
+        now = time() if now is None else now
+        with self.lock:
+            self.entries[addr] = (connection_id, now + self.lifetime)
+            if len(self.entries) > 1024:  # Drop expired entries of trackers that weren't probed again
+                for stale in [key for key, (_, expires) in self.entries.items() if expires <= now]:
+                    del self.entries[stale]
+
+    def discard(self, addr: tuple[str, int]) -> None:
+        with self.lock:
+            self.entries.pop(addr, None)
+
+
+udp_multiplexer: UDPMultiplexer = UDPMultiplexer()
+connection_ids: ConnectionIDCache = ConnectionIDCache()
@@ -1,7 +1,8 @@
 import sqlite3
 import sys
-from collections.abc import Mapping, Sequence
-from ipaddress import IPv4Address, IPv6Address, ip_address
+from collections.abc import Callable, Collection, Mapping, Sequence
+from queue import Empty, Queue
+from threading import Lock, Thread
 from time import time
 from typing import TYPE_CHECKING
 from urllib.parse import ParseResult
@@ -16,7 +17,90 @@ ProtocolPref = tuple[str, int]
 
 # Type alias for tracker URL with its IP addresses
 TrackerEndpoint = tuple[str, list[str]]
-TrackerEndpointInput = tuple[str, list[str] | None]
+
+HAPPY_EYEBALLS_DELAY: float = 0.25  # RFC 8305 recommended connection attempt delay
+
+
+class TokenBucket:
+    """Token bucket allowing `rate` events per second with bursts of up to `capacity`. Starts full."""
+
+    def __init__(self, rate: float, capacity: float) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated: float | None = None
+        self.lock = Lock()
+
+    def refill(self, now: float) -> None:
+        if self.updated is not None and now > self.updated:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now if self.updated is None else max(self.updated, now)
+
+    def take(self, now: float) -> bool:
+        with self.lock:
+            self.refill(now)
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+    def delay(self, now: float) -> float:
+        """Seconds until the next token is available."""
+        with self.lock:
+            self.refill(now)
+            if self.tokens >= 1:
+                return 0.0
+            return (1 - self.tokens) / self.rate if self.rate > 0 else float("inf")
+
+
+def interleave_families(ips: Collection[str]) -> list[str]:
+    """Order addresses for happy eyeballs (RFC 8305): alternating families, starting with IPv6."""
+    ipv6 = [ip for ip in ips if ":" in ip]
+    ipv4 = [ip for ip in ips if ":" not in ip]
+    interleaved: list[str] = []
+    for i in range(max(len(ipv6), len(ipv4))):
+        interleaved.extend(ip_list[i] for ip_list in (ipv6, ipv4) if i < len(ip_list))
+    return interleaved
+
+
+def race[T](addresses: Sequence[str], attempt: Callable[[str], T], on_loser: Callable[[T], object] | None = None) -> T:
+    """Happy eyeballs (RFC 8305): attempt addresses on threads, a new one every HAPPY_EYEBALLS_DELAY or as soon as one
+    fails, and return the first result. Results of attempts still running go to on_loser. Attempts fail by raising
+    OSError or RuntimeError; if all fail, the last error is raised.
+    """
+    results: Queue[T | OSError | RuntimeError] = Queue()
+
+    def run(address: str) -> None:
+        try:
+            results.put(attempt(address))
+        except (OSError, RuntimeError) as err:
+            results.put(err)
+
+    last_error: OSError | RuntimeError = RuntimeError("No address to attempt")
+    started = finished = 0
+    while finished < len(addresses):
+        if started < len(addresses):
+            Thread(target=run, args=(addresses[started],), daemon=True).start()
+            started += 1
+        try:
+            result = results.get(timeout=HAPPY_EYEBALLS_DELAY if started < len(addresses) else None)
+        except Empty:
+            continue
+        finished += 1
+        if isinstance(result, (OSError, RuntimeError)):
+            last_error = result
+        else:
+            if on_loser is not None and started > finished:
+                Thread(target=hand_off_losers, args=(results, started - finished, on_loser), daemon=True).start()
+            return result
+    raise last_error
+
+
+def hand_off_losers[T](results: Queue[T | OSError | RuntimeError], pending: int, on_loser: Callable[[T], object]) -> None:
+    for _ in range(pending):
+        result = results.get()
+        if not isinstance(result, (OSError, RuntimeError)):
+            on_loser(result)
 
 
 def add_api_headers(resp: Response) -> Response:
@@ -91,21 +175,6 @@ def format_time(last_time: float) -> str:
         return str(years) + " years"
 
 
-def remove_ipvx_only_trackers(raw_list: Sequence[TrackerEndpointInput], version: int) -> list[TrackerEndpoint]:
-    ip_type_to_keep: type[IPv4Address | IPv6Address]
-    if version == 6:
-        ip_type_to_keep = IPv4Address
-    else:
-        ip_type_to_keep = IPv6Address
-    cleaned_list: list[TrackerEndpoint] = []
-    for url, ips_list in raw_list:
-        if ips_list:
-            ips_parsed = [ip_address(ip) for ip in ips_list]
-            if any(isinstance(ip, ip_type_to_keep) for ip in ips_parsed):
-                cleaned_list.append((url, ips_list))
-    return cleaned_list
-
-
 def format_list(raw_list: list[TrackerEndpoint]) -> str:
     formatted_list = ""
     for url in raw_list:
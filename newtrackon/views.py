@@ -183,6 +183,8 @@ def api_all():
 @app.route("/api/live")
 @app.route("/api/udp")
 @app.route("/api/http")
+@app.route("/api/ipv4")
+@app.route("/api/ipv6")
 def api_multiple():
     resp = make_response(db.get_api_data(request.path, added_before=get_added_before_or_abort()))
     resp = utils.add_api_headers(resp)
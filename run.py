@@ -5,7 +5,7 @@ from tornado.httpserver import HTTPServer
 from tornado.ioloop import IOLoop
 from tornado.wsgi import WSGIContainer
 
-from newtrackon import db, ingest, scraper, trackerlist_project, trackon
+from newtrackon import db, enrichment, geoip, ingest, persistence, scraper, trackerlist_project, trackon
 from newtrackon.scraper import get_server_ip
 from newtrackon.views import app
 
@@ -25,6 +25,30 @@ if __name__ == "__main__":
         dest="ignore_ipv6",
         action="store_true",
     )
+    parser.add_argument(
+        "--check-workers",
+        type=int,
+        help="Number of trackers checked concurrently",
+        default=trackon.check_workers,
+    )
+    parser.add_argument(
+        "--check-engine",
+        choices=["threads", "asyncio"],
+        help="Run tracker checks in a thread pool or on an asyncio event loop",
+        default="threads",
+    )
+    parser.add_argument(
+        "--checker-only",
+        help="Only check trackers, without the web server, for extra checker processes sharing the database",
+        dest="checker_only",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--geoip-ranges",
+        type=str,
+        help="CSV of IP ranges (first IP, last IP, country, country code, network) to geolocate trackers offline,"
+        " instead of querying IP-API",
+    )
 
     args = parser.parse_args()
 
@@ -35,9 +59,23 @@ if __name__ == "__main__":
     if not args.ignore_ipv6:
         scraper.my_ipv6 = get_server_ip("6")
 
+    trackon.check_workers = args.check_workers
+    trackon.save_raw_history = not args.checker_only
+    scraper.restore_raw_history(persistence.raw_data)
+    if args.geoip_ranges:
+        geoip.local_ranges = geoip.open_ranges(args.geoip_ranges)
+
+    geo_worker = Thread(target=enrichment.geo_worker)  # Checkers only publish IP changes, this geolocates them
+    geo_worker.daemon = True
+    geo_worker.start()
+
+    check_trackers = trackon.run_async_checker if args.check_engine == "asyncio" else trackon.update_outdated_trackers
+    if args.checker_only:
+        check_trackers()
+
     http_server = HTTPServer(WSGIContainer(app))
 
-    update_status = Thread(target=trackon.update_outdated_trackers)
+    update_status = Thread(target=check_trackers)
     update_status.daemon = True
     update_status.start()
 
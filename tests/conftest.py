@@ -13,6 +13,7 @@ from typing import TYPE_CHECKING, Any
 from unittest.mock import MagicMock, patch
 
 import pytest
+from dns.exception import DNSException
 from flask.testing import FlaskClient
 
 if TYPE_CHECKING:
@@ -29,19 +30,35 @@ def drain_submitted_queue(persistence: ModuleType) -> None:
             persistence.submitted_queue.task_done()
         except Empty:
             break
+    while True:
+        try:
+            persistence.schedule_changes.get_nowait()
+        except Empty:
+            break
+    while True:
+        try:
+            persistence.geo_updates.get_nowait()
+        except Empty:
+            break
 
 
 @pytest.fixture(autouse=True)
 def clean_global_state() -> Generator[None]:
     """Automatically clean global state before and after each test."""
     from newtrackon import persistence
+    from newtrackon.dnscache import dns_cache
+    from newtrackon.geoip import GeoCache
+    from newtrackon.udp import connection_ids
 
     # Clear before test
     drain_submitted_queue(persistence)
     persistence.raw_data.clear()
     persistence.submitted_data.clear()
+    connection_ids.entries.clear()
+    dns_cache.clear()
 
-    yield
+    with patch("newtrackon.geoip.geo_cache", GeoCache(":memory:")):  # Never data/geoip.db
+        yield
 
     # Clear after test
     drain_submitted_queue(persistence)
@@ -70,7 +87,19 @@ def in_memory_db() -> Generator[Connection]:
             historic TEXT,
             last_downtime INTEGER,
             last_uptime INTEGER,
-            recent_ip TEXT
+            recent_ip TEXT,
+            lease_owner TEXT,
+            lease_expires INTEGER,
+            status_ipv4 INTEGER,
+            latency_ipv4 INTEGER,
+            uptime_ipv4 INTEGER,
+            historic_ipv4 TEXT,
+            status_ipv6 INTEGER,
+            latency_ipv6 INTEGER,
+            uptime_ipv6 INTEGER,
+            historic_ipv6 TEXT,
+            handshake INTEGER,
+            located_ip TEXT
         )
     """)
     conn.commit()
@@ -143,7 +172,9 @@ def sample_tracker(sample_tracker_data: TrackerDataDict) -> Tracker:
 def insert_sample_tracker(mock_db_connection: Connection, sample_tracker_data: TrackerDataDict) -> TrackerDataDict:
     """Insert sample tracker into the test database."""
     mock_db_connection.execute(
-        "INSERT INTO status VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)",
+        "INSERT INTO status (host, url, ip, latency, last_checked, interval, status, uptime, country,"
+        " country_code, network, added, historic, last_downtime, last_uptime, recent_ip)"
+        " VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)",
         (
             sample_tracker_data["host"],
             sample_tracker_data["url"],
@@ -174,14 +205,14 @@ def mock_network() -> Generator[dict[str, MagicMock]]:
         patch("requests.get") as mock_get,
         patch("requests.post") as mock_post,
         patch("socket.socket") as mock_socket,
-        patch("socket.getaddrinfo") as mock_getaddrinfo,
-        patch("dns.resolver.resolve") as mock_dns,
+        patch("newtrackon.dnscache.resolve_ips") as mock_resolve_ips,
+        patch("dns.resolver.resolve", side_effect=DNSException("Network disabled in tests")) as mock_dns,
     ):
         yield {
             "get": mock_get,
             "post": mock_post,
             "socket": mock_socket,
-            "getaddrinfo": mock_getaddrinfo,
+            "resolve_ips": mock_resolve_ips,
             "dns": mock_dns,
         }
 
@@ -264,9 +295,7 @@ def bencoded_tracker_response() -> bytes:
 
 @pytest.fixture
 def mock_ip_resolution() -> Generator[MagicMock]:
-    """Mock socket.getaddrinfo for IP resolution."""
-    with patch("socket.getaddrinfo") as mock:
-        mock.return_value = [
-            (2, 1, 6, "", ("93.184.216.34", 6969)),
-        ]
+    """Mock the DNS cache's IP resolution."""
+    with patch("newtrackon.dnscache.resolve_ips") as mock:
+        mock.return_value = ["93.184.216.34"]
         yield mock
@@ -162,7 +162,9 @@ class TestApiPercentageEndpoint:
         new_added = now - (2 * 86400)
 
         mock_db_connection.execute(
-            "INSERT INTO status VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)",
+            "INSERT INTO status (host, url, ip, latency, last_checked, interval, status, uptime, country,"
+            " country_code, network, added, historic, last_downtime, last_uptime, recent_ip)"
+            " VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)",
             (
                 "old.percentage.tracker.com",
                 "udp://old.percentage.tracker.com:6969/announce",
@@ -183,7 +185,9 @@ class TestApiPercentageEndpoint:
             ),
         )
         mock_db_connection.execute(
-            "INSERT INTO status VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)",
+            "INSERT INTO status (host, url, ip, latency, last_checked, interval, status, uptime, country,"
+            " country_code, network, added, historic, last_downtime, last_uptime, recent_ip)"
+            " VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)",
             (
                 "new.percentage.tracker.com",
                 "udp://new.percentage.tracker.com:6969/announce",
@@ -235,7 +239,9 @@ class TestApiStableEndpoint:
         """GET /api/stable should exclude trackers below 95% uptime."""
         # Insert a tracker with 90% uptime
         mock_db_connection.execute(
-            "INSERT INTO status VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)",
+            "INSERT INTO status (host, url, ip, latency, last_checked, interval, status, uptime, country,"
+            " country_code, network, added, historic, last_downtime, last_uptime, recent_ip)"
+            " VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)",
             (
                 "low.uptime.tracker.com",
                 "udp://low.uptime.tracker.com:6969/announce",
@@ -270,7 +276,9 @@ class TestApiStableEndpoint:
         new_added = now - (2 * 86400)
 
         mock_db_connection.execute(
-            "INSERT INTO status VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)",
+            "INSERT INTO status (host, url, ip, latency, last_checked, interval, status, uptime, country,"
+            " country_code, network, added, historic, last_downtime, last_uptime, recent_ip)"
+            " VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)",
             (
                 "old.stable.tracker.com",
                 "udp://old.stable.tracker.com:6969/announce",
@@ -291,7 +299,9 @@ class TestApiStableEndpoint:
             ),
         )
         mock_db_connection.execute(
-            "INSERT INTO status VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)",
+            "INSERT INTO status (host, url, ip, latency, last_checked, interval, status, uptime, country,"
+            " country_code, network, added, historic, last_downtime, last_uptime, recent_ip)"
+            " VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)",
             (
                 "new.stable.tracker.com",
                 "udp://new.stable.tracker.com:6969/announce",
@@ -361,7 +371,9 @@ class TestApiAllEndpoint:
         """GET /api/all should include trackers with low uptime."""
         # Insert a tracker with 10% uptime
         mock_db_connection.execute(
-            "INSERT INTO status VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)",
+            "INSERT INTO status (host, url, ip, latency, last_checked, interval, status, uptime, country,"
+            " country_code, network, added, historic, last_downtime, last_uptime, recent_ip)"
+            " VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)",
             (
                 "low.uptime.tracker.com",
                 "udp://low.uptime.tracker.com:6969/announce",
@@ -396,7 +408,9 @@ class TestApiAllEndpoint:
         new_added = now - (2 * 86400)
 
         mock_db_connection.execute(
-            "INSERT INTO status VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)",
+            "INSERT INTO status (host, url, ip, latency, last_checked, interval, status, uptime, country,"
+            " country_code, network, added, historic, last_downtime, last_uptime, recent_ip)"
+            " VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)",
             (
                 "old.all.tracker.com",
                 "udp://old.all.tracker.com:6969/announce",
@@ -417,7 +431,9 @@ class TestApiAllEndpoint:
             ),
         )
         mock_db_connection.execute(
-            "INSERT INTO status VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)",
+            "INSERT INTO status (host, url, ip, latency, last_checked, interval, status, uptime, country,"
+            " country_code, network, added, historic, last_downtime, last_uptime, recent_ip)"
+            " VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)",
             (
                 "new.all.tracker.com",
                 "udp://new.all.tracker.com:6969/announce",
@@ -462,7 +478,9 @@ class TestApiLiveEndpoint:
         """GET /api/live should exclude offline trackers."""
         # Insert an offline tracker
         mock_db_connection.execute(
-            "INSERT INTO status VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)",
+            "INSERT INTO status (host, url, ip, latency, last_checked, interval, status, uptime, country,"
+            " country_code, network, added, historic, last_downtime, last_uptime, recent_ip)"
+            " VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)",
             (
                 "offline.tracker.com",
                 "udp://offline.tracker.com:6969/announce",
@@ -497,7 +515,9 @@ class TestApiLiveEndpoint:
         new_added = now - (2 * 86400)
 
         mock_db_connection.execute(
-            "INSERT INTO status VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)",
+            "INSERT INTO status (host, url, ip, latency, last_checked, interval, status, uptime, country,"
+            " country_code, network, added, historic, last_downtime, last_uptime, recent_ip)"
+            " VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)",
             (
                 "old.live.tracker.com",
                 "udp://old.live.tracker.com:6969/announce",
@@ -518,7 +538,9 @@ class TestApiLiveEndpoint:
             ),
         )
         mock_db_connection.execute(
-            "INSERT INTO status VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)",
+            "INSERT INTO status (host, url, ip, latency, last_checked, interval, status, uptime, country,"
+            " country_code, network, added, historic, last_downtime, last_uptime, recent_ip)"
+            " VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)",
             (
                 "new.live.tracker.com",
                 "udp://new.live.tracker.com:6969/announce",
@@ -561,7 +583,9 @@ class TestApiUdpEndpoint:
         """GET /api/udp should exclude HTTP trackers."""
         # Insert an HTTP tracker with high uptime
         mock_db_connection.execute(
-            "INSERT INTO status VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)",
+            "INSERT INTO status (host, url, ip, latency, last_checked, interval, status, uptime, country,"
+            " country_code, network, added, historic, last_downtime, last_uptime, recent_ip)"
+            " VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)",
             (
                 "http.tracker.com",
                 "http://http.tracker.com:6969/announce",
@@ -591,7 +615,9 @@ class TestApiUdpEndpoint:
         """GET /api/udp should exclude UDP trackers with < 95% uptime."""
         # Insert a UDP tracker with low uptime
         mock_db_connection.execute(
-            "INSERT INTO status VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)",
+            "INSERT INTO status (host, url, ip, latency, last_checked, interval, status, uptime, country,"
+            " country_code, network, added, historic, last_downtime, last_uptime, recent_ip)"
+            " VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)",
             (
                 "low.udp.tracker.com",
                 "udp://low.udp.tracker.com:6969/announce",
@@ -626,7 +652,9 @@ class TestApiUdpEndpoint:
         new_added = now - (2 * 86400)
 
         mock_db_connection.execute(
-            "INSERT INTO status VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)",
+            "INSERT INTO status (host, url, ip, latency, last_checked, interval, status, uptime, country,"
+            " country_code, network, added, historic, last_downtime, last_uptime, recent_ip)"
+            " VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)",
             (
                 "old.udp.tracker.com",
                 "udp://old.udp.tracker.com:6969/announce",
@@ -647,7 +675,9 @@ class TestApiUdpEndpoint:
             ),
         )
         mock_db_connection.execute(
-            "INSERT INTO status VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)",
+            "INSERT INTO status (host, url, ip, latency, last_checked, interval, status, uptime, country,"
+            " country_code, network, added, historic, last_downtime, last_uptime, recent_ip)"
+            " VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)",
             (
                 "new.udp.tracker.com",
                 "udp://new.udp.tracker.com:6969/announce",
@@ -682,7 +712,9 @@ class TestApiHttpEndpoint:
         """GET /api/http should return HTTP trackers with >= 95% uptime."""
         # Insert an HTTP tracker with high uptime
         mock_db_connection.execute(
-            "INSERT INTO status VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)",
+            "INSERT INTO status (host, url, ip, latency, last_checked, interval, status, uptime, country,"
+            " country_code, network, added, historic, last_downtime, last_uptime, recent_ip)"
+            " VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)",
             (
                 "http.tracker.com",
                 "http://http.tracker.com:6969/announce",
@@ -715,7 +747,9 @@ class TestApiHttpEndpoint:
         """GET /api/http should include HTTPS trackers (starts with http)."""
         # Insert an HTTPS tracker with high uptime
         mock_db_connection.execute(
-            "INSERT INTO status VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)",
+            "INSERT INTO status (host, url, ip, latency, last_checked, interval, status, uptime, country,"
+            " country_code, network, added, historic, last_downtime, last_uptime, recent_ip)"
+            " VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)",
             (
                 "https.tracker.com",
                 "https://https.tracker.com:443/announce",
@@ -757,7 +791,9 @@ class TestApiHttpEndpoint:
         new_added = now - (2 * 86400)
 
         mock_db_connection.execute(
-            "INSERT INTO status VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)",
+            "INSERT INTO status (host, url, ip, latency, last_checked, interval, status, uptime, country,"
+            " country_code, network, added, historic, last_downtime, last_uptime, recent_ip)"
+            " VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)",
             (
                 "old.http.tracker.com",
                 "http://old.http.tracker.com:6969/announce",
@@ -778,7 +814,9 @@ class TestApiHttpEndpoint:
             ),
         )
         mock_db_connection.execute(
-            "INSERT INTO status VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)",
+            "INSERT INTO status (host, url, ip, latency, last_checked, interval, status, uptime, country,"
+            " country_code, network, added, historic, last_downtime, last_uptime, recent_ip)"
+            " VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)",
             (
                 "new.http.tracker.com",
                 "http://new.http.tracker.com:6969/announce",
@@ -813,7 +851,9 @@ class TestIpv4Ipv6Filtering:
     def insert_ipv4_only_tracker(self, mock_db_connection: sqlite3.Connection) -> str:
         """Insert a tracker with only IPv4 address."""
         mock_db_connection.execute(
-            "INSERT INTO status VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)",
+            "INSERT INTO status (host, url, ip, latency, last_checked, interval, status, uptime, country,"
+            " country_code, network, added, historic, last_downtime, last_uptime, recent_ip)"
+            " VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)",
             (
                 "ipv4only.tracker.com",
                 "udp://ipv4only.tracker.com:6969/announce",
@@ -840,7 +880,9 @@ class TestIpv4Ipv6Filtering:
     def insert_ipv6_only_tracker(self, mock_db_connection: sqlite3.Connection) -> str:
         """Insert a tracker with only IPv6 address."""
         mock_db_connection.execute(
-            "INSERT INTO status VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)",
+            "INSERT INTO status (host, url, ip, latency, last_checked, interval, status, uptime, country,"
+            " country_code, network, added, historic, last_downtime, last_uptime, recent_ip)"
+            " VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)",
             (
                 "ipv6only.tracker.com",
                 "udp://ipv6only.tracker.com:6969/announce",
@@ -867,7 +909,9 @@ class TestIpv4Ipv6Filtering:
     def insert_dual_stack_tracker(self, mock_db_connection: sqlite3.Connection) -> str:
         """Insert a tracker with both IPv4 and IPv6 addresses."""
         mock_db_connection.execute(
-            "INSERT INTO status VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)",
+            "INSERT INTO status (host, url, ip, latency, last_checked, interval, status, uptime, country,"
+            " country_code, network, added, historic, last_downtime, last_uptime, recent_ip)"
+            " VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)",
             (
                 "dualstack.tracker.com",
                 "udp://dualstack.tracker.com:6969/announce",
@@ -1117,7 +1161,9 @@ class TestEdgeCases:
         # Insert multiple trackers
         for i in range(3):
             mock_db_connection.execute(
-                "INSERT INTO status VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)",
+                "INSERT INTO status (host, url, ip, latency, last_checked, interval, status, uptime, country,"
+                " country_code, network, added, historic, last_downtime, last_uptime, recent_ip)"
+                " VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)",
                 (
                     f"tracker{i}.example.com",
                     f"udp://tracker{i}.example.com:6969/announce",
@@ -1150,7 +1196,9 @@ class TestEdgeCases:
     def test_special_characters_in_tracker_url(self, flask_client: FlaskClient, mock_db_connection: sqlite3.Connection) -> None:
         """API should handle tracker URLs with special characters."""
         mock_db_connection.execute(
-            "INSERT INTO status VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)",
+            "INSERT INTO status (host, url, ip, latency, last_checked, interval, status, uptime, country,"
+            " country_code, network, added, historic, last_downtime, last_uptime, recent_ip)"
+            " VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)",
             (
                 "special.tracker.com",
                 "http://special.tracker.com:8080/path/announce?key=value",
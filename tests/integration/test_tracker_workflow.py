@@ -14,9 +14,14 @@ import pytest
 from pytest import MonkeyPatch
 
 from newtrackon import persistence
+from newtrackon.geoip import GeoInfo
 from newtrackon.tracker import Tracker
 
 
+def locate_in_us(ips: list[str]) -> dict[str, GeoInfo]:
+    return dict.fromkeys(ips, GeoInfo("United States", "us", "Example ISP"))
+
+
 @pytest.fixture
 def shared_memory_db(monkeypatch: MonkeyPatch) -> Generator[Connection]:
     """Provide a shared in-memory SQLite database that persists across connections.
@@ -43,7 +48,19 @@ def shared_memory_db(monkeypatch: MonkeyPatch) -> Generator[Connection]:
             historic TEXT,
             last_downtime INTEGER,
             last_uptime INTEGER,
-            recent_ip TEXT
+            recent_ip TEXT,
+            lease_owner TEXT,
+            lease_expires INTEGER,
+            status_ipv4 INTEGER,
+            latency_ipv4 INTEGER,
+            uptime_ipv4 INTEGER,
+            historic_ipv4 TEXT,
+            status_ipv6 INTEGER,
+            latency_ipv6 INTEGER,
+            uptime_ipv6 INTEGER,
+            historic_ipv6 TEXT,
+            handshake INTEGER,
+            located_ip TEXT
         )
     """)
     conn.commit()
@@ -83,7 +100,9 @@ class TestTrackerUpdateCycle:
 
         # Insert tracker into DB
         shared_memory_db.execute(
-            "INSERT INTO status VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)",
+            "INSERT INTO status (host, url, ip, latency, last_checked, interval, status, uptime, country,"
+            " country_code, network, added, historic, last_downtime, last_uptime, recent_ip)"
+            " VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)",
             (
                 sample_tracker.host,
                 sample_tracker.url,
@@ -114,8 +133,8 @@ class TestTrackerUpdateCycle:
 
         with (
             patch("newtrackon.scraper.get_bep_34", return_value=(False, None)),
-            patch("socket.getaddrinfo", return_value=[(2, 1, 6, "", ("93.184.216.34", 6969))]),
-            patch("newtrackon.tracker.Tracker.ip_api", return_value="United States\nus\nExample ISP"),
+            patch("newtrackon.dnscache.resolve_ips", return_value=["93.184.216.34"]),
+            patch("newtrackon.geoip.ip_api_client.locate", side_effect=locate_in_us),
             patch("newtrackon.scraper.announce_udp", return_value=(mock_response, "93.184.216.34")),
         ):
             sample_tracker.update_status()
@@ -159,7 +178,9 @@ class TestTrackerUpdateCycle:
 
         # Insert tracker into DB
         shared_memory_db.execute(
-            "INSERT INTO status VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)",
+            "INSERT INTO status (host, url, ip, latency, last_checked, interval, status, uptime, country,"
+            " country_code, network, added, historic, last_downtime, last_uptime, recent_ip)"
+            " VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)",
             (
                 sample_tracker.host,
                 sample_tracker.url,
@@ -185,8 +206,8 @@ class TestTrackerUpdateCycle:
 
         with (
             patch("newtrackon.scraper.get_bep_34", return_value=(False, None)),
-            patch("socket.getaddrinfo", return_value=[(2, 1, 6, "", ("93.184.216.34", 6969))]),
-            patch("newtrackon.tracker.Tracker.ip_api", return_value="United States\nus\nExample ISP"),
+            patch("newtrackon.dnscache.resolve_ips", return_value=["93.184.216.34"]),
+            patch("newtrackon.geoip.ip_api_client.locate", side_effect=locate_in_us),
             patch("newtrackon.scraper.announce_udp", return_value=(mock_response, "93.184.216.34")),
         ):
             sample_tracker.update_status()
@@ -213,7 +234,9 @@ class TestTrackerGoesDown:
 
         # Insert tracker into DB
         shared_memory_db.execute(
-            "INSERT INTO status VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)",
+            "INSERT INTO status (host, url, ip, latency, last_checked, interval, status, uptime, country,"
+            " country_code, network, added, historic, last_downtime, last_uptime, recent_ip)"
+            " VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)",
             (
                 sample_tracker.host,
                 sample_tracker.url,
@@ -238,8 +261,8 @@ class TestTrackerGoesDown:
         # Mock scraper to raise RuntimeError (simulating connection failure)
         with (
             patch("newtrackon.scraper.get_bep_34", return_value=(False, None)),
-            patch("socket.getaddrinfo", return_value=[(2, 1, 6, "", ("93.184.216.34", 6969))]),
-            patch("newtrackon.tracker.Tracker.ip_api", return_value="United States\nus\nExample ISP"),
+            patch("newtrackon.dnscache.resolve_ips", return_value=["93.184.216.34"]),
+            patch("newtrackon.geoip.ip_api_client.locate", side_effect=locate_in_us),
             patch("newtrackon.scraper.announce_udp", side_effect=RuntimeError("UDP timeout")),
         ):
             sample_tracker.update_status()
@@ -265,7 +288,9 @@ class TestTrackerGoesDown:
 
         # Insert tracker into DB
         shared_memory_db.execute(
-            "INSERT INTO status VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)",
+            "INSERT INTO status (host, url, ip, latency, last_checked, interval, status, uptime, country,"
+            " country_code, network, added, historic, last_downtime, last_uptime, recent_ip)"
+            " VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)",
             (
                 sample_tracker.host,
                 sample_tracker.url,
@@ -289,8 +314,8 @@ class TestTrackerGoesDown:
 
         with (
             patch("newtrackon.scraper.get_bep_34", return_value=(False, None)),
-            patch("socket.getaddrinfo", return_value=[(2, 1, 6, "", ("93.184.216.34", 6969))]),
-            patch("newtrackon.tracker.Tracker.ip_api", return_value="United States\nus\nExample ISP"),
+            patch("newtrackon.dnscache.resolve_ips", return_value=["93.184.216.34"]),
+            patch("newtrackon.geoip.ip_api_client.locate", side_effect=locate_in_us),
             patch("newtrackon.scraper.announce_udp", side_effect=RuntimeError("Connection refused")),
         ):
             sample_tracker.update_status()
@@ -333,8 +358,8 @@ class TestTrackerGoesDown:
 
         with (
             patch("newtrackon.scraper.get_bep_34", return_value=(False, None)),
-            patch("socket.getaddrinfo", return_value=[(2, 1, 6, "", ("93.184.216.34", 80))]),
-            patch("newtrackon.tracker.Tracker.ip_api", return_value="United States\nus\nExample ISP"),
+            patch("newtrackon.dnscache.resolve_ips", return_value=["93.184.216.34"]),
+            patch("newtrackon.geoip.ip_api_client.locate", side_effect=locate_in_us),
             patch("newtrackon.scraper.announce_http", side_effect=RuntimeError("HTTP timeout")),
         ):
             tracker.update_status()
@@ -449,7 +474,6 @@ class TestNewTrackerSubmissionFlow:
             patch.object(Tracker, "from_url", return_value=mock_tracker),
             patch("newtrackon.ingest.attempt_submitted", return_value=mock_attempt_result),
             patch("newtrackon.ingest.save_deque_to_disk"),
-            patch.object(mock_tracker, "update_ipapi_data"),
         ):
             # Step 1: Add to submission queue
             ingest.add_one_tracker_to_submitted_queue(test_url)
@@ -481,7 +505,9 @@ class TestDuplicateIPRejection:
 
         # Insert an existing tracker with known IP
         shared_memory_db.execute(
-            "INSERT INTO status VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)",
+            "INSERT INTO status (host, url, ip, latency, last_checked, interval, status, uptime, country,"
+            " country_code, network, added, historic, last_downtime, last_uptime, recent_ip)"
+            " VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)",
             (
                 sample_tracker_data["host"],
                 sample_tracker_data["url"],
@@ -524,7 +550,9 @@ class TestDuplicateIPRejection:
 
         # Insert existing tracker with multiple IPs
         shared_memory_db.execute(
-            "INSERT INTO status VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)",
+            "INSERT INTO status (host, url, ip, latency, last_checked, interval, status, uptime, country,"
+            " country_code, network, added, historic, last_downtime, last_uptime, recent_ip)"
+            " VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)",
             (
                 sample_tracker_data["host"],
                 sample_tracker_data["url"],
@@ -567,7 +595,9 @@ class TestDuplicateIPRejection:
 
         # Insert existing tracker with known IP
         shared_memory_db.execute(
-            "INSERT INTO status VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)",
+            "INSERT INTO status (host, url, ip, latency, last_checked, interval, status, uptime, country,"
+            " country_code, network, added, historic, last_downtime, last_uptime, recent_ip)"
+            " VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)",
             (
                 sample_tracker_data["host"],
                 sample_tracker_data["url"],
@@ -647,7 +677,6 @@ class TestIntervalValidation:
         with (
             patch("newtrackon.ingest.attempt_submitted", return_value=mock_attempt_result),
             patch("newtrackon.ingest.save_deque_to_disk"),
-            patch.object(mock_tracker, "update_ipapi_data"),
         ):
             ingest.process_submitted_queue()
 
@@ -695,7 +724,6 @@ class TestIntervalValidation:
         with (
             patch("newtrackon.ingest.attempt_submitted", return_value=mock_attempt_result),
             patch("newtrackon.ingest.save_deque_to_disk"),
-            patch.object(mock_tracker, "update_ipapi_data"),
         ):
             ingest.process_submitted_queue()
 
@@ -739,7 +767,6 @@ class TestIntervalValidation:
         with (
             patch("newtrackon.ingest.attempt_submitted", return_value=mock_attempt_result),
             patch("newtrackon.ingest.save_deque_to_disk"),
-            patch.object(mock_tracker, "update_ipapi_data"),
         ):
             ingest.process_submitted_queue()
 
@@ -788,7 +815,6 @@ class TestIntervalValidation:
         with (
             patch("newtrackon.ingest.attempt_submitted", return_value=mock_attempt_result),
             patch("newtrackon.ingest.save_deque_to_disk"),
-            patch.object(mock_tracker, "update_ipapi_data"),
         ):
             ingest.process_submitted_queue()
 
@@ -832,7 +858,6 @@ class TestIntervalValidation:
         with (
             patch("newtrackon.ingest.attempt_submitted", return_value=mock_attempt_result),
             patch("newtrackon.ingest.save_deque_to_disk"),
-            patch.object(mock_tracker, "update_ipapi_data"),
         ):
             ingest.process_submitted_queue()
 
@@ -877,7 +902,6 @@ class TestIntervalValidation:
         with (
             patch("newtrackon.ingest.attempt_submitted", return_value=mock_attempt_result),
             patch("newtrackon.ingest.save_deque_to_disk"),
-            patch.object(mock_tracker, "update_ipapi_data"),
             patch("newtrackon.ingest.log_wrong_interval_denial"),  # Mock to avoid buffer pop error
         ):
             ingest.process_submitted_queue()
@@ -921,7 +945,7 @@ class TestTrackerDeletionWorkflow:
 
         with (
             patch("newtrackon.scraper.get_bep_34", return_value=(False, None)),
-            patch("socket.getaddrinfo", return_value=[(2, 1, 6, "", ("93.184.216.34", 6969))]),
+            patch("newtrackon.dnscache.resolve_ips", return_value=["93.184.216.34"]),
         ):
             tracker.update_status()
 
@@ -941,7 +965,7 @@ class TestTrackerIPResolutionFailure:
 
         with (
             patch("newtrackon.scraper.get_bep_34", return_value=(False, None)),
-            patch("socket.getaddrinfo", side_effect=OSError("DNS resolution failed")),
+            patch("newtrackon.dnscache.resolve_ips", return_value=[]),
         ):
             sample_tracker.update_status()
 
@@ -980,8 +1004,8 @@ class TestBEP34Integration:
 
         with (
             patch("newtrackon.scraper.get_bep_34", return_value=(True, bep34_prefs)),
-            patch("socket.getaddrinfo", return_value=[(2, 1, 6, "", ("93.184.216.34", 1337))]),
-            patch("newtrackon.tracker.Tracker.ip_api", return_value="United States\nus\nExample ISP"),
+            patch("newtrackon.dnscache.resolve_ips", return_value=["93.184.216.34"]),
+            patch("newtrackon.geoip.ip_api_client.locate", side_effect=locate_in_us),
             patch("newtrackon.scraper.announce_udp", return_value=(mock_response, "93.184.216.34")),
         ):
             sample_tracker.update_status()
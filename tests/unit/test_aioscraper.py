@@ -0,0 +1,254 @@
+"""Tests for the asyncio probing engine in newtrackon.aioscraper.
+
+Probes run against local stand-in trackers bound to 127.0.0.1, so no external network access is needed.
+"""
+
+import asyncio
+import gzip
+import socket
+import struct
+from collections.abc import Awaitable, Callable
+from time import time
+from typing import Any, cast
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from dns.exception import DNSException
+from dns.resolver import NXDOMAIN
+from tornado.httpserver import HTTPServer
+from tornado.testing import bind_unused_port
+from tornado.web import Application, RequestHandler
+
+from newtrackon import aioscraper
+
+
+class UDPTrackerStandIn(asyncio.DatagramProtocol):
+    """Minimal BEP 15 tracker answering connect and announce requests."""
+
+    def __init__(self, interval: int = 1800) -> None:
+        self.transport: asyncio.DatagramTransport | None = None
+        self.interval = interval
+
+    def connection_made(self, transport: asyncio.BaseTransport) -> None:
+        self.transport = cast(asyncio.DatagramTransport, transport)
+
+    def datagram_received(self, data: bytes, addr: tuple[str | int, int]) -> None:
+        assert self.transport is not None
+        action, transaction_id = struct.unpack_from("!iI", data, 8)
+        if action == 0:
+            self.transport.sendto(struct.pack("!iIq", 0, transaction_id, 0x1234), addr)
+        else:
+            peer = bytes([1, 2, 3, 4]) + struct.pack("!H", 6881)
+            self.transport.sendto(struct.pack("!iIiii", 1, transaction_id, self.interval, 5, 10) + peer, addr)
+
+
+def run_with_udp_tracker(probe: Callable[[int], Awaitable[Any]]) -> Any:
+    async def scenario() -> Any:
+        loop = asyncio.get_running_loop()
+        transport, _ = await loop.create_datagram_endpoint(UDPTrackerStandIn, local_addr=("127.0.0.1", 0))
+        port = transport.get_extra_info("sockname")[1]
+        try:
+            return await probe(port)
+        finally:
+            transport.close()
+
+    return asyncio.run(scenario())
+
+
+class AnnounceHandler(RequestHandler):
+    body: bytes = b"d8:intervali1800e5:peers6:\x01\x02\x03\x04\x1a\xe1e"
+    status: int = 200
+    content_encoding: str = ""
+
+    def get(self, *args: str, **kwargs: str) -> None:
+        self.set_status(self.status)
+        if self.content_encoding:
+            self.set_header("Content-Encoding", self.content_encoding)
+        self.write(self.body)  # pyright: ignore[reportUnknownMemberType]
+
+
+def run_with_http_tracker(body: bytes, status: int = 200, content_encoding: str = "", host: str = "127.0.0.1") -> Any:
+    async def scenario() -> Any:
+        attributes = {"body": body, "status": status, "content_encoding": content_encoding}
+        handler = type("Handler", (AnnounceHandler,), attributes)
+        sock, port = bind_unused_port()
+        server = HTTPServer(Application([(r"/announce", handler)]))
+        server.add_sockets([sock])
+        try:
+            return await aioscraper.announce_http(f"http://{host}:{port}/announce")
+        finally:
+            server.stop()
+
+    return asyncio.run(scenario())
+
+
+class TestAnnounceUDPAsync:
+    """Tests for aioscraper.announce_udp."""
+
+    def test_announce_udp_success(self) -> None:
+        """A full connect + announce exchange returns the parsed response and the answering IP."""
+        with patch("newtrackon.aioscraper.resolve_ips", AsyncMock(return_value={"127.0.0.1"})):
+            response, ip = run_with_udp_tracker(lambda port: aioscraper.announce_udp(f"udp://localhost:{port}/announce"))
+
+        assert ip == "127.0.0.1"
+        assert response["interval"] == 1800
+        assert response["leechers"] == 5
+        assert response["seeds"] == 10
+        assert response["peers"] == [{"IP": "1.2.3.4", "port": 6881}]
+
+    def test_concurrent_announces_share_one_endpoint(self) -> None:
+        """Announces running together on a loop are demultiplexed over a single IPv4 endpoint."""
+
+        async def announce_many(port: int) -> list[Any]:
+            url = f"udp://localhost:{port}/announce"
+            results = await asyncio.gather(*(aioscraper.announce_udp(url) for _ in range(50)))
+            loop = asyncio.get_running_loop()
+            assert [family for endpoint_loop, family in aioscraper.udp_endpoints if endpoint_loop is loop] == [socket.AF_INET]
+            return results
+
+        with patch("newtrackon.aioscraper.resolve_ips", AsyncMock(return_value={"127.0.0.1"})):
+            results = run_with_udp_tracker(announce_many)
+
+        assert all(response["interval"] == 1800 for response, _ in results)
+
+    def test_dual_stack_addresses_are_raced(self) -> None:
+        """A silent IPv6 address doesn't hold up IPv4, and the losing task is cancelled."""
+        ipv6_cancelled = asyncio.Event()
+
+        async def announce_address(udp_url: str, ip: str, *args: Any) -> tuple[dict[str, Any], str]:
+            if ":" in ip:
+                try:
+                    await asyncio.sleep(5)
+                except asyncio.CancelledError:
+                    ipv6_cancelled.set()
+                    raise
+            return {"interval": 1800, "leechers": 0, "seeds": 0, "peers": []}, ip
+
+        async def scenario() -> tuple[Any, str | None]:
+            result = await aioscraper.announce_udp("udp://tracker.example.com:6969/announce")
+            await asyncio.wait_for(ipv6_cancelled.wait(), 1)
+            return result
+
+        with (
+            patch("newtrackon.aioscraper.resolve_ips", AsyncMock(return_value={"93.184.216.34", "2001:db8::1"})),
+            patch("newtrackon.aioscraper.announce_udp_address", side_effect=announce_address),
+            patch("newtrackon.aioscraper.HAPPY_EYEBALLS_DELAY", 0.01),
+        ):
+            response, ip = asyncio.run(scenario())
+
+        assert ip == "93.184.216.34"
+        assert response["interval"] == 1800
+
+    def test_announce_udp_unresolvable(self) -> None:
+        """A hostname without addresses fails before any datagram is sent."""
+        with (
+            patch("newtrackon.aioscraper.resolve_ips", AsyncMock(return_value=set())),
+            pytest.raises(RuntimeError, match="Can't resolve IP"),
+        ):
+            asyncio.run(aioscraper.announce_udp("udp://tracker.example.com:6969/announce"))
+
+    def test_announce_udp_timeout(self) -> None:
+        """A silent tracker is reported as a UDP timeout after both attempts."""
+
+        async def scenario() -> None:
+            loop = asyncio.get_running_loop()
+            transport, _ = await loop.create_datagram_endpoint(asyncio.DatagramProtocol, local_addr=("127.0.0.1", 0))
+            port = transport.get_extra_info("sockname")[1]
+            try:
+                await aioscraper.announce_udp(f"udp://localhost:{port}/announce")
+            finally:
+                transport.close()
+
+        with (
+            patch("newtrackon.aioscraper.resolve_ips", AsyncMock(return_value={"127.0.0.1"})),
+            patch("newtrackon.aioscraper.retransmission_timeouts", return_value=[0.02, 0.04]),
+            pytest.raises(RuntimeError, match="UDP timeout"),
+        ):
+            asyncio.run(scenario())
+
+
+class TestAnnounceHTTPAsync:
+    """Tests for aioscraper.announce_http."""
+
+    def test_announce_http_success(self) -> None:
+        """A valid bencoded response is decoded."""
+        response = run_with_http_tracker(b"d8:intervali1800e5:peers6:\x01\x02\x03\x04\x1a\xe1e")
+
+        assert response["interval"] == 1800
+        assert response["peers"] == [{"IP": "1.2.3.4", "port": 6881}]
+
+    def test_announce_http_failure_reason(self) -> None:
+        """A tracker failure reason is surfaced as RuntimeError."""
+        with pytest.raises(RuntimeError, match="Tracker error message: denied"):
+            run_with_http_tracker(b"d14:failure reason6:deniede")
+
+    def test_announce_http_status_code(self) -> None:
+        """Non-200 responses are rejected."""
+        with pytest.raises(RuntimeError, match="HTTP 404 status code returned"):
+            run_with_http_tracker(b"not found", status=404)
+
+    def test_announce_http_response_too_large(self) -> None:
+        """Bodies above MAX_RESPONSE_SIZE are aborted."""
+        with patch("newtrackon.scraper.MAX_RESPONSE_SIZE", 10), pytest.raises(RuntimeError, match="above 1 MB"):
+            run_with_http_tracker(b"d8:intervali1800e5:peers0:e")
+
+    def test_announce_http_gzip(self) -> None:
+        """gzip bodies are inflated by AnnounceReader, and gzip bombs aborted."""
+        response = run_with_http_tracker(gzip.compress(b"d8:intervali1800e5:peers0:e"), content_encoding="gzip")
+        assert response["interval"] == 1800
+
+        with pytest.raises(RuntimeError, match="decompression ratio above"):
+            run_with_http_tracker(gzip.compress(b"d5:peers900000:" + bytes(900000)), content_encoding="gzip")
+
+    def test_announce_http_connection_failed(self) -> None:
+        """A closed port is reported as a connection failure."""
+        sock, port = bind_unused_port()
+        sock.close()
+        with pytest.raises(RuntimeError, match="HTTP connection failed"):
+            asyncio.run(aioscraper.announce_http(f"http://127.0.0.1:{port}/announce"))
+
+
+class TestAsyncDNS:
+    """Tests for the dns.asyncresolver lookups, made through the DNS cache."""
+
+    @staticmethod
+    def answer(*records: str) -> MagicMock:
+        answer = MagicMock()
+        answer.__iter__.return_value = iter(records)  # pyright: ignore[reportAttributeAccessIssue]
+        answer.expiration = time() + 300
+        return answer
+
+    def test_get_bep_34_valid_record(self) -> None:
+        """A BITTORRENT TXT record is parsed into protocol preferences."""
+        answer = self.answer('"BITTORRENT UDP:6969 TCP:443"')
+        with patch("newtrackon.dnscache.asyncresolver.resolve", AsyncMock(return_value=answer)):
+            valid, prefs = asyncio.run(aioscraper.get_bep_34("tracker.example.com"))
+
+        assert valid is True
+        assert prefs == [("udp", 6969), ("tcp", 443)]
+
+    def test_get_bep_34_dns_error(self) -> None:
+        """DNS errors mean no valid BEP34 record."""
+        with patch("newtrackon.dnscache.asyncresolver.resolve", AsyncMock(side_effect=DNSException())):
+            assert asyncio.run(aioscraper.get_bep_34("tracker.example.com")) == (False, None)
+
+    def test_resolve_ips_merges_families(self) -> None:
+        """A and AAAA answers are merged, and a missing family is not an error."""
+
+        async def resolve(hostname: str, rdtype: str) -> MagicMock:
+            if rdtype == "AAAA":
+                raise NXDOMAIN()
+            return self.answer("93.184.216.34", "93.184.216.35")
+
+        with patch("newtrackon.dnscache.asyncresolver.resolve", side_effect=resolve):
+            ips = asyncio.run(aioscraper.resolve_ips("tracker.example.com"))
+
+        assert ips == {"93.184.216.34", "93.184.216.35"}
+
+    def test_http_connections_resolve_through_the_cache(self) -> None:
+        """tornado's HTTP client connects to the addresses in the DNS cache."""
+        with patch("newtrackon.dnscache.resolve_ips_async", AsyncMock(return_value=["127.0.0.1"])) as resolve_ips:
+            response = run_with_http_tracker(b"d8:intervali1800e5:peers0:e", host="tracker.example.com")
+
+        assert response["interval"] == 1800
+        resolve_ips.assert_awaited_once_with("tracker.example.com", socket.AF_UNSPEC)
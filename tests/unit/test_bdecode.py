@@ -8,297 +8,258 @@ Tests cover:
 - Binary peer list decoding (IPv4 and IPv6)
 - Realistic tracker responses
 - The bdecode() function's key conversion and peer processing
+- Iterative decoding with decode_value
+- Incremental decoding with StreamDecoder
 """
 
-from collections import OrderedDict
 from socket import AF_INET, AF_INET6
 
 import pytest
 
-from newtrackon.bdecode import Decoder, bdecode, decode_binary_peers_list
+from newtrackon.bdecode import (
+    ANNOUNCE_FIELDS,
+    PeerList,
+    StreamDecoder,
+    bdecode,
+    decode_binary_peers_list,
+    decode_response,
+    decode_value,
+    peer_stats,
+)
 
 
-class TestDecoderStrings:
+class TestDecodeStrings:
     """Tests for string/bytes decoding."""
 
     def test_decode_simple_string(self):
         """Decode a simple bencoded string."""
-        decoder = Decoder(b"5:hello")
-        result = decoder.decode()
+        result = decode_value(b"5:hello")
         assert result == b"hello"
 
     def test_decode_empty_string(self):
         """Decode an empty bencoded string."""
-        decoder = Decoder(b"0:")
-        result = decoder.decode()
+        result = decode_value(b"0:")
         assert result == b""
 
     def test_decode_single_char_string(self):
         """Decode a single character string."""
-        decoder = Decoder(b"1:x")
-        result = decoder.decode()
+        result = decode_value(b"1:x")
         assert result == b"x"
 
     def test_decode_string_with_spaces(self):
         """Decode a string containing spaces."""
-        decoder = Decoder(b"11:hello world")
-        result = decoder.decode()
+        result = decode_value(b"11:hello world")
         assert result == b"hello world"
 
     def test_decode_string_with_special_chars(self):
         """Decode a string with special characters."""
-        decoder = Decoder(b"5:a:b:c")
-        result = decoder.decode()
+        result = decode_value(b"5:a:b:c")
         assert result == b"a:b:c"
 
     def test_decode_binary_string(self):
         """Decode a string containing binary data."""
-        decoder = Decoder(b"4:\x00\x01\x02\x03")
-        result = decoder.decode()
+        result = decode_value(b"4:\x00\x01\x02\x03")
         assert result == b"\x00\x01\x02\x03"
 
     def test_decode_string_with_unicode_bytes(self):
         """Decode a string containing UTF-8 encoded unicode."""
         utf8_bytes = "hello\u00e9".encode()
         bencoded = str(len(utf8_bytes)).encode() + b":" + utf8_bytes
-        decoder = Decoder(bencoded)
-        result = decoder.decode()
+        result = decode_value(bencoded)
         assert result == utf8_bytes
 
     def test_decode_long_string(self):
         """Decode a longer string."""
         long_str = b"a" * 1000
         bencoded = b"1000:" + long_str
-        decoder = Decoder(bencoded)
-        result = decoder.decode()
+        result = decode_value(bencoded)
         assert result == long_str
         assert isinstance(result, bytes)
         assert len(result) == 1000
 
 
-class TestDecoderIntegers:
+class TestDecodeIntegers:
     """Tests for integer decoding."""
 
     def test_decode_positive_integer(self):
         """Decode a positive integer."""
-        decoder = Decoder(b"i42e")
-        result = decoder.decode()
+        result = decode_value(b"i42e")
         assert result == 42
 
     def test_decode_zero(self):
         """Decode zero."""
-        decoder = Decoder(b"i0e")
-        result = decoder.decode()
+        result = decode_value(b"i0e")
         assert result == 0
 
     def test_decode_negative_integer(self):
         """Decode a negative integer."""
-        decoder = Decoder(b"i-42e")
-        result = decoder.decode()
+        result = decode_value(b"i-42e")
         assert result == -42
 
     def test_decode_large_positive_integer(self):
         """Decode a large positive integer."""
-        decoder = Decoder(b"i9999999999e")
-        result = decoder.decode()
+        result = decode_value(b"i9999999999e")
         assert result == 9999999999
 
     def test_decode_large_negative_integer(self):
         """Decode a large negative integer."""
-        decoder = Decoder(b"i-9999999999e")
-        result = decoder.decode()
+        result = decode_value(b"i-9999999999e")
         assert result == -9999999999
 
     def test_decode_single_digit(self):
         """Decode single digit integers."""
         for i in range(10):
-            decoder = Decoder(f"i{i}e".encode())
-            result = decoder.decode()
+            result = decode_value(f"i{i}e".encode())
             assert result == i
 
 
-class TestDecoderLists:
+class TestDecodeLists:
     """Tests for list decoding."""
 
     def test_decode_empty_list(self):
         """Decode an empty list."""
-        decoder = Decoder(b"le")
-        result = decoder.decode()
+        result = decode_value(b"le")
         assert result == []
 
     def test_decode_list_of_integers(self):
         """Decode a list of integers."""
-        decoder = Decoder(b"li1ei2ei3ee")
-        result = decoder.decode()
+        result = decode_value(b"li1ei2ei3ee")
         assert result == [1, 2, 3]
 
     def test_decode_list_of_strings(self):
         """Decode a list of strings."""
-        decoder = Decoder(b"l5:hello5:worlde")
-        result = decoder.decode()
+        result = decode_value(b"l5:hello5:worlde")
         assert result == [b"hello", b"world"]
 
     def test_decode_mixed_list(self):
         """Decode a list with mixed types."""
-        decoder = Decoder(b"li42e5:helloe")
-        result = decoder.decode()
+        result = decode_value(b"li42e5:helloe")
         assert result == [42, b"hello"]
 
     def test_decode_nested_list(self):
         """Decode a nested list."""
-        decoder = Decoder(b"lli1ei2eeli3ei4eee")
-        result = decoder.decode()
+        result = decode_value(b"lli1ei2eeli3ei4eee")
         assert result == [[1, 2], [3, 4]]
 
     def test_decode_deeply_nested_list(self):
-        """Decode a deeply nested list.
-
-        Note: The decoder's peek() implementation has an off-by-one behavior
-        that causes issues with very deeply nested empty structures. This test
-        uses a structure with content to verify nesting works.
-        """
-        # Use nested lists with actual values to avoid peek() edge case
-        decoder = Decoder(b"llli1eeee")
-        result = decoder.decode()
+        """Decode a deeply nested list."""
+        result = decode_value(b"llli1eeee")
         assert result == [[[1]]]
+        assert decode_value(b"lllleeee") == [[[[]]]]
 
     def test_decode_list_with_single_element(self):
         """Decode a list with a single element."""
-        decoder = Decoder(b"li42ee")
-        result = decoder.decode()
+        result = decode_value(b"li42ee")
         assert result == [42]
 
 
-class TestDecoderDicts:
+class TestDecodeDicts:
     """Tests for dictionary decoding."""
 
     def test_decode_empty_dict(self):
         """Decode an empty dictionary."""
-        decoder = Decoder(b"de")
-        result = decoder.decode()
-        assert result == OrderedDict()
-        assert isinstance(result, OrderedDict)
+        result = decode_value(b"de")
+        assert result == {}
+        assert isinstance(result, dict)
 
     def test_decode_simple_dict(self):
         """Decode a simple dictionary."""
-        decoder = Decoder(b"d3:fooi42ee")
-        result = decoder.decode()
-        assert result == OrderedDict([(b"foo", 42)])
+        result = decode_value(b"d3:fooi42ee")
+        assert result == {b"foo": 42}
 
     def test_decode_dict_with_string_value(self):
         """Decode a dictionary with string value."""
-        decoder = Decoder(b"d3:key5:valuee")
-        result = decoder.decode()
-        assert result == OrderedDict([(b"key", b"value")])
+        result = decode_value(b"d3:key5:valuee")
+        assert result == {b"key": b"value"}
 
     def test_decode_dict_multiple_keys(self):
         """Decode a dictionary with multiple keys."""
-        decoder = Decoder(b"d1:ai1e1:bi2e1:ci3ee")
-        result = decoder.decode()
-        assert result == OrderedDict([(b"a", 1), (b"b", 2), (b"c", 3)])
+        result = decode_value(b"d1:ai1e1:bi2e1:ci3ee")
+        assert result == {b"a": 1, b"b": 2, b"c": 3}
 
     def test_decode_dict_preserves_order(self):
         """Verify dictionary key order is preserved."""
-        decoder = Decoder(b"d1:zi1e1:ai2e1:mi3ee")
-        result = decoder.decode()
-        assert isinstance(result, OrderedDict)
+        result = decode_value(b"d1:zi1e1:ai2e1:mi3ee")
+        assert isinstance(result, dict)
         assert list(result.keys()) == [b"z", b"a", b"m"]
 
     def test_decode_nested_dict(self):
         """Decode a nested dictionary."""
-        decoder = Decoder(b"d5:innerd3:fooi42eee")
-        result = decoder.decode()
-        assert result == OrderedDict([(b"inner", OrderedDict([(b"foo", 42)]))])
+        result = decode_value(b"d5:innerd3:fooi42eee")
+        assert result == {b"inner": {b"foo": 42}}
 
     def test_decode_dict_with_list_value(self):
         """Decode a dictionary containing a list."""
-        decoder = Decoder(b"d4:listli1ei2ei3eee")
-        result = decoder.decode()
-        assert result == OrderedDict([(b"list", [1, 2, 3])])
+        result = decode_value(b"d4:listli1ei2ei3eee")
+        assert result == {b"list": [1, 2, 3]}
 
 
-class TestDecoderNestedStructures:
+class TestDecodeNestedStructures:
     """Tests for complex nested structures."""
 
     def test_decode_dict_in_list(self):
         """Decode a list containing dictionaries."""
-        decoder = Decoder(b"ld3:fooi1eed3:bari2eee")
-        result = decoder.decode()
+        result = decode_value(b"ld3:fooi1eed3:bari2eee")
         assert result == [
-            OrderedDict([(b"foo", 1)]),
-            OrderedDict([(b"bar", 2)]),
+            {b"foo": 1},
+            {b"bar": 2},
         ]
 
     def test_decode_complex_structure(self):
         """Decode a complex nested structure."""
         # {"data": {"items": [1, 2, 3], "name": "test"}, "count": 3}
         bencoded = b"d5:counti3e4:datad5:itemsli1ei2ei3ee4:name4:testeee"
-        decoder = Decoder(bencoded)
-        result = decoder.decode()
-        assert isinstance(result, OrderedDict)
+        result = decode_value(bencoded)
+        assert isinstance(result, dict)
         assert result[b"count"] == 3
         inner = result[b"data"]
-        assert isinstance(inner, OrderedDict)
+        assert isinstance(inner, dict)
         assert inner[b"items"] == [1, 2, 3]
         assert inner[b"name"] == b"test"
 
     def test_decode_list_of_lists_of_dicts(self):
         """Decode deeply nested mixed structures."""
-        decoder = Decoder(b"lld1:ai1eeee")
-        result = decoder.decode()
-        assert result == [[OrderedDict([(b"a", 1)])]]
+        result = decode_value(b"lld1:ai1eeee")
+        assert result == [[{b"a": 1}]]
 
 
-class TestDecoderErrors:
-    """Tests for error handling in Decoder."""
+class TestDecodeErrors:
+    """Tests for error handling in decode_value."""
 
     def test_empty_data_raises_eof_error(self):
         """Empty data should raise EOFError."""
-        decoder = Decoder(b"")
         with pytest.raises(EOFError):
-            decoder.decode()
+            decode_value(b"")
 
     def test_invalid_token_raises_runtime_error(self):
         """Invalid starting token should raise RuntimeError."""
-        decoder = Decoder(b"x123")
         with pytest.raises(RuntimeError, match="Could not bdecode data"):
-            decoder.decode()
+            decode_value(b"x123")
 
     def test_truncated_string_raises_runtime_error(self):
         """Truncated string should raise RuntimeError."""
-        decoder = Decoder(b"10:hello")  # Says 10 chars but only 5
         with pytest.raises(RuntimeError):
-            decoder.decode()
+            decode_value(b"10:hello")  # Says 10 chars but only 5
 
     def test_truncated_integer_raises_runtime_error(self):
         """Integer without end marker should raise RuntimeError."""
-        decoder = Decoder(b"i42")
         with pytest.raises(RuntimeError):
-            decoder.decode()
+            decode_value(b"i42")
 
-    def test_truncated_list_raises_eof_error(self):
-        """List without end marker should raise EOFError.
+    def test_truncated_list_raises_runtime_error(self):
+        """List without end marker should raise RuntimeError."""
+        with pytest.raises(RuntimeError, match="Truncated"):
+            decode_value(b"li1ei2e")
 
-        The decoder raises EOFError when it cannot read more data.
-        """
-        decoder = Decoder(b"li1ei2e")
-        with pytest.raises(EOFError):
-            decoder.decode()
-
-    def test_truncated_dict_raises_eof_error(self):
-        """Dict without end marker should raise EOFError.
-
-        The decoder raises EOFError when it cannot read more data.
-        """
-        decoder = Decoder(b"d3:fooi42e")
-        with pytest.raises(EOFError):
-            decoder.decode()
+    def test_truncated_dict_raises_runtime_error(self):
+        """Dict without end marker should raise RuntimeError."""
+        with pytest.raises(RuntimeError, match="Truncated"):
+            decode_value(b"d3:fooi42e")
 
     def test_string_without_length_separator(self):
         """String without colon should raise error."""
-        decoder = Decoder(b"5hello")
         with pytest.raises(RuntimeError):
-            decoder.decode()
+            decode_value(b"5hello")
 
 
 class TestDecodeBinaryPeersList:
@@ -439,7 +400,7 @@ class TestBdecodeFunction:
         result = bdecode(data)
         assert "peers" in result
         peers = result["peers"]
-        assert isinstance(peers, list)
+        assert isinstance(peers, PeerList)
         assert len(peers) == 1
         peer = peers[0]
         assert isinstance(peer, dict)
@@ -454,7 +415,7 @@ class TestBdecodeFunction:
         result = bdecode(data)
         assert "peers6" in result
         peers6 = result["peers6"]
-        assert isinstance(peers6, list)
+        assert isinstance(peers6, PeerList)
         assert len(peers6) == 1
         peer6 = peers6[0]
         assert isinstance(peer6, dict)
@@ -522,7 +483,7 @@ class TestRealisticTrackerResponses:
         assert result["incomplete"] == 5
         assert result["interval"] == 1800
         peers = result["peers"]
-        assert isinstance(peers, list)
+        assert isinstance(peers, PeerList)
         assert len(peers) == 2
         peer0 = peers[0]
         assert isinstance(peer0, dict)
@@ -551,13 +512,13 @@ class TestRealisticTrackerResponses:
         )
         result = bdecode(data)
         peers = result["peers"]
-        assert isinstance(peers, list)
+        assert isinstance(peers, PeerList)
         assert len(peers) == 1
         peer = peers[0]
         assert isinstance(peer, dict)
         assert peer["IP"] == "1.2.3.4"  # pyright: ignore[reportArgumentType]
         peers6 = result["peers6"]
-        assert isinstance(peers6, list)
+        assert isinstance(peers6, PeerList)
         assert len(peers6) == 1
         peer6 = peers6[0]
         assert isinstance(peer6, dict)
@@ -565,7 +526,6 @@ class TestRealisticTrackerResponses:
 
     def test_tracker_failure_response(self):
         """Decode a tracker failure response."""
-        # The decoder needs additional data after the last value due to peek() behavior
         # "tracker is offline" is 18 characters
         data = b"d14:failure reason18:tracker is offline8:intervali0ee"
         result = bdecode(data)
@@ -611,7 +571,7 @@ class TestRealisticTrackerResponses:
         assert result["min interval"] == 900
         assert result["external ip"] == "10.0.0.1"
         peers = result["peers"]
-        assert isinstance(peers, list)
+        assert isinstance(peers, PeerList)
         assert len(peers) == 1
         peer = peers[0]
         assert isinstance(peer, dict)
@@ -623,44 +583,35 @@ class TestEdgeCases:
 
     def test_decode_zero_length_string_in_dict(self):
         """Decode a dictionary with empty string value."""
-        decoder = Decoder(b"d3:key0:e")
-        result = decoder.decode()
-        assert isinstance(result, OrderedDict)
+        result = decode_value(b"d3:key0:e")
+        assert isinstance(result, dict)
         assert result[b"key"] == b""
 
     def test_decode_dict_with_integer_zero(self):
         """Decode a dictionary with zero value."""
-        decoder = Decoder(b"d3:numi0ee")
-        result = decoder.decode()
-        assert isinstance(result, OrderedDict)
+        result = decode_value(b"d3:numi0ee")
+        assert isinstance(result, dict)
         assert result[b"num"] == 0
 
     def test_decode_nested_empty_containers(self):
-        """Decode dict with empty list and empty dict values.
-
-        Note: The peek() implementation requires at least 2 bytes remaining,
-        so we add padding fields to avoid edge cases.
-        """
+        """Decode dict with empty list and empty dict values."""
         # Build a dict with empty containers
         # Structure: { 'empty': {}, 'list': [], 'end': 0 }
         # Bencoded: d + 5:empty + de + 4:list + le + 3:end + i0e + e
-        decoder = Decoder(b"d5:emptyde4:listle3:endi0ee")
-        result = decoder.decode()
-        assert isinstance(result, OrderedDict)
-        assert result[b"empty"] == OrderedDict()
+        result = decode_value(b"d5:emptyde4:listle3:endi0ee")
+        assert isinstance(result, dict)
+        assert result[b"empty"] == {}
         assert result[b"list"] == []
         assert result[b"end"] == 0
 
     def test_decode_string_starting_with_digit(self):
         """Decode a string that starts with a digit."""
-        decoder = Decoder(b"5:12345")
-        result = decoder.decode()
+        result = decode_value(b"5:12345")
         assert result == b"12345"
 
     def test_decode_string_with_bencoding_chars(self):
         """Decode a string containing bencode special characters."""
-        decoder = Decoder(b"6:d:i:l:")
-        result = decoder.decode()
+        result = decode_value(b"6:d:i:l:")
         assert result == b"d:i:l:"
 
     def test_bdecode_empty_peers_list(self):
@@ -694,55 +645,236 @@ class TestEdgeCases:
         assert len(result["files"]) == 2
 
 
-class TestDecoderInternals:
-    """Tests for internal Decoder methods."""
-
-    def test_peek_returns_none_at_end(self):
-        """peek() returns None when at end of data.
-
-        Note: peek() implementation uses `index + 1 >= len(data)` which means
-        it returns None when only 1 byte remains. This is intentional behavior.
-        """
-        decoder = Decoder(b"xy")
-        assert decoder.peek() == b"x"
-        decoder.index = 1
-        # With index=1 and len=2, condition `1+1 >= 2` is True, so peek returns None
-        assert decoder.peek() is None
-
-    def test_read_advances_index(self):
-        """read() advances the internal index."""
-        decoder = Decoder(b"hello")
-        assert decoder.read(2) == b"he"
-        assert decoder.index == 2
-        assert decoder.read(3) == b"llo"
-        assert decoder.index == 5
-
-    def test_read_past_end_raises_error(self):
-        """read() raises RuntimeError when reading past end."""
-        decoder = Decoder(b"hi")
-        with pytest.raises(RuntimeError):
-            decoder.read(5)
+class TestPeerList:
+    """Tests for the lazily decoded compact peers of PeerList."""
 
-    def test_read_until_finds_token(self):
-        """read_until() correctly finds and stops at token."""
-        decoder = Decoder(b"hello:world")
-        result = decoder.read_until(b":")
-        assert result == b"hello"
-        assert decoder.index == 6  # Just past the colon
+    BUF = b"\x00\x00\xc0\xa8\x01\x01\x1a\xe1\x0a\x00\x00\x01\x1f\x90\x01\x02"  # 2 peers after 2 bytes, then a truncated one
 
-    def test_read_until_token_not_found(self):
-        """read_until() raises RuntimeError when token not found."""
-        decoder = Decoder(b"hello world")
-        with pytest.raises(RuntimeError):
-            decoder.read_until(b":")
-
-    def test_decode_returns_none_for_end_token(self):
-        """decode() returns None when encountering TOK_END at the top level.
-
-        This tests line 91 in bdecode.py where an 'e' character at the start
-        of parsing returns None. This is normally used internally during
-        dict/list parsing to signal the end of a container.
-        """
-        decoder = Decoder(b"exx")  # 'e' followed by padding for peek()
-        result = decoder.decode()
-        assert result is None
+    def test_view_into_the_response(self):
+        """Peers aren't copied out of the buffer, and a truncated last one isn't counted."""
+        peers = PeerList(self.BUF, 2, AF_INET)
+        assert len(peers) == 2
+        assert peers.view.obj is self.BUF
+        assert repr(peers) == "<2 IPv4 peers>"
+
+    def test_indexing_decodes_single_peers(self):
+        """Positive, negative and slice indexes decode the peers they select, past the end raises IndexError."""
+        peers = PeerList(self.BUF, 2, AF_INET)
+        assert peers[0] == {"IP": "192.168.1.1", "port": 6881}
+        assert peers[-1] == {"IP": "10.0.0.1", "port": 8080}
+        assert peers[1:] == [{"IP": "10.0.0.1", "port": 8080}]
+        with pytest.raises(IndexError):
+            peers[2]
+
+    def test_equality_with_lists(self):
+        """A PeerList equals the list of its decoded peers, from either side."""
+        peers = PeerList(self.BUF, 2, AF_INET)
+        assert peers == decode_binary_peers_list(self.BUF, 2, AF_INET)
+        assert [{"IP": "192.168.1.1", "port": 6881}, {"IP": "10.0.0.1", "port": 8080}] == peers
+        assert peers != PeerList(self.BUF, 8, AF_INET)
+        assert PeerList(b"", 0, AF_INET6) == []
+
+    def test_columns(self):
+        """Addresses are packed back to back in network order, ports decoded to ints."""
+        columns = PeerList(self.BUF, 2, AF_INET).columns()
+        assert columns.addresses == b"\xc0\xa8\x01\x01\x0a\x00\x00\x01"
+        assert list(columns.ports) == [6881, 8080]
+        assert columns.address_length == 4
+
+    def test_stats(self):
+        """Peers are counted per /24 for IPv4 and per /48 for IPv6, and ports tallied."""
+        ipv4 = bytes([10, 0, 0, 1, 0x1A, 0xE1, 10, 0, 0, 9, 0x1A, 0xE1, 10, 0, 1, 1, 0x1F, 0x90])
+        stats = peer_stats(PeerList(ipv4, 0, AF_INET).columns())
+        assert (stats.peers, stats.prefixes, stats.ports) == (3, 2, {6881: 2, 8080: 1})
+
+        prefix = b"\x20\x01\x0d\xb8\x00\x01"
+        ipv6 = prefix + bytes(9) + b"\x01\x1a\xe1" + prefix + bytes(9) + b"\x02\x1a\xe1" + bytes(15) + b"\x01\x00\x01"
+        peers6 = PeerList(ipv6, 0, AF_INET6)
+        assert [peer["IP"] for peer in peers6] == ["2001:db8:1::1", "2001:db8:1::2", "::1"]
+        stats = peer_stats(peers6.columns())
+        assert (stats.peers, stats.prefixes, stats.ports) == (3, 2, {6881: 2, 1: 1})
+
+        assert peer_stats(PeerList(b"", 0, AF_INET).columns()) == (0, 0, {})
+
+
+class TestDecodeValue:
+    """Tests for iterative decoding with decode_value."""
+
+    RESPONSE = (
+        b"d8:completei5e10:incompletei-3e8:intervali1800e"
+        b"5:peersld2:ip7:1.2.3.44:porti6881eed2:ip7:5.6.7.84:porti6882eee"
+        b"7:x-emptyde6:x-listlli1eeee"
+    )
+
+    def test_decodes_into_plain_dicts(self):
+        """Nested containers, negative ints and empty dicts decode into plain dicts, in the order of their keys."""
+        result = decode_value(self.RESPONSE)
+        assert result == {
+            b"complete": 5,
+            b"incomplete": -3,
+            b"interval": 1800,
+            b"peers": [{b"ip": b"1.2.3.4", b"port": 6881}, {b"ip": b"5.6.7.8", b"port": 6882}],
+            b"x-empty": {},
+            b"x-list": [[1]],
+        }
+        assert type(result) is dict
+        assert list(result) == [b"complete", b"incomplete", b"interval", b"peers", b"x-empty", b"x-list"]
+
+    def test_scalars_at_the_top_level(self):
+        """Strings and ints decode on their own, and anything after the first value is ignored."""
+        assert decode_value(b"5:hello") == b"hello"
+        assert decode_value(b"0:") == b""
+        assert decode_value(b"i-42e") == -42
+        assert decode_value(b"i1etrailing") == 1
+
+    def test_memoryview_and_bytearray_input(self):
+        """Views into a larger buffer decode without copying it first."""
+        buf = bytearray(b"xx" + self.RESPONSE)
+        assert decode_value(memoryview(buf)[2:]) == decode_value(self.RESPONSE)
+        assert decode_value(buf[2:]) == decode_value(self.RESPONSE)
+
+    def test_deep_nesting_doesnt_recurse(self):
+        """Nesting past the recursion limit decodes, bounded by the explicit stack only."""
+        depth = 100_000
+        result = decode_value(b"l" * depth + b"e" * depth)
+        for _ in range(depth - 1):
+            assert isinstance(result, list)
+            result = result[0]
+        assert result == []
+
+    def test_truncated_data(self):
+        """Data ending inside a value raises RuntimeError, empty data EOFError."""
+        with pytest.raises(EOFError):
+            decode_value(b"")
+        for data in (b"d", b"d3:foo", b"li1e", b"i12", b"5:abc", b"12"):
+            with pytest.raises(RuntimeError, match="Truncated"):
+                decode_value(data)
+
+    def test_invalid_data(self):
+        """Unknown tokens, stray ends, dict keys without values and overlong length prefixes are rejected."""
+        for data in (b"x", b"e", b"d3:fooe", b"l5:helloxe", b"12345678901:a"):
+            with pytest.raises(RuntimeError, match="invalid format"):
+                decode_value(data)
+        for data in (b"di1ei2ee", b"dlei1ee", b"dd1:a0:ee"):
+            with pytest.raises(TypeError, match="Dict key"):
+                decode_value(data)
+
+
+class TestStreamDecoder:
+    """Tests for incremental decoding with StreamDecoder."""
+
+    RESPONSE = b"d8:completei5e10:incompletei3e8:intervali1800e5:peers12:\x01\x02\x03\x04\x1a\xe1\x05\x06\x07\x08\x1a\xe2e"
+
+    def test_any_chunking_matches_bdecode(self):
+        """Feeding the data one byte at a time, or split anywhere, decodes like bdecode."""
+        for split in range(len(self.RESPONSE)):
+            decoder = StreamDecoder()
+            decoder.feed(self.RESPONSE[:split])
+            assert decoder.feed(self.RESPONSE[split:])
+            assert decode_response(decoder.value()) == bdecode(self.RESPONSE)
+
+        decoder = StreamDecoder()
+        assert not any(decoder.feed(self.RESPONSE[i : i + 1]) for i in range(len(self.RESPONSE) - 1))
+        assert decoder.feed(self.RESPONSE[-1:])
+
+    def test_only_unparsed_tail_is_buffered(self):
+        """Complete values leave the buffer, a partial one waits there for the rest of its bytes."""
+        decoder = StreamDecoder()
+        decoder.feed(b"d8:completei5e5:peers12:\x01\x02")
+        assert decoder.buffer == b"12:\x01\x02"
+        assert decoder.keys == [b"peers"]
+
+    def test_stops_after_last_peers_field(self):
+        """With sorted keys, a key past peers6 ends decoding before its value arrives."""
+        decoder = StreamDecoder()
+        assert not decoder.feed(b"d8:intervali1800e5:peers0:")
+        assert decoder.feed(b"7:warning")
+        assert decode_response(decoder.value()) == {"interval": 1800, "peers": []}
+
+    def test_stops_on_failure_reason(self):
+        """A failure reason is enough, whatever follows."""
+        decoder = StreamDecoder()
+        assert decoder.feed(b"d14:failure reason6:denied8:intervali")
+        assert decoder.value() == {b"failure reason": b"denied"}
+
+    def test_unsorted_keys_wait_for_dict_end(self):
+        """Once keys are out of order, a missing peers field may still come, so decoding runs to the end."""
+        decoder = StreamDecoder()
+        assert not decoder.feed(b"d8:intervali1800e8:completei1e5:peers0:7:warning2:hi")
+        assert decoder.feed(b"6:peers60:e")
+        assert decode_response(decoder.value())["peers6"] == []
+
+    def test_nested_peers_list_is_complete(self):
+        """A non-compact peers list only counts once it's closed."""
+        decoder = StreamDecoder()
+        assert not decoder.feed(b"d6:peers60:8:intervali1800e5:peersld2:ip7:1.2.3.4e")
+        assert decoder.feed(b"d2:ip7:5.6.7.8eee")
+        assert decoder.value()[b"peers"] == [{b"ip": b"1.2.3.4"}, {b"ip": b"5.6.7.8"}]
+
+    def test_invalid_data(self):
+        """Malformed data raises the same error types as decode_value."""
+        with pytest.raises(TypeError, match="Could not extract the bencoded dict"):
+            StreamDecoder().feed(b"li1ee")
+        with pytest.raises(TypeError, match="Dict key must be bytes"):
+            StreamDecoder().feed(b"di1ei2ee")
+        with pytest.raises(RuntimeError, match="invalid format"):
+            StreamDecoder().feed(b"d8:intervalx")
+        with pytest.raises(RuntimeError, match="invalid format"):
+            StreamDecoder().feed(b"d12345678901")
+        with pytest.raises(ValueError):
+            StreamDecoder().feed(b"d8:intervalixe")
+
+    def test_truncated_data(self):
+        """Data ending before the root dict closes, or a reason to stop, has no value."""
+        decoder = StreamDecoder()
+        assert not decoder.feed(b"d8:intervali1800e")
+        with pytest.raises(RuntimeError, match="Truncated"):
+            decoder.value()
+
+
+class TestSelectiveStreamDecoder:
+    """Tests for StreamDecoder skipping the top-level keys it isn't given."""
+
+    RESPONSE = (
+        b"d8:completei5e5:filesd20:aaaaaaaaaaaaaaaaaaaald8:completei1eeee"
+        b"10:incompletei3e8:intervali1800e5:peers6:\x01\x02\x03\x04\x1a\xe1"
+        b"10:x-metadatal0:i-1ed1:kdeee7:x-notes11:hello worlde"
+    )
+
+    def test_any_chunking_keeps_only_given_fields(self):
+        """Skipped values leave no trace, however the data is split."""
+        expected = {b"complete": 5, b"incomplete": 3, b"interval": 1800, b"peers": b"\x01\x02\x03\x04\x1a\xe1"}
+        for split in range(len(self.RESPONSE)):
+            decoder = StreamDecoder(ANNOUNCE_FIELDS)
+            decoder.feed(self.RESPONSE[:split])
+            decoder.feed(self.RESPONSE[split:])
+            assert decoder.value() == expected
+
+        decoder = StreamDecoder(frozenset((b"x-notes",)))
+        for i in range(len(self.RESPONSE)):
+            decoder.feed(self.RESPONSE[i : i + 1])
+        assert decoder.value() == {b"x-notes": b"hello world"}
+
+    def test_skipped_strings_arent_buffered(self):
+        """A large skipped string is dropped as it arrives instead of waiting in the buffer for its end."""
+        decoder = StreamDecoder(ANNOUNCE_FIELDS)
+        decoder.feed(b"d4:blob100000:" + bytes(1000))
+        assert decoder.buffer == b""
+        assert decoder.skip_length == 99000
+        decoder.feed(bytes(99000) + b"8:intervali1800e5:peers0:e")
+        assert decoder.value() == {b"interval": 1800, b"peers": b""}
+
+    def test_stops_after_last_peers_field(self):
+        """A skipped key past peers6 still ends decoding."""
+        decoder = StreamDecoder(ANNOUNCE_FIELDS)
+        assert not decoder.feed(b"d8:intervali1800e5:peers0:")
+        assert decoder.feed(b"7:x-files")
+
+    def test_invalid_data(self):
+        """A skipped key without a value, or malformed tokens in a skipped value, are rejected."""
+        with pytest.raises(RuntimeError, match="invalid format"):
+            StreamDecoder(ANNOUNCE_FIELDS).feed(b"d7:x-filese")
+        with pytest.raises(RuntimeError, match="invalid format"):
+            StreamDecoder(ANNOUNCE_FIELDS).feed(b"d7:x-filesli1ex")
+        with pytest.raises(RuntimeError, match="invalid format"):
+            StreamDecoder(ANNOUNCE_FIELDS).feed(b"d7:x-files12345678901")
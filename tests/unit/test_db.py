@@ -8,6 +8,7 @@ from collections import deque
 from collections.abc import Generator
 from pathlib import Path
 from typing import Any
+from unittest.mock import patch
 
 import pytest
 from pytest import MonkeyPatch
@@ -65,7 +66,19 @@ def test_db() -> Generator[sqlite3.Connection]:
             historic TEXT,
             last_downtime INTEGER,
             last_uptime INTEGER,
-            recent_ip TEXT
+            recent_ip TEXT,
+            lease_owner TEXT,
+            lease_expires INTEGER,
+            status_ipv4 INTEGER,
+            latency_ipv4 INTEGER,
+            uptime_ipv4 INTEGER,
+            historic_ipv4 TEXT,
+            status_ipv6 INTEGER,
+            latency_ipv6 INTEGER,
+            uptime_ipv6 INTEGER,
+            historic_ipv6 TEXT,
+            handshake INTEGER,
+            located_ip TEXT
         )
     """)
     conn.commit()
@@ -135,7 +148,9 @@ def sample_tracker_obj(sample_tracker_dict: dict[str, Any]) -> Tracker:
 def inserted_sample_tracker(patched_db: sqlite3.Connection, sample_tracker_dict: dict[str, Any]) -> dict[str, Any]:
     """Insert sample tracker into the test database."""
     patched_db.execute(
-        "INSERT INTO status VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)",
+        "INSERT INTO status (host, url, ip, latency, last_checked, interval, status, uptime, country,"
+        " country_code, network, added, historic, last_downtime, last_uptime, recent_ip)"
+        " VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)",
         (
             sample_tracker_dict["host"],
             sample_tracker_dict["url"],
@@ -372,7 +387,9 @@ class TestGetAllData:
         # Insert trackers with different uptimes
         for i, uptime in enumerate([50, 99, 75]):
             patched_db.execute(
-                "INSERT INTO status VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)",
+                "INSERT INTO status (host, url, ip, latency, last_checked, interval, status, uptime, country,"
+                " country_code, network, added, historic, last_downtime, last_uptime, recent_ip)"
+                " VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)",
                 (
                     f"tracker{i}.example.com",
                     f"udp://tracker{i}.example.com:6969/announce",
@@ -402,6 +419,71 @@ class TestGetAllData:
         assert trackers[2].uptime == 50
 
 
+class TestGetTracker:
+    """Tests for get_tracker function."""
+
+    def test_get_tracker_returns_single_row(
+        self, patched_db: sqlite3.Connection, inserted_sample_tracker: dict[str, Any], sample_tracker_dict: dict[str, Any]
+    ) -> None:
+        """Verify that get_tracker loads one tracker by host."""
+        tracker = db.get_tracker(sample_tracker_dict["host"])
+
+        assert tracker is not None
+        assert tracker.url == sample_tracker_dict["url"]
+        assert tracker.ips == sample_tracker_dict["ips"]
+
+    def test_get_tracker_missing_host(self, patched_db: sqlite3.Connection) -> None:
+        """Verify that get_tracker returns None for unknown hosts."""
+        assert db.get_tracker("missing.example.com") is None
+
+
+@pytest.fixture
+def leased_db(tmp_path: Path, monkeypatch: MonkeyPatch) -> Path:
+    """Create an on-disk database with two trackers, as shared by several checker processes."""
+    db_path = tmp_path / "trackon.db"
+    monkeypatch.setattr(db, "db_file", str(db_path))
+    db.create_db()
+    conn = sqlite3.connect(str(db_path))
+    conn.executemany(
+        "INSERT INTO status (host, url, last_checked) VALUES (?, ?, ?)",
+        [("a.example.com", "udp://a.example.com:6969/announce", 1000), ("b.example.com", "udp://b.example.com:80", 2000)],
+    )
+    conn.commit()
+    conn.close()
+    return db_path
+
+
+class TestTrackerLeases:
+    """Tests for the row leases shared between checker processes."""
+
+    def test_claim_skips_rows_leased_to_another_worker(self, leased_db: Path) -> None:
+        """A live lease keeps other workers off the row until it is released."""
+        assert db.claim_trackers(["a.example.com"], "worker-1", now=5000, lease_duration=600) == {"a.example.com"}
+        assert db.claim_trackers(["a.example.com", "b.example.com"], "worker-2", 5001, 600) == {"b.example.com"}
+
+        db.release_trackers(["a.example.com"], "worker-1")
+
+        assert db.claim_trackers(["a.example.com"], "worker-2", 5002, 600) == {"a.example.com"}
+
+    def test_expired_lease_is_taken_over(self, leased_db: Path) -> None:
+        """Rows held by a checker that died become claimable once the lease expires."""
+        db.claim_trackers(["a.example.com"], "dead-worker", now=5000, lease_duration=600)
+
+        assert db.claim_trackers(["a.example.com"], "worker-2", 5599, 600) == set()
+        assert db.claim_trackers(["a.example.com"], "worker-2", 5601, 600) == {"a.example.com"}
+
+    def test_release_ignores_leases_of_other_workers(self, leased_db: Path) -> None:
+        """A worker can only release its own leases."""
+        db.claim_trackers(["a.example.com"], "worker-1", now=5000, lease_duration=600)
+        db.release_trackers(["a.example.com"], "worker-2")
+
+        assert db.claim_trackers(["a.example.com"], "worker-2", 5001, 600) == set()
+
+    def test_get_check_times(self, leased_db: Path) -> None:
+        """The cheap sync query returns last_checked per host."""
+        assert db.get_check_times() == {"a.example.com": 1000, "b.example.com": 2000}
+
+
 class TestUpdateTracker:
     """Tests for update_tracker function."""
 
@@ -580,6 +662,44 @@ class TestUpdateTracker:
         assert row[0] == 1700000999
 
 
+class TestUpdateGeo:
+    """Tests for update_geo function."""
+
+    def test_update_geo_only_writes_geo_columns(
+        self, patched_db: sqlite3.Connection, inserted_sample_tracker: dict[str, Any], sample_tracker_obj: Tracker
+    ) -> None:
+        """Verify that update_geo stores the geolocation and leaves the check results alone."""
+        sample_tracker_obj.countries, sample_tracker_obj.country_codes = ["Germany"], ["de"]
+        sample_tracker_obj.networks = ["Other ISP"]
+        sample_tracker_obj.latency = 999
+        db.update_geo(sample_tracker_obj)
+
+        cursor = patched_db.cursor()
+        cursor.execute("SELECT country, country_code, network, latency FROM status WHERE host = ?", (sample_tracker_obj.host,))
+        country, country_code, network, latency = cursor.fetchone()
+
+        assert (json.loads(country), json.loads(country_code), json.loads(network)) == (["Germany"], ["de"], ["Other ISP"])
+        assert latency == inserted_sample_tracker["latency"]
+
+    def test_located_ips_survive_a_reload(
+        self, patched_db: sqlite3.Connection, inserted_sample_tracker: dict[str, Any], sample_tracker_obj: Tracker
+    ) -> None:
+        """A tracker read back after geolocation knows its IPs were located, so its next check doesn't republish it."""
+        never_located = db.get_tracker(sample_tracker_obj.host)
+        assert never_located is not None
+        assert never_located.located_ips is None
+
+        sample_tracker_obj.located_ips = frozenset(sample_tracker_obj.ips or [])
+        db.update_geo(sample_tracker_obj)
+        reloaded = db.get_tracker(sample_tracker_obj.host)
+
+        assert reloaded is not None
+        assert reloaded.located_ips == frozenset(sample_tracker_obj.ips or [])
+        with patch("newtrackon.tracker.persistence.geo_updates") as geo_updates:
+            reloaded.publish_ip_change()
+        geo_updates.put.assert_not_called()  # pyright: ignore[reportUnknownMemberType]
+
+
 class TestDeleteTracker:
     """Tests for delete_tracker function."""
 
@@ -600,7 +720,9 @@ class TestDeleteTracker:
         # Insert two trackers
         for i in range(2):
             patched_db.execute(
-                "INSERT INTO status VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)",
+                "INSERT INTO status (host, url, ip, latency, last_checked, interval, status, uptime, country,"
+                " country_code, network, added, historic, last_downtime, last_uptime, recent_ip)"
+                " VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)",
                 (
                     f"tracker{i}.example.com",
                     f"udp://tracker{i}.example.com:6969/announce",
@@ -762,7 +884,9 @@ class TestGetApiData:
         ]
         for tracker in trackers:
             patched_db.execute(
-                "INSERT INTO status VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)",
+                "INSERT INTO status (host, url, ip, latency, last_checked, interval, status, uptime, country,"
+                " country_code, network, added, historic, last_downtime, last_uptime, recent_ip)"
+                " VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)",
                 tracker,
             )
         patched_db.commit()
@@ -843,7 +967,9 @@ class TestGetApiData:
         """Verify include_ipv4_only=False filters out IPv4-only trackers."""
         # Insert tracker with only IPv4
         patched_db.execute(
-            "INSERT INTO status VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)",
+            "INSERT INTO status (host, url, ip, latency, last_checked, interval, status, uptime, country,"
+            " country_code, network, added, historic, last_downtime, last_uptime, recent_ip)"
+            " VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)",
             (
                 "ipv4only.example.com",
                 "udp://ipv4only.example.com:6969/announce",
@@ -865,7 +991,9 @@ class TestGetApiData:
         )
         # Insert tracker with both IPv4 and IPv6
         patched_db.execute(
-            "INSERT INTO status VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)",
+            "INSERT INTO status (host, url, ip, latency, last_checked, interval, status, uptime, country,"
+            " country_code, network, added, historic, last_downtime, last_uptime, recent_ip)"
+            " VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)",
             (
                 "dualstack.example.com",
                 "udp://dualstack.example.com:6969/announce",
@@ -896,7 +1024,9 @@ class TestGetApiData:
         """Verify include_ipv6_only=False filters out IPv6-only trackers."""
         # Insert tracker with only IPv6
         patched_db.execute(
-            "INSERT INTO status VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)",
+            "INSERT INTO status (host, url, ip, latency, last_checked, interval, status, uptime, country,"
+            " country_code, network, added, historic, last_downtime, last_uptime, recent_ip)"
+            " VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)",
             (
                 "ipv6only.example.com",
                 "udp://ipv6only.example.com:6969/announce",
@@ -918,7 +1048,9 @@ class TestGetApiData:
         )
         # Insert tracker with both IPv4 and IPv6
         patched_db.execute(
-            "INSERT INTO status VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)",
+            "INSERT INTO status (host, url, ip, latency, last_checked, interval, status, uptime, country,"
+            " country_code, network, added, historic, last_downtime, last_uptime, recent_ip)"
+            " VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)",
             (
                 "dualstack.example.com",
                 "udp://dualstack.example.com:6969/announce",
@@ -945,6 +1077,50 @@ class TestGetApiData:
         assert "udp://ipv6only.example.com:6969/announce" not in result
         assert "udp://dualstack.example.com:6969/announce" in result
 
+    def test_get_api_data_uses_verified_family_health(self, patched_db: sqlite3.Connection) -> None:
+        """A dual-stack tracker that only answers over IPv4 counts as IPv4-only once probed per version."""
+        patched_db.executemany(
+            "INSERT INTO status (host, url, ip, status, uptime, added, status_ipv4, uptime_ipv4, status_ipv6, uptime_ipv6)"
+            " VALUES (?,?,?,?,?,?,?,?,?,?)",
+            [
+                ("broken6.example.com", "udp://broken6.example.com:6969/announce", json.dumps(["2001:db8::1", "1.2.3.4"]),
+                 1, 99, 1704067200, 1, 99, 0, 10),
+                ("both.example.com", "udp://both.example.com:6969/announce", json.dumps(["2001:db8::2", "1.2.3.5"]),
+                 1, 98, 1704067200, 1, 98, 1, 97),
+                ("unprobed.example.com", "udp://unprobed.example.com:6969/announce", json.dumps(["2001:db8::3", "1.2.3.6"]),
+                 1, 97, 1704067200, None, None, None, None),
+            ],
+        )  # fmt: skip
+        patched_db.commit()
+
+        live = db.get_api_data("/api/live", include_ipv4_only=False)
+        assert "broken6.example.com" not in live
+        assert "both.example.com" in live
+        assert "unprobed.example.com" in live  # Falls back to its resolved addresses
+
+        assert "broken6.example.com" in db.get_api_data("/api/ipv4")
+        ipv6 = db.get_api_data("/api/ipv6")
+        assert "broken6.example.com" not in ipv6
+        assert "both.example.com" in ipv6
+        assert "unprobed.example.com" not in ipv6
+
+    def test_family_health_round_trip(
+        self, patched_db: sqlite3.Connection, inserted_sample_tracker: dict[str, Any], sample_tracker_obj: Tracker
+    ) -> None:
+        """Per version status, latency, uptime and history survive a write and a read."""
+        sample_tracker_obj.family_health[4].record(True, 40)
+        sample_tracker_obj.family_health[6].record(False, None)
+        db.update_tracker(sample_tracker_obj)
+
+        tracker = db.get_tracker(sample_tracker_obj.host)
+
+        assert tracker is not None
+        assert tracker.family_health[4].status == 1
+        assert tracker.family_health[4].latency == 40
+        assert tracker.family_health[4].uptime == 100
+        assert list(tracker.family_health[6].historic) == [0]
+        assert tracker.family_health[6].uptime == 0
+
     def test_get_api_data_empty_database(self, patched_db: sqlite3.Connection) -> None:
         """Verify get_api_data returns empty string for empty database."""
         result = db.get_api_data("/api/live")
@@ -1168,6 +1344,18 @@ class TestDatabaseCreation:
             "last_downtime": "INTEGER",
             "last_uptime": "INTEGER",
             "recent_ip": "TEXT",
+            "lease_owner": "TEXT",
+            "lease_expires": "INTEGER",
+            "status_ipv4": "INTEGER",
+            "latency_ipv4": "INTEGER",
+            "uptime_ipv4": "INTEGER",
+            "historic_ipv4": "TEXT",
+            "status_ipv6": "INTEGER",
+            "latency_ipv6": "INTEGER",
+            "uptime_ipv6": "INTEGER",
+            "historic_ipv6": "TEXT",
+            "handshake": "INTEGER",
+            "located_ip": "TEXT",
         }
         assert columns == expected_columns
 
@@ -1233,3 +1421,18 @@ class TestDatabaseCreation:
 
         assert len(rows) == 1
         assert rows[0][0] == "test.host"
+
+    def test_ensure_db_existence_adds_lease_columns(self, tmp_path: Path, monkeypatch: MonkeyPatch) -> None:
+        """Databases created before the lease columns existed are migrated in place."""
+        db_path = tmp_path / "trackon.db"
+        monkeypatch.setattr(db, "db_file", str(db_path))
+        conn = sqlite3.connect(str(db_path))
+        conn.execute("CREATE TABLE status (host TEXT PRIMARY KEY, url TEXT, last_checked INTEGER)")
+        conn.execute("INSERT INTO status VALUES ('test.host', 'udp://test.host:6969', 1000)")
+        conn.commit()
+        conn.close()
+
+        db.ensure_db_existence()
+        db.ensure_db_existence()  # Already migrated, nothing to add
+
+        assert db.claim_trackers(["test.host"], "worker-1", now=5000, lease_duration=600) == {"test.host"}
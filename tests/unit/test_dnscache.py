@@ -0,0 +1,166 @@
+"""Tests for the TTL-aware DNS cache in newtrackon.dnscache."""
+
+import asyncio
+import socket
+from time import time
+from unittest.mock import MagicMock, patch
+
+import dns.message
+import dns.name
+import dns.rcode
+import dns.rrset
+import pytest
+from dns.exception import Timeout
+from dns.resolver import NXDOMAIN, NoAnswer
+
+from newtrackon import dnscache
+from newtrackon.dnscache import MIN_TTL, NEGATIVE_TTL, dns_cache, negative_ttl, resolve, resolve_ips
+
+
+def answer(*records: str, ttl: float = 300) -> MagicMock:
+    result = MagicMock()
+    result.__iter__.return_value = iter(records)  # pyright: ignore[reportAttributeAccessIssue]
+    result.expiration = time() + ttl
+    return result
+
+
+def nxdomain(soa_ttl: int, soa_minimum: int) -> NXDOMAIN:
+    qname = dns.name.from_text("tracker.example.com")
+    response = dns.message.make_response(dns.message.make_query(qname, "A"))
+    response.set_rcode(dns.rcode.NXDOMAIN)
+    soa = f"ns.example.com. hostmaster.example.com. 1 7200 3600 1209600 {soa_minimum}"
+    response.authority.append(dns.rrset.from_text("example.com.", soa_ttl, "IN", "SOA", soa))
+    return NXDOMAIN(qnames=[qname], responses={qname: response})
+
+
+class TestDNSCache:
+    """Tests for lookups through dns_cache."""
+
+    def test_answers_are_cached_for_their_ttl(self) -> None:
+        """A second lookup within the TTL is a hit, and the entry expires with the records."""
+        with patch("newtrackon.dnscache.resolver.resolve", return_value=answer("93.184.216.34", ttl=600)) as lookup:
+            assert resolve("Tracker.Example.com.", "A") == ("93.184.216.34",)
+            assert resolve("tracker.example.com", "A") == ("93.184.216.34",)
+
+        lookup.assert_called_once()  # pyright: ignore[reportUnknownMemberType]
+        assert dns_cache.stats() == (1, 1, 1)
+        assert dns_cache.get(("tracker.example.com", "A"), now=time() + 599) is not None
+        assert dns_cache.get(("tracker.example.com", "A"), now=time() + 601) is None
+
+    def test_short_ttls_are_raised_to_the_minimum(self) -> None:
+        """Zero-TTL answers still serve every lookup of a check."""
+        with patch("newtrackon.dnscache.resolver.resolve", return_value=answer("93.184.216.34", ttl=0)):
+            resolution = dnscache.lookup("tracker.example.com", "A")
+
+        assert resolution.expires >= time() + MIN_TTL - 1
+        assert resolution.latency >= 0
+
+    def test_failures_are_cached(self) -> None:
+        """NXDOMAIN is raised again from the cache, without a second query."""
+        with patch("newtrackon.dnscache.resolver.resolve", side_effect=nxdomain(3600, 900)) as lookup:
+            for _ in range(2):
+                with pytest.raises(NXDOMAIN):
+                    resolve("tracker.example.com", "TXT")
+
+        lookup.assert_called_once()  # pyright: ignore[reportUnknownMemberType]
+
+    def test_negative_ttl(self) -> None:
+        """Negative answers last the SOA minimum, capped by the SOA TTL, and transient errors the least."""
+        assert negative_ttl(nxdomain(3600, 900)) == 900
+        assert negative_ttl(nxdomain(600, 900)) == 600
+        assert negative_ttl(nxdomain(3600, 0)) == MIN_TTL
+        assert negative_ttl(NXDOMAIN()) == NEGATIVE_TTL
+        assert negative_ttl(NoAnswer()) == NEGATIVE_TTL
+        assert negative_ttl(Timeout()) == MIN_TTL
+
+    def test_resolve_ips(self) -> None:
+        """AAAA and A are looked up once each, a missing one adds nothing, and families restrict the record types."""
+
+        def lookup(hostname: str, rdtype: str) -> MagicMock:
+            if rdtype == "AAAA":
+                raise NoAnswer()
+            return answer("93.184.216.34")
+
+        with patch("newtrackon.dnscache.resolver.resolve", side_effect=lookup) as resolver:
+            assert resolve_ips("tracker.example.com") == ["93.184.216.34"]
+            assert resolve_ips("tracker.example.com", socket.AF_INET) == ["93.184.216.34"]
+            assert resolve_ips("tracker.example.com", socket.AF_INET6) == []
+
+        assert resolver.call_count == 2
+
+    def test_address_literals_are_not_looked_up(self) -> None:
+        """IP hostnames resolve to themselves, if of the requested family."""
+        with patch("newtrackon.dnscache.resolver.resolve") as resolver:
+            assert resolve_ips("93.184.216.34") == ["93.184.216.34"]
+            assert resolve_ips("[2001:db8::1]", socket.AF_INET6) == ["2001:db8::1"]
+            assert resolve_ips("2001:db8::1", socket.AF_INET) == []
+            assert resolve_ips(None) == []
+
+        resolver.assert_not_called()  # pyright: ignore[reportUnknownMemberType]
+
+    def test_prefetch_warms_every_record_type(self) -> None:
+        """Prefetched hostnames are answered from the cache, IP literals aren't looked up."""
+
+        async def lookup(hostname: str, rdtype: str) -> MagicMock:
+            if hostname == "gone.example.com":
+                raise nxdomain(3600, 900)
+            return answer("93.184.216.34") if rdtype == "A" else answer()
+
+        with patch("newtrackon.dnscache.asyncresolver.resolve", side_effect=lookup) as resolver:
+            asyncio.run(dnscache.prefetch(["tracker.example.com", "gone.example.com", "93.184.216.34", "tracker.example.com"]))
+
+        assert resolver.call_count == 6
+        with patch("newtrackon.dnscache.resolver.resolve") as sync_resolver:
+            assert resolve_ips("tracker.example.com") == ["93.184.216.34"]
+        sync_resolver.assert_not_called()  # pyright: ignore[reportUnknownMemberType]
+        stats = dns_cache.stats()
+        assert dnscache.nxdomain("gone.example.com")
+        assert not dnscache.nxdomain("tracker.example.com")
+        assert not dnscache.nxdomain("unknown.example.com")
+        assert dns_cache.stats() == stats  # Only lookups are counted
+
+    def test_prefetch_skips_cached_hostnames(self) -> None:
+        """Hostnames with every record still cached aren't looked up again, nor counted as cache hits."""
+
+        async def lookup(hostname: str, rdtype: str) -> MagicMock:
+            return answer("93.184.216.34") if rdtype == "A" else answer()
+
+        with patch("newtrackon.dnscache.asyncresolver.resolve", side_effect=lookup) as resolver:
+            asyncio.run(dnscache.prefetch(["tracker.example.com"]))
+            stats = dnscache.dns_cache.stats()
+            assert dnscache.uncached(["tracker.example.com", "other.example.com", "93.184.216.34"]) == {"other.example.com"}
+            asyncio.run(dnscache.prefetch(["tracker.example.com", "other.example.com"]))
+
+        assert [call.args for call in resolver.call_args_list][3:] == [
+            ("other.example.com", rdtype) for rdtype in dnscache.PREFETCH_RECORDS
+        ]
+        assert dnscache.dns_cache.stats().hits == stats.hits
+
+    def test_prefetch_renews_records_expiring_before_the_checks(self) -> None:
+        """A record cached now but expiring before the checks it's prefetched for is queried again."""
+
+        async def lookup(hostname: str, rdtype: str) -> MagicMock:
+            return answer("93.184.216.34", ttl=600) if rdtype == "A" else answer(ttl=0)
+
+        with patch("newtrackon.dnscache.asyncresolver.resolve", side_effect=lookup) as resolver:
+            asyncio.run(dnscache.prefetch(["tracker.example.com"]))
+            now = time()
+            assert dnscache.uncached(["tracker.example.com"], now + MIN_TTL - 5) == set()
+            assert dnscache.stale_records(["tracker.example.com"], now + MIN_TTL + 5) == [
+                ("tracker.example.com", "TXT"),
+                ("tracker.example.com", "AAAA"),
+            ]
+            asyncio.run(dnscache.prefetch(["tracker.example.com"], now + MIN_TTL + 5))
+
+        assert [call.args for call in resolver.call_args_list][3:] == [
+            ("tracker.example.com", "TXT"),
+            ("tracker.example.com", "AAAA"),
+        ]
+
+    def test_oldest_entry_is_evicted(self) -> None:
+        """A full cache drops its oldest resolution."""
+        cache = dnscache.DNSCache(size=2)
+        for index in range(3):
+            cache.put((f"tracker{index}.example.com", "A"), dnscache.Resolution((), None, time() + 300, 0))
+
+        assert list(cache.entries) == [("tracker1.example.com", "A"), ("tracker2.example.com", "A")]
@@ -0,0 +1,74 @@
+"""Tests for the background geolocation stage in newtrackon.enrichment."""
+
+from copy import copy
+from time import time
+from unittest.mock import patch
+
+from newtrackon import enrichment
+from newtrackon.geoip import GeoInfo
+from newtrackon.persistence import geo_updates
+from newtrackon.tracker import Tracker
+
+US = GeoInfo("United States", "us", "Example ISP")
+DE = GeoInfo("Germany", "de", "Other ISP")
+
+
+class TestPublishIpChange:
+    """Tests for Tracker.publish_ip_change."""
+
+    def test_only_changed_ip_sets_are_published(self, sample_tracker: Tracker) -> None:
+        """A tracker is queued until all its current IPs are geolocated, and again once they change."""
+        sample_tracker.ips = ["93.184.216.34"]
+        sample_tracker.publish_ip_change()
+        assert geo_updates.get_nowait() is sample_tracker
+
+        sample_tracker.set_geo_data({"93.184.216.34": US})
+        sample_tracker.publish_ip_change()
+        assert geo_updates.empty()
+
+        sample_tracker.ips = ["2001:db8::1", "93.184.216.34"]
+        sample_tracker.publish_ip_change()
+        assert geo_updates.get_nowait() is sample_tracker
+
+    def test_update_status_doesnt_geolocate_inline(self, sample_tracker: Tracker) -> None:
+        """Checks publish the IP change instead of waiting on the geo provider."""
+        sample_tracker.last_uptime = int(time())
+        with (
+            patch("newtrackon.scraper.get_bep_34", return_value=(False, None)),
+            patch("newtrackon.dnscache.resolve_ips", return_value=["93.184.216.34"]),
+            patch("newtrackon.scraper.announce_udp", return_value=({"interval": 1800, "peers": []}, "93.184.216.34")),
+            patch("newtrackon.geoip.locate") as locate,
+        ):
+            sample_tracker.update_status()
+
+        locate.assert_not_called()  # pyright: ignore[reportUnknownMemberType]
+        assert geo_updates.get_nowait() is sample_tracker
+
+
+class TestGeoWorker:
+    """Tests for take_geo_updates and enrich."""
+
+    def test_queued_updates_are_taken_once_per_host(self, sample_tracker: Tracker) -> None:
+        """Trackers published several times before the worker runs are geolocated once."""
+        for _ in range(3):
+            geo_updates.put(sample_tracker)
+
+        assert enrichment.take_geo_updates() == [sample_tracker]
+        assert geo_updates.empty()
+
+    def test_trackers_are_geolocated_together(self, sample_tracker: Tracker) -> None:
+        """IPs of every taken tracker are looked up in one call, and each tracker's columns are stored."""
+        sample_tracker.ips = ["93.184.216.34"]
+        second = copy(sample_tracker)
+        second.host, second.ips = "tracker2.example.com", ["2001:db8::1", "93.184.216.34"]
+
+        with (
+            patch("newtrackon.geoip.ip_api_client.locate", return_value={"93.184.216.34": US, "2001:db8::1": DE}) as locate,
+            patch("newtrackon.enrichment.db.update_geo") as update_geo,
+        ):
+            enrichment.enrich([sample_tracker, second])
+
+        locate.assert_called_once_with(["2001:db8::1", "93.184.216.34"])  # pyright: ignore[reportUnknownMemberType]
+        assert [call.args[0] for call in update_geo.call_args_list] == [sample_tracker, second]
+        assert second.country_codes == ["de", "us"]
+        assert second.located_ips == frozenset({"2001:db8::1", "93.184.216.34"})
@@ -0,0 +1,217 @@
+"""Tests for IP geolocation in newtrackon.geoip: the SQLite cache, offline range files and the IP-API batch client.
+
+IP-API is replaced by a local HTTP server bound to 127.0.0.1, so no external network access is needed.
+"""
+
+import json
+import os
+import threading
+from collections.abc import Generator
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from time import perf_counter, sleep
+from unittest.mock import patch
+
+import pytest
+
+from newtrackon.geoip import GEO_TTL, GeoCache, GeoInfo, GeoRanges, IPAPIClient, locate, open_ranges
+
+INFO = GeoInfo("United States", "us", "Example ISP")
+
+
+class TestGeoCache:
+    """Tests for GeoCache."""
+
+    def test_entries_expire_after_ttl(self) -> None:
+        """An IP is answered until GEO_TTL after it was fetched."""
+        cache = GeoCache(":memory:")
+        cache.put("93.184.216.34", INFO, now=1000)
+
+        assert cache.get("93.184.216.34", now=1000 + GEO_TTL - 1) == INFO
+        assert cache.get("93.184.216.34", now=1000 + GEO_TTL) is None
+        assert cache.get("2001:db8::1", now=1000) is None
+
+    def test_refetched_entry_replaces_the_old_one(self) -> None:
+        """Putting a known IP again updates its data and restarts its TTL."""
+        cache = GeoCache(":memory:")
+        cache.put("93.184.216.34", INFO, now=1000)
+        cache.put("93.184.216.34", INFO._replace(network="Other ISP"), now=1000 + GEO_TTL)
+
+        assert cache.get("93.184.216.34", now=1000 + GEO_TTL) == INFO._replace(network="Other ISP")
+
+    def test_entries_survive_restarts(self, tmp_path: Path) -> None:
+        """A new cache on the same database file sees what the previous one stored."""
+        database = str(tmp_path / "geoip.db")
+        GeoCache(database).put("93.184.216.34", INFO)
+
+        assert GeoCache(database).get("93.184.216.34") == INFO
+
+
+RANGES_CSV = """first_ip,last_ip,country,country_code,network
+# Comments and malformed rows are skipped
+93.184.216.0,93.184.216.255,United States,US,Example ISP
+2001:db8::,2001:db8:ffff:ffff:ffff:ffff:ffff:ffff,Germany,DE,Documentation Net
+1.0.0.0,1.0.0.255,Australia,AU,Example ISP
+1.0.1.0,1.0.1.255,United States,US,Example ISP
+2001:db9::1:0,2001:db9::1:ffff,France,FR,Second Half
+2001:db9::,2001:db9::ffff,Spain,ES,First Half
+"""
+
+
+@pytest.fixture
+def ranges(tmp_path: Path) -> GeoRanges:
+    csv_path = tmp_path / "ranges.csv"
+    csv_path.write_text(RANGES_CSV)
+    return open_ranges(str(csv_path))
+
+
+class TestGeoRanges:
+    """Tests for compiled range files and their lookups."""
+
+    def test_lookups_by_ip_version(self, ranges: GeoRanges) -> None:
+        """Addresses inside a range get its data, whatever their version and the CSV order."""
+        assert ranges.get("93.184.216.34") == INFO
+        assert ranges.get("93.184.216.255") == INFO
+        assert ranges.get("1.0.0.0") == GeoInfo("Australia", "au", "Example ISP")
+        assert ranges.get("1.0.1.7") == GeoInfo("United States", "us", "Example ISP")
+        assert ranges.get("2001:db8::1") == GeoInfo("Germany", "de", "Documentation Net")
+        assert ranges.get("2001:db9::5") == GeoInfo("Spain", "es", "First Half")
+        assert ranges.get("2001:db9::1:5") == GeoInfo("France", "fr", "Second Half")
+
+    def test_addresses_outside_every_range(self, ranges: GeoRanges) -> None:
+        """Gaps, addresses before the first range and after the last one, and non-IPs are unknown."""
+        assert ranges.get("0.255.255.255") is None
+        assert ranges.get("1.0.2.0") is None
+        assert ranges.get("255.255.255.255") is None
+        assert ranges.get("2001:db9::2:0") is None
+        assert ranges.get("2001:dba::1") is None
+        assert ranges.get("::1") is None
+        assert ranges.get("tracker.example.com") is None
+
+    def test_compiled_file_is_reused_until_the_csv_changes(self, tmp_path: Path, ranges: GeoRanges) -> None:
+        """Opening the dataset again maps the existing file, a newer CSV is compiled again."""
+        csv_path = tmp_path / "ranges.csv"
+        compiled = tmp_path / "ranges.csv.ranges"
+        with patch("newtrackon.geoip.compile_ranges") as compile_ranges:
+            open_ranges(str(csv_path))
+        compile_ranges.assert_not_called()  # pyright: ignore[reportUnknownMemberType]
+
+        csv_path.write_text("1.1.1.0,1.1.1.255,Australia,AU,Other ISP\n")
+        os.utime(compiled, (0, 0))
+        assert open_ranges(str(csv_path)).get("1.1.1.1") == GeoInfo("Australia", "au", "Other ISP")
+
+    def test_local_ranges_replace_ip_api(self, ranges: GeoRanges) -> None:
+        """With local ranges configured, IP-API is never queried."""
+        with patch("newtrackon.geoip.local_ranges", ranges), patch("newtrackon.geoip.ip_api_client.locate") as ip_api:
+            assert locate(["93.184.216.34", "10.0.0.1"]) == {"93.184.216.34": INFO}
+
+        ip_api.assert_not_called()  # pyright: ignore[reportUnknownMemberType]
+
+
+class BatchHandler(BaseHTTPRequestHandler):
+    """Stand-in for IP-API's batch endpoint: private addresses fail, others are in the US."""
+
+    def do_POST(self) -> None:
+        server = self.server
+        assert isinstance(server, LocalIPAPI)
+        ips: list[str] = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        server.batches.append(ips)
+        body = json.dumps(
+            [
+                {"status": "fail", "message": "private range", "query": ip}
+                if ip.startswith("10.")
+                else {"status": "success", "country": "United States", "countryCode": "US", "isp": "Example ISP", "query": ip}
+                for ip in ips
+            ]
+        ).encode()
+        self.send_response(server.status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: object) -> None:
+        pass
+
+
+class LocalIPAPI(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self) -> None:
+        super().__init__(("127.0.0.1", 0), BatchHandler)
+        self.batches: list[list[str]] = []
+        self.status = 200
+        self.url = f"http://127.0.0.1:{self.server_address[1]}/batch"
+
+
+@pytest.fixture
+def ip_api_server() -> Generator[LocalIPAPI]:
+    server = LocalIPAPI()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+class TestIPAPIClient:
+    """Tests for IPAPIClient against a local stand-in of the batch endpoint."""
+
+    def test_ips_are_sent_in_batches(self, ip_api_server: LocalIPAPI) -> None:
+        """IPs go out batch_size at a time, and the ones IP-API can't locate are left out."""
+        client = IPAPIClient(ip_api_server.url, rate=1000, batch_size=2)
+
+        located = client.locate(["93.184.216.34", "10.0.0.1", "2001:db8::1"])
+
+        assert located == {"93.184.216.34": INFO, "2001:db8::1": INFO}
+        assert ip_api_server.batches == [["93.184.216.34", "10.0.0.1"], ["2001:db8::1"]]
+        stats = client.stats()
+        assert stats.queued == 0
+        assert stats.batches == 2
+        assert stats.latency is not None
+
+    def test_concurrent_callers_share_a_batch(self, ip_api_server: LocalIPAPI) -> None:
+        """IPs queued by several checks while a batch is in flight go out together in the next one."""
+        client = IPAPIClient(ip_api_server.url, rate=1000)
+        results: list[dict[str, GeoInfo]] = []
+
+        def locate(ip: str) -> None:
+            results.append(client.locate([ip]))
+
+        callers = [threading.Thread(target=locate, args=(ip,)) for ip in ("1.1.1.1", "8.8.8.8")]
+        with client.sending:
+            for caller in callers:
+                caller.start()
+            while client.stats().queued < 2:
+                sleep(0.01)
+        for caller in callers:
+            caller.join()
+
+        assert ip_api_server.batches == [["1.1.1.1", "8.8.8.8"]]
+        assert sorted(ip for result in results for ip in result) == ["1.1.1.1", "8.8.8.8"]
+
+    def test_batches_are_paced_by_the_token_bucket(self, ip_api_server: LocalIPAPI) -> None:
+        """Batches beyond the first wait for a token instead of a fixed sleep."""
+        client = IPAPIClient(ip_api_server.url, rate=20, batch_size=1)
+
+        started = perf_counter()
+        client.locate(["1.1.1.1", "8.8.8.8", "9.9.9.9"])
+
+        assert perf_counter() - started >= 0.09  # Two tokens at 20 per second
+        assert len(ip_api_server.batches) == 3
+
+    def test_failed_batch_locates_nothing(self, ip_api_server: LocalIPAPI) -> None:
+        """An error response is logged and its IPs are left for the next check."""
+        ip_api_server.status = 503
+        client = IPAPIClient(ip_api_server.url, rate=1000)
+
+        assert client.locate(["93.184.216.34"]) == {}
+        assert client.stats().batches == 1
+
+    def test_locate_caches_what_ip_api_found(self, ip_api_server: LocalIPAPI) -> None:
+        """Only IPs missing from the geo cache reach IP-API."""
+        with patch("newtrackon.geoip.ip_api_client", IPAPIClient(ip_api_server.url, rate=1000)):
+            assert locate(["93.184.216.34", "10.0.0.1"]) == {"93.184.216.34": INFO}
+            assert locate(["93.184.216.34", "10.0.0.1"]) == {"93.184.216.34": INFO}
+
+        assert ip_api_server.batches == [["93.184.216.34", "10.0.0.1"], ["10.0.0.1"]]
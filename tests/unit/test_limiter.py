@@ -0,0 +1,97 @@
+"""Tests for per-IP and per-network probe concurrency limits in newtrackon.limiter."""
+
+import asyncio
+import threading
+from time import sleep
+
+from newtrackon.limiter import ProbeLimiter, probe_keys
+
+
+class TestProbeKeys:
+    """Tests for probe_keys function."""
+
+    def test_keys_for_ips_and_networks(self) -> None:
+        """IPs and network names map to separate key namespaces."""
+        keys = probe_keys(["1.2.3.4", "2001:db8::1"], ["Example ISP", "Example ISP"])
+
+        assert keys == frozenset({"ip:1.2.3.4", "ip:2001:db8::1", "network:Example ISP"})
+
+    def test_keys_ignore_missing_data(self) -> None:
+        """Trackers without IPs or geo data get no keys and are never limited."""
+        assert probe_keys(None, None) == frozenset()
+        assert probe_keys([], [""]) == frozenset()
+
+
+class TestProbeLimiter:
+    """Tests for ProbeLimiter class."""
+
+    def test_hold_caps_probes_per_ip(self) -> None:
+        """No more than per_ip probes run at once against the same IP."""
+        limiter = ProbeLimiter(per_ip=2, per_network=10)
+        running = 0
+        peak = 0
+        lock = threading.Lock()
+
+        def probe() -> None:
+            nonlocal running, peak
+            with limiter.hold(["1.2.3.4"], None):
+                with lock:
+                    running += 1
+                    peak = max(peak, running)
+                sleep(0.02)
+                with lock:
+                    running -= 1
+
+        threads = [threading.Thread(target=probe) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert peak == 2
+        assert not limiter.in_flight
+
+    def test_network_limit_spans_ips(self) -> None:
+        """Trackers on different IPs of the same provider share the network cap."""
+        limiter = ProbeLimiter(per_ip=5, per_network=1)
+
+        with limiter.hold(["1.2.3.4"], ["Example ISP"]):
+            assert not limiter.available(probe_keys(["5.6.7.8"], ["Example ISP"]))
+            assert limiter.available(probe_keys(["5.6.7.8"], ["Other ISP"]))
+
+        assert limiter.available(probe_keys(["5.6.7.8"], ["Example ISP"]))
+
+    def test_release_on_exception(self) -> None:
+        """A failing probe frees its slots."""
+        limiter = ProbeLimiter(per_ip=1, per_network=1)
+
+        try:
+            with limiter.hold(["1.2.3.4"], ["Example ISP"]):
+                raise RuntimeError("UDP timeout")
+        except RuntimeError:
+            pass
+
+        assert not limiter.in_flight
+
+    def test_hold_async_caps_probes_per_ip(self) -> None:
+        """The asyncio variant queues tasks beyond the per-IP cap."""
+        limiter = ProbeLimiter(per_ip=3, per_network=10)
+        running = 0
+        peak = 0
+
+        async def probe() -> None:
+            nonlocal running, peak
+            async with limiter.hold_async(["1.2.3.4"], ["Example ISP"]):
+                running += 1
+                peak = max(peak, running)
+                await asyncio.sleep(0.01)
+                running -= 1
+
+        async def scenario() -> None:
+            await asyncio.gather(*(probe() for _ in range(10)))
+
+        asyncio.run(scenario())
+        asyncio.run(scenario())  # A new event loop gets a fresh condition
+
+        assert peak == 3
+        assert not limiter.in_flight
@@ -124,6 +124,19 @@ class TestSaveDequeToDisk:
             data = json.load(f)
         assert data == test_data
 
+    def test_save_deque_replaces_the_file_whole(self, tmp_path: Path) -> None:
+        """The history is written to a temporary file renamed over the old one, leaving nothing else behind."""
+        from newtrackon.persistence import save_deque_to_disk
+
+        filepath = tmp_path / "history.json"
+        filepath.write_text("[]")
+        entry: HistoryData = {"url": "udp://tracker1.com:6969", "time": 1700000000, "status": 1, "ip": "1.2.3.4", "info": []}
+
+        save_deque_to_disk(deque([entry]), str(filepath))
+
+        assert [path.name for path in tmp_path.iterdir()] == ["history.json"]
+        assert json.loads(filepath.read_text()) == [entry]
+
     def test_save_deque_overwrites_existing_file(self, tmp_path: Path) -> None:
         """Test that saving overwrites existing file content."""
         from newtrackon.persistence import save_deque_to_disk
@@ -162,6 +175,20 @@ class TestSaveDequeToDisk:
             content = f.read()
         json.loads(content)
 
+    def test_save_deque_saves_raw_responses_compactly(self, tmp_path: Path) -> None:
+        """Responses kept unformatted in raw_data are saved formatted, without decoding their peers."""
+        from newtrackon.persistence import save_deque_to_disk
+        from newtrackon.scraper import RawResponse, saved_info
+
+        filepath = tmp_path / "raw.json"
+        entry: HistoryData = {"url": "udp://test.tracker:6969", "time": 1700000000, "status": 1, "ip": "1.2.3.4", "info": ""}
+        entry["info"] = RawResponse({"interval": 1800})
+
+        save_deque_to_disk(deque([entry]), str(filepath), default=saved_info)
+
+        with open(filepath) as f:
+            assert json.load(f)[0]["info"] == {"response": "{'interval': 1800}", "peers": {}}
+
 
 class TestBufferOverflow:
     """Test that buffers correctly handle overflow at their size limits."""
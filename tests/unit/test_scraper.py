@@ -4,16 +4,20 @@ Tests cover:
 - UDP protocol binary encoding/decoding
 - UDP response parsing
 - HTTP announce with mocked requests
-- UDP announce with mocked socket
+- UDP announce against a local stand-in tracker
 - BEP34 DNS TXT record parsing
-- Memory-limited HTTP GET
+- Memory-limited, streamed HTTP GET
 - IP redaction
 - Error handling throughout
 """
 
+import gzip
 import socket
 import struct
+import threading
 from collections import deque
+from collections.abc import Generator
+from time import time
 from typing import Any
 from unittest.mock import MagicMock, patch
 
@@ -22,9 +26,14 @@ import requests
 from dns.exception import DNSException
 
 from newtrackon import scraper
+from newtrackon.bdecode import PeerList
+from newtrackon.persistence import HistoryData
 from newtrackon.scraper import (
     HTTP_PORT,
+    MAX_RESPONSE_SIZE,
     UDP_PORT,
+    AnnounceReader,
+    RawResponse,
     announce_http,
     announce_udp,
     attempt_all_protocols,
@@ -42,6 +51,22 @@ from newtrackon.scraper import (
     udp_parse_announce_response,
     udp_parse_connection_response,
 )
+from newtrackon.sessions import SessionAdapter, http_burst
+from newtrackon.udp import connection_ids, udp_multiplexer
+
+
+def read_body(body: bytes) -> AnnounceReader:
+    reader = AnnounceReader()
+    reader.feed(body)
+    return reader
+
+
+def streamed_response(chunks: list[bytes], content_encoding: str = "") -> MagicMock:
+    response = MagicMock()
+    response.status_code = 200
+    response.headers = {"Content-Encoding": content_encoding}
+    response.raw.stream.return_value = iter(chunks)
+    return response
 
 
 class TestUDPBinaryEncoding:
@@ -63,14 +88,15 @@ class TestUDPBinaryEncoding:
         assert action == 0
 
         # Verify transaction_id matches returned value
-        packed_transaction_id = struct.unpack_from("!i", buf, 12)[0]
+        packed_transaction_id = struct.unpack_from("!I", buf, 12)[0]
         assert packed_transaction_id == transaction_id
 
     def test_udp_create_binary_connection_request_transaction_id_range(self) -> None:
-        """Test that transaction ID is within expected range."""
-        for _ in range(100):
-            _, transaction_id = udp_create_binary_connection_request()
-            assert 0 <= transaction_id <= 255
+        """Test that transaction IDs use the full unsigned 32-bit range."""
+        transaction_ids = [udp_create_binary_connection_request()[1] for _ in range(100)]
+        assert all(0 <= transaction_id < 2**32 for transaction_id in transaction_ids)
+        assert max(transaction_ids) > 2**24
+        assert len(set(transaction_ids)) == 100
 
     def test_udp_create_announce_request_structure(self) -> None:
         """Test that announce request has correct structure and length."""
@@ -91,7 +117,7 @@ class TestUDPBinaryEncoding:
         assert action == 1
 
         # Verify transaction_id
-        packed_transaction_id = struct.unpack_from("!i", buf, 12)[0]
+        packed_transaction_id = struct.unpack_from("!I", buf, 12)[0]
         assert packed_transaction_id == transaction_id
 
         # Verify info_hash
@@ -276,7 +302,7 @@ class TestAnnounceHTTP:
         bencoded = b"d8:intervali1800e5:peers6:\xc0\xa8\x01\x01\x1a\xe1e"
         mock_response = MagicMock()
         mock_response.status_code = 200
-        mock_get.return_value = (mock_response, bencoded)
+        mock_get.return_value = (mock_response, read_body(bencoded))
 
         result = announce_http("http://tracker.example.com/announce", b"\x00" * 20)
 
@@ -304,7 +330,7 @@ class TestAnnounceHTTP:
         """Test HTTP announce with non-200 status code."""
         mock_response = MagicMock()
         mock_response.status_code = 404
-        mock_get.return_value = (mock_response, b"Not found")
+        mock_get.return_value = (mock_response, read_body(b"Not found"))
 
         with pytest.raises(RuntimeError, match="HTTP 404 status code returned"):
             announce_http("http://tracker.example.com/announce")
@@ -314,7 +340,7 @@ class TestAnnounceHTTP:
         """Test HTTP announce with empty response."""
         mock_response = MagicMock()
         mock_response.status_code = 200
-        mock_get.return_value = (mock_response, b"")
+        mock_get.return_value = (mock_response, read_body(b""))
 
         with pytest.raises(RuntimeError, match="Got empty HTTP response"):
             announce_http("http://tracker.example.com/announce")
@@ -324,7 +350,7 @@ class TestAnnounceHTTP:
         """Test HTTP announce with invalid bencoded response."""
         mock_response = MagicMock()
         mock_response.status_code = 200
-        mock_get.return_value = (mock_response, b"invalid bencoded data")
+        mock_get.return_value = (mock_response, read_body(b"invalid bencoded data"))
 
         with pytest.raises(RuntimeError, match="Failed bdecoding HTTP response"):
             announce_http("http://tracker.example.com/announce")
@@ -334,12 +360,9 @@ class TestAnnounceHTTP:
         """TypeError from bdecode should be exposed as an announce failure."""
         mock_response = MagicMock()
         mock_response.status_code = 200
-        mock_get.return_value = (mock_response, b"li1ei2ee")
+        mock_get.return_value = (mock_response, read_body(b"li1ei2ee"))
 
-        with (
-            patch("newtrackon.scraper.bdecode", side_effect=TypeError("invalid root type")),
-            pytest.raises(RuntimeError, match="Failed bdecoding HTTP response: invalid root type"),
-        ):
+        with pytest.raises(RuntimeError, match="Failed bdecoding HTTP response: Could not extract the bencoded dict"):
             announce_http("http://tracker.example.com/announce")
 
     @patch("newtrackon.scraper.memory_limited_get")
@@ -348,7 +371,7 @@ class TestAnnounceHTTP:
         bencoded = b"d14:failure reason12:invalid hashe"
         mock_response = MagicMock()
         mock_response.status_code = 200
-        mock_get.return_value = (mock_response, bencoded)
+        mock_get.return_value = (mock_response, read_body(bencoded))
 
         with pytest.raises(RuntimeError, match="Tracker error message"):
             announce_http("http://tracker.example.com/announce")
@@ -359,7 +382,7 @@ class TestAnnounceHTTP:
         bencoded = b"d8:intervali1800ee"
         mock_response = MagicMock()
         mock_response.status_code = 200
-        mock_get.return_value = (mock_response, bencoded)
+        mock_get.return_value = (mock_response, read_body(bencoded))
 
         with pytest.raises(RuntimeError, match=r"Invalid response.*peers.*missing"):
             announce_http("http://tracker.example.com/announce")
@@ -381,129 +404,187 @@ class TestAnnounceHTTP:
             announce_http("http://tracker.example.com/announce")
 
 
-class TestAnnounceUDP:
-    """Test UDP announce functionality with mocked socket."""
+class UDPTrackerStandIn:
+    """Minimal BEP 15 tracker on a local socket, answering connect and announce requests from a thread."""
+
+    def __init__(self, answer: bool = True) -> None:
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind(("127.0.0.1", 0))
+        self.port: int = self.sock.getsockname()[1]
+        self.answer = answer
+        self.received = 0
+        self.connects = 0
+        self.thread = threading.Thread(target=self.serve, daemon=True)
+        self.thread.start()
+
+    def serve(self) -> None:
+        while True:
+            try:
+                data, addr = self.sock.recvfrom(2048)
+            except OSError:
+                return
+            self.received += 1
+            if not self.answer:
+                continue
+            action, transaction_id = struct.unpack_from("!iI", data, 8)
+            if action == 0:
+                self.connects += 1
+                self.sock.sendto(struct.pack("!iIq", 0, transaction_id, 0x12345678ABCDEF01), addr)
+            else:
+                self.sock.sendto(struct.pack("!iIiii", 1, transaction_id, 1800, 50, 100), addr)
 
-    @pytest.fixture
-    def mock_socket(self) -> MagicMock:
-        """Create a mock socket for UDP testing."""
-        mock_sock = MagicMock()
-        mock_sock.family = socket.AF_INET
-        return mock_sock
-
-    @patch("socket.getaddrinfo")
-    @patch("socket.socket")
-    def test_announce_udp_success(self, mock_socket_class: MagicMock, mock_getaddrinfo: MagicMock) -> None:
-        """Test successful UDP announce."""
-        # Setup getaddrinfo response
-        mock_getaddrinfo.return_value = [(socket.AF_INET, socket.SOCK_DGRAM, 17, "", ("93.184.216.34", 6969))]
+    def close(self) -> None:
+        self.sock.close()
 
-        # Create mock socket
-        mock_sock = MagicMock()
-        mock_sock.family = socket.AF_INET
-        mock_socket_class.return_value = mock_sock
 
-        # Setup connection response
-        connection_id = 0x12345678ABCDEF01
-        connect_response = struct.pack("!i", 0)  # action = 0
-        connect_response += struct.pack("!i", 0)  # will be overwritten by transaction_id check
-        connect_response += struct.pack("!q", connection_id)
-
-        # Setup announce response
-        announce_response = struct.pack("!i", 1)  # action = 1
-        announce_response += struct.pack("!i", 0)  # will be overwritten
-        announce_response += struct.pack("!i", 1800)  # interval
-        announce_response += struct.pack("!i", 50)  # leechers
-        announce_response += struct.pack("!i", 100)  # seeds
-
-        def recv_side_effect(size: int) -> bytes:
-            if mock_sock.recv.call_count == 1:  # pyright: ignore[reportUnknownMemberType]
-                # First recv is for connection response
-                # Get the transaction ID from the sent request
-                sent_data = mock_sock.sendall.call_args_list[0][0][0]
-                sent_transaction_id = struct.unpack_from("!i", sent_data, 12)[0]
-                response = struct.pack("!i", 0)  # action
-                response += struct.pack("!i", sent_transaction_id)
-                response += struct.pack("!q", connection_id)
-                return response
-            else:
-                # Second recv is for announce response
-                sent_data = mock_sock.sendall.call_args_list[1][0][0]
-                sent_transaction_id = struct.unpack_from("!i", sent_data, 12)[0]
-                response = struct.pack("!i", 1)  # action
-                response += struct.pack("!i", sent_transaction_id)
-                response += struct.pack("!i", 1800)
-                response += struct.pack("!i", 50)
-                response += struct.pack("!i", 100)
-                return response
+class TestAnnounceUDP:
+    """Test UDP announce against a local stand-in tracker."""
 
-        mock_sock.recv.side_effect = recv_side_effect
+    @pytest.fixture
+    def tracker(self) -> Generator[UDPTrackerStandIn]:
+        stand_in = UDPTrackerStandIn()
+        yield stand_in
+        stand_in.close()
 
-        result, ip = announce_udp("udp://tracker.example.com:6969/announce", b"\x00" * 20)
+    def test_announce_udp_success(self, tracker: UDPTrackerStandIn) -> None:
+        """Test successful UDP announce."""
+        with patch("newtrackon.dnscache.resolve_ips", return_value=["127.0.0.1"]):
+            result, ip = announce_udp(f"udp://tracker.example.com:{tracker.port}/announce", b"\x00" * 20)
 
         assert result["interval"] == 1800
         assert result["leechers"] == 50
         assert result["seeds"] == 100
-        assert ip == "93.184.216.34"
+        assert ip == "127.0.0.1"
 
-    @patch("socket.getaddrinfo")
-    def test_announce_udp_dns_resolution_error(self, mock_getaddrinfo: MagicMock) -> None:
-        """Test UDP announce with DNS resolution error."""
-        mock_getaddrinfo.side_effect = OSError("Name or service not known")
+    def test_connection_id_is_reused(self, tracker: UDPTrackerStandIn) -> None:
+        """A second announce within the connection ID lifetime skips the connect exchange."""
+        with patch("newtrackon.dnscache.resolve_ips", return_value=["127.0.0.1"]):
+            announce_udp(f"udp://tracker.example.com:{tracker.port}/announce")
+            announce_udp(f"udp://tracker.example.com:{tracker.port}/announce")
 
-        with pytest.raises(RuntimeError, match="UDP error"):
-            announce_udp("udp://invalid.tracker.com:6969/announce")
+        assert tracker.connects == 1
+
+    def test_failed_announce_forgets_connection_id(self) -> None:
+        """A connection ID the tracker no longer answers to is dropped, and the retry connects again."""
+        silent = UDPTrackerStandIn(answer=False)
+        connection_ids.put(("127.0.0.1", silent.port), 0x1234)
+        try:
+            with (
+                patch("newtrackon.dnscache.resolve_ips", return_value=["127.0.0.1"]),
+                patch("newtrackon.scraper.retransmission_timeouts", return_value=[0.02, 0.04]),
+                pytest.raises(RuntimeError, match="UDP timeout"),
+            ):
+                announce_udp(f"udp://tracker.example.com:{silent.port}/announce")
+        finally:
+            silent.close()
 
-    @patch("socket.getaddrinfo")
-    @patch("socket.socket")
-    def test_announce_udp_connection_refused(self, mock_socket_class: MagicMock, mock_getaddrinfo: MagicMock) -> None:
-        """Test UDP announce with connection refused."""
-        mock_getaddrinfo.return_value = [(socket.AF_INET, socket.SOCK_DGRAM, 17, "", ("93.184.216.34", 6969))]
+        assert connection_ids.get(("127.0.0.1", silent.port)) is None
 
-        mock_sock = MagicMock()
-        mock_socket_class.return_value = mock_sock
-        mock_sock.sendall.side_effect = ConnectionRefusedError()
+    def test_announce_udp_restricted_to_family(self, tracker: UDPTrackerStandIn) -> None:
+        """A family restricted announce only resolves addresses of that family."""
+        with patch("newtrackon.dnscache.resolve_ips", return_value=["127.0.0.1"]) as resolve_ips:
+            _result, ip = announce_udp(f"udp://tracker.example.com:{tracker.port}/announce", family=socket.AF_INET)
 
-        with pytest.raises(RuntimeError, match="UDP connection failed"):
-            announce_udp("udp://tracker.example.com:6969/announce")
+        assert ip == "127.0.0.1"
+        resolve_ips.assert_called_once_with("tracker.example.com", socket.AF_INET)  # pyright: ignore[reportUnknownMemberType]
 
-    @patch("socket.getaddrinfo")
-    @patch("socket.socket")
-    def test_announce_udp_timeout(self, mock_socket_class: MagicMock, mock_getaddrinfo: MagicMock) -> None:
-        """Test UDP announce timeout."""
-        mock_getaddrinfo.return_value = [(socket.AF_INET, socket.SOCK_DGRAM, 17, "", ("93.184.216.34", 6969))]
+    def test_concurrent_announces_share_one_socket(self, tracker: UDPTrackerStandIn) -> None:
+        """Concurrent announces are demultiplexed by transaction ID over a single IPv4 socket."""
+        from concurrent.futures import ThreadPoolExecutor
 
-        mock_sock = MagicMock()
-        mock_socket_class.return_value = mock_sock
-        mock_sock.recv.side_effect = TimeoutError()
+        with (
+            patch("newtrackon.dnscache.resolve_ips", return_value=["127.0.0.1"]),
+            ThreadPoolExecutor(max_workers=20) as executor,
+        ):
+            url = f"udp://tracker.example.com:{tracker.port}/announce"
+            results = [future.result() for future in [executor.submit(announce_udp, url) for _ in range(50)]]
+
+        assert all(result["interval"] == 1800 for result, _ in results)
+        assert list(udp_multiplexer.sockets) == [socket.AF_INET]
+        assert not udp_multiplexer.pending
+
+    def test_dual_stack_addresses_are_raced(self) -> None:
+        """A silent IPv6 address doesn't hold up IPv4, and the losing attempt is cancelled."""
+        addresses = ["2001:db8::1", "93.184.216.34"]
+        ipv6_cancelled = threading.Event()
+
+        def announce_address(udp_url: str, af: socket.AddressFamily, address: tuple[str, int], *args: Any) -> dict[str, Any]:
+            cancelled = args[-1]
+            if af == socket.AF_INET6:
+                if cancelled.wait(5):
+                    ipv6_cancelled.set()
+                raise RuntimeError("UDP timeout")
+            return {"interval": 1800, "leechers": 0, "seeds": 0, "peers": []}
 
-        with pytest.raises(RuntimeError, match="UDP timeout"):
-            announce_udp("udp://tracker.example.com:6969/announce")
+        with (
+            patch("newtrackon.dnscache.resolve_ips", return_value=addresses),
+            patch("newtrackon.scraper.announce_udp_address", side_effect=announce_address),
+            patch("newtrackon.utils.HAPPY_EYEBALLS_DELAY", 0.01),
+        ):
+            result, ip = announce_udp("udp://tracker.example.com:6969/announce")
 
-    @patch("socket.getaddrinfo")
-    @patch("socket.socket")
-    def test_announce_udp_socket_creation_failure(self, mock_socket_class: MagicMock, mock_getaddrinfo: MagicMock) -> None:
-        """Test UDP announce when socket creation fails."""
-        mock_getaddrinfo.return_value = [(socket.AF_INET, socket.SOCK_DGRAM, 17, "", ("93.184.216.34", 6969))]
+        assert ip == "93.184.216.34"
+        assert result["interval"] == 1800
+        assert ipv6_cancelled.wait(1)
 
-        mock_socket_class.side_effect = OSError("Cannot create socket")
+    def test_failed_address_starts_next_immediately(self) -> None:
+        """An address that fails fast hands over to the next one without waiting for the stagger delay."""
+        addresses = ["2001:db8::1", "93.184.216.34"]
 
-        with pytest.raises(RuntimeError, match="UDP connection error"):
-            announce_udp("udp://tracker.example.com:6969/announce")
+        def announce_address(udp_url: str, af: socket.AddressFamily, address: tuple[str, int], *args: Any) -> dict[str, Any]:
+            if af == socket.AF_INET6:
+                raise RuntimeError("UDP error: Network is unreachable")
+            return {"interval": 1800, "leechers": 0, "seeds": 0, "peers": []}
 
-    @patch("socket.getaddrinfo")
-    @patch("socket.socket")
-    def test_announce_udp_connect_failure(self, mock_socket_class: MagicMock, mock_getaddrinfo: MagicMock) -> None:
-        """Test UDP announce when socket connect fails."""
-        mock_getaddrinfo.return_value = [(socket.AF_INET, socket.SOCK_DGRAM, 17, "", ("93.184.216.34", 6969))]
+        with (
+            patch("newtrackon.dnscache.resolve_ips", return_value=addresses),
+            patch("newtrackon.scraper.announce_udp_address", side_effect=announce_address),
+            patch("newtrackon.utils.HAPPY_EYEBALLS_DELAY", 60),
+        ):
+            _, ip = announce_udp("udp://tracker.example.com:6969/announce")
 
-        mock_sock = MagicMock()
-        mock_socket_class.return_value = mock_sock
-        mock_sock.connect.side_effect = OSError("Connection failed")
+        assert ip == "93.184.216.34"
 
-        with pytest.raises(RuntimeError, match="UDP connection error"):
+    def test_all_addresses_failing_reports_last_error(self) -> None:
+        """When every address fails, an error of one of the attempts is raised."""
+        addresses = ["2001:db8::1", "93.184.216.34"]
+        with (
+            patch("newtrackon.dnscache.resolve_ips", return_value=addresses),
+            patch("newtrackon.scraper.announce_udp_address", side_effect=RuntimeError("UDP timeout")),
+            pytest.raises(RuntimeError, match="UDP timeout"),
+        ):
             announce_udp("udp://tracker.example.com:6969/announce")
 
+    @patch("newtrackon.dnscache.resolve_ips", return_value=[])
+    def test_announce_udp_dns_resolution_error(self, mock_resolve_ips: MagicMock) -> None:  # pyright: ignore[reportUnusedParameter]
+        """Test UDP announce with DNS resolution error."""
+        with pytest.raises(RuntimeError, match="UDP error: Can't resolve IP"):
+            announce_udp("udp://invalid.tracker.com:6969/announce")
+
+    def test_announce_udp_timeout(self) -> None:
+        """Test UDP announce timeout."""
+        silent = UDPTrackerStandIn(answer=False)
+        try:
+            with (
+                patch("newtrackon.dnscache.resolve_ips", return_value=["127.0.0.1"]),
+                patch("newtrackon.scraper.retransmission_timeouts", return_value=[0.02, 0.04]),
+                pytest.raises(RuntimeError, match="UDP timeout"),
+            ):
+                announce_udp(f"udp://tracker.example.com:{silent.port}/announce")
+        finally:
+            silent.close()
+        assert silent.received == 2  # One retransmission schedule, not repeated by a second attempt
+        assert not udp_multiplexer.pending
+
+    def test_announce_udp_socket_creation_failure(self) -> None:
+        """Test UDP announce when no socket can be opened for the tracker's address family."""
+        with (
+            patch("newtrackon.dnscache.resolve_ips", return_value=["127.0.0.1"]),
+            patch.object(udp_multiplexer, "socket_for", side_effect=OSError("Cannot create socket")),
+            pytest.raises(RuntimeError, match="UDP connection error"),
+        ):
+            announce_udp(f"udp://tracker.example.com:{6969}/announce")
+
 
 class TestGetBEP34:
     """Test BEP34 DNS TXT record parsing."""
@@ -515,6 +596,7 @@ class TestGetBEP34:
         mock_record.__str__ = MagicMock(return_value='"BITTORRENT UDP:6969 TCP:80"')
         mock_answer = MagicMock()
         mock_answer.__iter__ = MagicMock(return_value=iter([mock_record]))
+        mock_answer.expiration = time() + 300
         mock_resolve.return_value = mock_answer
 
         valid, prefs = get_bep_34("tracker.example.com")
@@ -539,6 +621,7 @@ class TestGetBEP34:
         mock_record.__str__ = MagicMock(return_value='"v=spf1 include:example.com"')
         mock_answer = MagicMock()
         mock_answer.__iter__ = MagicMock(return_value=iter([mock_record]))
+        mock_answer.expiration = time() + 300
         mock_resolve.return_value = mock_answer
 
         valid, prefs = get_bep_34("tracker.example.com")
@@ -553,6 +636,7 @@ class TestGetBEP34:
         mock_record.__str__ = MagicMock(return_value='"BITTORRENT"')
         mock_answer = MagicMock()
         mock_answer.__iter__ = MagicMock(return_value=iter([mock_record]))
+        mock_answer.expiration = time() + 300
         mock_resolve.return_value = mock_answer
 
         valid, prefs = get_bep_34("tracker.example.com")
@@ -569,6 +653,7 @@ class TestGetBEP34:
         mock_record2.__str__ = MagicMock(return_value='"BITTORRENT UDP:1337"')
         mock_answer = MagicMock()
         mock_answer.__iter__ = MagicMock(return_value=iter([mock_record1, mock_record2]))
+        mock_answer.expiration = time() + 300
         mock_resolve.return_value = mock_answer
 
         valid, prefs = get_bep_34("tracker.example.com")
@@ -578,47 +663,88 @@ class TestGetBEP34:
 
 
 class TestMemoryLimitedGet:
-    """Test memory-limited HTTP GET functionality."""
+    """Test memory-limited, streamed HTTP GET functionality."""
 
-    @patch("requests.get")
+    @patch("requests.Session.get")
     def test_memory_limited_get_success(self, mock_get: MagicMock) -> None:
-        """Test successful GET within size limit."""
-        mock_response = MagicMock()
-        mock_response.raw.read.return_value = b"x" * 1000
+        """The body is streamed raw into the decoder, and the response closed afterwards."""
+        body = b"d8:intervali1800e5:peers6:\x01\x02\x03\x04\x1a\xe1e"
+        mock_response = streamed_response([body[:10], body[10:]])
+        mock_get.return_value = mock_response
+
+        _response, reader = memory_limited_get("http://example.com")
+
+        assert reader.response() == {"interval": 1800, "peers": [{"IP": "1.2.3.4", "port": 6881}]}
+        mock_response.raw.stream.assert_called_once_with(4096, decode_content=False)  # pyright: ignore[reportUnknownMemberType]
+        mock_response.close.assert_called_once()  # pyright: ignore[reportUnknownMemberType]
+
+    @patch("requests.Session.get")
+    def test_memory_limited_get_stops_once_decoded(self, mock_get: MagicMock) -> None:
+        """Nothing past an interval and the last peers field is read."""
+        read: list[bytes] = []
+
+        def chunks() -> Generator[bytes]:
+            for chunk in (b"d8:intervali1800e5:peers0:", b"6:peers60:", b"8:trailingi1ee"):
+                read.append(chunk)
+                yield chunk
+
+        mock_response = streamed_response([])
+        mock_response.raw.stream.return_value = chunks()
         mock_get.return_value = mock_response
 
-        _response, content = memory_limited_get("http://example.com")
+        _response, reader = memory_limited_get("http://example.com")
 
-        assert len(content) == 1000
-        mock_response.raw.read.assert_called_once_with(1024 * 1024 + 1, decode_content=True)  # pyright: ignore[reportUnknownMemberType]
+        assert read == [b"d8:intervali1800e5:peers0:", b"6:peers60:"]
+        assert reader.response() == {"interval": 1800, "peers": [], "peers6": []}
 
-    @patch("requests.get")
+    @patch("requests.Session.get")
     def test_memory_limited_get_exceeds_limit(self, mock_get: MagicMock) -> None:
         """Test GET that exceeds 1MB limit."""
-        mock_response = MagicMock()
-        mock_response.raw.read.return_value = b"x" * (1024 * 1024 + 1)
-        mock_get.return_value = mock_response
+        body = b"d5:peers%d:" % MAX_RESPONSE_SIZE + bytes(MAX_RESPONSE_SIZE)
+        mock_get.return_value = streamed_response([body[i : i + 4096] for i in range(0, len(body), 4096)])
 
         with pytest.raises(RuntimeError, match="HTTP response size above 1 MB"):
             memory_limited_get("http://example.com")
 
-    @patch("requests.get")
+    @patch("requests.Session.get")
     def test_memory_limited_get_exactly_at_limit(self, mock_get: MagicMock) -> None:
         """Test GET exactly at 1MB limit."""
-        mock_response = MagicMock()
-        mock_response.raw.read.return_value = b"x" * (1024 * 1024)
-        mock_get.return_value = mock_response
+        header = b"d8:intervali1800e5:peers"
+        padding = MAX_RESPONSE_SIZE - len(header) - len(b"1234567:e")
+        body = header + b"%d:" % padding + bytes(padding) + b"e"
+        assert len(body) == MAX_RESPONSE_SIZE
+        mock_get.return_value = streamed_response([body])
+
+        _response, reader = memory_limited_get("http://example.com")
+
+        assert reader.decoded == MAX_RESPONSE_SIZE
+        peers = reader.response()["peers"]
+        assert isinstance(peers, PeerList)
+        assert len(peers) == padding // 6
+
+    @patch("requests.Session.get")
+    def test_memory_limited_get_gzip(self, mock_get: MagicMock) -> None:
+        """gzip bodies are inflated chunk by chunk."""
+        body = gzip.compress(b"d8:intervali1800e5:peers6:\x01\x02\x03\x04\x1a\xe1e")
+        mock_get.return_value = streamed_response([body[:5], body[5:]], "gzip")
 
-        _response, content = memory_limited_get("http://example.com")
+        _response, reader = memory_limited_get("http://example.com")
 
-        assert len(content) == 1024 * 1024
+        assert reader.response()["interval"] == 1800
 
-    @patch("requests.get")
+    @patch("requests.Session.get")
+    def test_memory_limited_get_gzip_bomb(self, mock_get: MagicMock) -> None:
+        """Bodies inflating past MAX_DECOMPRESSION_RATIO are aborted, however small they are on the wire."""
+        body = gzip.compress(b"d5:peers900000:" + bytes(900000))
+        mock_get.return_value = streamed_response([body], "gzip")
+
+        with pytest.raises(RuntimeError, match="decompression ratio above 100:1"):
+            memory_limited_get("http://example.com")
+
+    @patch("requests.Session.get")
     def test_memory_limited_get_uses_correct_headers(self, mock_get: MagicMock) -> None:
         """Test that correct headers are used."""
-        mock_response = MagicMock()
-        mock_response.raw.read.return_value = b"content"
-        mock_get.return_value = mock_response
+        mock_get.return_value = streamed_response([b"content"])
 
         memory_limited_get("http://example.com")
 
@@ -629,6 +755,20 @@ class TestMemoryLimitedGet:
         assert call_kwargs["stream"] is True
         assert call_kwargs["allow_redirects"] is False
 
+    def test_memory_limited_get_binds_family_source_address(self) -> None:
+        """Restricting the IP version mounts adapters whose sockets bind that version's wildcard address."""
+        mock_response = streamed_response([b"d8:intervali1800e5:peers0:e"])
+
+        with http_burst() as burst, patch("requests.Session.get", return_value=mock_response):
+            _response, reader = memory_limited_get("http://example.com", family=socket.AF_INET6)
+            adapter = burst.sessions[socket.AF_INET6].get_adapter("http://example.com")
+
+        assert reader.response() == {"interval": 1800, "peers": []}
+        assert isinstance(adapter, SessionAdapter)
+        assert adapter.source_address == ("::", 0)
+        assert SessionAdapter(socket.AF_INET).source_address == ("0.0.0.0", 0)
+        assert SessionAdapter().source_address is None
+
 
 class TestRedactOrigin:
     """Test IP redaction functionality."""
@@ -703,6 +843,58 @@ class TestRedactOrigin:
             scraper.my_ipv6 = original_ipv6
 
 
+class TestRawResponse:
+    """Test RawResponse, the deferred pretty-printing of checked responses."""
+
+    def test_peers_are_decoded_once_rendered(self) -> None:
+        """The response keeps its peers as a view until str(), which decodes and redacts them, once."""
+        buf = struct.pack("!iIiii", 1, 1234, 1800, 5, 10) + bytes([192, 168, 1, 1, 0xC8, 0xD5])
+        response, _ = udp_parse_announce_response(buf, 1234, socket.AF_INET)
+        original_ipv4 = scraper.my_ipv4
+        scraper.my_ipv4 = "192.168.1.1"
+
+        try:
+            raw = RawResponse(response)
+            assert response["peers"].view.obj is buf
+            rendered = str(raw)
+            assert rendered == "{'interval': 1800, 'leechers': 5, 'peers': [{'IP': 'v4-redacted', 'port': 51413}], 'seeds': 10}"
+            assert str(raw) is rendered
+        finally:
+            scraper.my_ipv4 = original_ipv4
+
+    def test_saved_form_keeps_peers_compact(self) -> None:
+        """Saving marks the peers in the formatted response and keeps them in hex, formatting it once."""
+        buf = struct.pack("!iIiii", 1, 1234, 1800, 5, 10) + bytes([192, 168, 1, 1, 0xC8, 0xD5])
+        response, _ = udp_parse_announce_response(buf, 1234, socket.AF_INET)
+        raw = RawResponse(response)
+
+        saved = raw.saved()
+        assert saved == {
+            "response": "{'interval': 1800, 'leechers': 5, 'peers': <peers>, 'seeds': 10}",
+            "peers": {"peers": "c0a80101c8d5"},
+        }
+        assert raw.saved() is saved
+        assert raw.pretty is None
+
+    def test_restored_response_renders_its_peers(self) -> None:
+        """A response loaded back from its saved form renders the same as before it was saved."""
+        buf = struct.pack("!iIiii", 1, 1234, 1800, 5, 10) + bytes([192, 168, 1, 1, 0xC8, 0xD5])
+        response, _ = udp_parse_announce_response(buf, 1234, socket.AF_INET)
+        raw = RawResponse(response)
+        history: list[HistoryData] = [
+            {"url": "udp://t.example:6969", "time": 1, "status": 1, "ip": "1.2.3.4", "info": raw.saved()},
+            {"url": "udp://t.example:6969", "time": 1, "status": 0, "ip": "1.2.3.4", "info": "UDP timeout"},
+        ]
+
+        scraper.restore_raw_history(history)
+
+        restored = history[0]["info"]
+        assert isinstance(restored, RawResponse)
+        assert str(restored) == str(raw)
+        assert restored.saved() == raw.saved()
+        assert history[1]["info"] == "UDP timeout"
+
+
 class TestAttemptUDP:
     """Test attempt_udp function."""
 
@@ -971,13 +1163,13 @@ class TestAttemptSubmitted:
 
     @patch("newtrackon.scraper.get_bep_34")
     @patch("newtrackon.scraper.attempt_all_protocols")
-    @patch("socket.getaddrinfo")
+    @patch("newtrackon.dnscache.resolve_ips")
     def test_attempt_submitted_no_bep34(
-        self, mock_getaddrinfo: MagicMock, mock_all_protocols: MagicMock, mock_bep34: MagicMock
+        self, mock_resolve_ips: MagicMock, mock_all_protocols: MagicMock, mock_bep34: MagicMock
     ) -> None:
         """Test submitted tracker without BEP34."""
 
-        mock_getaddrinfo.return_value = [(2, 1, 6, "", ("93.184.216.34", 6969))]
+        mock_resolve_ips.return_value = ["93.184.216.34"]
         mock_bep34.return_value = (False, None)
         mock_all_protocols.return_value = (1800, "udp://tracker.example.com:6969/announce", 50)
 
@@ -993,12 +1185,12 @@ class TestAttemptSubmitted:
 
     @patch("newtrackon.scraper.get_bep_34")
     @patch("newtrackon.scraper.attempt_from_txt_prefs")
-    @patch("socket.getaddrinfo")
+    @patch("newtrackon.dnscache.resolve_ips")
     def test_attempt_submitted_with_bep34(
-        self, mock_getaddrinfo: MagicMock, mock_txt_prefs: MagicMock, mock_bep34: MagicMock
+        self, mock_resolve_ips: MagicMock, mock_txt_prefs: MagicMock, mock_bep34: MagicMock
     ) -> None:
         """Test submitted tracker with valid BEP34."""
-        mock_getaddrinfo.return_value = [(2, 1, 6, "", ("93.184.216.34", 6969))]
+        mock_resolve_ips.return_value = ["93.184.216.34"]
         mock_bep34.return_value = (True, [("udp", 6969)])
         mock_txt_prefs.return_value = (1800, "udp://tracker.example.com:6969/announce", 50)
 
@@ -1014,12 +1206,12 @@ class TestAttemptSubmitted:
 
     @patch("newtrackon.scraper.get_bep_34")
     @patch("newtrackon.persistence.submitted_data", new_callable=lambda: deque[str](maxlen=100))
-    @patch("socket.getaddrinfo")
+    @patch("newtrackon.dnscache.resolve_ips")
     def test_attempt_submitted_bep34_denies(
-        self, mock_getaddrinfo: MagicMock, mock_submitted_data: MagicMock, mock_bep34: MagicMock
+        self, mock_resolve_ips: MagicMock, mock_submitted_data: MagicMock, mock_bep34: MagicMock
     ) -> None:
         """Test submitted tracker with BEP34 that denies connection."""
-        mock_getaddrinfo.return_value = [(2, 1, 6, "", ("93.184.216.34", 6969))]
+        mock_resolve_ips.return_value = ["93.184.216.34"]
         mock_bep34.return_value = (True, [])  # Empty list = deny
 
         tracker = MagicMock()
@@ -1030,12 +1222,12 @@ class TestAttemptSubmitted:
 
     @patch("newtrackon.scraper.get_bep_34")
     @patch("newtrackon.scraper.attempt_all_protocols")
-    @patch("socket.getaddrinfo")
+    @patch("newtrackon.dnscache.resolve_ips")
     def test_attempt_submitted_dns_failure(
-        self, mock_getaddrinfo: MagicMock, mock_all_protocols: MagicMock, mock_bep34: MagicMock
+        self, mock_resolve_ips: MagicMock, mock_all_protocols: MagicMock, mock_bep34: MagicMock
     ) -> None:
         """Test submitted tracker with DNS resolution failure."""
-        mock_getaddrinfo.side_effect = OSError("DNS failure")
+        mock_resolve_ips.return_value = []
         mock_bep34.return_value = (False, None)
         mock_all_protocols.return_value = (1800, "url", 50)
 
@@ -1092,7 +1284,7 @@ class TestGlobalConstants:
         """Test SCRAPING_HEADERS configuration."""
         assert scraper.SCRAPING_HEADERS["User-Agent"] == "qBittorrent/4.3.9"
         assert scraper.SCRAPING_HEADERS["Accept-Encoding"] == "gzip"
-        assert scraper.SCRAPING_HEADERS["Connection"] == "close"
+        assert "Connection" not in scraper.SCRAPING_HEADERS  # Keep-alive, connections are reused within a check
 
 
 class TestEdgeCases:
@@ -1159,7 +1351,7 @@ class TestEdgeCases:
         bencoded = b"d8:intervali1800e6:peers618:\x20\x01\x0d\xb8\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x01\x1a\xe1e"
         mock_response = MagicMock()
         mock_response.status_code = 200
-        mock_get.return_value = (mock_response, bencoded)
+        mock_get.return_value = (mock_response, read_body(bencoded))
 
         result = announce_http("http://tracker.example.com/announce", b"\x00" * 20)
 
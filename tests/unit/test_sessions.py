@@ -0,0 +1,205 @@
+"""Tests for the pooled HTTP sessions and TLS session resumption in newtrackon.sessions.
+
+Requests go to local HTTP(S) servers bound to 127.0.0.1, resolved as localhost through a seeded DNS cache, so no
+external network access is needed.
+"""
+
+import socket
+import ssl
+import threading
+from collections.abc import Generator
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from time import perf_counter, time
+from typing import Any, cast
+from unittest.mock import patch
+
+import pytest
+import requests
+from urllib3.util.connection import create_connection as real_create_connection
+
+from newtrackon.dnscache import Resolution, dns_cache
+from newtrackon.sessions import TLSSessionCache, create_tls_context, current_burst, http_burst
+
+CERTIFICATE = Path(__file__).parent.parent / "data" / "localhost.pem"
+
+
+class AnnounceHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive
+
+    def do_GET(self) -> None:
+        server = self.server
+        assert isinstance(server, LocalTracker)
+        server.connections.add(self.client_address)
+        if isinstance(self.connection, ssl.SSLSocket):
+            server.resumed.append(self.connection.session_reused)
+        body = b"d8:intervali1800e5:peers0:e"
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: object) -> None:
+        pass
+
+
+class LocalTracker(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, tls: bool) -> None:
+        super().__init__(("127.0.0.1", 0), AnnounceHandler)
+        self.connections: set[tuple[str, int]] = set()
+        self.resumed: list[bool | None] = []
+        if tls:
+            context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+            context.load_cert_chain(CERTIFICATE)
+            self.socket = context.wrap_socket(self.socket, server_side=True)
+        self.url = f"{'https' if tls else 'http'}://localhost:{self.server_address[1]}/announce"
+
+
+def serve(tls: bool) -> Generator[LocalTracker]:
+    dns_cache.put(("localhost", "A"), Resolution(("127.0.0.1",), None, time() + 300, 0))
+    dns_cache.put(("localhost", "AAAA"), Resolution((), None, time() + 300, 0))
+    server = LocalTracker(tls)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def http_tracker() -> Generator[LocalTracker]:
+    yield from serve(tls=False)
+
+
+@pytest.fixture
+def https_tracker() -> Generator[LocalTracker]:
+    context = create_tls_context()
+    context.load_verify_locations(CERTIFICATE)
+    with patch("newtrackon.sessions.tls_context", context):
+        yield from serve(tls=True)
+
+
+def announce(url: str) -> bytes:
+    burst = current_burst()
+    assert burst is not None
+    response = burst.get(url, socket.AF_UNSPEC, timeout=5)
+    return response.content
+
+
+class TestHTTPBurst:
+    """Tests for HTTPBurst and http_burst."""
+
+    def test_connection_is_reused_within_a_burst(self, http_tracker: LocalTracker) -> None:
+        """A second request of the same burst rides the first one's connection, which is reported as reused."""
+        with http_burst() as burst:
+            announce(http_tracker.url)
+            first = burst.setups[socket.AF_UNSPEC]
+            announce(http_tracker.url)
+            second = burst.setups[socket.AF_UNSPEC]
+
+        assert len(http_tracker.connections) == 1
+        assert not first.reused
+        assert second.reused
+        assert second.handshake == first.handshake
+
+    def test_bursts_dont_share_connections(self, http_tracker: LocalTracker) -> None:
+        """Connections are closed with their burst."""
+        with http_burst():
+            announce(http_tracker.url)
+        with http_burst():
+            announce(http_tracker.url)
+
+        assert len(http_tracker.connections) == 2
+
+    def test_nested_and_joined_bursts(self) -> None:
+        """Nested bursts reuse the running one, and other threads can join it explicitly."""
+        joined: list[object] = []
+        with http_burst() as outer:
+            with http_burst() as inner:
+                assert inner is outer
+
+            def join() -> None:
+                with http_burst(outer) as burst:
+                    joined.append(burst)
+                joined.append(current_burst())
+
+            thread = threading.Thread(target=join)
+            thread.start()
+            thread.join()
+
+            assert current_burst() is outer
+        assert joined == [outer, None]
+        assert current_burst() is None
+
+
+class TestHappyEyeballs:
+    """Tests for the connection race of TimedHTTPConnection over a host's addresses."""
+
+    def test_hanging_address_does_not_hold_up_the_next(self, http_tracker: LocalTracker) -> None:
+        """While the IPv6 address hangs, the IPv4 one is tried after HAPPY_EYEBALLS_DELAY and carries the request."""
+        dns_cache.put(("localhost", "AAAA"), Resolution(("2001:db8::1",), None, time() + 300, 0))
+        released = threading.Event()
+
+        def create_connection(address: tuple[str, int], *args: Any, **kwargs: Any) -> socket.socket:
+            if address[0] == "2001:db8::1":
+                released.wait(5)
+                raise TimeoutError
+            return real_create_connection(address, *args, **kwargs)
+
+        with patch("newtrackon.sessions.connection.create_connection", side_effect=create_connection), http_burst():
+            started = perf_counter()
+            assert announce(http_tracker.url) == b"d8:intervali1800e5:peers0:e"
+            elapsed = perf_counter() - started
+        released.set()
+
+        assert elapsed < 2
+        assert len(http_tracker.connections) == 1
+
+    def test_every_address_failing(self, http_tracker: LocalTracker) -> None:
+        """The request fails once every address refused the connection."""
+        dns_cache.put(("localhost", "AAAA"), Resolution(("2001:db8::1",), None, time() + 300, 0))
+        refused = patch("newtrackon.sessions.connection.create_connection", side_effect=ConnectionRefusedError)
+        with refused as create_connection, http_burst(), pytest.raises(requests.ConnectionError):
+            announce(http_tracker.url)
+
+        assert {call.args[0][0] for call in create_connection.call_args_list} == {"2001:db8::1", "127.0.0.1"}
+        assert not http_tracker.connections
+
+
+class TestTLSResumption:
+    """Tests for TLS session resumption through ResumingSSLContext."""
+
+    def test_session_is_resumed_across_bursts(self, https_tracker: LocalTracker) -> None:
+        """The second connection to a server resumes the session it issued on the first one."""
+        with http_burst():
+            assert announce(https_tracker.url) == b"d8:intervali1800e5:peers0:e"
+        with http_burst():
+            announce(https_tracker.url)
+
+        assert len(https_tracker.connections) == 2
+        assert https_tracker.resumed == [False, True]
+
+
+class TestTLSSessionCache:
+    """Tests for TLSSessionCache."""
+
+    def test_expired_and_evicted_sessions(self) -> None:
+        """Sessions past their lifetime are dropped, and the oldest one goes when the cache is full."""
+
+        class Session:
+            def __init__(self, issued: float) -> None:
+                self.time = issued
+                self.timeout = 100
+
+        cache = TLSSessionCache(size=2)
+        cache.put(("expired.example.com", 443), cast(ssl.SSLSession, Session(0)))
+        assert cache.get(("expired.example.com", 443)) is None
+
+        fresh = [Session(2**40) for _ in range(3)]
+        for port, session in enumerate(fresh):
+            cache.put(("tracker.example.com", port), cast(ssl.SSLSession, session))
+
+        assert cache.get(("tracker.example.com", 0)) is None
+        assert cache.get(("tracker.example.com", 2)) is fresh[2]
@@ -1,15 +1,20 @@
 """Comprehensive tests for the Tracker class in newtrackon.tracker module."""
 
+import asyncio
 import socket
 from collections import deque
+from queue import Queue
 from time import time
 from typing import Any
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, patch
 
 import pytest
 
+from newtrackon.bdecode import BDecodeResponse
+from newtrackon.geoip import GeoInfo
 from newtrackon.scraper import ScraperResult
-from newtrackon.tracker import Tracker, max_downtime
+from newtrackon.sessions import ConnectionSetup, current_burst, http_burst
+from newtrackon.tracker import FamilyProbe, Tracker, max_downtime
 
 
 class TestTrackerInit:
@@ -285,9 +290,7 @@ class TestFromUrl:
 
     def test_from_url_creates_tracker(self, mock_network: dict[str, Any]) -> None:
         """Test that from_url creates a Tracker with correct initial values."""
-        mock_network["getaddrinfo"].return_value = [  # pyright: ignore[reportUnknownMemberType]
-            (socket.AF_INET, socket.SOCK_DGRAM, 17, "", ("93.184.216.34", 6969)),
-        ]
+        mock_network["resolve_ips"].return_value = ["93.184.216.34"]  # pyright: ignore[reportUnknownMemberType]
 
         tracker = Tracker.from_url("udp://tracker.example.com:6969")
 
@@ -300,9 +303,7 @@ class TestFromUrl:
 
     def test_from_url_resolves_ipv4(self, mock_network: dict[str, Any]) -> None:
         """Test that from_url resolves IPv4 addresses."""
-        mock_network["getaddrinfo"].return_value = [  # pyright: ignore[reportUnknownMemberType]
-            (socket.AF_INET, socket.SOCK_DGRAM, 17, "", ("1.2.3.4", 6969)),
-        ]
+        mock_network["resolve_ips"].return_value = ["1.2.3.4"]  # pyright: ignore[reportUnknownMemberType]
 
         tracker = Tracker.from_url("udp://tracker.example.com:6969")
 
@@ -311,9 +312,7 @@ class TestFromUrl:
 
     def test_from_url_resolves_ipv6(self, mock_network: dict[str, Any]) -> None:
         """Test that from_url resolves IPv6 addresses."""
-        mock_network["getaddrinfo"].return_value = [  # pyright: ignore[reportUnknownMemberType]
-            (socket.AF_INET6, socket.SOCK_DGRAM, 17, "", ("2606:2800:21f:cb07:6820:80da:af6b:8b2c", 6969, 0, 0)),
-        ]
+        mock_network["resolve_ips"].return_value = ["2606:2800:21f:cb07:6820:80da:af6b:8b2c"]  # pyright: ignore[reportUnknownMemberType]
 
         tracker = Tracker.from_url("udp://tracker.example.com:6969")
 
@@ -322,10 +321,7 @@ class TestFromUrl:
 
     def test_from_url_orders_ipv6_first(self, mock_network: dict[str, Any]) -> None:
         """Test that from_url orders IPv6 addresses before IPv4."""
-        mock_network["getaddrinfo"].return_value = [  # pyright: ignore[reportUnknownMemberType]
-            (socket.AF_INET, socket.SOCK_DGRAM, 17, "", ("1.2.3.4", 6969)),
-            (socket.AF_INET6, socket.SOCK_DGRAM, 17, "", ("2606:2800:21f:cb07:6820:80da:af6b:8b2c", 6969, 0, 0)),
-        ]
+        mock_network["resolve_ips"].return_value = ["1.2.3.4", "2606:2800:21f:cb07:6820:80da:af6b:8b2c"]  # pyright: ignore[reportUnknownMemberType]
 
         tracker = Tracker.from_url("udp://tracker.example.com:6969")
 
@@ -340,16 +336,14 @@ class TestFromUrl:
 
     def test_from_url_dns_failure_raises(self, mock_network: dict[str, Any]) -> None:
         """Test that from_url raises RuntimeError when DNS resolution fails."""
-        mock_network["getaddrinfo"].side_effect = OSError("Name resolution failed")  # pyright: ignore[reportUnknownMemberType]
+        mock_network["resolve_ips"].return_value = []  # pyright: ignore[reportUnknownMemberType]
 
         with pytest.raises(RuntimeError, match="Can't resolve IP"):
             Tracker.from_url("udp://nonexistent.tracker.com:6969")
 
     def test_from_url_sets_added_timestamp(self, mock_network: dict[str, Any]) -> None:
         """Test that from_url sets the added timestamp."""
-        mock_network["getaddrinfo"].return_value = [  # pyright: ignore[reportUnknownMemberType]
-            (socket.AF_INET, socket.SOCK_DGRAM, 17, "", ("1.2.3.4", 6969)),
-        ]
+        mock_network["resolve_ips"].return_value = ["1.2.3.4"]  # pyright: ignore[reportUnknownMemberType]
 
         before = int(time())
         tracker = Tracker.from_url("udp://tracker.example.com:6969")
@@ -443,14 +437,73 @@ class TestIsUpIsDown:
         assert sample_tracker.historic[-1] == 0
 
 
+class TestCheckInterval:
+    """Tests for Tracker.check_interval backoff of long-dead trackers."""
+
+    def test_up_tracker_uses_its_interval(self, sample_tracker: Tracker) -> None:
+        """A working tracker is checked at its own interval."""
+        assert sample_tracker.check_interval() == 1800
+
+    def test_recently_down_tracker_is_not_backed_off(self, sample_tracker: Tracker) -> None:
+        """Less than a day of downtime keeps the normal interval."""
+        sample_tracker.status = 0
+        sample_tracker.last_checked = sample_tracker.last_uptime + 86399
+        assert sample_tracker.check_interval() == 1800
+
+    @pytest.mark.parametrize(
+        ("days_down", "expected"),
+        [(1, 3600), (2, 7200), (3, 7200), (4, 14400), (8, 28800), (16, 57600), (32, 86400), (500, 86400)],
+    )
+    def test_interval_doubles_with_downtime_up_to_cap(self, sample_tracker: Tracker, days_down: int, expected: int) -> None:
+        """The interval doubles every time the downtime doubles, capped at one day."""
+        sample_tracker.status = 0
+        sample_tracker.last_checked = sample_tracker.last_uptime + days_down * 86400
+        assert sample_tracker.check_interval() == expected
+
+    def test_backoff_resets_on_first_success(self, sample_tracker: Tracker) -> None:
+        """A single successful announce brings the tracker back to its interval."""
+        sample_tracker.status = 0
+        sample_tracker.last_checked = sample_tracker.last_uptime + 30 * 86400
+        sample_tracker.is_up()
+        assert sample_tracker.check_interval() == 1800
+
+    def test_backed_off_failure_is_weighted_by_covered_time(self, sample_tracker: Tracker) -> None:
+        """A down check eight intervals after the previous one counts as eight samples in historic."""
+        sample_tracker.status = 0
+        sample_tracker.historic = deque([1] * 4, maxlen=1000)
+        sample_tracker.last_checked = int(time()) - 8 * 1800 - 300
+        sample_tracker.mark_checked()
+        sample_tracker.is_down()
+        sample_tracker.update_uptime()
+
+        assert list(sample_tracker.historic) == [1] * 4 + [0] * 8
+        assert sample_tracker.uptime == pytest.approx(100 / 3)
+
+    def test_failure_weight_ignores_next_interval(self, sample_tracker: Tracker) -> None:
+        """A check that just crossed a backoff step covered one interval, though the next one is longer."""
+        sample_tracker.status = 0
+        sample_tracker.last_uptime = int(time()) - 2 * 86400
+        sample_tracker.last_checked = int(time()) - 1800
+        sample_tracker.mark_checked()
+        assert sample_tracker.check_interval() == 7200
+        assert sample_tracker.down_weight() == 1
+
+    def test_first_or_overdue_check_weight_is_bounded(self, sample_tracker: Tracker) -> None:
+        """A first check counts once, and a check after a long pause counts for at most a day."""
+        sample_tracker.last_checked = 0
+        sample_tracker.mark_checked()
+        assert sample_tracker.down_weight() == 1
+
+        sample_tracker.previous_check = sample_tracker.last_checked - 30 * 86400
+        assert sample_tracker.down_weight() == 86400 // 1800
+
+
 class TestUpdateIps:
     """Tests for Tracker.update_ips method."""
 
     def test_update_ips_resolves_ipv4(self, sample_tracker: Tracker, mock_network: dict[str, Any]) -> None:
         """Test that update_ips resolves IPv4 addresses."""
-        mock_network["getaddrinfo"].return_value = [  # pyright: ignore[reportUnknownMemberType]
-            (socket.AF_INET, socket.SOCK_DGRAM, 17, "", ("93.184.216.34", 6969)),
-        ]
+        mock_network["resolve_ips"].return_value = ["93.184.216.34"]  # pyright: ignore[reportUnknownMemberType]
 
         sample_tracker.update_ips()
 
@@ -458,9 +511,7 @@ class TestUpdateIps:
 
     def test_update_ips_resolves_ipv6(self, sample_tracker: Tracker, mock_network: dict[str, Any]) -> None:
         """Test that update_ips resolves IPv6 addresses."""
-        mock_network["getaddrinfo"].return_value = [  # pyright: ignore[reportUnknownMemberType]
-            (socket.AF_INET6, socket.SOCK_DGRAM, 17, "", ("2606:2800:21f:cb07:6820:80da:af6b:8b2c", 6969, 0, 0)),
-        ]
+        mock_network["resolve_ips"].return_value = ["2606:2800:21f:cb07:6820:80da:af6b:8b2c"]  # pyright: ignore[reportUnknownMemberType]
 
         sample_tracker.update_ips()
 
@@ -468,10 +519,7 @@ class TestUpdateIps:
 
     def test_update_ips_orders_ipv6_before_ipv4(self, sample_tracker: Tracker, mock_network: dict[str, Any]) -> None:
         """Test that update_ips orders IPv6 addresses before IPv4."""
-        mock_network["getaddrinfo"].return_value = [  # pyright: ignore[reportUnknownMemberType]
-            (socket.AF_INET, socket.SOCK_DGRAM, 17, "", ("93.184.216.34", 6969)),
-            (socket.AF_INET6, socket.SOCK_DGRAM, 17, "", ("2606:2800:21f:cb07:6820:80da:af6b:8b2c", 6969, 0, 0)),
-        ]
+        mock_network["resolve_ips"].return_value = ["93.184.216.34", "2606:2800:21f:cb07:6820:80da:af6b:8b2c"]  # pyright: ignore[reportUnknownMemberType]
 
         sample_tracker.update_ips()
 
@@ -479,10 +527,7 @@ class TestUpdateIps:
 
     def test_update_ips_deduplicates(self, sample_tracker: Tracker, mock_network: dict[str, Any]) -> None:
         """Test that update_ips removes duplicate IPs."""
-        mock_network["getaddrinfo"].return_value = [  # pyright: ignore[reportUnknownMemberType]
-            (socket.AF_INET, socket.SOCK_DGRAM, 17, "", ("93.184.216.34", 6969)),
-            (socket.AF_INET, socket.SOCK_STREAM, 6, "", ("93.184.216.34", 6969)),
-        ]
+        mock_network["resolve_ips"].return_value = ["93.184.216.34"]  # pyright: ignore[reportUnknownMemberType]
 
         sample_tracker.update_ips()
 
@@ -490,7 +535,7 @@ class TestUpdateIps:
 
     def test_update_ips_dns_failure_raises(self, sample_tracker: Tracker, mock_network: dict[str, Any]) -> None:
         """Test that update_ips raises RuntimeError on DNS failure."""
-        mock_network["getaddrinfo"].side_effect = OSError("DNS failure")  # pyright: ignore[reportUnknownMemberType]
+        mock_network["resolve_ips"].return_value = []  # pyright: ignore[reportUnknownMemberType]
 
         with pytest.raises(RuntimeError, match="Can't resolve IP"):
             sample_tracker.update_ips()
@@ -499,16 +544,14 @@ class TestUpdateIps:
 
     def test_update_ips_empty_result_raises(self, sample_tracker: Tracker, mock_network: dict[str, Any]) -> None:
         """Test that update_ips raises RuntimeError when no IPs returned."""
-        mock_network["getaddrinfo"].return_value = []  # pyright: ignore[reportUnknownMemberType]
+        mock_network["resolve_ips"].return_value = []  # pyright: ignore[reportUnknownMemberType]
 
         with pytest.raises(RuntimeError, match="Can't resolve IP"):
             sample_tracker.update_ips()
 
     def test_update_ips_rejects_non_global_ipv4(self, sample_tracker: Tracker, mock_network: dict[str, Any]) -> None:
         """Test that update_ips rejects private/non-global IPv4 addresses."""
-        mock_network["getaddrinfo"].return_value = [  # pyright: ignore[reportUnknownMemberType]
-            (socket.AF_INET, socket.SOCK_DGRAM, 17, "", ("192.168.1.1", 6969)),
-        ]
+        mock_network["resolve_ips"].return_value = ["192.168.1.1"]  # pyright: ignore[reportUnknownMemberType]
 
         with pytest.raises(RuntimeError, match="not globally routable"):
             sample_tracker.update_ips()
@@ -518,9 +561,7 @@ class TestUpdateIps:
 
     def test_update_ips_rejects_non_global_ipv6(self, sample_tracker: Tracker, mock_network: dict[str, Any]) -> None:
         """Test that update_ips rejects non-global IPv6 addresses (documentation prefix)."""
-        mock_network["getaddrinfo"].return_value = [  # pyright: ignore[reportUnknownMemberType]
-            (socket.AF_INET6, socket.SOCK_DGRAM, 17, "", ("2001:db8::1", 6969, 0, 0)),
-        ]
+        mock_network["resolve_ips"].return_value = ["2001:db8::1"]  # pyright: ignore[reportUnknownMemberType]
 
         with pytest.raises(RuntimeError, match="not globally routable"):
             sample_tracker.update_ips()
@@ -530,9 +571,7 @@ class TestUpdateIps:
 
     def test_update_ips_rejects_loopback(self, sample_tracker: Tracker, mock_network: dict[str, Any]) -> None:
         """Test that update_ips rejects loopback addresses."""
-        mock_network["getaddrinfo"].return_value = [  # pyright: ignore[reportUnknownMemberType]
-            (socket.AF_INET, socket.SOCK_DGRAM, 17, "", ("127.0.0.1", 6969)),
-        ]
+        mock_network["resolve_ips"].return_value = ["127.0.0.1"]  # pyright: ignore[reportUnknownMemberType]
 
         with pytest.raises(RuntimeError, match="not globally routable"):
             sample_tracker.update_ips()
@@ -542,9 +581,7 @@ class TestUpdateIps:
 
     def test_update_ips_rejects_unspecified(self, sample_tracker: Tracker, mock_network: dict[str, Any]) -> None:
         """Test that update_ips rejects unspecified address (0.0.0.0)."""
-        mock_network["getaddrinfo"].return_value = [  # pyright: ignore[reportUnknownMemberType]
-            (socket.AF_INET, socket.SOCK_DGRAM, 17, "", ("0.0.0.0", 6969)),
-        ]
+        mock_network["resolve_ips"].return_value = ["0.0.0.0"]  # pyright: ignore[reportUnknownMemberType]
 
         with pytest.raises(RuntimeError, match="not globally routable"):
             sample_tracker.update_ips()
@@ -561,17 +598,14 @@ class TestUpdateStatus:
         # Set last_uptime to recent time to avoid deletion check
         sample_tracker.last_uptime = int(time())
 
-        mock_getaddrinfo_return = [
-            (socket.AF_INET, socket.SOCK_DGRAM, 17, "", ("93.184.216.34", 6969)),
-        ]
+        resolved_ips = ["93.184.216.34"]
 
         with (
             patch("newtrackon.tracker.scraper.get_bep_34", return_value=(False, None)),
             patch("newtrackon.tracker.scraper.announce_udp") as mock_announce,
             patch("newtrackon.tracker.scraper.redact_origin", return_value="mocked"),
             patch("newtrackon.tracker.persistence.raw_data", deque[dict[str, Any]]()),
-            patch("newtrackon.tracker.socket.getaddrinfo", return_value=mock_getaddrinfo_return),
-            patch.object(sample_tracker, "update_ipapi_data"),
+            patch("newtrackon.dnscache.resolve_ips", return_value=resolved_ips),
         ):
             mock_announce.return_value = ({"interval": 1800, "seeds": 100, "leechers": 50, "peers": []}, "93.184.216.34")
 
@@ -587,17 +621,14 @@ class TestUpdateStatus:
         # Set last_uptime to recent time to avoid deletion check
         sample_tracker.last_uptime = int(time())
 
-        mock_getaddrinfo_return = [
-            (socket.AF_INET, socket.SOCK_DGRAM, 17, "", ("93.184.216.34", 80)),
-        ]
+        resolved_ips = ["93.184.216.34"]
 
         with (
             patch("newtrackon.tracker.scraper.get_bep_34", return_value=(False, None)),
             patch("newtrackon.tracker.scraper.announce_http") as mock_announce,
             patch("newtrackon.tracker.scraper.redact_origin", return_value="mocked"),
             patch("newtrackon.tracker.persistence.raw_data", deque[dict[str, Any]]()),
-            patch("newtrackon.tracker.socket.getaddrinfo", return_value=mock_getaddrinfo_return),
-            patch.object(sample_tracker, "update_ipapi_data"),
+            patch("newtrackon.dnscache.resolve_ips", return_value=resolved_ips),
         ):
             mock_announce.return_value = {"interval": 1800, "complete": 100, "incomplete": 50, "peers": []}
 
@@ -610,15 +641,12 @@ class TestUpdateStatus:
         self, sample_tracker: Tracker, mock_network: dict[str, Any], reset_globals: None
     ) -> None:  # pyright: ignore[reportUnusedParameter]
         """Test update_status when announce fails."""
-        mock_network["getaddrinfo"].return_value = [  # pyright: ignore[reportUnknownMemberType]
-            (socket.AF_INET, socket.SOCK_DGRAM, 17, "", ("93.184.216.34", 6969)),
-        ]
+        mock_network["resolve_ips"].return_value = ["93.184.216.34"]  # pyright: ignore[reportUnknownMemberType]
 
         with (
             patch("newtrackon.tracker.scraper.get_bep_34", return_value=(False, None)),
             patch("newtrackon.tracker.scraper.announce_udp") as mock_announce,
             patch("newtrackon.tracker.persistence.raw_data", deque[dict[str, Any]]()),
-            patch.object(sample_tracker, "update_ipapi_data"),
         ):
             mock_announce.side_effect = RuntimeError("UDP timeout")
 
@@ -640,7 +668,7 @@ class TestUpdateStatus:
 
     def test_update_status_dns_failure(self, sample_tracker: Tracker, mock_network: dict[str, Any], reset_globals: None) -> None:  # pyright: ignore[reportUnusedParameter]
         """Test update_status handles DNS resolution failure."""
-        mock_network["getaddrinfo"].side_effect = OSError("DNS failure")  # pyright: ignore[reportUnknownMemberType]
+        mock_network["resolve_ips"].return_value = []  # pyright: ignore[reportUnknownMemberType]
 
         with (
             patch("newtrackon.tracker.scraper.get_bep_34", return_value=(False, None)),
@@ -654,15 +682,12 @@ class TestUpdateStatus:
         self, sample_tracker: Tracker, mock_network: dict[str, Any], reset_globals: None
     ) -> None:  # pyright: ignore[reportUnusedParameter]
         """Test that interval is set to 10800 when uptime is 0."""
-        mock_network["getaddrinfo"].return_value = [  # pyright: ignore[reportUnknownMemberType]
-            (socket.AF_INET, socket.SOCK_DGRAM, 17, "", ("93.184.216.34", 6969)),
-        ]
+        mock_network["resolve_ips"].return_value = ["93.184.216.34"]  # pyright: ignore[reportUnknownMemberType]
 
         with (
             patch("newtrackon.tracker.scraper.get_bep_34", return_value=(False, None)),
             patch("newtrackon.tracker.scraper.announce_udp") as mock_announce,
             patch("newtrackon.tracker.persistence.raw_data", deque[dict[str, Any]]()),
-            patch.object(sample_tracker, "update_ipapi_data"),
         ):
             mock_announce.side_effect = RuntimeError("UDP timeout")
             sample_tracker.historic = deque([0] * 10, maxlen=1000)
@@ -672,6 +697,137 @@ class TestUpdateStatus:
             assert sample_tracker.interval == 10800
 
 
+class TestUpdateStatusAsync:
+    """Tests for Tracker.update_status_async method."""
+
+    def test_update_status_async_udp_success(self, sample_tracker: Tracker, reset_globals: None) -> None:  # pyright: ignore[reportUnusedParameter]
+        """The asyncio engine records an UP check like the threaded one."""
+        sample_tracker.last_uptime = int(time())
+
+        with (
+            patch("newtrackon.tracker.aioscraper.get_bep_34", AsyncMock(return_value=(False, None))),
+            patch("newtrackon.tracker.aioscraper.resolve_ips", AsyncMock(return_value={"93.184.216.34"})),
+            patch("newtrackon.tracker.aioscraper.announce_udp", AsyncMock()) as mock_announce,
+            patch("newtrackon.tracker.persistence.raw_data", deque[dict[str, Any]]()) as raw_data,
+        ):
+            mock_announce.return_value = ({"interval": 1800, "seeds": 100, "leechers": 50, "peers": []}, "93.184.216.34")
+
+            asyncio.run(sample_tracker.update_status_async())
+
+            assert sample_tracker.status == 1
+            assert sample_tracker.interval == 1800
+            assert sample_tracker.ips == ["93.184.216.34"]
+            assert raw_data[0]["status"] == 1
+
+    def test_update_status_async_unresolvable(self, sample_tracker: Tracker, reset_globals: None) -> None:  # pyright: ignore[reportUnusedParameter]
+        """A hostname without A/AAAA records clears the tracker."""
+        sample_tracker.last_uptime = int(time())
+
+        with (
+            patch("newtrackon.tracker.aioscraper.get_bep_34", AsyncMock(return_value=(False, None))),
+            patch("newtrackon.tracker.aioscraper.resolve_ips", AsyncMock(return_value=set())),
+            patch("newtrackon.tracker.persistence.raw_data", deque[dict[str, Any]]()) as raw_data,
+        ):
+            asyncio.run(sample_tracker.update_status_async())
+
+            assert sample_tracker.status == 0
+            assert raw_data[0]["info"] == "Can't resolve IP"
+
+
+class TestFamilyHealth:
+    """Tests for per IP version probing and health."""
+
+    def test_ip_versions(self, sample_tracker: Tracker) -> None:
+        """Versions come from the resolved addresses, IPv6 first, or 0 when they are unknown."""
+        sample_tracker.ips = ["93.184.216.34", "2001:db8::1"]
+        assert sample_tracker.ip_versions() == [6, 4]
+        sample_tracker.ips = ["93.184.216.34"]
+        assert sample_tracker.ip_versions() == [4]
+        sample_tracker.ips = None
+        assert sample_tracker.ip_versions() == [0]
+
+    def test_dual_stack_partial_outage(self, sample_tracker: Tracker, reset_globals: None) -> None:  # pyright: ignore[reportUnusedParameter]
+        """A tracker down over IPv6 but up over IPv4 is UP overall, with IPv6 recorded as down."""
+        sample_tracker.ips = ["93.184.216.34", "2001:db8::1"]
+        sample_tracker.last_uptime = int(time())
+
+        def announce_udp(url: str, latency: int | None = None, family: socket.AddressFamily = socket.AF_UNSPEC) -> Any:
+            if family == socket.AF_INET6:
+                raise RuntimeError("UDP timeout")
+            return {"interval": 1800, "seeds": 1, "leechers": 1, "peers": []}, "93.184.216.34"
+
+        with (
+            patch("newtrackon.tracker.scraper.announce_udp", side_effect=announce_udp) as mock_announce,
+            patch("newtrackon.tracker.persistence.raw_data", deque[dict[str, Any]]()),
+        ):
+            sample_tracker.record_probes(sample_tracker.probe_families(), time())
+
+        assert {call.kwargs["family"] for call in mock_announce.call_args_list} == {socket.AF_INET, socket.AF_INET6}
+        assert sample_tracker.status == 1
+        assert sample_tracker.family_health[4].status == 1
+        assert sample_tracker.family_health[4].uptime == 100
+        assert sample_tracker.family_health[6].status == 0
+        assert sample_tracker.family_health[6].uptime == 0
+
+    def test_fastest_family_sets_latency(self, sample_tracker: Tracker, reset_globals: None) -> None:  # pyright: ignore[reportUnusedParameter]
+        """The overall latency is the one of the fastest answering family."""
+        response: BDecodeResponse = {"interval": 1800, "complete": 1, "incomplete": 1}
+        probes = {6: FamilyProbe(response, None, 80), 4: FamilyProbe(response, None, 30)}
+
+        with patch("newtrackon.tracker.persistence.raw_data", deque[dict[str, Any]]()):
+            sample_tracker.record_probes(probes, time())
+
+        assert sample_tracker.latency == 30
+        assert sample_tracker.family_health[6].latency == 80
+        assert sample_tracker.family_health[4].latency == 30
+
+    def test_single_stack_leaves_other_family_unknown(self, sample_tracker: Tracker, reset_globals: None) -> None:  # pyright: ignore[reportUnusedParameter]
+        """A version the tracker lost every address of forgets its record, so it stops counting as reachable over it."""
+        health = sample_tracker.family_health[6]
+        health.record(True, 80)
+        probes = {4: FamilyProbe(None, RuntimeError("UDP timeout"), 2000)}
+
+        with patch("newtrackon.tracker.persistence.raw_data", deque[dict[str, Any]]()) as raw_data:
+            sample_tracker.record_probes(probes, time())
+
+        assert sample_tracker.status == 0
+        assert raw_data[0]["info"] == "UDP timeout"
+        assert sample_tracker.family_health[4].status == 0
+        assert (health.status, health.latency, health.uptime, list(health.historic)) == (None, None, None, [])
+
+    def test_reused_connection_counts_its_handshake(self, sample_tracker: Tracker) -> None:
+        """An announce over a connection opened earlier in the check still reports a fresh connection's latency."""
+        sample_tracker.url = "https://tracker.example.com/announce"
+
+        def announce_http(url: str, family: socket.AddressFamily = socket.AF_UNSPEC) -> dict[str, Any]:
+            burst = current_burst()
+            assert burst is not None
+            burst.setups[family] = ConnectionSetup(handshake=250, reused=True)
+            return {"interval": 1800, "peers": []}
+
+        with http_burst(), patch("newtrackon.tracker.scraper.announce_http", side_effect=announce_http):
+            probe = sample_tracker.announce(4)
+
+        assert probe.handshake == 250
+        assert probe.latency >= 250
+
+    def test_probe_families_async(self, sample_tracker: Tracker) -> None:
+        """The asyncio engine probes both versions and reports each outcome."""
+        sample_tracker.ips = ["93.184.216.34", "2001:db8::1"]
+
+        async def announce_udp(url: str, latency: int | None = None, family: socket.AddressFamily = socket.AF_UNSPEC) -> Any:
+            if family == socket.AF_INET:
+                raise RuntimeError("UDP timeout")
+            return {"interval": 1800, "seeds": 1, "leechers": 1, "peers": []}, "2001:db8::1"
+
+        with patch("newtrackon.tracker.aioscraper.announce_udp", side_effect=announce_udp):
+            probes = asyncio.run(sample_tracker.probe_families_async())
+
+        assert probes[6].response is not None
+        assert probes[4].response is None
+        assert str(probes[4].error) == "UDP timeout"
+
+
 class TestUpdateSchemeFromBep34:
     """Tests for Tracker.update_scheme_from_bep_34 method."""
 
@@ -765,6 +921,23 @@ class TestClearTracker:
             assert sample_tracker.networks is None
             assert sample_tracker.country_codes is None
 
+    def test_cleared_tracker_is_geolocated_again_on_the_same_ips(self, sample_tracker: Tracker, reset_globals: None) -> None:  # pyright: ignore[reportUnusedParameter]
+        """After a failed resolution the tracker's IPs are published again, even if they didn't change."""
+        sample_tracker.set_ips({"1.2.3.4"})
+        sample_tracker.set_geo_data({"1.2.3.4": GeoInfo("United States", "us", "Example ISP")})
+        geo_updates: Queue[Tracker] = Queue()
+
+        with (
+            patch("newtrackon.tracker.persistence.raw_data", deque[dict[str, Any]]()),
+            patch("newtrackon.tracker.persistence.geo_updates", geo_updates),
+        ):
+            sample_tracker.clear_tracker("Can't resolve IP")
+            sample_tracker.set_ips({"1.2.3.4"})
+            sample_tracker.publish_ip_change()
+
+        assert sample_tracker.located_ips is None
+        assert geo_updates.get_nowait() is sample_tracker
+
     def test_clear_tracker_clears_latency(self, sample_tracker: Tracker, reset_globals: None) -> None:  # pyright: ignore[reportUnusedParameter]
         """Test that clear_tracker clears latency."""
         sample_tracker.latency = 100
@@ -796,76 +969,39 @@ class TestClearTracker:
             assert raw_data[0]["info"] == "Test reason"
 
 
-class TestUpdateIpapiData:
-    """Tests for Tracker.update_ipapi_data method."""
-
-    def test_update_ipapi_data_single_ip(self, sample_tracker: Tracker) -> None:
-        """Test that update_ipapi_data fetches data for single IP."""
-        sample_tracker.ips = ["93.184.216.34"]
-
-        with patch.object(Tracker, "ip_api", return_value="United States\nus\nExample ISP"):
-            sample_tracker.update_ipapi_data()
-
-            assert sample_tracker.countries == ["United States"]
-            assert sample_tracker.country_codes == ["us"]
-            assert sample_tracker.networks == ["Example ISP"]
+class TestSetGeoData:
+    """Tests for Tracker.set_geo_data method."""
 
-    def test_update_ipapi_data_multiple_ips(self, sample_tracker: Tracker) -> None:
-        """Test that update_ipapi_data fetches data for multiple IPs."""
+    def test_set_geo_data_multiple_ips(self, sample_tracker: Tracker) -> None:
+        """Geolocation is listed in the order of the IPs, and records which IPs it's of."""
         sample_tracker.ips = ["93.184.216.34", "2001:db8::1"]
+        located = {"2001:db8::1": GeoInfo("Germany", "de", "ISP2"), "93.184.216.34": GeoInfo("United States", "us", "ISP1")}
 
-        def mock_ip_api(ip: str) -> str:
-            if ip == "93.184.216.34":
-                return "United States\nus\nISP1"
-            return "Germany\nde\nISP2"
-
-        with patch.object(Tracker, "ip_api", side_effect=mock_ip_api):
-            sample_tracker.update_ipapi_data()
+        sample_tracker.set_geo_data(located)
 
-            assert sample_tracker.countries == ["United States", "Germany"]
-            assert sample_tracker.country_codes == ["us", "de"]
-            assert sample_tracker.networks == ["ISP1", "ISP2"]
+        assert sample_tracker.countries == ["United States", "Germany"]
+        assert sample_tracker.country_codes == ["us", "de"]
+        assert sample_tracker.networks == ["ISP1", "ISP2"]
+        assert sample_tracker.located_ips == {"93.184.216.34", "2001:db8::1"}
 
-    def test_update_ipapi_data_no_ips(self, sample_tracker: Tracker) -> None:
-        """Test that update_ipapi_data handles None IPs."""
+    def test_set_geo_data_no_ips(self, sample_tracker: Tracker) -> None:
+        """A tracker without IPs gets empty geolocation."""
         sample_tracker.ips = None
 
-        sample_tracker.update_ipapi_data()
+        sample_tracker.set_geo_data({})
 
         assert sample_tracker.countries == []
         assert sample_tracker.country_codes == []
         assert sample_tracker.networks == []
 
-    def test_update_ipapi_data_invalid_response(self, sample_tracker: Tracker) -> None:
-        """Test that update_ipapi_data handles invalid API response."""
+    def test_set_geo_data_failed_lookup(self, sample_tracker: Tracker) -> None:
+        """IPs that couldn't be located are left out, and so are published again on the next check."""
         sample_tracker.ips = ["93.184.216.34"]
 
-        with patch.object(Tracker, "ip_api", return_value="Error"):
-            sample_tracker.update_ipapi_data()
-
-            # Should not add data when response is invalid (not 3 lines)
-            assert sample_tracker.countries == []
-
-
-class TestIpApi:
-    """Tests for Tracker.ip_api static method."""
+        sample_tracker.set_geo_data({})
 
-    def test_ip_api_success(self) -> None:
-        """Test successful IP API query."""
-        mock_response = MagicMock()
-        mock_response.read.return_value = b"United States\nus\nExample ISP"  # pyright: ignore[reportUnknownMemberType]
-
-        with patch("urllib.request.urlopen", return_value=mock_response), patch("time.sleep"):
-            result = Tracker.ip_api("93.184.216.34")
-
-            assert result == "United States\nus\nExample ISP"
-
-    def test_ip_api_network_error(self) -> None:
-        """Test IP API query with network error."""
-        with patch("urllib.request.urlopen", side_effect=OSError("Network error")):
-            result = Tracker.ip_api("93.184.216.34")
-
-            assert result == "Error"
+        assert sample_tracker.countries == []
+        assert sample_tracker.located_ips == frozenset()
 
 
 class TestMaxDowntimeConstant:
@@ -884,11 +1020,9 @@ class TestEdgeCases:
 
     def test_tracker_with_ip_as_hostname_in_url(self, mock_network: dict[str, Any]) -> None:
         """Test tracker creation with IP address as hostname."""
-        mock_network["getaddrinfo"].return_value = [  # pyright: ignore[reportUnknownMemberType]
-            (socket.AF_INET, socket.SOCK_DGRAM, 17, "", ("93.184.216.34", 6969)),
-        ]
+        mock_network["resolve_ips"].return_value = ["93.184.216.34"]  # pyright: ignore[reportUnknownMemberType]
 
-        # IP address as hostname should work (getaddrinfo resolves it)
+        # IP address as hostname should work (resolve_ips returns it)
         tracker = Tracker.from_url("udp://93.184.216.34:6969")
 
         assert tracker.host == "93.184.216.34"
@@ -903,9 +1037,7 @@ class TestEdgeCases:
 
     def test_tracker_url_without_port(self, mock_network: dict[str, Any]) -> None:
         """Test tracker URL without explicit port."""
-        mock_network["getaddrinfo"].return_value = [  # pyright: ignore[reportUnknownMemberType]
-            (socket.AF_INET, socket.SOCK_DGRAM, 17, "", ("93.184.216.34", 80)),
-        ]
+        mock_network["resolve_ips"].return_value = ["93.184.216.34"]  # pyright: ignore[reportUnknownMemberType]
 
         tracker = Tracker.from_url("http://tracker.example.com")
 
@@ -913,12 +1045,7 @@ class TestEdgeCases:
 
     def test_update_ips_with_multiple_address_families(self, sample_tracker: Tracker, mock_network: dict[str, Any]) -> None:
         """Test update_ips handles multiple address families correctly."""
-        mock_network["getaddrinfo"].return_value = [  # pyright: ignore[reportUnknownMemberType]
-            (socket.AF_INET, socket.SOCK_DGRAM, 17, "", ("1.2.3.4", 6969)),
-            (socket.AF_INET, socket.SOCK_STREAM, 6, "", ("1.2.3.4", 6969)),
-            (socket.AF_INET6, socket.SOCK_DGRAM, 17, "", ("2606:2800:21f:cb07:6820:80da:af6b:8b2c", 6969, 0, 0)),
-            (socket.AF_INET6, socket.SOCK_STREAM, 6, "", ("2606:2800:21f:cb07:6820:80da:af6b:8b2c", 6969, 0, 0)),
-        ]
+        mock_network["resolve_ips"].return_value = ["1.2.3.4", "2606:2800:21f:cb07:6820:80da:af6b:8b2c"]  # pyright: ignore[reportUnknownMemberType]
 
         sample_tracker.update_ips()
 
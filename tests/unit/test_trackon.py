@@ -5,6 +5,8 @@ from __future__ import annotations
 import logging
 import sqlite3
 from collections import deque
+from collections.abc import Callable, Generator
+from queue import Empty, Queue
 from types import ModuleType
 from unittest.mock import MagicMock, patch
 
@@ -44,6 +46,25 @@ def create_test_tracker(
     )
 
 
+def claim_everything(trackers: list[Tracker], now: int) -> list[Tracker]:
+    """Stand-in for CheckScheduler.claim when no other worker holds a lease."""
+    return trackers
+
+
+def wait_for_one_check(changes: Queue[str]) -> Callable[..., None]:
+    """Stand-in for CheckScheduler.wait that returns once a check finishes, then breaks the checker loop."""
+    calls = 0
+
+    def wait(idle: bool = True) -> None:
+        nonlocal calls
+        calls += 1
+        if calls > 1:
+            raise StopIteration
+        changes.get(timeout=5)
+
+    return wait
+
+
 class TestEnqueueNewTrackers:
     """Tests for enqueue_new_trackers function."""
 
@@ -617,7 +638,7 @@ class TestProcessNewTracker:
             ingest.process_new_tracker(tracker_candidate)  # pyright: ignore[reportUnknownArgumentType]
 
             mock_insert.assert_called_once_with(tracker_candidate)
-            tracker_candidate.update_ipapi_data.assert_called_once()  # pyright: ignore[reportUnknownMemberType]
+            tracker_candidate.publish_ip_change.assert_called_once()  # pyright: ignore[reportUnknownMemberType]
             tracker_candidate.is_up.assert_called_once()  # pyright: ignore[reportUnknownMemberType]
             tracker_candidate.update_uptime.assert_called_once()  # pyright: ignore[reportUnknownMemberType]
 
@@ -831,6 +852,7 @@ class TestLogWrongIntervalDenial:
 
         updated_entry = submitted_data[0]
         assert updated_entry["status"] == 0
+        assert isinstance(updated_entry["info"], list)
         assert updated_entry["info"][0] == "original info"
         assert "Tracker rejected for test reason" in updated_entry["info"][1]
 
@@ -852,6 +874,7 @@ class TestLogWrongIntervalDenial:
         ingest.log_wrong_interval_denial("having too short interval")
 
         updated_entry = submitted_data[0]
+        assert isinstance(updated_entry["info"], list)
         assert updated_entry["info"][0] == original_info
 
 
@@ -945,9 +968,11 @@ class TestUpdateOutdatedTrackers:
 
         # Create a tracker that was checked recently (now - last_checked < interval)
         recent_tracker = MagicMock()
+        recent_tracker.host = "tracker.example.com"
         recent_tracker.url = "udp://tracker.example.com:6969/announce"
         recent_tracker.last_checked = 1000  # Checked at time 1000
         recent_tracker.interval = 300  # 5 minute interval
+        recent_tracker.check_interval.return_value = 300
         recent_tracker.to_be_deleted = False
 
         with (
@@ -956,7 +981,10 @@ class TestUpdateOutdatedTrackers:
             patch("newtrackon.trackon.db.update_tracker") as mock_update,
             patch("newtrackon.trackon.db.delete_tracker") as mock_delete,
             patch("newtrackon.trackon.save_deque_to_disk") as mock_save,
-            patch("newtrackon.trackon.sleep", side_effect=StopIteration),  # Break the infinite loop
+            patch("newtrackon.trackon.CheckScheduler.claim", side_effect=claim_everything),
+            patch("newtrackon.trackon.db.release_trackers"),
+            patch("newtrackon.trackon.prefetch_dns"),
+            patch("newtrackon.trackon.CheckScheduler.wait", side_effect=StopIteration),  # Break the infinite loop
         ):
             try:
                 trackon.update_outdated_trackers()
@@ -975,9 +1003,11 @@ class TestUpdateOutdatedTrackers:
 
         # Create a tracker that is outdated (now - last_checked > interval)
         outdated_tracker = MagicMock()
+        outdated_tracker.host = "tracker.example.com"
         outdated_tracker.url = "udp://tracker.example.com:6969/announce"
         outdated_tracker.last_checked = 1000  # Checked at time 1000
         outdated_tracker.interval = 300  # 5 minute interval
+        outdated_tracker.check_interval.return_value = 300
         outdated_tracker.to_be_deleted = False  # Should NOT be deleted
 
         with (
@@ -986,7 +1016,11 @@ class TestUpdateOutdatedTrackers:
             patch("newtrackon.trackon.db.update_tracker") as mock_update,
             patch("newtrackon.trackon.db.delete_tracker") as mock_delete,
             patch("newtrackon.trackon.save_deque_to_disk") as mock_save,
-            patch("newtrackon.trackon.sleep", side_effect=StopIteration),  # Break the infinite loop
+            patch("newtrackon.trackon.CheckScheduler.claim", side_effect=claim_everything),
+            patch("newtrackon.trackon.db.release_trackers"),
+            patch("newtrackon.trackon.prefetch_dns"),
+            patch("newtrackon.trackon.schedule_changes", Queue[str]()) as changes,
+            patch("newtrackon.trackon.CheckScheduler.wait", side_effect=wait_for_one_check(changes)),
         ):
             try:
                 trackon.update_outdated_trackers()
@@ -1005,9 +1039,11 @@ class TestUpdateOutdatedTrackers:
 
         # Create a tracker that is outdated and marked for deletion
         outdated_tracker = MagicMock()
+        outdated_tracker.host = "tracker.example.com"
         outdated_tracker.url = "udp://tracker.example.com:6969/announce"
         outdated_tracker.last_checked = 1000  # Checked at time 1000
         outdated_tracker.interval = 300  # 5 minute interval
+        outdated_tracker.check_interval.return_value = 300
         outdated_tracker.to_be_deleted = True  # Should be deleted
 
         with (
@@ -1016,7 +1052,11 @@ class TestUpdateOutdatedTrackers:
             patch("newtrackon.trackon.db.update_tracker") as mock_update,
             patch("newtrackon.trackon.db.delete_tracker") as mock_delete,
             patch("newtrackon.trackon.save_deque_to_disk") as mock_save,
-            patch("newtrackon.trackon.sleep", side_effect=StopIteration),  # Break the infinite loop
+            patch("newtrackon.trackon.CheckScheduler.claim", side_effect=claim_everything),
+            patch("newtrackon.trackon.db.release_trackers"),
+            patch("newtrackon.trackon.prefetch_dns"),
+            patch("newtrackon.trackon.schedule_changes", Queue[str]()) as changes,
+            patch("newtrackon.trackon.CheckScheduler.wait", side_effect=wait_for_one_check(changes)),
         ):
             try:
                 trackon.update_outdated_trackers()
@@ -1029,6 +1069,508 @@ class TestUpdateOutdatedTrackers:
             mock_update.assert_not_called()
             mock_save.assert_called_once()  # pyright: ignore[reportUnknownMemberType]
 
+    def test_reads_table_once(self, mock_db_connection: sqlite3.Connection) -> None:
+        """The full table is loaded at startup only, not on every scheduling pass."""
+        from newtrackon import trackon
+
+        with (
+            patch("newtrackon.trackon.db.get_all_data", return_value=[]) as mock_get_all,
+            patch("newtrackon.trackon.CheckScheduler.wait", side_effect=[None, None, StopIteration]),
+        ):
+            try:
+                trackon.update_outdated_trackers()
+            except StopIteration:
+                pass
+
+        mock_get_all.assert_called_once()  # pyright: ignore[reportUnknownMemberType]
+
+
+class TestCheckScheduler:
+    """Tests for the heap-based due-time scheduler."""
+
+    @pytest.fixture(autouse=True)
+    def no_jitter(self) -> Generator[None]:
+        with patch("newtrackon.trackon.SCHEDULE_JITTER", 0):
+            yield
+
+    def test_pops_only_due_trackers_in_due_order(self) -> None:
+        """Trackers come out of the heap ordered by last_checked + interval."""
+        from newtrackon.trackon import CheckScheduler
+
+        late = create_test_tracker("udp://late.example.com:6969/announce")
+        late.last_checked, late.interval = 1000, 900
+        early = create_test_tracker("udp://early.example.com:6969/announce")
+        early.last_checked, early.interval = 1000, 300
+        not_due = create_test_tracker("udp://notdue.example.com:6969/announce")
+        not_due.last_checked, not_due.interval = 1000, 5000
+
+        scheduler = CheckScheduler([late, early, not_due])
+
+        assert scheduler.next_due() == 1300
+        assert scheduler.pop_due(2000) == [early, late]
+        assert scheduler.next_due() == 6000
+
+    def test_upcoming_includes_overdue_and_soon_due_trackers(self) -> None:
+        """Trackers due within the prefetch window are listed, later ones aren't."""
+        from newtrackon.trackon import CheckScheduler
+
+        overdue = create_test_tracker("udp://overdue.example.com:6969/announce")
+        overdue.last_checked, overdue.interval = 1000, 300
+        soon = create_test_tracker("udp://soon.example.com:6969/announce")
+        soon.last_checked, soon.interval = 1000, 1100
+        later = create_test_tracker("udp://later.example.com:6969/announce")
+        later.last_checked, later.interval = 1000, 5000
+
+        scheduler = CheckScheduler([overdue, soon, later])
+
+        assert sorted(tracker.host for tracker in scheduler.upcoming(2000, window=120)) == [
+            "overdue.example.com",
+            "soon.example.com",
+        ]
+
+    def test_upcoming_is_bounded_by_what_the_pacer_releases(self) -> None:
+        """Of a large backlog only the earliest trackers the pacer can release within the window are listed."""
+        from newtrackon.trackon import CheckScheduler
+        from newtrackon.utils import TokenBucket
+
+        trackers = [create_test_tracker(f"udp://tracker{index}.example.com:6969/announce") for index in range(100)]
+        for index, tracker in enumerate(trackers):
+            tracker.last_checked, tracker.interval = 1000 + index, 300
+        scheduler = CheckScheduler(trackers)
+        scheduler.schedule(trackers[0], now=2000)  # Leaves a stale entry at the heap's root
+        scheduler.pacer = TokenBucket(rate=0.1, capacity=2)
+
+        upcoming = scheduler.upcoming(2000, window=120)
+
+        assert [tracker.host for tracker in upcoming] == [f"tracker{index}.example.com" for index in range(1, 15)]
+
+    def test_reschedule_uses_new_last_checked(self) -> None:
+        """A checked tracker is pushed back by its interval."""
+        from newtrackon.trackon import CheckScheduler
+
+        tracker = create_test_tracker("udp://tracker.example.com:6969/announce")
+        tracker.last_checked, tracker.interval = 1000, 300
+        scheduler = CheckScheduler([tracker])
+
+        [due] = scheduler.pop_due(1300)
+        due.last_checked = 1305
+        with patch("newtrackon.trackon.time", return_value=1310):
+            scheduler.reschedule([due])
+
+        assert scheduler.next_due() == 1605
+
+    def test_reschedule_incomplete_check_waits_one_interval(self) -> None:
+        """A tracker whose check never updated last_checked is not immediately due again."""
+        from newtrackon.trackon import CheckScheduler
+
+        tracker = create_test_tracker("udp://tracker.example.com:6969/announce")
+        tracker.last_checked, tracker.interval = 1000, 300
+        scheduler = CheckScheduler([tracker])
+
+        scheduler.pop_due(1400)
+        with patch("newtrackon.trackon.time", return_value=1400):
+            scheduler.reschedule([tracker])
+
+        assert scheduler.next_due() == 1700
+
+    def test_reschedule_drops_deleted_trackers(self) -> None:
+        """Trackers marked for deletion leave the schedule."""
+        from newtrackon.trackon import CheckScheduler
+
+        tracker = create_test_tracker("udp://tracker.example.com:6969/announce")
+        scheduler = CheckScheduler([tracker])
+        [due] = scheduler.pop_due(20000)
+        due.to_be_deleted = True
+        scheduler.reschedule([due])
+
+        assert scheduler.next_due() is None
+
+    def test_wait_reloads_only_changed_rows(self) -> None:
+        """Hosts announced on schedule_changes are re-read individually."""
+        from newtrackon.persistence import schedule_changes
+        from newtrackon.trackon import CheckScheduler
+
+        added = create_test_tracker("udp://new.example.com:6969/announce")
+        added.last_checked, added.interval = 1000, 300
+        scheduler = CheckScheduler([])
+        schedule_changes.put("new.example.com")
+
+        with patch("newtrackon.trackon.db.get_tracker", return_value=added) as mock_get:
+            scheduler.wait()
+
+        mock_get.assert_called_once_with("new.example.com")
+        assert scheduler.next_due() == 1300
+
+    def test_wait_sleeps_until_next_due_time(self) -> None:
+        """Without changes, wait blocks exactly until the earliest due time."""
+        from newtrackon.trackon import CheckScheduler
+
+        tracker = create_test_tracker("udp://tracker.example.com:6969/announce")
+        tracker.last_checked, tracker.interval = 1000, 300
+        scheduler = CheckScheduler([tracker])
+
+        with (
+            patch("newtrackon.trackon.time", return_value=1290.5),
+            patch("newtrackon.trackon.schedule_changes") as mock_changes,
+        ):
+            mock_changes.get.side_effect = Empty  # pyright: ignore[reportUnknownMemberType]
+            scheduler.wait()
+
+        mock_changes.get.assert_called_once_with(timeout=9.5)  # pyright: ignore[reportUnknownMemberType]
+
+    def test_busy_wait_wakes_on_finished_checks_only(self) -> None:
+        """With every worker busy a due tracker doesn't end the wait, and a finished check wakes it without a reload."""
+        from newtrackon.trackon import CHECK_DONE, SYNC_INTERVAL, CheckScheduler
+
+        tracker = create_test_tracker("udp://tracker.example.com:6969/announce")
+        tracker.last_checked, tracker.interval = 1000, 300
+        scheduler = CheckScheduler([tracker])
+        scheduler.synced_at = 2000
+
+        with (
+            patch("newtrackon.trackon.time", return_value=2000),
+            patch("newtrackon.trackon.schedule_changes") as mock_changes,
+            patch("newtrackon.trackon.db.get_tracker") as mock_get,
+        ):
+            mock_changes.get.return_value = CHECK_DONE  # pyright: ignore[reportUnknownMemberType]
+            mock_changes.get_nowait.side_effect = Empty  # pyright: ignore[reportUnknownMemberType]
+            scheduler.wait(idle=False)
+
+        mock_changes.get.assert_called_once_with(timeout=SYNC_INTERVAL)  # pyright: ignore[reportUnknownMemberType]
+        mock_get.assert_not_called()
+
+    def test_claim_defers_trackers_leased_elsewhere(self) -> None:
+        """A due tracker leased to another checker is reloaded and waits one interval."""
+        from newtrackon.trackon import CheckScheduler
+
+        tracker = create_test_tracker("udp://tracker.example.com:6969/announce")
+        tracker.last_checked, tracker.interval = 1000, 300
+        scheduler = CheckScheduler([tracker])
+        due = scheduler.pop_due(1300)
+
+        with (
+            patch("newtrackon.trackon.db.claim_trackers", return_value=set()),
+            patch("newtrackon.trackon.db.get_tracker", return_value=tracker),
+        ):
+            assert scheduler.claim(due, 1300) == []
+
+        assert scheduler.next_due() == 1600
+
+    def test_claim_skips_trackers_checked_elsewhere(self) -> None:
+        """A row another checker updated after our last read is rescheduled and its lease released."""
+        from newtrackon.trackon import CheckScheduler, worker_id
+
+        tracker = create_test_tracker("udp://tracker.example.com:6969/announce")
+        tracker.last_checked, tracker.interval = 1000, 300
+        fresh = create_test_tracker("udp://tracker.example.com:6969/announce")
+        fresh.last_checked, fresh.interval = 1290, 300
+        scheduler = CheckScheduler([tracker])
+        due = scheduler.pop_due(1300)
+
+        with (
+            patch("newtrackon.trackon.db.claim_trackers", return_value={"tracker.example.com"}),
+            patch("newtrackon.trackon.db.get_tracker", return_value=fresh),
+            patch("newtrackon.trackon.db.release_trackers") as mock_release,
+        ):
+            assert scheduler.claim(due, 1300) == []
+
+        mock_release.assert_called_once_with(["tracker.example.com"], worker_id)
+        assert scheduler.next_due() == 1590
+
+    def test_claim_returns_fresh_rows(self) -> None:
+        """Claimed trackers are checked from their re-read row."""
+        from newtrackon.trackon import CheckScheduler
+
+        tracker = create_test_tracker("udp://tracker.example.com:6969/announce")
+        tracker.last_checked, tracker.interval = 1000, 300
+        fresh = create_test_tracker("udp://tracker.example.com:6969/announce")
+        fresh.last_checked, fresh.interval = 1000, 300
+        scheduler = CheckScheduler([tracker])
+
+        with (
+            patch("newtrackon.trackon.db.claim_trackers", return_value={"tracker.example.com"}),
+            patch("newtrackon.trackon.db.get_tracker", return_value=fresh),
+        ):
+            assert scheduler.claim(scheduler.pop_due(1300), 1300) == [fresh]
+
+    def test_sync_follows_other_processes(self) -> None:
+        """Rows added, removed or checked by other processes are picked up on sync."""
+        from newtrackon.trackon import CheckScheduler
+
+        unchanged = create_test_tracker("udp://unchanged.example.com:6969/announce")
+        unchanged.last_checked, unchanged.interval = 1000, 300
+        checked = create_test_tracker("udp://checked.example.com:6969/announce")
+        checked.last_checked, checked.interval = 1000, 300
+        deleted = create_test_tracker("udp://deleted.example.com:6969/announce")
+        deleted.last_checked, deleted.interval = 900, 300
+        scheduler = CheckScheduler([unchanged, checked, deleted])
+        checked_elsewhere = create_test_tracker("udp://checked.example.com:6969/announce")
+        checked_elsewhere.last_checked, checked_elsewhere.interval = 1250, 300
+
+        with (
+            patch(
+                "newtrackon.trackon.db.get_check_times",
+                return_value={"unchanged.example.com": 1000, "checked.example.com": 1250},
+            ),
+            patch("newtrackon.trackon.db.get_tracker", return_value=checked_elsewhere) as mock_get,
+        ):
+            scheduler.sync()
+
+        mock_get.assert_called_once_with("checked.example.com")
+        assert "deleted.example.com" not in scheduler.trackers
+        assert scheduler.due == {"unchanged.example.com": 1300, "checked.example.com": 1550}
+
+
+class TestSchedulingSpread:
+    """Tests for jittered due times and probe pacing."""
+
+    def test_schedule_jitter_is_deterministic_and_bounded(self) -> None:
+        """The same host always gets the same offset, within +-5% of the interval."""
+        from newtrackon.trackon import schedule_jitter
+
+        offsets = [schedule_jitter(f"tracker{i}.example.com", 10800) for i in range(200)]
+
+        assert offsets == [schedule_jitter(f"tracker{i}.example.com", 10800) for i in range(200)]
+        assert all(-540 <= offset <= 540 for offset in offsets)
+        assert len(set(offsets)) > 150
+
+    def test_trackers_checked_together_come_due_apart(self) -> None:
+        """Trackers with the same last_checked and interval get distinct due times."""
+        from newtrackon.trackon import CheckScheduler
+
+        trackers = [create_test_tracker(f"udp://tracker{i}.example.com:6969/announce") for i in range(50)]
+        for tracker in trackers:
+            tracker.last_checked = 1000
+
+        scheduler = CheckScheduler(trackers)
+
+        assert len(set(scheduler.due.values())) > 40
+
+    def test_backlog_is_released_at_the_probe_rate(self) -> None:
+        """After an outage, overdue trackers are paced instead of released in one burst."""
+        from newtrackon.trackon import CheckScheduler
+
+        trackers = [create_test_tracker(f"udp://tracker{i}.example.com:6969/announce") for i in range(1080)]
+
+        with patch("newtrackon.trackon.check_workers", 10):
+            scheduler = CheckScheduler(trackers)
+
+        # 1080 trackers every 10800 s is 0.1 checks/s, 0.15 with headroom
+        assert scheduler.pacer.rate == pytest.approx(0.15)
+        assert len(scheduler.pop_due(100000)) == 10  # Initial burst capacity
+        assert scheduler.pop_due(100000) == []
+        assert len(scheduler.pop_due(100030)) == 4
+        assert scheduler.time_until_next_check() is not None
+
+
+class TestCheckTrackers:
+    """Tests for the concurrent check engine."""
+
+    def test_slow_probe_holds_only_its_own_worker(self, mock_db_connection: sqlite3.Connection) -> None:
+        """Workers are refilled as checks finish, so fast checks go on while a slow one is still in flight."""
+        import threading
+
+        from newtrackon import trackon
+        from newtrackon.trackon import CheckScheduler
+
+        released = threading.Event()
+        trackers = [
+            MagicMock(host=f"tracker{i}.example.com", url=f"udp://tracker{i}.example.com:6969/announce") for i in range(4)
+        ]
+        for tracker in trackers:
+            tracker.last_checked, tracker.to_be_deleted = 0, False
+            tracker.check_interval.return_value = 1
+        slow = trackers[0]
+        slow.update_status.side_effect = lambda: released.wait(5)
+        real_wait = CheckScheduler.wait
+
+        def wait(scheduler: CheckScheduler, idle: bool = True) -> None:
+            if mock_update.call_count >= 3:  # pyright: ignore[reportUnknownMemberType]
+                released.set()
+                raise StopIteration
+            real_wait(scheduler, idle)
+
+        with (
+            patch("newtrackon.trackon.check_workers", 2),
+            patch("newtrackon.trackon.db.get_all_data", return_value=trackers),
+            patch("newtrackon.trackon.db.update_tracker") as mock_update,
+            patch("newtrackon.trackon.db.release_trackers"),
+            patch("newtrackon.trackon.save_deque_to_disk"),
+            patch("newtrackon.trackon.prefetch_dns"),
+            patch("newtrackon.trackon.schedule_changes", Queue[str]()),
+            patch("newtrackon.trackon.CheckScheduler.claim", side_effect=claim_everything),
+            patch.object(CheckScheduler, "wait", wait),
+        ):
+            try:
+                trackon.update_outdated_trackers()
+            except StopIteration:
+                pass
+
+        assert {tracker for call in mock_update.call_args_list for tracker in call.args} == set(trackers[1:])
+        slow.update_status.assert_called_once()  # pyright: ignore[reportUnknownMemberType]
+
+    def test_failed_check_is_logged_and_not_saved(
+        self, mock_db_connection: sqlite3.Connection, caplog: pytest.LogCaptureFixture
+    ) -> None:
+        """An unexpected exception in one check is logged, and its lease is released and its next check scheduled."""
+        from newtrackon import trackon
+
+        broken = MagicMock(host="broken.example.com", url="udp://broken.example.com:6969/announce")
+        broken.last_checked, broken.to_be_deleted = 1000, False
+        broken.check_interval.return_value = 300
+        broken.update_status.side_effect = ValueError("boom")
+
+        with (
+            caplog.at_level(logging.ERROR, logger="newtrackon"),
+            patch("newtrackon.trackon.time", return_value=1500),
+            patch("newtrackon.trackon.db.get_all_data", return_value=[broken]),
+            patch("newtrackon.trackon.db.update_tracker") as mock_update,
+            patch("newtrackon.trackon.db.release_trackers") as mock_release,
+            patch("newtrackon.trackon.save_deque_to_disk"),
+            patch("newtrackon.trackon.prefetch_dns"),
+            patch("newtrackon.trackon.schedule_changes", Queue[str]()) as changes,
+            patch("newtrackon.trackon.CheckScheduler.claim", side_effect=claim_everything),
+            patch("newtrackon.trackon.CheckScheduler.wait", side_effect=wait_for_one_check(changes)),
+        ):
+            try:
+                trackon.update_outdated_trackers()
+            except StopIteration:
+                pass
+
+        mock_update.assert_not_called()
+        mock_release.assert_called_once_with(["broken.example.com"], trackon.worker_id)
+        assert "broken.example.com" in caplog.text
+
+    def test_sweep_stats_rate(self) -> None:
+        """Throughput is reported as checks per second."""
+        from newtrackon.trackon import SweepStats
+
+        assert SweepStats(checked=30, elapsed=10.0).rate == 3.0
+        assert SweepStats(checked=4, elapsed=0.0).rate == 4.0
+
+    def test_throughput_is_logged_per_sync_interval(self, caplog: pytest.LogCaptureFixture) -> None:
+        """Finished checks are summed and reported as checks/s over the SYNC_INTERVAL window."""
+        from newtrackon.trackon import SYNC_INTERVAL, ThroughputLog
+
+        throughput = ThroughputLog(1000.0)
+        with caplog.at_level(logging.INFO, logger="newtrackon"):
+            throughput.add(2, 1010.0)
+            throughput.add(3, 1030.0)
+            assert "checks/s" not in caplog.text
+            throughput.add(7, 1000.0 + SYNC_INTERVAL)
+
+        assert f"Checked 12 trackers in {SYNC_INTERVAL:.1f} s ({12 / SYNC_INTERVAL:.2f} checks/s)" in caplog.text
+        assert (throughput.since, throughput.checked) == (1000.0 + SYNC_INTERVAL, 0)
+
+
+class TestSkipUnresolvable:
+    """Tests for dropping trackers whose hostname doesn't exist before they take a worker slot."""
+
+    def test_nxdomain_tracker_is_recorded_down_without_a_probe(self, mock_db_connection: sqlite3.Connection) -> None:
+        """A tracker with a cached NXDOMAIN is saved as down and left out of the check, others are kept."""
+        from time import time
+
+        from dns.resolver import NXDOMAIN
+
+        from newtrackon import trackon
+        from newtrackon.dnscache import Resolution, dns_cache
+
+        gone = create_test_tracker("udp://gone.example.com:6969/announce")
+        gone.last_uptime = int(time())
+        alive = create_test_tracker("udp://alive.example.com:6969/announce")
+        dns_cache.put(("gone.example.com", "A"), Resolution((), NXDOMAIN(), time() + 300, 0))
+
+        with (
+            patch("newtrackon.trackon.db.update_tracker") as mock_update,
+            patch("newtrackon.trackon.save_deque_to_disk"),
+        ):
+            assert trackon.skip_unresolvable([gone, alive]) == [alive]
+
+        mock_update.assert_called_once_with(gone)
+        assert gone.status == 0
+        assert gone.historic[-1] == 0
+        assert gone.last_checked > 0
+
+
+class TestSaveTracker:
+    """Tests for persisting a checked tracker."""
+
+    def test_checker_only_processes_leave_raw_history_alone(self, mock_db_connection: sqlite3.Connection) -> None:
+        """Only the main instance writes the raw history file, extra checkers just update their rows."""
+        from newtrackon import trackon
+
+        tracker = create_test_tracker("udp://tracker.example.com:6969/announce")
+
+        with (
+            patch("newtrackon.trackon.save_raw_history", False),
+            patch("newtrackon.trackon.db.update_tracker") as mock_update,
+            patch("newtrackon.trackon.save_deque_to_disk") as mock_save,
+        ):
+            trackon.save_tracker(tracker)
+
+        mock_update.assert_called_once_with(tracker)
+        mock_save.assert_not_called()
+
+
+class TestCheckTrackersAsync:
+    """Tests for the asyncio check engine."""
+
+    def test_slow_probe_holds_only_its_own_slot(self, mock_db_connection: sqlite3.Connection) -> None:
+        """Checks run as tasks refilled as they finish, and are saved off the event loop."""
+        import asyncio
+        import threading
+        from unittest.mock import AsyncMock
+
+        from newtrackon import trackon
+        from newtrackon.trackon import CheckScheduler
+
+        class StopChecker(Exception):
+            pass
+
+        released = threading.Event()
+
+        async def slow_check() -> None:
+            while not released.is_set():
+                await asyncio.sleep(0.01)
+
+        trackers = [
+            MagicMock(host=f"tracker{i}.example.com", url=f"udp://tracker{i}.example.com:6969/announce") for i in range(4)
+        ]
+        for tracker in trackers:
+            tracker.last_checked, tracker.to_be_deleted = 0, False
+            tracker.check_interval.return_value = 1
+            tracker.update_status_async = AsyncMock()
+        trackers[0].update_status_async.side_effect = slow_check
+        trackers[1].update_status_async.side_effect = ValueError("boom")
+        saved_from: set[str] = set()
+        real_wait = CheckScheduler.wait
+
+        def update(tracker: Tracker) -> None:
+            saved_from.add(threading.current_thread().name)
+
+        def wait(scheduler: CheckScheduler, idle: bool = True) -> None:
+            if mock_update.call_count >= 2 and mock_release.call_count >= 3:  # pyright: ignore[reportUnknownMemberType]
+                released.set()
+                raise StopChecker
+            real_wait(scheduler, idle)
+
+        with (
+            patch("newtrackon.trackon.check_workers", 2),
+            patch("newtrackon.trackon.db.get_all_data", return_value=trackers),
+            patch("newtrackon.trackon.db.update_tracker", side_effect=update) as mock_update,
+            patch("newtrackon.trackon.db.release_trackers") as mock_release,
+            patch("newtrackon.trackon.save_deque_to_disk"),
+            patch("newtrackon.trackon.dnscache.prefetch", AsyncMock()),
+            patch("newtrackon.trackon.schedule_changes", Queue[str]()),
+            patch("newtrackon.trackon.CheckScheduler.claim", side_effect=claim_everything),
+            patch.object(CheckScheduler, "wait", wait),
+            pytest.raises(StopChecker),
+        ):
+            trackon.run_async_checker()
+
+        assert {tracker for call in mock_update.call_args_list for tracker in call.args} == set(trackers[2:])
+        assert threading.main_thread().name not in saved_from
+
 
 class TestWarnOfIpConflictsPeriodic:
     """Tests for periodic IP conflict warnings."""
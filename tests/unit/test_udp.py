@@ -0,0 +1,161 @@
+"""Tests for the shared UDP socket multiplexer in newtrackon.udp."""
+
+import socket
+import struct
+from collections.abc import Generator
+
+import pytest
+
+from newtrackon.udp import (
+    ANNOUNCE_REQUEST,
+    ANNOUNCE_RESPONSE,
+    CONNECT_REQUEST,
+    CONNECT_RESPONSE,
+    ConnectionIDCache,
+    UDPMultiplexer,
+    response_key,
+    response_transaction_id,
+    retransmission_timeouts,
+)
+
+
+@pytest.fixture
+def multiplexer() -> Generator[UDPMultiplexer]:
+    mux = UDPMultiplexer()
+    yield mux
+    mux.close()
+
+
+@pytest.fixture
+def peer() -> Generator[socket.socket]:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind(("127.0.0.1", 0))
+    sock.settimeout(5)
+    yield sock
+    sock.close()
+
+
+class TestResponseRouting:
+    """Tests for the demultiplexing key helpers."""
+
+    def test_response_transaction_id(self) -> None:
+        """The transaction ID is read unsigned from bytes 4-8."""
+        assert response_transaction_id(struct.pack("!iI", 1, 0xFFFFFFFE)) == 0xFFFFFFFE
+        assert response_transaction_id(b"\x00" * 7) is None
+
+    def test_response_key_ignores_ipv6_flow_and_scope(self) -> None:
+        """IPv6 source addresses from recvfrom carry flowinfo and scope id, which aren't part of the key."""
+        assert response_key(("2001:db8::1", 6969, 0, 0), 7) == ("2001:db8::1", 6969, 7)
+
+
+class TestPacketLayouts:
+    """Tests for the precompiled BEP 15 layouts."""
+
+    def test_sizes_match_bep_15(self) -> None:
+        """Requests and fixed response headers have the sizes BEP 15 specifies."""
+        assert CONNECT_REQUEST.size == 16
+        assert ANNOUNCE_REQUEST.size == 98
+        assert CONNECT_RESPONSE.size == 16
+        assert ANNOUNCE_RESPONSE.size == 20
+
+    def test_transaction_id_from_buffer_view(self) -> None:
+        """The transaction ID is read straight from a view over a receive buffer."""
+        buf = bytearray(64)
+        struct.pack_into("!iI", buf, 0, 1, 42)
+
+        assert response_transaction_id(memoryview(buf)[:8]) == 42
+
+
+class TestRetransmissionTimeouts:
+    """Tests for the BEP 15-style retransmission schedule."""
+
+    def test_schedule_doubles(self) -> None:
+        """Each retransmission waits twice as long as the previous send."""
+        assert retransmission_timeouts(None) == [2, 4, 8]
+
+    def test_schedule_follows_latency(self) -> None:
+        """Fast trackers get short timeouts, bounded on both ends."""
+        assert retransmission_timeouts(400) == [0.8, 1.6, 3.2]
+        assert retransmission_timeouts(20) == [0.5, 1, 2]
+        assert retransmission_timeouts(9000) == [4, 8, 16]
+
+
+class TestUDPMultiplexer:
+    """Tests for UDPMultiplexer."""
+
+    def test_responses_are_routed_by_transaction_id(self, multiplexer: UDPMultiplexer, peer: socket.socket) -> None:
+        """Out-of-order responses reach the request that matches their transaction ID."""
+        from concurrent.futures import ThreadPoolExecutor
+
+        address = peer.getsockname()
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            first = executor.submit(multiplexer.request, socket.AF_INET, address, b"first", 1, [5])
+            second = executor.submit(multiplexer.request, socket.AF_INET, address, b"second", 2, [5])
+            senders = dict(peer.recvfrom(2048) for _ in range(2))
+            peer.sendto(struct.pack("!iI", 0, 2) + b"for second", senders[b"second"])
+            peer.sendto(struct.pack("!iI", 0, 1) + b"for first", senders[b"first"])
+
+            assert first.result().endswith(b"for first")
+            assert second.result().endswith(b"for second")
+
+        assert len(multiplexer.sockets) == 1
+        assert not multiplexer.pending
+
+    def test_responses_are_copied_out_of_the_receive_buffer(self, multiplexer: UDPMultiplexer, peer: socket.socket) -> None:
+        """A short response following a long one comes out at its own length, not padded by the reused buffer."""
+        from concurrent.futures import ThreadPoolExecutor
+
+        address = peer.getsockname()
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            for transaction_id, payload in ((1, b"x" * 100), (2, b"y")):
+                response = executor.submit(multiplexer.request, socket.AF_INET, address, b"ping", transaction_id, [5])
+                _, sender = peer.recvfrom(2048)
+                peer.sendto(struct.pack("!iI", 0, transaction_id) + payload, sender)
+
+                assert response.result() == struct.pack("!iI", 0, transaction_id) + payload
+
+    def test_stray_datagrams_are_dropped(self, multiplexer: UDPMultiplexer, peer: socket.socket) -> None:
+        """A response with an unknown transaction ID doesn't complete the pending request."""
+        address = peer.getsockname()
+        sock = multiplexer.socket_for(socket.AF_INET)
+        peer.sendto(struct.pack("!iI", 0, 99), sock.getsockname())
+
+        with pytest.raises(TimeoutError):
+            multiplexer.request(socket.AF_INET, address, b"ping", 1, [0.1])
+
+        assert not multiplexer.pending
+
+
+class TestConnectionIDCache:
+    """Tests for ConnectionIDCache."""
+
+    def test_connection_id_expires(self) -> None:
+        """A connection ID is reused within its lifetime only."""
+        cache = ConnectionIDCache(lifetime=60)
+        cache.put(("93.184.216.34", 6969), 0x1234, now=1000)
+
+        assert cache.get(("93.184.216.34", 6969), now=1059) == 0x1234
+        assert cache.get(("93.184.216.34", 1337), now=1059) is None
+        assert cache.get(("93.184.216.34", 6969), now=1060) is None
+        assert not cache.entries
+
+    def test_discard(self) -> None:
+        """A rejected connection ID is forgotten."""
+        cache = ConnectionIDCache()
+        cache.put(("93.184.216.34", 6969), 0x1234)
+        cache.discard(("93.184.216.34", 6969))
+
+        assert cache.get(("93.184.216.34", 6969)) is None
+
+    def test_lost_request_is_retransmitted(self, multiplexer: UDPMultiplexer, peer: socket.socket) -> None:
+        """A request the peer never answered is sent again, and the answer to the resend completes it."""
+        from concurrent.futures import ThreadPoolExecutor
+
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            pending = executor.submit(multiplexer.request, socket.AF_INET, peer.getsockname(), b"ping", 7, [0.05, 5])
+            peer.recvfrom(2048)  # Lost
+            data, addr = peer.recvfrom(2048)
+            peer.sendto(struct.pack("!iI", 0, 7), addr)
+
+            assert data == b"ping"
+            assert pending.result() == struct.pack("!iI", 0, 7)
@@ -1,20 +1,25 @@
 """Comprehensive tests for newtrackon.utils module."""
 
+import threading
+import time
 from typing import Any
-from unittest.mock import MagicMock
+from unittest.mock import MagicMock, patch
 from urllib.parse import urlparse
 
+import pytest
 from freezegun import freeze_time
 
 from newtrackon.utils import (
+    TokenBucket,
     add_api_headers,
     build_httpx_url,
     dict_factory,
     format_list,
     format_time,
     format_uptime_and_downtime_time,
+    interleave_families,
     process_txt_prefs,
-    remove_ipvx_only_trackers,
+    race,
 )
 
 
@@ -441,116 +446,6 @@ class TestFormatUptimeAndDowntimeTime:
         assert result is trackers
 
 
-class TestRemoveIpvxOnlyTrackers:
-    """Tests for remove_ipvx_only_trackers function."""
-
-    def test_remove_ipv4_only_when_version_6(self):
-        """Should remove IPv4-only trackers when requesting IPv6."""
-        raw_list = [
-            ("udp://tracker1.example.com:6969", ["192.168.1.1"]),
-            ("udp://tracker2.example.com:6969", ["2001:db8::1"]),
-            ("udp://tracker3.example.com:6969", ["192.168.1.2", "2001:db8::2"]),
-        ]
-
-        result = remove_ipvx_only_trackers(raw_list, version=6)
-
-        # Should keep only trackers with IPv4 addresses (to keep for IPv6 filtering)
-        # When version=6, ip_type_to_keep is IPv4Address, so it keeps trackers that have IPv4
-        urls = [url for url, _ in result]
-        assert "udp://tracker1.example.com:6969" in urls
-        assert "udp://tracker3.example.com:6969" in urls
-        assert "udp://tracker2.example.com:6969" not in urls
-
-    def test_remove_ipv6_only_when_version_4(self):
-        """Should remove IPv6-only trackers when requesting IPv4."""
-        raw_list = [
-            ("udp://tracker1.example.com:6969", ["192.168.1.1"]),
-            ("udp://tracker2.example.com:6969", ["2001:db8::1"]),
-            ("udp://tracker3.example.com:6969", ["192.168.1.2", "2001:db8::2"]),
-        ]
-
-        result = remove_ipvx_only_trackers(raw_list, version=4)
-
-        # When version=4, ip_type_to_keep is IPv6Address, so it keeps trackers that have IPv6
-        urls = [url for url, _ in result]
-        assert "udp://tracker2.example.com:6969" in urls
-        assert "udp://tracker3.example.com:6969" in urls
-        assert "udp://tracker1.example.com:6969" not in urls
-
-    def test_dual_stack_tracker_kept_for_both_versions(self):
-        """Dual-stack trackers should be kept regardless of version filter."""
-        raw_list = [
-            ("udp://dualstack.example.com:6969", ["192.168.1.1", "2001:db8::1"]),
-        ]
-
-        result_v4 = remove_ipvx_only_trackers(raw_list, version=4)
-        result_v6 = remove_ipvx_only_trackers(raw_list, version=6)
-
-        assert len(result_v4) == 1
-        assert len(result_v6) == 1
-
-    def test_empty_list(self):
-        """Should handle empty input list."""
-        result = remove_ipvx_only_trackers([], version=4)
-
-        assert result == []
-
-    def test_tracker_with_empty_ips_list(self) -> None:
-        """Should filter out trackers with empty IP lists."""
-        raw_list: list[tuple[str, list[str]]] = [
-            ("udp://tracker1.example.com:6969", []),
-            ("udp://tracker2.example.com:6969", ["192.168.1.1"]),
-        ]
-
-        result = remove_ipvx_only_trackers(raw_list, version=6)
-
-        # Empty IP list should be filtered out
-        assert len(result) == 1
-        assert result[0][0] == "udp://tracker2.example.com:6969"
-
-    def test_tracker_with_none_ips_treated_as_falsy(self):
-        """Trackers with falsy IP lists should be filtered out."""
-        raw_list = [
-            ("udp://tracker1.example.com:6969", None),
-            ("udp://tracker2.example.com:6969", ["192.168.1.1"]),
-        ]
-
-        result = remove_ipvx_only_trackers(raw_list, version=6)  # type: ignore[arg-type]
-
-        assert len(result) == 1
-        assert result[0][0] == "udp://tracker2.example.com:6969"
-
-    def test_preserves_ip_list_in_result(self):
-        """Should preserve the IP list in the result tuples."""
-        raw_list = [
-            ("udp://tracker.example.com:6969", ["192.168.1.1", "2001:db8::1"]),
-        ]
-
-        result = remove_ipvx_only_trackers(raw_list, version=4)
-
-        assert result[0][1] == ["192.168.1.1", "2001:db8::1"]
-
-    def test_multiple_ipv4_addresses(self):
-        """Should handle trackers with multiple IPv4 addresses."""
-        raw_list = [
-            ("udp://tracker.example.com:6969", ["192.168.1.1", "192.168.1.2", "10.0.0.1"]),
-        ]
-
-        result = remove_ipvx_only_trackers(raw_list, version=6)
-
-        assert len(result) == 1
-
-    def test_multiple_ipv6_addresses(self):
-        """Should handle trackers with multiple IPv6 addresses."""
-        raw_list = [
-            ("udp://tracker.example.com:6969", ["2001:db8::1", "2001:db8::2", "fe80::1"]),
-        ]
-
-        result = remove_ipvx_only_trackers(raw_list, version=4)
-
-        assert len(result) == 1
-
-
 class TestFormatList:
     """Tests for format_list function."""
 
@@ -829,3 +724,82 @@ class TestBuildHttpxUrl:
         result = build_httpx_url(submitted_url, tls=False)
 
         assert "tracker.cdn.example.com" in result
+
+
+class TestTokenBucket:
+    """Tests for TokenBucket class."""
+
+    def test_starts_full_and_drains(self) -> None:
+        """A new bucket allows a burst of capacity events."""
+        bucket = TokenBucket(rate=1, capacity=3)
+
+        assert [bucket.take(100) for _ in range(4)] == [True, True, True, False]
+
+    def test_refills_at_rate(self) -> None:
+        """Tokens come back at the configured rate, capped at capacity."""
+        bucket = TokenBucket(rate=2, capacity=2)
+        bucket.take(100)
+        bucket.take(100)
+
+        assert bucket.delay(100) == 0.5
+        assert bucket.take(100.5) is True
+        assert bucket.take(100.5) is False
+        assert bucket.take(1000) is True
+        assert bucket.take(1000) is True
+        assert bucket.take(1000) is False
+
+    def test_zero_rate_never_refills(self) -> None:
+        """A bucket without rate has an infinite delay once empty."""
+        bucket = TokenBucket(rate=0, capacity=1)
+        bucket.take(0)
+
+        assert bucket.delay(10) == float("inf")
+
+
+class TestInterleaveFamilies:
+    """Tests for interleave_families function."""
+
+    def test_alternates_starting_with_ipv6(self) -> None:
+        """Families alternate, IPv6 first, keeping the order within each family."""
+        ips = ["1.1.1.1", "2.2.2.2", "3.3.3.3", "2001:db8::1"]
+
+        assert interleave_families(ips) == ["2001:db8::1", "1.1.1.1", "2.2.2.2", "3.3.3.3"]
+
+    def test_single_family(self) -> None:
+        """Single-stack trackers keep their address order."""
+        assert interleave_families(["1.1.1.1", "2.2.2.2"]) == ["1.1.1.1", "2.2.2.2"]
+        assert interleave_families([]) == []
+
+
+class TestRace:
+    """Tests for race, the threaded happy eyeballs."""
+
+    def test_next_address_starts_after_the_delay_and_can_win(self) -> None:
+        """A hanging first address doesn't hold back the second, and its late result goes to on_loser."""
+        release = threading.Event()
+        losers: list[str] = []
+
+        def attempt(address: str) -> str:
+            if address == "slow":
+                release.wait(5)
+            return address
+
+        with patch("newtrackon.utils.HAPPY_EYEBALLS_DELAY", 0.01):
+            assert race(["slow", "fast"], attempt, on_loser=losers.append) == "fast"
+        release.set()
+        for _ in range(100):
+            if losers:
+                break
+            time.sleep(0.01)
+        assert losers == ["slow"]
+
+    def test_failure_starts_the_next_address_at_once(self) -> None:
+        """A failed attempt doesn't wait out the delay, and the last error is raised once all have failed."""
+
+        def attempt(address: str) -> str:
+            raise OSError(f"{address} refused")
+
+        started = time.monotonic()
+        with patch("newtrackon.utils.HAPPY_EYEBALLS_DELAY", 60), pytest.raises(OSError, match="second refused"):
+            race(["first", "second"], attempt)
+        assert time.monotonic() - started < 5